@@ -1,3 +1,5 @@
+import argparse
+import json
 import os
 import sys
 from dotenv import load_dotenv
@@ -8,9 +10,95 @@ load_dotenv()
 # Add src to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.core.orchestrator import OrchestrationAgent
+from src.core.checkpoint import dump_state
+from src.core.orchestrator import BatchResult, OrchestrationAgent
+from src.utils.llm_limiter import get_llm_limiter_stats
+from src.utils.llm_metrics import write_llm_calls_jsonl
+from src.utils.structured_output import get_structured_output_stats
 
-def main():
+# NDJSON に書き出す state のキー（記事本文は長いので含めない）
+_RESULT_STATE_KEYS = (
+    "request_id",
+    "halt_reason",
+    "optimistic_argument",
+    "pessimistic_argument",
+    "critique",
+    "optimistic_rebuttal",
+    "pessimistic_rebuttal",
+    "final_report",
+    "phase_timings",
+    "result_cache_hit",
+    "degraded",
+)
+
+
+def read_topics(stream):
+    """1行1トピック（空行と # で始まる行は読み飛ばす）"""
+    for line in stream:
+        topic = line.strip()
+        if topic and not topic.startswith("#"):
+            yield topic
+
+
+def result_record(result: BatchResult) -> dict:
+    state = result.state or {}
+    record = {
+        "index": result.index,
+        "topic": result.topic,
+        "ok": result.ok,
+        "error": result.error,
+        "phase_errors": result.phase_errors,
+        "halt": bool(state.get("halt")),
+        "duration_sec": result.duration_sec,
+    }
+    record.update(json.loads(dump_state({k: state[k] for k in _RESULT_STATE_KEYS if k in state})))
+    return record
+
+
+def run_batch(args) -> int:
+    orchestrator = OrchestrationAgent(args.model)
+    src = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = 0
+    try:
+        results = orchestrator.invoke_many(
+            read_topics(src),
+            max_concurrency=args.concurrency,
+            bypass_cache=args.no_cache,
+            deadline=args.deadline,
+        )
+        for n, result in enumerate(results, 1):
+            failed += 0 if result.ok else 1
+            out.write(json.dumps(result_record(result), ensure_ascii=False) + "\n")
+            out.flush()
+            if args.metrics and result.state:
+                write_llm_calls_jsonl(result.state.get("llm_calls") or [], args.metrics)
+            status = "ok" if result.ok else f"error: {result.error}"
+            print(f"[{n}] #{result.index} {result.topic} ({result.duration_sec:.1f}s) {status}", file=sys.stderr)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    stats = get_structured_output_stats()
+    if stats["calls"]:
+        print(
+            f"structured output: calls={stats['calls']} repaired={stats['repaired']} "
+            f"fallback_rate={stats['fallback_rate']:.1%}",
+            file=sys.stderr,
+        )
+    limiter = get_llm_limiter_stats()
+    if limiter:
+        print(
+            f"llm limiter: limit={limiter['limit']}/{limiter['max_limit']} acquired={limiter['acquired']} "
+            f"waited={limiter['waited']} wait_avg={limiter['wait_sec_avg']}s wait_max={limiter['wait_sec_max']}s "
+            f"max_queue_depth={limiter['max_queue_depth']}",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+def main(model_name: str = "gemma3:4b"):
     topic = input("Enter a topic or URL to analyze: ")
     if not topic:
         print("Topic is required.")
@@ -18,9 +106,16 @@ def main():
 
     print("Initializing system...")
     try:
-        orchestrator = OrchestrationAgent()
+        orchestrator = OrchestrationAgent(model_name)
         print("Running analysis...")
-        result = orchestrator.invoke({"topic": topic, "messages": []})
+        result = {}
+        for event in orchestrator.stream({"topic": topic, "messages": []}):
+            result = event.state
+            if event.key == "halt_reason":
+                print(f"Stopped: {event.value}")
+                return
+            if not event.done:
+                print(f"  [{event.elapsed_sec:6.1f}s] {event.phase}: {event.key} ({event.duration_sec:.1f}s)")
         
         print("\n=== Final Report ===")
         print(result.get("final_report"))
@@ -28,6 +123,30 @@ def main():
     except Exception as e:
         print(f"An error occurred: {e}")
 
-if __name__ == "__main__":
-    main()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ニュース記事の多角的分析")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="トピック/URLを1行ずつ読み込んで一括実行する（- で標準入力）。結果は NDJSON で出力",
+    )
+    parser.add_argument("--output", "-o", default="-", help="NDJSON の出力先（既定: 標準出力）")
+    parser.add_argument("--concurrency", "-j", type=int, default=4, help="同時に実行する件数（既定: 4）")
+    parser.add_argument("--model", default="gemma3:4b", help="使用するモデル（既定: gemma3:4b）")
+    parser.add_argument("--no-cache", action="store_true", help="結果キャッシュを参照しない")
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SEC",
+        help="1件あたりの目安の秒数。残りが少なければ反論やレポートの仕上げを省いて決定的な要約で返す",
+    )
+    parser.add_argument("--metrics", metavar="FILE", help="LLM 呼び出しごとの計測値を JSONL で追記する")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.batch:
+        sys.exit(run_batch(args))
+    main(args.model)
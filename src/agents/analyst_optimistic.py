@@ -1,6 +1,10 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseChatModel
 from src.models.schemas import Argument, Critique, Rebuttal
+from src.utils.json_stream import DeltaCallback, astream_structured, stream_structured
+from src.utils.llm_metrics import llm_config, record_llm_path
+from src.utils.shared_context import shared_article_text, shared_context_enabled, shared_context_prompt
+from src.utils.structured_output import structured_chain
 import logging
 import os
 
@@ -89,6 +93,11 @@ class OptimisticAnalystAgent:
 反論を生成してください。""")
         ])
 
+        # SHARED_CONTEXT_PROMPTS=1 用: 記事本文は全フェーズ共通の先頭部分に置き、役割の指示を後ろに付ける
+        # （反論でも記事本文は先頭部分に入る。前のフェーズの KV キャッシュを再利用するので prefill はほぼ増えない）
+        self.analyze_prompt_shared = shared_context_prompt(self.analyze_prompt, "上の記事を分析してください。")
+        self.debate_prompt_shared = shared_context_prompt(self.debate_prompt_basic)
+
     @staticmethod
     def _format_argument_for_prompt(argument: Argument) -> str:
         conclusion = "" if argument is None else str(getattr(argument, "conclusion", "") or "")
@@ -110,12 +119,14 @@ class OptimisticAnalystAgent:
         factual = "\n".join([f"- {x}" for x in factual_errors]) if factual_errors else "（なし）"
         return f"バイアス指摘:\n{bias}\n事実誤り:\n{factual}"
     
-    def analyze(self, article_text: str) -> Argument:
+    def analyze(self, article_text: str, on_delta: DeltaCallback | None = None) -> Argument:
         """
         記事を楽観的な視点から分析する（フェーズ1）
         
         Args:
             article_text: 分析対象の記事テキスト
+            on_delta: 指定すると出力をストリーミングで受け取り、文字列値が伸びるたびに on_delta(位置, 差分) を呼ぶ
+                （例: 位置 ("conclusion",) / ("evidence", 0)）
         
         Returns:
             Argument: 楽観的な結論と証拠
@@ -127,21 +138,54 @@ class OptimisticAnalystAgent:
             raise ValueError("記事テキストが空です。")
         
         try:
+            prompt, inputs = self._analyze_prompt(article_text)
+            if on_delta is not None:
+                return stream_structured(
+                    self.model, prompt, inputs, Argument, on_delta, config=llm_config("analyze", "streaming")
+                )
+
             # プロンプトチェーンを作成
-            chain = self.analyze_prompt | self.model.with_structured_output(Argument)
+            chain = structured_chain(prompt, self.model, Argument)
             
             # LLMを呼び出して構造化出力を取得
-            result = chain.invoke({"article_text": article_text})
+            result = chain.invoke(inputs, config=llm_config("analyze"))
             
             return result
             
         except Exception as e:
-            # エラーが発生した場合、フォールバックとしてモックデータを返す
-            logging.getLogger(__name__).exception("楽観的分析エラー: %s", e)
-            return Argument(
-                conclusion=f"分析中にエラーが発生しました: {str(e)}",
-                evidence=[]
-            )
+            return self._analyze_fallback(e)
+
+    async def aanalyze(self, article_text: str, on_delta: DeltaCallback | None = None) -> Argument:
+        """analyze の asyncio 版（LangChain の ainvoke を使用）"""
+        if not article_text or not article_text.strip():
+            raise ValueError("記事テキストが空です。")
+
+        try:
+            prompt, inputs = self._analyze_prompt(article_text)
+            if on_delta is not None:
+                return await astream_structured(
+                    self.model, prompt, inputs, Argument, on_delta, config=llm_config("analyze", "streaming")
+                )
+            chain = structured_chain(prompt, self.model, Argument)
+            return await chain.ainvoke(inputs, config=llm_config("analyze"))
+        except Exception as e:
+            return self._analyze_fallback(e)
+
+    def _analyze_prompt(self, article_text: str):
+        """分析のプロンプトと入力を組み立てる（SHARED_CONTEXT_PROMPTS=1 なら共通の先頭部分から始まる版）"""
+        if shared_context_enabled():
+            return self.analyze_prompt_shared, {"shared_article": shared_article_text(article_text)}
+        return self.analyze_prompt, {"article_text": article_text}
+
+    @staticmethod
+    def _analyze_fallback(e: Exception) -> Argument:
+        # エラーが発生した場合、フォールバックとしてモックデータを返す
+        record_llm_path("analyze", error=e)
+        logging.getLogger(__name__).exception("楽観的分析エラー: %s", e)
+        return Argument(
+            conclusion=f"分析中にエラーが発生しました: {str(e)}",
+            evidence=[]
+        )
     
     def debate(
         self,
@@ -149,6 +193,7 @@ class OptimisticAnalystAgent:
         opponent_argument: Argument,
         original_argument: Argument,
         article_text: str | None = None,
+        on_delta: DeltaCallback | None = None,
     ) -> Rebuttal:
         """
         ファクトチェッカーの批判と相手の主張に対して反論する（フェーズ3）
@@ -158,31 +203,74 @@ class OptimisticAnalystAgent:
             opponent_argument: 悲観的アナリストの主張
             original_argument: 自分（楽観的アナリスト）の主張（フェーズ1の出力）
             article_text: 元の記事テキスト（参考・必要なら引用）
+            on_delta: 指定すると出力をストリーミングで受け取る（analyze と同じ）
         
         Returns:
             Rebuttal: 反論ポイントと補強証拠
         """
         try:
-            # プロンプトチェーンを作成（既定は修正前と同一入力。環境変数でのみ本文コンテキストを追加）
-            use_article = os.getenv("ENABLE_REBUTTAL_ARTICLE_CONTEXT", "0") == "1"
-            prompt = self.debate_prompt_with_article if use_article else self.debate_prompt_basic
-            chain = prompt | self.model.with_structured_output(Rebuttal)
+            prompt, inputs = self._debate_prompt(critique, opponent_argument, original_argument, article_text)
+            if on_delta is not None:
+                return stream_structured(
+                    self.model, prompt, inputs, Rebuttal, on_delta, config=llm_config("debate", "streaming")
+                )
             
             # LLMを呼び出して構造化出力を取得
-            result = chain.invoke({
-                "original_argument": self._format_argument_for_prompt(original_argument),
-                "opponent_argument": self._format_argument_for_prompt(opponent_argument),
-                "critique": self._format_critique_for_prompt(critique),
-                "article_text": (article_text or "").strip(),
-            })
+            chain = structured_chain(prompt, self.model, Rebuttal)
+            result = chain.invoke(inputs, config=llm_config("debate"))
             
             return result
             
         except Exception as e:
-            # エラーが発生した場合、フォールバックとしてモックデータを返す
-            logging.getLogger(__name__).exception("楽観的反論エラー: %s", e)
-            return Rebuttal(
-                counter_points=[f"エラー: {str(e)}"],
-                strengthened_evidence=[]
-            )
+            return self._debate_fallback(e)
+
+    async def adebate(
+        self,
+        critique: Critique,
+        opponent_argument: Argument,
+        original_argument: Argument,
+        article_text: str | None = None,
+        on_delta: DeltaCallback | None = None,
+    ) -> Rebuttal:
+        """debate の asyncio 版（LangChain の ainvoke を使用）"""
+        try:
+            prompt, inputs = self._debate_prompt(critique, opponent_argument, original_argument, article_text)
+            if on_delta is not None:
+                return await astream_structured(
+                    self.model, prompt, inputs, Rebuttal, on_delta, config=llm_config("debate", "streaming")
+                )
+            chain = structured_chain(prompt, self.model, Rebuttal)
+            return await chain.ainvoke(inputs, config=llm_config("debate"))
+        except Exception as e:
+            return self._debate_fallback(e)
+
+    def _debate_prompt(
+        self,
+        critique: Critique,
+        opponent_argument: Argument,
+        original_argument: Argument,
+        article_text: str | None,
+    ):
+        """反論生成のプロンプトと入力を組み立てる（同期/非同期・ストリーミングで共通）"""
+        inputs = {
+            "original_argument": self._format_argument_for_prompt(original_argument),
+            "opponent_argument": self._format_argument_for_prompt(opponent_argument),
+            "critique": self._format_critique_for_prompt(critique),
+        }
+        if shared_context_enabled():
+            return self.debate_prompt_shared, {**inputs, "shared_article": shared_article_text(article_text)}
+        # 既定は修正前と同一入力。環境変数でのみ本文コンテキストを追加
+        use_article = os.getenv("ENABLE_REBUTTAL_ARTICLE_CONTEXT", "0") == "1"
+        prompt = self.debate_prompt_with_article if use_article else self.debate_prompt_basic
+        return prompt, {**inputs, "article_text": (article_text or "").strip()}
+
+    @staticmethod
+    def _debate_fallback(e: Exception) -> Rebuttal:
+        # エラーが発生した場合、フォールバックとしてモックデータを返す
+        record_llm_path("debate", error=e)
+        logging.getLogger(__name__).exception("楽観的反論エラー: %s", e)
+        return Rebuttal(
+            counter_points=[f"エラー: {str(e)}"],
+            strengthened_evidence=[]
+        )
 
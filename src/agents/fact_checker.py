@@ -1,6 +1,9 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseChatModel
 from src.models.schemas import Argument, Critique
+from src.utils.llm_metrics import llm_config, record_llm_path
+from src.utils.shared_context import shared_article_text, shared_context_enabled, shared_context_prompt
+from src.utils.structured_output import constrained_model
 import json
 import re
 import logging
@@ -91,6 +94,28 @@ class FactCheckerAgent:
             original_error=RuntimeError("CritiqueはJSON経由で復元（structured_output不使用）"),
         )
 
+    async def avalidate(
+        self,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        article_text: str
+    ) -> Critique:
+        """validate の asyncio 版（LangChain の ainvoke を使用）"""
+        if not optimistic_argument or not pessimistic_argument:
+            raise ValueError("検証する主張が不足しています。")
+        if not article_text or not article_text.strip():
+            raise ValueError("記事テキストが空です。")
+
+        original_error = RuntimeError("CritiqueはJSON経由で復元（structured_output不使用）")
+        content = ""
+        try:
+            prompt, inputs = self._validate_json_request(optimistic_argument, pessimistic_argument, article_text)
+            raw = await (prompt | constrained_model(self.model, Critique)).ainvoke(inputs, config=llm_config("validate", "json"))
+            content = self._message_text(raw)
+            return await self._anormalize_critique(self._critique_from_json_text(content))
+        except Exception as e:
+            return self._validate_failure(e, content, original_error)
+
     def _normalize_critique(self, critique: Critique) -> Critique:
         """
         CritiqueをUI表示向けに正規化する。
@@ -98,12 +123,7 @@ class FactCheckerAgent:
         - 重複項目を除去する（LLMが同じ文を複数回出すケースの対策）
         """
         try:
-            bias_points = list(getattr(critique, "bias_points", []) or [])
-            factual_errors = list(getattr(critique, "factual_errors", []) or [])
-
-            bias_points = self._dedupe_points(bias_points)
-            factual_errors = [self._truncate_text(x, 200) for x in factual_errors]
-            factual_errors = self._dedupe_points(factual_errors)
+            bias_points, factual_errors = self._prenormalize_points(critique)
 
             # --- 日本語化: まれに英語で返るケースがあるため、UI表示向けに日本語へ寄せる ---
             # - モデル未接続/失敗時はそのまま（フォールバック）
@@ -115,6 +135,26 @@ class FactCheckerAgent:
             # 失敗時は元のまま返す
             return critique
 
+    async def _anormalize_critique(self, critique: Critique) -> Critique:
+        """_normalize_critique の asyncio 版"""
+        try:
+            bias_points, factual_errors = self._prenormalize_points(critique)
+            bias_points = await self._aensure_japanese_points(bias_points, kind="bias_points")
+            factual_errors = await self._aensure_japanese_points(factual_errors, kind="factual_errors")
+            return Critique(bias_points=bias_points, factual_errors=factual_errors)
+        except Exception:
+            return critique
+
+    def _prenormalize_points(self, critique: Critique) -> tuple[list[str], list[str]]:
+        """日本語化（LLM呼び出し）の前に行う、丸め・重複除去。"""
+        bias_points = list(getattr(critique, "bias_points", []) or [])
+        factual_errors = list(getattr(critique, "factual_errors", []) or [])
+
+        bias_points = self._dedupe_points(bias_points)
+        factual_errors = [self._truncate_text(x, 200) for x in factual_errors]
+        factual_errors = self._dedupe_points(factual_errors)
+        return bias_points, factual_errors
+
     @staticmethod
     def _contains_japanese(text: str) -> bool:
         s = "" if text is None else str(text)
@@ -127,26 +167,54 @@ class FactCheckerAgent:
         - 既に日本語っぽいものはそのまま
         - 翻訳に失敗した場合はそのまま（安全側）
         """
-        items = [("" if x is None else str(x)).strip() for x in (points or [])]
-        items = [x for x in items if x]
-        if not items:
+        items = self._clean_points(points)
+        if not self._needs_japanese_rewrite(items):
             return items
 
-        # 英語中心と判断したものが無ければ何もしない
-        needs = [x for x in items if not self._contains_japanese(x)]
-        if not needs:
+        try:
+            raw = (self._japanese_rewrite_prompt() | self.model).invoke(
+                {"items_json": json.dumps(items, ensure_ascii=False)}, config=llm_config("japanese_rewrite", "json")
+            )
+            return self._parse_japanese_rewrite(items, self._message_text(raw))
+        except Exception as e:
+            logging.getLogger(__name__).info("日本語化をスキップ（%s）: %s", kind, e)
+            return items
+
+    async def _aensure_japanese_points(self, points: list[str], kind: str) -> list[str]:
+        """_ensure_japanese_points の asyncio 版"""
+        items = self._clean_points(points)
+        if not self._needs_japanese_rewrite(items):
             return items
 
         try:
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    (
-                        "system",
-                        "あなたは翻訳者です。必ず日本語で書き直してください。必ずJSONのみを出力してください。",
-                    ),
-                    (
-                        "human",
-                        """次の items を順番を変えずに日本語へ書き直してください。
+            raw = await (self._japanese_rewrite_prompt() | self.model).ainvoke(
+                {"items_json": json.dumps(items, ensure_ascii=False)}, config=llm_config("japanese_rewrite", "json")
+            )
+            return self._parse_japanese_rewrite(items, self._message_text(raw))
+        except Exception as e:
+            logging.getLogger(__name__).info("日本語化をスキップ（%s）: %s", kind, e)
+            return items
+
+    @staticmethod
+    def _clean_points(points: list[str]) -> list[str]:
+        items = [("" if x is None else str(x)).strip() for x in (points or [])]
+        return [x for x in items if x]
+
+    def _needs_japanese_rewrite(self, items: list[str]) -> bool:
+        # 英語中心と判断したものが無ければ何もしない
+        return any(not self._contains_japanese(x) for x in items)
+
+    @staticmethod
+    def _japanese_rewrite_prompt() -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "あなたは翻訳者です。必ず日本語で書き直してください。必ずJSONのみを出力してください。",
+                ),
+                (
+                    "human",
+                    """次の items を順番を変えずに日本語へ書き直してください。
 
 ルール:
 - 既に日本語の文はそのままでもよい
@@ -158,35 +226,38 @@ class FactCheckerAgent:
 items:
 {items_json}
 """,
-                    ),
-                ]
-            )
-            raw = (prompt | self.model).invoke({"items_json": json.dumps(items, ensure_ascii=False)})
-            content = getattr(raw, "content", raw)
-            if not isinstance(content, str):
-                content = str(content)
-            cleaned = self._strip_code_fences(content)
-            json_text = (
-                self._extract_first_json_object_stream(cleaned)
-                or self._extract_first_json_object(cleaned)
-                or cleaned
-            )
-            data = json.loads(json_text)
-            out = data.get("items") if isinstance(data, dict) else None
-            if not isinstance(out, list):
-                return items
-            out2 = [("" if x is None else str(x)).strip() for x in out]
-            out2 = [x for x in out2 if x]
-            # 長さが合わない場合は安全側（元を返す）
-            if len(out2) != len(items):
-                return items
-            # 再度丸め・重複除去
-            out2 = [self._truncate_text(x, 200) for x in out2]
-            out2 = self._dedupe_points(out2)
-            return out2
-        except Exception as e:
-            logging.getLogger(__name__).info("日本語化をスキップ（%s）: %s", kind, e)
+                ),
+            ]
+        )
+
+    def _parse_japanese_rewrite(self, items: list[str], content: str) -> list[str]:
+        cleaned = self._strip_code_fences(content)
+        json_text = (
+            self._extract_first_json_object_stream(cleaned)
+            or self._extract_first_json_object(cleaned)
+            or cleaned
+        )
+        data = json.loads(json_text)
+        out = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(out, list):
+            return items
+        out2 = [("" if x is None else str(x)).strip() for x in out]
+        out2 = [x for x in out2 if x]
+        # 長さが合わない場合は安全側（元を返す）
+        if len(out2) != len(items):
             return items
+        # 再度丸め・重複除去
+        out2 = [self._truncate_text(x, 200) for x in out2]
+        out2 = self._dedupe_points(out2)
+        return out2
+
+    @staticmethod
+    def _message_text(raw) -> str:
+        # rawはMessage型になることがあるのでcontentを取り出す
+        content = getattr(raw, "content", raw)
+        if not isinstance(content, str):
+            content = str(content)
+        return content
 
     @staticmethod
     def _dedupe_points(points: list[str]) -> list[str]:
@@ -247,72 +318,93 @@ items:
         structured_outputが失敗した場合のフォールバック。
         LLMにJSON文字列で出させて、Pydantic(Critique)へ復元する。
         """
+        content = ""
         try:
-            optimistic_evidence_str = "\n".join([f"- {ev}" for ev in optimistic_argument.evidence])
-            pessimistic_evidence_str = "\n".join([f"- {ev}" for ev in pessimistic_argument.evidence])
-
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", "あなたは客観的なファクトチェッカーです。必ずJSONのみを出力してください。"),
-                ("human", """以下を検証し、次のJSONのみを返してください。\n\nJSONスキーマ:\n{{\n  \"bias_points\": [\"...\"] ,\n  \"factual_errors\": [\"...\"]\n}}\n\n元の記事:\n{article_text}\n\n楽観的アナリスト:\n結論: {optimistic_conclusion}\n証拠:\n{optimistic_evidence}\n\n悲観的アナリスト:\n結論: {pessimistic_conclusion}\n証拠:\n{pessimistic_evidence}\n""")
-            ])
-            raw = (prompt | self.model).invoke({
-                "article_text": self._truncate_article_text(article_text),
-                "optimistic_conclusion": optimistic_argument.conclusion,
-                "optimistic_evidence": optimistic_evidence_str if optimistic_evidence_str else "（証拠なし）",
-                "pessimistic_conclusion": pessimistic_argument.conclusion,
-                "pessimistic_evidence": pessimistic_evidence_str if pessimistic_evidence_str else "（証拠なし）",
-            })
-
-            # rawはMessage型になることがあるのでcontentを取り出す
-            content = getattr(raw, "content", raw)
-            if not isinstance(content, str):
-                content = str(content)
-
-            # --- JSON抽出の頑健化（案F1） ---
-            # - ```json ... ``` のフェンス除去
-            # - 複数JSONがある/前後に説明がある場合でも「最初にパースできたJSON」を採用
-            cleaned = self._strip_code_fences(content)
-            json_text = (
-                self._extract_first_json_object_stream(cleaned)
-                or self._extract_first_json_object(cleaned)
-                or cleaned
-            )
-            data = json.loads(json_text)
-
-            # 欠落/型崩れに備えて最低限の形へ整形
-            if not isinstance(data, dict):
-                data = {}
-            bias_points = data.get("bias_points", [])
-            factual_errors = data.get("factual_errors", [])
-            if not isinstance(bias_points, list):
-                bias_points = []
-            if not isinstance(factual_errors, list):
-                factual_errors = []
-            data = {"bias_points": bias_points, "factual_errors": factual_errors}
-
-            if hasattr(Critique, "model_validate"):
-                critique = Critique.model_validate(data)  # pydantic v2
-            else:
-                critique = Critique.parse_obj(data)  # pydantic v1
-            return self._normalize_critique(critique)
+            prompt, inputs = self._validate_json_request(optimistic_argument, pessimistic_argument, article_text)
+            raw = (prompt | constrained_model(self.model, Critique)).invoke(inputs, config=llm_config("validate", "json"))
+            content = self._message_text(raw)
+            return self._normalize_critique(self._critique_from_json_text(content))
 
         except Exception as e:
-            logging.getLogger(__name__).exception("ファクトチェックフォールバックエラー: %s", e)
-            # 観測性: モデル出力の断片（記事本文ではなく、LLM出力側のみ）を短く残す
-            try:
-                snippet = self._safe_snippet(locals().get("content", ""), 480)
-                if snippet:
-                    logging.getLogger(__name__).warning("ファクトチェック復元失敗: model_output_snippet=%s", snippet)
-            except Exception:
-                pass
-            return Critique(
-                bias_points=[
-                    "検証に失敗しました（出力の構造化に失敗）。",
-                    f"structured_outputエラー: {str(original_error)}",
-                    f"fallbackエラー: {str(e)}",
-                ],
-                factual_errors=[],
+            return self._validate_failure(e, content, original_error)
+
+    def _validate_json_request(
+        self,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        article_text: str,
+    ) -> tuple[ChatPromptTemplate, dict]:
+        """JSON出力による検証のプロンプトと入力を組み立てる（同期/非同期で共通）"""
+        optimistic_evidence_str = "\n".join([f"- {ev}" for ev in optimistic_argument.evidence])
+        pessimistic_evidence_str = "\n".join([f"- {ev}" for ev in pessimistic_argument.evidence])
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "あなたは客観的なファクトチェッカーです。必ずJSONのみを出力してください。"),
+            ("human", """以下を検証し、次のJSONのみを返してください。\n\nJSONスキーマ:\n{{\n  \"bias_points\": [\"...\"] ,\n  \"factual_errors\": [\"...\"]\n}}\n\n元の記事:\n{article_text}\n\n楽観的アナリスト:\n結論: {optimistic_conclusion}\n証拠:\n{optimistic_evidence}\n\n悲観的アナリスト:\n結論: {pessimistic_conclusion}\n証拠:\n{pessimistic_evidence}\n""")
+        ])
+        inputs = {
+            "article_text": self._truncate_article_text(article_text),
+            "optimistic_conclusion": optimistic_argument.conclusion,
+            "optimistic_evidence": optimistic_evidence_str if optimistic_evidence_str else "（証拠なし）",
+            "pessimistic_conclusion": pessimistic_argument.conclusion,
+            "pessimistic_evidence": pessimistic_evidence_str if pessimistic_evidence_str else "（証拠なし）",
+        }
+        if shared_context_enabled():
+            # 記事本文は全フェーズ共通の先頭部分に置く（src.utils.shared_context）
+            prompt = shared_context_prompt(
+                prompt,
+                """上の記事をもとに以下を検証し、次のJSONのみを返してください。\n\nJSONスキーマ:\n{{\n  \"bias_points\": [\"...\"] ,\n  \"factual_errors\": [\"...\"]\n}}\n\n楽観的アナリスト:\n結論: {optimistic_conclusion}\n証拠:\n{optimistic_evidence}\n\n悲観的アナリスト:\n結論: {pessimistic_conclusion}\n証拠:\n{pessimistic_evidence}\n""",
             )
+            inputs["shared_article"] = shared_article_text(article_text)
+            del inputs["article_text"]
+        return prompt, inputs
+
+    def _critique_from_json_text(self, content: str) -> Critique:
+        """モデル出力（JSON文字列）から Critique を復元する（正規化前）。"""
+        # --- JSON抽出の頑健化（案F1） ---
+        # - ```json ... ``` のフェンス除去
+        # - 複数JSONがある/前後に説明がある場合でも「最初にパースできたJSON」を採用
+        cleaned = self._strip_code_fences(content)
+        json_text = (
+            self._extract_first_json_object_stream(cleaned)
+            or self._extract_first_json_object(cleaned)
+            or cleaned
+        )
+        data = json.loads(json_text)
+
+        # 欠落/型崩れに備えて最低限の形へ整形
+        if not isinstance(data, dict):
+            data = {}
+        bias_points = data.get("bias_points", [])
+        factual_errors = data.get("factual_errors", [])
+        if not isinstance(bias_points, list):
+            bias_points = []
+        if not isinstance(factual_errors, list):
+            factual_errors = []
+        data = {"bias_points": bias_points, "factual_errors": factual_errors}
+
+        if hasattr(Critique, "model_validate"):
+            return Critique.model_validate(data)  # pydantic v2
+        return Critique.parse_obj(data)  # pydantic v1
+
+    def _validate_failure(self, e: Exception, content: str, original_error: Exception) -> Critique:
+        logging.getLogger(__name__).exception("ファクトチェックフォールバックエラー: %s", e)
+        record_llm_path("validate", error=e)
+        # 観測性: モデル出力の断片（記事本文ではなく、LLM出力側のみ）を短く残す
+        try:
+            snippet = self._safe_snippet(content, 480)
+            if snippet:
+                logging.getLogger(__name__).warning("ファクトチェック復元失敗: model_output_snippet=%s", snippet)
+        except Exception:
+            pass
+        return Critique(
+            bias_points=[
+                "検証に失敗しました（出力の構造化に失敗）。",
+                f"structured_outputエラー: {str(original_error)}",
+                f"fallbackエラー: {str(e)}",
+            ],
+            factual_errors=[],
+        )
 
     @staticmethod
     def _strip_code_fences(text: str) -> str:
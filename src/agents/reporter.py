@@ -1,15 +1,58 @@
 from __future__ import annotations
 
+import functools
 import logging
 import re
 import json
-from typing import Optional
+from typing import Any, Awaitable, Callable, Generator, Optional
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+from src.utils.deadline import Deadline
+from src.utils.json_stream import DeltaCallback, astream_structured, stream_structured
+from src.utils.llm_metrics import llm_config, record_llm_path
+from src.utils.shared_context import shared_article_text, shared_context_enabled, shared_context_prompt
+from src.utils.structured_output import constrained_model, structured_chain
+
+# deadline 指定時、report フェーズの予算（Deadline.budget_for("report")）に対してこの割合以上の残りが無ければ省く処理
+# - LLM による事実抽出/統合: 省いた場合は本文からの決定的な要約/結論（_synthesize_*_from_facts）にする
+# - JSON文字列フォールバック / critique_points の日本語化: 省いた場合はそのまま次へ進む
+_LLM_BUDGET_SHARE = 0.5
+_JSON_FALLBACK_BUDGET_SHARE = 0.5
+_JAPANESE_REWRITE_BUDGET_SHARE = 0.25
+
+
+class _LLMCall:
+    """
+    レポート生成中の LLM 呼び出し1回分。_report_steps が組み立て、create_report は run()、acreate_report は arun() で実行する
+    （同期版/非同期版の違いはここだけ）。
+    """
+
+    def __init__(self, run: Callable[[], Any], arun: Callable[[], Awaitable[Any]]) -> None:
+        self.run = run
+        self.arun = arun
+
+    @classmethod
+    def invoke(cls, runnable, inputs: dict, config: dict) -> "_LLMCall":
+        return cls(
+            functools.partial(runnable.invoke, inputs, config=config),
+            functools.partial(runnable.ainvoke, inputs, config=config),
+        )
+
+    @classmethod
+    def stream(cls, model, prompt, inputs: dict, schema: type[BaseModel], on_delta: DeltaCallback, config: dict) -> "_LLMCall":
+        args = (model, prompt, inputs, schema, on_delta)
+        return cls(
+            functools.partial(stream_structured, *args, config=config),
+            functools.partial(astream_structured, *args, config=config),
+        )
+
+
+# LLM 呼び出しを _LLMCall として返し、結果を send で受け取るジェネレーター（return 値が最終結果）
+_Steps = Generator[_LLMCall, Any, Any]
 
 
 class ReporterAgent:
@@ -140,6 +183,32 @@ class ReporterAgent:
             ]
         )
 
+        # SHARED_CONTEXT_PROMPTS=1 用: 記事本文は全フェーズ共通の先頭部分に置き、役割の指示を後ろに付ける
+        # （統合のプロンプトにも先頭部分を付ける。前のフェーズの KV キャッシュを再利用するので prefill はほぼ増えない）
+        self.facts_prompt_shared = shared_context_prompt(
+            self.facts_prompt,
+            """記事タイトル:
+{article_title}
+
+ソースURL:
+{article_url}
+
+本文からの引用候補（抜粋）:
+{article_quotes}
+
+上の記事に基づき、事実抽出をしてください。""",
+        )
+        self.facts_prompt_json_shared = shared_context_prompt(
+            self.facts_prompt_json,
+            """上の記事について、次のJSONのみを返してください。\n\nJSONスキーマ:\n{{\n  \"key_facts\": [\"...\"] ,\n  \"unknowns\": [\"...\"]\n}}\n\n記事タイトル:\n{article_title}\n\nソースURL:\n{article_url}\n\n本文からの引用候補（抜粋）:\n{article_quotes}\n""",
+        )
+        self.report_prompt_shared = shared_context_prompt(self.report_prompt)
+        self.report_prompt_json_shared = shared_context_prompt(self.report_prompt_json)
+
+    def _prompt(self, ctx: dict, name: str) -> ChatPromptTemplate:
+        """ctx（_prepare_report_context）が共通の先頭部分を使う設定なら name の shared 版を返す"""
+        return getattr(self, f"{name}_shared" if ctx["shared"] else name)
+
     @staticmethod
     def _truncate(text: str, max_chars: int = 8000) -> str:
         s = (text or "").strip()
@@ -341,32 +410,49 @@ class ReporterAgent:
         s = "" if text is None else str(text)
         return bool(re.search(r"[\u3040-\u30ff\u4e00-\u9fff]", s))
 
-    def _ensure_japanese_tagged_points(self, points: list[str]) -> list[str]:
+    def _japanese_rewrite_steps(self, points: list[str], deadline: Optional[Deadline] = None) -> _Steps:
         """
         critique_points は入力（Critique/反論）由来なので、まれに英語が混ざることがある。
-        UI表示の安定化のため、英語中心のものは日本語へ書き直す（失敗時はそのまま）。
+        UI表示の安定化のため、英語中心のものは日本語へ書き直す（失敗時/期限が近いときはそのまま）。
         """
-        items = [("" if x is None else str(x)).strip() for x in (points or [])]
-        items = [x for x in items if x]
-        if not items:
+        items = self._clean_points(points)
+        if not self._needs_japanese_rewrite(items):
+            return items
+        if not self._deadline_allows(deadline, _JAPANESE_REWRITE_BUDGET_SHARE, "report:japanese_rewrite"):
+            return items
+
+        try:
+            raw = yield _LLMCall.invoke(
+                self._japanese_rewrite_prompt() | self.model,
+                {"items_json": json.dumps(items, ensure_ascii=False)},
+                llm_config("japanese_rewrite", "json"),
+            )
+            return self._parse_japanese_rewrite(items, self._message_text(raw))
+        except Exception as e:
+            logging.getLogger(__name__).info("critique_pointsの日本語化をスキップ: %s", e)
             return items
 
+    @staticmethod
+    def _clean_points(points: list[str]) -> list[str]:
+        items = [("" if x is None else str(x)).strip() for x in (points or [])]
+        return [x for x in items if x]
+
+    def _needs_japanese_rewrite(self, items: list[str]) -> bool:
         # タグ部分（[Bias]等）を除いた本文が日本語を含むかで判定
-        need = []
         for x in items:
             body = re.sub(r"^\[[^\]]+\]\s*", "", x).strip()
             if body and not self._contains_japanese(body):
-                need.append(x)
-        if not need:
-            return items
+                return True
+        return False
 
-        try:
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", "あなたは翻訳者です。必ず日本語で書き直してください。必ずJSONのみを出力してください。"),
-                    (
-                        "human",
-                        """次の items を順番を変えずに日本語へ書き直してください。
+    @staticmethod
+    def _japanese_rewrite_prompt() -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages(
+            [
+                ("system", "あなたは翻訳者です。必ず日本語で書き直してください。必ずJSONのみを出力してください。"),
+                (
+                    "human",
+                    """次の items を順番を変えずに日本語へ書き直してください。
 
 ルール:
 - 先頭のタグ（例: [Factual] [Bias] [Rebuttal] [EvidenceCheck]）はそのまま維持する
@@ -378,34 +464,36 @@ class ReporterAgent:
 items:
 {items_json}
 """,
-                    ),
-                ]
-            )
-            raw = (prompt | self.model).invoke({"items_json": json.dumps(items, ensure_ascii=False)})
-            content = getattr(raw, "content", raw)
-            if not isinstance(content, str):
-                content = str(content)
-            cleaned = self._strip_code_fences(content)
-            json_text = self._extract_first_json_object_stream(cleaned) or cleaned
-            data = json.loads(json_text)
-            out = data.get("items") if isinstance(data, dict) else None
-            if not isinstance(out, list):
-                return items
-            out2 = [("" if x is None else str(x)).strip() for x in out]
-            out2 = [x for x in out2 if x]
-            if len(out2) != len(items):
-                return items
-            # 200文字上限（念のため）
-            trimmed = []
-            for x in out2:
-                s = re.sub(r"\s+", " ", x).strip()
-                if len(s) > 200:
-                    s = s[:200].rstrip() + "…"
-                trimmed.append(s)
-            return trimmed
-        except Exception as e:
-            logging.getLogger(__name__).info("critique_pointsの日本語化をスキップ: %s", e)
+                ),
+            ]
+        )
+
+    def _parse_japanese_rewrite(self, items: list[str], content: str) -> list[str]:
+        cleaned = self._strip_code_fences(content)
+        json_text = self._extract_first_json_object_stream(cleaned) or cleaned
+        data = json.loads(json_text)
+        out = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(out, list):
+            return items
+        out2 = [("" if x is None else str(x)).strip() for x in out]
+        out2 = [x for x in out2 if x]
+        if len(out2) != len(items):
             return items
+        # 200文字上限（念のため）
+        trimmed = []
+        for x in out2:
+            s = re.sub(r"\s+", " ", x).strip()
+            if len(s) > 200:
+                s = s[:200].rstrip() + "…"
+            trimmed.append(s)
+        return trimmed
+
+    @staticmethod
+    def _message_text(raw) -> str:
+        content = getattr(raw, "content", raw)
+        if not isinstance(content, str):
+            content = str(content)
+        return content
 
     @staticmethod
     def _facts_looks_weak(extracted_facts: list[str], quote_lines: list[str]) -> bool:
@@ -512,249 +600,491 @@ items:
         optimistic_rebuttal: Rebuttal,
         pessimistic_rebuttal: Rebuttal,
         article_url: Optional[str] = None,
+        on_delta: Optional[DeltaCallback] = None,
+        deadline: Optional[Deadline] = None,
     ) -> FinalReport:
         """
         フェーズ4: 最終レポートを生成する。
         - optimistic_view / pessimistic_view は state の値をそのまま採用（幻覚の混入を避ける）
         - LLMは summary / final_conclusion のみ生成
+        - on_delta を渡すと、統合（summary / final_conclusion）の生成をストリーミングで受け取り、
+          文字列が伸びるたびに on_delta(位置, 差分) を呼ぶ。最終値は品質ガード適用後の FinalReport を参照すること
+        - deadline を渡すと、残り時間が足りない処理（LLM呼び出し/JSONフォールバック/日本語化）を省き、
+          省いた処理を deadline.skipped に記録する
         """
+        return self._drive(
+            self._report_steps(
+                article_text,
+                optimistic_argument,
+                pessimistic_argument,
+                critique,
+                optimistic_rebuttal,
+                pessimistic_rebuttal,
+                article_url,
+                on_delta,
+                deadline,
+            )
+        )
+
+    async def acreate_report(
+        self,
+        article_text: str,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        critique: Critique,
+        optimistic_rebuttal: Rebuttal,
+        pessimistic_rebuttal: Rebuttal,
+        article_url: Optional[str] = None,
+        on_delta: Optional[DeltaCallback] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> FinalReport:
+        """create_report の asyncio 版（LLM呼び出しのみ ainvoke、前後処理は同期版と共通）"""
+        return await self._adrive(
+            self._report_steps(
+                article_text,
+                optimistic_argument,
+                pessimistic_argument,
+                critique,
+                optimistic_rebuttal,
+                pessimistic_rebuttal,
+                article_url,
+                on_delta,
+                deadline,
+            )
+        )
+
+    @staticmethod
+    def _drive(steps: _Steps) -> Any:
+        """steps が返す _LLMCall を順に実行して結果を send し（例外は throw する）、steps の return 値を返す"""
         try:
-            title, url, body = self._extract_article_header(article_text, fallback_url=article_url)
+            call = next(steps)
+            while True:
+                try:
+                    value = call.run()
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(value)
+        except StopIteration as done:
+            return done.value
 
-            quote_lines = [ln.strip()[2:].strip() for ln in self._pick_article_quotes(body, limit=6).splitlines() if ln.strip().startswith("- ")]
+    @staticmethod
+    async def _adrive(steps: _Steps) -> Any:
+        """_drive の asyncio 版（_LLMCall を await する）"""
+        try:
+            call = next(steps)
+            while True:
+                try:
+                    value = await call.arun()
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(value)
+        except StopIteration as done:
+            return done.value
+
+    def _report_steps(
+        self,
+        article_text: str,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        critique: Critique,
+        optimistic_rebuttal: Rebuttal,
+        pessimistic_rebuttal: Rebuttal,
+        article_url: Optional[str],
+        on_delta: Optional[DeltaCallback],
+        deadline: Optional[Deadline],
+    ) -> _Steps:
+        """create_report / acreate_report で共通の処理（LLM 呼び出しは _LLMCall として返し、結果を受け取る）"""
+        try:
+            ctx = self._prepare_report_context(article_text, article_url)
+            if not self._deadline_allows(deadline, _LLM_BUDGET_SHARE, "report:llm"):
+                return self._deterministic_report(
+                    ctx, article_text, optimistic_argument, pessimistic_argument, critique, optimistic_rebuttal, pessimistic_rebuttal
+                )
 
             # 1) 事実抽出（本文ベース）: 失敗しても機械抽出で続行（案R1）
-            extracted_facts: list[str] = []
-            unknowns: list[str] = []
             try:
-                facts_chain = self.facts_prompt | self.model.with_structured_output(ExtractedFacts)
-                extracted: ExtractedFacts = facts_chain.invoke(
-                    {
-                        "article_title": title,
-                        "article_url": url,
-                        "article_text": self._truncate(body, 8000),
-                        "article_quotes": "\n".join([f"- {x}" for x in quote_lines]) if quote_lines else "（抽出できませんでした）",
-                    }
-                )
-                extracted_facts = list(getattr(extracted, "key_facts", []) or [])
-                unknowns = list(getattr(extracted, "unknowns", []) or [])
+                facts_chain = structured_chain(self._prompt(ctx, "facts_prompt"), self.model, ExtractedFacts)
+                extracted: ExtractedFacts = yield _LLMCall.invoke(facts_chain, ctx["facts_inputs"], llm_config("facts"))
+                facts = self._facts_from_structured(extracted)
             except Exception as e:
                 logging.getLogger(__name__).exception("事実抽出エラー（フォールバックへ切替）: %s", e)
+                facts = None
                 # 1-b) JSON文字列フォールバック（structured_output未対応/不安定なモデル向け）
-                try:
-                    raw = (self.facts_prompt_json | self.model).invoke(
-                        {
-                            "article_title": title,
-                            "article_url": url,
-                            "article_text": self._truncate(body, 8000),
-                            "article_quotes": "\n".join([f"- {x}" for x in quote_lines]) if quote_lines else "（抽出できませんでした）",
-                        }
-                    )
-                    content = getattr(raw, "content", raw)
-                    if not isinstance(content, str):
-                        content = str(content)
-                    cleaned = self._strip_code_fences(content)
-                    json_text = self._extract_first_json_object_stream(cleaned) or cleaned
-                    data = json.loads(json_text)
-                    if not isinstance(data, dict):
-                        data = {}
-                    extracted_facts = list(data.get("key_facts", []) or [])
-                    unknowns = list(data.get("unknowns", []) or [])
-                except Exception:
-                    # 機械抽出: 引用候補をそのまま事実候補として利用
-                    extracted_facts = quote_lines[:8] if quote_lines else []
-                    unknowns = [
-                        "記事本文だけでは影響評価や因果の断定が難しい点がある可能性。",
-                        "アナリストの主張の一部は本文の直接引用ではない可能性。",
-                    ]
-
-            # facts品質が弱い場合は、引用候補へ寄せる（モデルの一般論化対策）
-            if self._facts_looks_weak(extracted_facts, quote_lines):
-                extracted_facts = quote_lines[:8] if quote_lines else extracted_facts
-
-            extracted_facts_text = "\n".join([f"- {x}" for x in extracted_facts]) if extracted_facts else "（抽出できませんでした）"
-            unknowns_text = "\n".join([f"- {x}" for x in unknowns]) if unknowns else "（なし）"
+                if self._deadline_allows(deadline, _JSON_FALLBACK_BUDGET_SHARE, "report:json_fallback"):
+                    try:
+                        raw = yield _LLMCall.invoke(
+                            self._prompt(ctx, "facts_prompt_json") | constrained_model(self.model, ExtractedFacts),
+                            ctx["facts_inputs"],
+                            llm_config("facts", "json_fallback"),
+                        )
+                        facts = self._facts_from_json_text(self._message_text(raw))
+                    except Exception:
+                        pass
+                if facts is None:
+                    record_llm_path("facts")
+                    facts = self._facts_mechanical(ctx["quote_lines"])
+
+            extracted_facts, unknowns = self._refine_facts(facts, ctx["quote_lines"])
+            report_inputs = self._report_inputs(
+                ctx,
+                extracted_facts,
+                unknowns,
+                article_text=article_text,
+                optimistic_argument=optimistic_argument,
+                pessimistic_argument=pessimistic_argument,
+                critique=critique,
+                optimistic_rebuttal=optimistic_rebuttal,
+                pessimistic_rebuttal=pessimistic_rebuttal,
+            )
 
             # 2) 統合（討論の出力も考慮）
             content: ReportContent | None = None
             try:
-                report_chain = self.report_prompt | self.model.with_structured_output(ReportContent)
-                content = report_chain.invoke(
-                    {
-                        "article_title": title,
-                        "article_url": url,
-                        "extracted_facts": extracted_facts_text,
-                        "unknowns": unknowns_text,
-                        "article_quotes": "\n".join([f"- {x}" for x in quote_lines]) if quote_lines else "（抽出できませんでした）",
-                        "optimistic_argument": self._fmt_argument(optimistic_argument),
-                        "pessimistic_argument": self._fmt_argument(pessimistic_argument),
-                        "critique": self._fmt_critique(critique),
-                        "optimistic_rebuttal": self._fmt_rebuttal(optimistic_rebuttal),
-                        "pessimistic_rebuttal": self._fmt_rebuttal(pessimistic_rebuttal),
-                        "evidence_mismatch_notes": self._evidence_mismatch_notes(article_text, optimistic_argument, pessimistic_argument),
-                    }
-                )
+                if on_delta is not None:
+                    content = yield _LLMCall.stream(
+                        self.model, self._prompt(ctx, "report_prompt"), report_inputs, ReportContent, on_delta,
+                        llm_config("report", "streaming"),
+                    )
+                else:
+                    report_chain = structured_chain(self._prompt(ctx, "report_prompt"), self.model, ReportContent)
+                    content = yield _LLMCall.invoke(report_chain, report_inputs, llm_config("report"))
             except Exception as e:
                 logging.getLogger(__name__).exception("統合レポート生成エラー（テンプレで復旧）: %s", e)
                 # 2-b) JSON文字列フォールバック
-                try:
-                    raw = (self.report_prompt_json | self.model).invoke(
-                        {
-                            "article_title": title,
-                            "article_url": url,
-                            "extracted_facts": extracted_facts_text,
-                            "unknowns": unknowns_text,
-                            "article_quotes": "\n".join([f"- {x}" for x in quote_lines]) if quote_lines else "（抽出できませんでした）",
-                            "optimistic_argument": self._fmt_argument(optimistic_argument),
-                            "pessimistic_argument": self._fmt_argument(pessimistic_argument),
-                            "critique": self._fmt_critique(critique),
-                            "optimistic_rebuttal": self._fmt_rebuttal(optimistic_rebuttal),
-                            "pessimistic_rebuttal": self._fmt_rebuttal(pessimistic_rebuttal),
-                            "evidence_mismatch_notes": self._evidence_mismatch_notes(article_text, optimistic_argument, pessimistic_argument),
-                        }
-                    )
-                    content_s = getattr(raw, "content", raw)
-                    if not isinstance(content_s, str):
-                        content_s = str(content_s)
-                    cleaned = self._strip_code_fences(content_s)
-                    json_text = self._extract_first_json_object_stream(cleaned) or cleaned
-                    data = json.loads(json_text)
-                    if not isinstance(data, dict):
-                        data = {}
-                    summary = str(data.get("summary", "") or "")
-                    final_conclusion = str(data.get("final_conclusion", "") or "")
-                    content = ReportContent(summary=summary, final_conclusion=final_conclusion)
-                except Exception:
-                    content = None
-
-            # critique_points はLLM任せにせず、入力から決定的に構成する（タグ/文字数/重複の安定化）
-            points: list[str] = []
-
-            def add_points(tag: str, items: list[str], limit: int) -> None:
-                for x in (items or [])[:limit]:
-                    s = ("" if x is None else str(x)).strip()
-                    # 表示用に改行/連続空白を潰す
-                    s = re.sub(r"\s+", " ", s).strip()
-                    if not s:
-                        continue
-                    # 200文字制限
-                    max_chars = 200 - (len(tag) + 4)  # "[X] " 分をざっくり差し引く
-                    if max_chars < 50:
-                        max_chars = 150
-                    if len(s) > max_chars:
-                        s = s[:max_chars].rstrip() + "…"
-                    points.append(f"[{tag}] {s}".strip())
-
-            add_points("Factual", list(getattr(critique, "factual_errors", []) or []), 4)
-            add_points("Bias", list(getattr(critique, "bias_points", []) or []), 4)
-            add_points("Rebuttal", list(getattr(optimistic_rebuttal, "counter_points", []) or []), 2)
-            add_points("Rebuttal", list(getattr(pessimistic_rebuttal, "counter_points", []) or []), 2)
-
-            mismatch_lines = [
-                ln.strip("- ").strip()
-                for ln in (self._evidence_mismatch_notes(article_text, optimistic_argument, pessimistic_argument) or "").splitlines()
-                if ln.strip() and ln.strip() != "（なし）"
-            ]
-            has_mismatch = bool(mismatch_lines)
-            add_points("EvidenceCheck", mismatch_lines, 4)
-
-            # 重複除去（タグ込みで一意化）
-            seen: set[str] = set()
-            deduped: list[str] = []
-            for p in points:
-                key = re.sub(r"\\s+", " ", p).strip()
-                if key in seen:
-                    continue
-                seen.add(key)
-                deduped.append(p)
+                if self._deadline_allows(deadline, _JSON_FALLBACK_BUDGET_SHARE, "report:json_fallback"):
+                    try:
+                        raw = yield _LLMCall.invoke(
+                            self._prompt(ctx, "report_prompt_json") | constrained_model(self.model, ReportContent),
+                            report_inputs,
+                            llm_config("report", "json_fallback"),
+                        )
+                        content = self._report_content_from_json_text(self._message_text(raw))
+                    except Exception:
+                        content = None
 
-            critique_points = deduped[:12]
+            critique_points, has_mismatch = self._build_critique_points(
+                article_text, optimistic_argument, pessimistic_argument, critique, optimistic_rebuttal, pessimistic_rebuttal
+            )
             # --- 日本語化: まれに英語が混ざるケースに備える ---
-            critique_points = self._ensure_japanese_tagged_points(critique_points)
-
-            # summary / final_conclusion を取り出し（失敗時はテンプレ合成）
-            if content is not None:
-                summary = (content.summary or "").strip()
-                final_conclusion = (content.final_conclusion or "").strip()
-            else:
-                # テンプレ: 抽出事実+批評の要点で最小限のレポートを作る（案R1）
-                top_facts = extracted_facts[:3] if extracted_facts else quote_lines[:3]
-                facts_inline = " / ".join([x[:80] + ("…" if len(x) > 80 else "") for x in top_facts]) if top_facts else "（本文から具体情報を抽出できませんでした）"
-                summary = f"この記事は、次の点が本文から読み取れます: {facts_inline}"
-                final_conclusion = (
-                    "抽出できた事実を踏まえると、機会（政策・対応の前進/効果）とリスク（副作用・不確実性）の両面を分けて評価する必要があります。"
-                )
+            critique_points = yield from self._japanese_rewrite_steps(critique_points, deadline)
+
+            return self._finalize_report(
+                ctx,
+                extracted_facts,
+                unknowns,
+                content,
+                critique_points,
+                has_mismatch,
+                optimistic_argument,
+                pessimistic_argument,
+            )
+        except Exception as e:
+            return self._report_failure(e, critique, optimistic_argument, pessimistic_argument)
 
-            # final_conclusion 末尾の不要記号を軽く正規化（モデルによって引用符が混入することがある）
-            final_conclusion = re.sub(r'[\"”]+\\}?\\s*$', "", final_conclusion).strip()
-
-            # --- Phase4 品質ガード（一般論/根拠なし断定の抑制） ---
-            anchors = []
-            anchors.extend([ln for ln in quote_lines[:6] if ln])
-            anchors.extend([f for f in extracted_facts[:8] if f])
-
-            # summary が本文アンカーに寄っていなければ、テンプレ要約に寄せる
-            if self._grounding_score(summary, anchors) < 2:
-                summary = self._synthesize_summary_from_facts(extracted_facts, quote_lines)
-
-            # conclusion が弱い/一般論すぎる場合は、テンプレ結論に寄せる
-            if self._grounding_score(final_conclusion, anchors) < 2:
-                final_conclusion = self._synthesize_conclusion_from_facts(
-                    extracted_facts=extracted_facts,
-                    unknowns=unknowns,
-                    critique_points=critique_points,
-                    quote_lines=quote_lines,
-                    has_mismatch=has_mismatch,
-                )
+    @staticmethod
+    def _deadline_allows(deadline: Optional[Deadline], share: float, step: str) -> bool:
+        """deadline の残りが report フェーズ予算の share 倍以上あれば True。足りなければ step を省いたと記録して False。"""
+        if deadline is None or deadline.allows(deadline.budget_for("report") * share):
+            return True
+        logging.getLogger(__name__).info("期限が近いため省略: %s（残り %.1f秒）", step, deadline.remaining())
+        deadline.skip(step)
+        return False
 
-            # summaryが抽象的すぎる場合は、本文引用候補を使って最低限の具体性を付与する
-            if quote_lines:
-                # 具体情報が少ない場合（数字が無い/引用断片が入っていない/抽象語が多い）に追記する
-                genericish = any(tok in summary for tok in ["一般的に", "重要", "必要", "求められる", "注目", "議論", "影響"])
-                lacks_quote_anchor = all((q[:20] not in summary) for q in quote_lines[:2])
-                if (not re.search(r"\d", summary)) and lacks_quote_anchor and genericish:
-                    q1 = quote_lines[0]
-                    q2 = quote_lines[1] if len(quote_lines) > 1 else ""
-                    q1 = q1[:80] + ("…" if len(q1) > 80 else "")
-                    q2 = q2[:80] + ("…" if len(q2) > 80 else "")
-                    extra = f"（本文より: {q1}"
-                    if q2:
-                        extra += f" / {q2}"
-                    extra += "）"
-                    # 長文化しすぎないように末尾に短く付与
-                    summary = (summary + " " + extra).strip()
-
-            # final_conclusionの必須フレーズを強制（モデルが守らないケース対策）
-            if "確実度が高い点" not in final_conclusion or "不確かな点" not in final_conclusion:
-                q = quote_lines[0][:80] + ("…" if quote_lines and len(quote_lines[0]) > 80 else "") if quote_lines else ""
-                hi = f"本文抜粋（「{q}」）に基づく範囲の事実。".strip() if q else "本文から直接確認できる範囲の事実。"
-                lo = "アナリストの引用の一部は本文一致しない可能性があり、追加検証が必要。 " if has_mismatch else "記事本文だけでは影響評価や因果の断定が難しい点。 "
-                final_conclusion = (final_conclusion + f" 確実度が高い点: {hi} 不確かな点: {lo}").strip()
-
-            return FinalReport(
-                article_info=f"タイトル: {title}\nソース: {url}\n要約: {summary if summary else '（不明）'}",
-                optimistic_view=optimistic_argument or Argument(conclusion="", evidence=[]),
-                pessimistic_view=pessimistic_argument or Argument(conclusion="", evidence=[]),
+    def _deterministic_report(
+        self,
+        ctx: dict,
+        article_text: str,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        critique: Critique,
+        optimistic_rebuttal: Rebuttal,
+        pessimistic_rebuttal: Rebuttal,
+    ) -> FinalReport:
+        """LLMを呼ばず、本文の引用候補から要約/結論を組み立てる（期限が近いとき用）"""
+        record_llm_path("report")
+        extracted_facts, unknowns = self._refine_facts(self._facts_mechanical(ctx["quote_lines"]), ctx["quote_lines"])
+        critique_points, has_mismatch = self._build_critique_points(
+            article_text, optimistic_argument, pessimistic_argument, critique, optimistic_rebuttal, pessimistic_rebuttal
+        )
+        critique_points = self._clean_points(critique_points)
+        content = ReportContent(
+            summary=self._synthesize_summary_from_facts(extracted_facts, ctx["quote_lines"]),
+            final_conclusion=self._synthesize_conclusion_from_facts(
+                extracted_facts=extracted_facts,
+                unknowns=unknowns,
                 critique_points=critique_points,
-                final_conclusion=final_conclusion,
+                quote_lines=ctx["quote_lines"],
+                has_mismatch=has_mismatch,
+            ),
+        )
+        return self._finalize_report(
+            ctx,
+            extracted_facts,
+            unknowns,
+            content,
+            critique_points,
+            has_mismatch,
+            optimistic_argument,
+            pessimistic_argument,
+        )
+
+    def _prepare_report_context(self, article_text: str, article_url: Optional[str]) -> dict:
+        """本文ヘッダ/引用候補など、LLM呼び出し前に決定的に決まる値をまとめる。"""
+        title, url, body = self._extract_article_header(article_text, fallback_url=article_url)
+        shared = shared_context_enabled()
+        # 共通の先頭部分にはヘッダ込みの記事をそのまま入れる（他のエージェントと同じ文字列にするため）
+        shared_inputs = {"shared_article": shared_article_text(article_text)} if shared else {}
+
+        quote_lines = [ln.strip()[2:].strip() for ln in self._pick_article_quotes(body, limit=6).splitlines() if ln.strip().startswith("- ")]
+        quotes_text = "\n".join([f"- {x}" for x in quote_lines]) if quote_lines else "（抽出できませんでした）"
+        return {
+            "title": title,
+            "url": url,
+            "body": body,
+            "quote_lines": quote_lines,
+            "quotes_text": quotes_text,
+            "shared": shared,
+            "shared_inputs": shared_inputs,
+            "facts_inputs": {
+                "article_title": title,
+                "article_url": url,
+                "article_text": self._truncate(body, 8000),
+                "article_quotes": quotes_text,
+                **shared_inputs,
+            },
+        }
+
+    @staticmethod
+    def _facts_from_structured(extracted: ExtractedFacts) -> tuple[list[str], list[str]]:
+        return list(getattr(extracted, "key_facts", []) or []), list(getattr(extracted, "unknowns", []) or [])
+
+    def _facts_from_json_text(self, content: str) -> tuple[list[str], list[str]]:
+        cleaned = self._strip_code_fences(content)
+        json_text = self._extract_first_json_object_stream(cleaned) or cleaned
+        data = json.loads(json_text)
+        if not isinstance(data, dict):
+            data = {}
+        return list(data.get("key_facts", []) or []), list(data.get("unknowns", []) or [])
+
+    @staticmethod
+    def _facts_mechanical(quote_lines: list[str]) -> tuple[list[str], list[str]]:
+        # 機械抽出: 引用候補をそのまま事実候補として利用
+        extracted_facts = quote_lines[:8] if quote_lines else []
+        unknowns = [
+            "記事本文だけでは影響評価や因果の断定が難しい点がある可能性。",
+            "アナリストの主張の一部は本文の直接引用ではない可能性。",
+        ]
+        return extracted_facts, unknowns
+
+    def _refine_facts(self, facts: tuple[list[str], list[str]], quote_lines: list[str]) -> tuple[list[str], list[str]]:
+        extracted_facts, unknowns = facts
+        # facts品質が弱い場合は、引用候補へ寄せる（モデルの一般論化対策）
+        if self._facts_looks_weak(extracted_facts, quote_lines):
+            extracted_facts = quote_lines[:8] if quote_lines else extracted_facts
+        return extracted_facts, unknowns
+
+    def _report_inputs(
+        self,
+        ctx: dict,
+        extracted_facts: list[str],
+        unknowns: list[str],
+        *,
+        article_text: str,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        critique: Critique,
+        optimistic_rebuttal: Rebuttal,
+        pessimistic_rebuttal: Rebuttal,
+    ) -> dict:
+        extracted_facts_text = "\n".join([f"- {x}" for x in extracted_facts]) if extracted_facts else "（抽出できませんでした）"
+        unknowns_text = "\n".join([f"- {x}" for x in unknowns]) if unknowns else "（なし）"
+        return {
+            "article_title": ctx["title"],
+            "article_url": ctx["url"],
+            "extracted_facts": extracted_facts_text,
+            "unknowns": unknowns_text,
+            "article_quotes": ctx["quotes_text"],
+            "optimistic_argument": self._fmt_argument(optimistic_argument),
+            "pessimistic_argument": self._fmt_argument(pessimistic_argument),
+            "critique": self._fmt_critique(critique),
+            "optimistic_rebuttal": self._fmt_rebuttal(optimistic_rebuttal),
+            "pessimistic_rebuttal": self._fmt_rebuttal(pessimistic_rebuttal),
+            "evidence_mismatch_notes": self._evidence_mismatch_notes(article_text, optimistic_argument, pessimistic_argument),
+            **ctx["shared_inputs"],
+        }
+
+    def _report_content_from_json_text(self, content: str) -> "ReportContent":
+        cleaned = self._strip_code_fences(content)
+        json_text = self._extract_first_json_object_stream(cleaned) or cleaned
+        data = json.loads(json_text)
+        if not isinstance(data, dict):
+            data = {}
+        summary = str(data.get("summary", "") or "")
+        final_conclusion = str(data.get("final_conclusion", "") or "")
+        return ReportContent(summary=summary, final_conclusion=final_conclusion)
+
+    def _build_critique_points(
+        self,
+        article_text: str,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+        critique: Critique,
+        optimistic_rebuttal: Rebuttal,
+        pessimistic_rebuttal: Rebuttal,
+    ) -> tuple[list[str], bool]:
+        """critique_points はLLM任せにせず、入力から決定的に構成する（タグ/文字数/重複の安定化）"""
+        points: list[str] = []
+
+        def add_points(tag: str, items: list[str], limit: int) -> None:
+            for x in (items or [])[:limit]:
+                s = ("" if x is None else str(x)).strip()
+                # 表示用に改行/連続空白を潰す
+                s = re.sub(r"\s+", " ", s).strip()
+                if not s:
+                    continue
+                # 200文字制限
+                max_chars = 200 - (len(tag) + 4)  # "[X] " 分をざっくり差し引く
+                if max_chars < 50:
+                    max_chars = 150
+                if len(s) > max_chars:
+                    s = s[:max_chars].rstrip() + "…"
+                points.append(f"[{tag}] {s}".strip())
+
+        add_points("Factual", list(getattr(critique, "factual_errors", []) or []), 4)
+        add_points("Bias", list(getattr(critique, "bias_points", []) or []), 4)
+        add_points("Rebuttal", list(getattr(optimistic_rebuttal, "counter_points", []) or []), 2)
+        add_points("Rebuttal", list(getattr(pessimistic_rebuttal, "counter_points", []) or []), 2)
+
+        mismatch_lines = [
+            ln.strip("- ").strip()
+            for ln in (self._evidence_mismatch_notes(article_text, optimistic_argument, pessimistic_argument) or "").splitlines()
+            if ln.strip() and ln.strip() != "（なし）"
+        ]
+        has_mismatch = bool(mismatch_lines)
+        add_points("EvidenceCheck", mismatch_lines, 4)
+
+        # 重複除去（タグ込みで一意化）
+        seen: set[str] = set()
+        deduped: list[str] = []
+        for p in points:
+            key = re.sub(r"\\s+", " ", p).strip()
+            if key in seen:
+                continue
+            seen.add(key)
+            deduped.append(p)
+
+        return deduped[:12], has_mismatch
+
+    def _finalize_report(
+        self,
+        ctx: dict,
+        extracted_facts: list[str],
+        unknowns: list[str],
+        content: "ReportContent | None",
+        critique_points: list[str],
+        has_mismatch: bool,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+    ) -> FinalReport:
+        """LLM出力（summary/final_conclusion）に品質ガードを適用し、FinalReport を組み立てる。"""
+        title = ctx["title"]
+        url = ctx["url"]
+        quote_lines: list[str] = ctx["quote_lines"]
+
+        # summary / final_conclusion を取り出し（失敗時はテンプレ合成）
+        if content is not None:
+            summary = (content.summary or "").strip()
+            final_conclusion = (content.final_conclusion or "").strip()
+        else:
+            # テンプレ: 抽出事実+批評の要点で最小限のレポートを作る（案R1）
+            record_llm_path("report")
+            top_facts = extracted_facts[:3] if extracted_facts else quote_lines[:3]
+            facts_inline = " / ".join([x[:80] + ("…" if len(x) > 80 else "") for x in top_facts]) if top_facts else "（本文から具体情報を抽出できませんでした）"
+            summary = f"この記事は、次の点が本文から読み取れます: {facts_inline}"
+            final_conclusion = (
+                "抽出できた事実を踏まえると、機会（政策・対応の前進/効果）とリスク（副作用・不確実性）の両面を分けて評価する必要があります。"
             )
-        except Exception as e:
-            logging.getLogger(__name__).exception("レポート生成エラー: %s", e)
-            critique_points: list[str] = []
-            try:
-                critique_points.extend(list(getattr(critique, "bias_points", []) or []))
-                critique_points.extend(list(getattr(critique, "factual_errors", []) or []))
-            except Exception:
-                critique_points = []
-
-            return FinalReport(
-                article_info="",
-                optimistic_view=optimistic_argument or Argument(conclusion="", evidence=[]),
-                pessimistic_view=pessimistic_argument or Argument(conclusion="", evidence=[]),
-                critique_points=critique_points[:10],
-                final_conclusion=f"最終レポート生成に失敗しました: {str(e)}",
+
+        # final_conclusion 末尾の不要記号を軽く正規化（モデルによって引用符が混入することがある）
+        final_conclusion = re.sub(r'[\"”]+\\}?\\s*$', "", final_conclusion).strip()
+
+        # --- Phase4 品質ガード（一般論/根拠なし断定の抑制） ---
+        anchors = []
+        anchors.extend([ln for ln in quote_lines[:6] if ln])
+        anchors.extend([f for f in extracted_facts[:8] if f])
+
+        # summary が本文アンカーに寄っていなければ、テンプレ要約に寄せる
+        if self._grounding_score(summary, anchors) < 2:
+            summary = self._synthesize_summary_from_facts(extracted_facts, quote_lines)
+
+        # conclusion が弱い/一般論すぎる場合は、テンプレ結論に寄せる
+        if self._grounding_score(final_conclusion, anchors) < 2:
+            final_conclusion = self._synthesize_conclusion_from_facts(
+                extracted_facts=extracted_facts,
+                unknowns=unknowns,
+                critique_points=critique_points,
+                quote_lines=quote_lines,
+                has_mismatch=has_mismatch,
             )
 
+        # summaryが抽象的すぎる場合は、本文引用候補を使って最低限の具体性を付与する
+        if quote_lines:
+            # 具体情報が少ない場合（数字が無い/引用断片が入っていない/抽象語が多い）に追記する
+            genericish = any(tok in summary for tok in ["一般的に", "重要", "必要", "求められる", "注目", "議論", "影響"])
+            lacks_quote_anchor = all((q[:20] not in summary) for q in quote_lines[:2])
+            if (not re.search(r"\d", summary)) and lacks_quote_anchor and genericish:
+                q1 = quote_lines[0]
+                q2 = quote_lines[1] if len(quote_lines) > 1 else ""
+                q1 = q1[:80] + ("…" if len(q1) > 80 else "")
+                q2 = q2[:80] + ("…" if len(q2) > 80 else "")
+                extra = f"（本文より: {q1}"
+                if q2:
+                    extra += f" / {q2}"
+                extra += "）"
+                # 長文化しすぎないように末尾に短く付与
+                summary = (summary + " " + extra).strip()
+
+        # final_conclusionの必須フレーズを強制（モデルが守らないケース対策）
+        if "確実度が高い点" not in final_conclusion or "不確かな点" not in final_conclusion:
+            q = quote_lines[0][:80] + ("…" if quote_lines and len(quote_lines[0]) > 80 else "") if quote_lines else ""
+            hi = f"本文抜粋（「{q}」）に基づく範囲の事実。".strip() if q else "本文から直接確認できる範囲の事実。"
+            lo = "アナリストの引用の一部は本文一致しない可能性があり、追加検証が必要。 " if has_mismatch else "記事本文だけでは影響評価や因果の断定が難しい点。 "
+            final_conclusion = (final_conclusion + f" 確実度が高い点: {hi} 不確かな点: {lo}").strip()
+
+        return FinalReport(
+            article_info=f"タイトル: {title}\nソース: {url}\n要約: {summary if summary else '（不明）'}",
+            optimistic_view=optimistic_argument or Argument(conclusion="", evidence=[]),
+            pessimistic_view=pessimistic_argument or Argument(conclusion="", evidence=[]),
+            critique_points=critique_points,
+            final_conclusion=final_conclusion,
+        )
+
+    @staticmethod
+    def _report_failure(
+        e: Exception,
+        critique: Critique,
+        optimistic_argument: Argument,
+        pessimistic_argument: Argument,
+    ) -> FinalReport:
+        logging.getLogger(__name__).exception("レポート生成エラー: %s", e)
+        record_llm_path("report", error=e)
+        critique_points: list[str] = []
+        try:
+            critique_points.extend(list(getattr(critique, "bias_points", []) or []))
+            critique_points.extend(list(getattr(critique, "factual_errors", []) or []))
+        except Exception:
+            critique_points = []
+
+        return FinalReport(
+            article_info="",
+            optimistic_view=optimistic_argument or Argument(conclusion="", evidence=[]),
+            pessimistic_view=pessimistic_argument or Argument(conclusion="", evidence=[]),
+            critique_points=critique_points[:10],
+            final_conclusion=f"最終レポート生成に失敗しました: {str(e)}",
+        )
+
 
 class ReportContent(BaseModel):
     summary: str = Field(description="記事内容の要約")
@@ -1,14 +1,21 @@
+import asyncio
 import os
 from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
 from langchain_core.language_models import BaseChatModel
 from langchain_community.tools.tavily_search import TavilySearchResults
-from src.utils.rss import fetch_feed_xml, load_rss_feed_urls, parse_feed, rank_items_by_query
-from src.utils.security import fetch_url_bytes, validate_outbound_url, UrlValidationError
+from src.utils.feed_index import get_feed_index, get_feed_poller
+from src.utils.html_extract import extract_article_text
+from src.utils.rss import (
+    FeedItem,
+    afetch_feed_xml,
+    afetch_feeds_by_url,
+    fetch_feed_xml,
+    fetch_feeds_by_url,
+    load_rss_feed_urls,
+)
+from src.utils.security import afetch_url_bytes, fetch_url_bytes, validate_outbound_url, UrlValidationError
 import logging
-import re
-import unicodedata
 
 
 class RssKeywordNotFoundError(ValueError):
@@ -33,6 +40,8 @@ class ResearcherAgent:
         self.tavily_tool = None
         self._init_tavily()
         self.rss_feed_urls = load_rss_feed_urls()
+        # RSS_BACKGROUND_POLL=1 なら、最初の検索までにインデックスを温めておく
+        get_feed_poller(self.rss_feed_urls[:50])
     
     def _init_tavily(self):
         """Tavily検索ツールを初期化（APIキーがある場合のみ）"""
@@ -51,6 +60,60 @@ class ResearcherAgent:
         - 許可リスト（環境変数 RSS_FEED_URLS または config/rss_feeds.txt）に限定
         - 無差別クロールはしない
         """
+        feed_urls = self._rss_feed_urls_for_query(query)[:50]  # 念のため上限
+
+        # バックグラウンドのインデックスが使えればネットワークI/Oなしで候補を決める
+        ranked = self._rank_from_feed_index(feed_urls, query)
+        if ranked is None:
+            # フィードを並行取得して候補記事を収集（全体/ホスト別の同時数と締め切りは RSS_FETCH_* で調整）
+            by_feed = fetch_feeds_by_url(feed_urls, fetch_xml=fetch_feed_xml)
+            ranked = self._rank_fetched_feeds(feed_urls, by_feed, query)
+        max_articles = self._rss_max_articles()
+
+        # 上位から本文を取得（同一URLは除外）
+        texts = []
+        for it, url in self._iter_rss_candidates(ranked):
+            try:
+                # RSS経由は上で[source]/[title]を付与するので、二重ヘッダを避ける
+                article = self._fetch_from_url(url, include_header=False)
+                header = f"[source] {url}\n[title] {it.title}".strip()
+                texts.append(header + "\n\n" + article)
+            except Exception as e:
+                logging.getLogger(__name__).warning("本文取得失敗: %s (%s)", url, e)
+                continue
+            if len(texts) >= max_articles:
+                break
+
+        return self._join_rss_texts(texts)
+
+    async def _asearch_with_rss(self, query: str) -> str:
+        """
+        _search_with_rss の asyncio 版。
+        - フィード取得は並行に行い、本文取得は上位候補から順に行う
+        """
+        feed_urls = self._rss_feed_urls_for_query(query)[:50]
+
+        ranked = self._rank_from_feed_index(feed_urls, query)
+        if ranked is None:
+            by_feed = await afetch_feeds_by_url(feed_urls, fetch_xml=afetch_feed_xml)
+            ranked = self._rank_fetched_feeds(feed_urls, by_feed, query)
+        max_articles = self._rss_max_articles()
+
+        texts = []
+        for it, url in self._iter_rss_candidates(ranked):
+            try:
+                article = await self._afetch_from_url(url, include_header=False)
+                header = f"[source] {url}\n[title] {it.title}".strip()
+                texts.append(header + "\n\n" + article)
+            except Exception as e:
+                logging.getLogger(__name__).warning("本文取得失敗: %s (%s)", url, e)
+                continue
+            if len(texts) >= max_articles:
+                break
+
+        return self._join_rss_texts(texts)
+
+    def _rss_feed_urls_for_query(self, query: str) -> list[str]:
         if not query or not query.strip():
             raise ValueError("検索キーワードが空です。")
 
@@ -60,73 +123,87 @@ class ResearcherAgent:
                 "RSSフィード許可リストが未設定です。\n"
                 "環境変数 RSS_FEED_URLS を設定するか、config/rss_feeds.txt にRSS/AtomのURLを記載してください。"
             )
+        return feed_urls
 
-        # フィードを集約して候補記事を収集
-        all_items = []
-        for feed_url in feed_urls[:50]:  # 念のため上限
-            try:
-                xml = fetch_feed_xml(feed_url, timeout=10)
-                items = parse_feed(xml, feed_url=feed_url)
-                all_items.extend(items)
-            except Exception as e:
-                logging.getLogger(__name__).warning("RSS取得失敗: %s (%s)", feed_url, e)
-                continue
-
-        if not all_items:
+    @staticmethod
+    def _rank_fetched_feeds(feed_urls: list[str], by_feed: dict[str, list[FeedItem]], query: str) -> list[FeedItem]:
+        """
+        取得したフィードを許可リストごとのプロセス共通 FeedIndex に反映して検索する。
+        前回から変わっていないフィードは索引し直さない。候補は今回取得できたフィードの記事だけ。
+        """
+        if not any(by_feed.values()):
             raise ValueError("RSSフィードから記事候補を取得できませんでした。")
 
-        ranked = rank_items_by_query(all_items, query=query, limit=5)
+        ranked = get_feed_index(feed_urls).search_feeds(by_feed, query, limit=5)
         if not ranked:
             raise RssKeywordNotFoundError(f"RSSフィード内にキーワード '{query}' の一致が見つかりませんでした。")
+        return ranked
 
+    @staticmethod
+    def _rank_from_feed_index(feed_urls: list[str], query: str) -> list[FeedItem] | None:
+        """
+        RSS_BACKGROUND_POLL=1 のとき、バックグラウンドで更新しているインデックスから候補を返す。
+        ポーラー無効/初回ポーリング前/インデックスが空なら None（呼び出し側はネットワーク取得にフォールバック）。
+        """
+        poller = get_feed_poller(feed_urls)
+        if poller is None or not poller.ready or poller.index.size == 0:
+            return None
+        ranked = poller.index.search(query, limit=5)
+        if not ranked:
+            raise RssKeywordNotFoundError(f"RSSフィード内にキーワード '{query}' の一致が見つかりませんでした。")
+        return ranked
+
+    @staticmethod
+    def _rss_max_articles() -> int:
         # 既定は最上位1件（複数記事の混在で分析がブレやすいため）。必要なら環境変数で増やす。
         try:
             max_articles = int(os.getenv("RSS_MAX_ARTICLES", "1"))
         except Exception:
             max_articles = 1
-        max_articles = max(1, min(max_articles, 3))
+        return max(1, min(max_articles, 3))
 
-        # 上位から本文を取得（同一URLは除外）
-        texts = []
+    def _iter_rss_candidates(self, ranked: list[FeedItem]):
+        """
+        ランキング上位から、本文取得してよい (item, url) を順に返す（同一URL・A案で不許可のURLは除外）。
+        """
         seen_urls = set()
         for it in ranked:
             url = (it.link or "").strip()
             if not url or url in seen_urls:
                 continue
             seen_urls.add(url)
-            try:
-                # security_spec.md: RSS item.link 方針（A案/B案）
-                # - A案（安全最優先）: フィードと同一ドメイン、または URL_ALLOWLIST_DOMAINS に含まれる場合のみ取得
-                # - B案（柔軟）: 取得可。ただし validate_outbound_url は必須
-                policy = (os.getenv("RSS_ITEM_LINK_POLICY") or "A").strip().upper()
-                if policy not in ("A", "B"):
-                    policy = "A"
-                if policy == "A":
-                    try:
-                        feed_host = (urlparse(getattr(it, "feed_url", "") or "").hostname or "").lower().strip(".")
-                        item_host = (urlparse(url).hostname or "").lower().strip(".")
-                    except Exception:
-                        feed_host = ""
-                        item_host = ""
-                    allowlist = (os.getenv("URL_ALLOWLIST_DOMAINS") or "").strip()
-                    # allowlist は security.py 側で解釈されるので、ここでは「同一ドメイン」だけ先に絞る
-                    if feed_host and item_host and item_host != feed_host and not item_host.endswith("." + feed_host):
-                        # allowlist による許可は validate_outbound_url で判定される（URL_ALLOWLIST_DOMAINS が設定されていれば通る）
-                        # ただし allowlist 未設定の場合はここでスキップする
-                        if not allowlist:
-                            logging.getLogger(__name__).info("RSS item.link をスキップ（A案: feed外ドメイン）: feed=%s item=%s", feed_host, item_host)
-                            continue
-                        # allowlist がある場合は validate_outbound_url に任せる（通らなければ例外になる）
-                # RSS経由は上で[source]/[title]を付与するので、二重ヘッダを避ける
-                article = self._fetch_from_url(url, include_header=False)
-                header = f"[source] {url}\n[title] {it.title}".strip()
-                texts.append(header + "\n\n" + article)
-            except Exception as e:
-                logging.getLogger(__name__).warning("本文取得失敗: %s (%s)", url, e)
+            if not self._rss_item_link_allowed(it, url):
                 continue
-            if len(texts) >= max_articles:
-                break
-
+            yield it, url
+
+    @staticmethod
+    def _rss_item_link_allowed(it: FeedItem, url: str) -> bool:
+        # security_spec.md: RSS item.link 方針（A案/B案）
+        # - A案（安全最優先）: フィードと同一ドメイン、または URL_ALLOWLIST_DOMAINS に含まれる場合のみ取得
+        # - B案（柔軟）: 取得可。ただし validate_outbound_url は必須
+        policy = (os.getenv("RSS_ITEM_LINK_POLICY") or "A").strip().upper()
+        if policy not in ("A", "B"):
+            policy = "A"
+        if policy == "A":
+            try:
+                feed_host = (urlparse(getattr(it, "feed_url", "") or "").hostname or "").lower().strip(".")
+                item_host = (urlparse(url).hostname or "").lower().strip(".")
+            except Exception:
+                feed_host = ""
+                item_host = ""
+            allowlist = (os.getenv("URL_ALLOWLIST_DOMAINS") or "").strip()
+            # allowlist は security.py 側で解釈されるので、ここでは「同一ドメイン」だけ先に絞る
+            if feed_host and item_host and item_host != feed_host and not item_host.endswith("." + feed_host):
+                # allowlist による許可は validate_outbound_url で判定される（URL_ALLOWLIST_DOMAINS が設定されていれば通る）
+                # ただし allowlist 未設定の場合はここでスキップする
+                if not allowlist:
+                    logging.getLogger(__name__).info("RSS item.link をスキップ（A案: feed外ドメイン）: feed=%s item=%s", feed_host, item_host)
+                    return False
+                # allowlist がある場合は validate_outbound_url に任せる（通らなければ例外になる）
+        return True
+
+    @staticmethod
+    def _join_rss_texts(texts: list[str]) -> str:
         if not texts:
             raise ValueError("候補URLから本文を取得できませんでした。")
 
@@ -166,344 +243,50 @@ class ResearcherAgent:
         try:
             # security_spec.md: URL直入力/RSS由来URLともにSSRF対策の検証を必須化
             safe_url = validate_outbound_url(url, purpose="article")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            fetched = fetch_url_bytes(safe_url, purpose="article", headers=headers)
+            fetched = fetch_url_bytes(safe_url, purpose="article", headers=self._article_request_headers())
             raw_html = fetched.content.decode("utf-8", errors="ignore")
+            return self._extract_article_text(raw_html, safe_url, include_header=include_header)
+        except Exception as e:
+            raise self._to_fetch_error(e)
 
-            # 可能なら readability で本文抽出（別記事一覧/ナビ混入を抑える）
-            extracted_html = None
-            extracted_title = ""
-            try:
-                from readability import Document  # readability-lxml
+    async def _afetch_from_url(self, url: str, include_header: bool = True) -> str:
+        """
+        _fetch_from_url の asyncio 版。
+        - DNS解決を伴うURL検証と本文抽出（CPU処理）はイベントループ外で実行する
+        """
+        try:
+            safe_url = await asyncio.to_thread(validate_outbound_url, url, purpose="article")
+            fetched = await afetch_url_bytes(safe_url, purpose="article", headers=self._article_request_headers())
+            raw_html = fetched.content.decode("utf-8", errors="ignore")
+            return await asyncio.to_thread(self._extract_article_text, raw_html, safe_url, include_header)
+        except Exception as e:
+            raise self._to_fetch_error(e)
+
+    @staticmethod
+    def _article_request_headers() -> dict:
+        return {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+
+    @staticmethod
+    def _to_fetch_error(e: Exception) -> ValueError:
+        """取得/解析時の例外を、呼び出し側に返す ValueError へ整形する。"""
+        if isinstance(e, requests.exceptions.RequestException):
+            return ValueError(f"URLから記事を取得できませんでした: {e}")
+        if isinstance(e, UrlValidationError):
+            return ValueError(f"危険/不正なURLのため取得を拒否しました: {e}")
+        return ValueError(f"記事の解析中にエラーが発生しました: {e}")
+
+    def _extract_article_text(self, raw_html: str, safe_url: str, include_header: bool = True) -> str:
+        """
+        取得済みHTMLから本文（と任意で [source]/[title] ヘッダ）を抽出する。
+        （HTMLは1回だけパースし、readability/本文抽出/タイトル抽出で共有する: src.utils.html_extract）
 
-                doc = Document(raw_html)
-                extracted_html = doc.summary(html_partial=True)
-                extracted_title = (doc.short_title() or "").strip()
-            except Exception:
-                extracted_html = None
-                extracted_title = ""
-
-            # readability が短すぎる/空の場合は、生HTMLにフォールバック（サイトによっては本文が落ちる）
-            def _html_text_len(html: str | None) -> int:
-                if not html:
-                    return 0
-                try:
-                    return len(BeautifulSoup(html, "lxml").get_text(separator=" ", strip=True))
-                except Exception:
-                    return 0
-
-            if extracted_html and _html_text_len(extracted_html) < 200:
-                extracted_html = None
-
-            soup = BeautifulSoup(extracted_html or raw_html, 'lxml')
-
-            # タイトル抽出（後段のレポートで利用）
-            def _clean_title(t: str) -> str:
-                s = (t or "").strip()
-                s = " ".join(s.split())
-                if not s:
-                    return ""
-                # サイト名サフィックスを落としやすい区切りを試す（長さが極端に短くなる場合は採用しない）
-                seps = [" | ", " - ", "｜", "–", "—", "：", ":"]
-                best = s
-                for sep in seps:
-                    if sep in s:
-                        head = s.split(sep, 1)[0].strip()
-                        if 8 <= len(head) <= len(best):
-                            best = head
-                return best.strip()
-
-            def extract_title() -> str:
-                if extracted_title:
-                    return _clean_title(extracted_title)
-                # 1) og:title / twitter:title / meta name=title
-                try:
-                    for sel in [
-                        ("meta", {"property": "og:title"}),
-                        ("meta", {"name": "twitter:title"}),
-                        ("meta", {"name": "title"}),
-                    ]:
-                        tag = soup.find(sel[0], attrs=sel[1])
-                        if tag and tag.get("content"):
-                            t = str(tag.get("content")).strip()
-                            if t:
-                                return _clean_title(t)
-                except Exception:
-                    pass
-
-                # 2) h1（article→main→body優先）
-                try:
-                    for container in [soup.find("article"), soup.find("main"), soup.find("body"), soup]:
-                        if not container:
-                            continue
-                        h1 = container.find("h1")
-                        if h1:
-                            t = h1.get_text(separator=" ", strip=True)
-                            if t:
-                                return _clean_title(t)
-                except Exception:
-                    pass
-
-                # 3) <title>
-                try:
-                    if soup.title and soup.title.string:
-                        t = str(soup.title.string).strip()
-                        if t:
-                            return _clean_title(t)
-                except Exception:
-                    pass
-
-                return ""
-
-            # まず不要要素を削除（ノイズ混入を減らす）
-            for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'svg']):
-                tag.decompose()
-
-            # --- 対策(a): 人間が見えないDOM（hidden/aria-hidden/CSSで不可視）を除去 ---
-            _invisible_style_pat = re.compile(
-                r"(display\s*:\s*none|visibility\s*:\s*hidden|opacity\s*:\s*0\b|font-size\s*:\s*0\b|text-indent\s*:\s*-9\d{2,}px)",
-                re.IGNORECASE,
-            )
+        Raises:
+            ValueError: 本文が短すぎる場合
+        """
+        return extract_article_text(raw_html, safe_url, include_header=include_header)
 
-            def drop_hidden_elements(s: BeautifulSoup) -> None:
-                # 明示属性
-                try:
-                    for el in s.select("[hidden], [aria-hidden='true']"):
-                        try:
-                            el.decompose()
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
-
-                # よくある視覚非表示クラス（スクリーンリーダー向け等）
-                for cls in ["sr-only", "visually-hidden", "sr_hidden", "u-hidden"]:
-                    try:
-                        for el in s.select(f".{cls}"):
-                            try:
-                                el.decompose()
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-
-                # style属性（最小限の判定に留める）
-                try:
-                    for el in s.select("[style]"):
-                        try:
-                            st = (el.get("style") or "")
-                            if st and _invisible_style_pat.search(st):
-                                el.decompose()
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
-
-            drop_hidden_elements(soup)
-            
-            # 記事本文を抽出（一般的なHTMLタグから）
-            # - サイトによっては <article> が「見出しのみ」で本文が別DOMにあるケースがあるため
-            #   短すぎる場合は別の抽出方法へフォールバックする
-            text = ""
-
-            def extract_from(container) -> str:
-                # 段落中心に拾う（body全文のメニュー等を避ける）
-                parts = []
-                # li は「関連記事/一覧」を拾いやすいので除外（本文混入対策）
-                for el in container.find_all(["h1", "h2", "h3", "p"]):
-                    t = el.get_text(separator=" ", strip=True)
-                    if not t:
-                        continue
-                    # 短すぎる断片は捨てる（シェア/ボタン等が混じりやすい）
-                    if len(t) < 5:
-                        continue
-                    parts.append(t)
-                return "\n".join(parts)
-
-            def select_best_container(s: BeautifulSoup) -> str:
-                """
-                article/mainが無い or 本文が落ちるサイト向けの追加ヒューリスティック。
-                いくつかの「本文っぽい」コンテナ候補から、段落テキスト量が最大のものを採用する。
-                """
-                selectors = [
-                    "article",
-                    "main",
-                    "div[role='main']",
-                    "[itemprop='articleBody']",
-                    "#content",
-                    ".content",
-                    ".article",
-                    ".post",
-                    ".entry-content",
-                    ".post-content",
-                    ".article-body",
-                    ".story-body",
-                    ".main-content",
-                ]
-                candidates = []
-                try:
-                    for sel in selectors:
-                        candidates.extend(list(s.select(sel))[:10])
-                except Exception:
-                    candidates = []
-                # 重複除去（idベース）
-                uniq = []
-                seen_ids = set()
-                for el in candidates:
-                    try:
-                        k = id(el)
-                    except Exception:
-                        k = None
-                    if k is None or k in seen_ids:
-                        continue
-                    seen_ids.add(k)
-                    uniq.append(el)
-                best_text = ""
-                best_len = 0
-                for el in uniq[:50]:
-                    try:
-                        t = extract_from(el)
-                    except Exception:
-                        continue
-                    # 極端に短いコンテナは無視
-                    tl = len(t or "")
-                    if tl > best_len:
-                        best_len = tl
-                        best_text = t
-                return best_text
-
-            # 1) article
-            article = soup.find('article')
-            if article:
-                text = extract_from(article) or article.get_text(separator='\n', strip=True)
-
-            # 2) main
-            if len(text) < 200:
-                main = soup.find('main')
-                if main:
-                    text = extract_from(main) or main.get_text(separator='\n', strip=True)
-
-            # 2.5) 本文っぽいコンテナの最大選択（サイト別DOM差異の吸収）
-            if len(text) < 200:
-                picked = select_best_container(soup)
-                if picked and len(picked) > len(text):
-                    text = picked
-
-            # 3) body全体（最終フォールバック）
-            if len(text) < 200:
-                body = soup.find('body') or soup
-                text = extract_from(body) or body.get_text(separator='\n', strip=True)
-
-            # readability利用時に短文になりやすいサイト向け: 生HTMLで再抽出を試す
-            if extracted_html and len(text) < 200:
-                try:
-                    soup2 = BeautifulSoup(raw_html, "lxml")
-                    for tag in soup2(['script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'svg']):
-                        tag.decompose()
-                    # --- 対策(a): 生HTML側でも不可視DOMを除去 ---
-                    drop_hidden_elements(soup2)
-                    text2 = ""
-                    article2 = soup2.find("article")
-                    if article2:
-                        text2 = extract_from(article2) or article2.get_text(separator="\n", strip=True)
-                    if len(text2) < 200:
-                        main2 = soup2.find("main")
-                        if main2:
-                            text2 = extract_from(main2) or main2.get_text(separator="\n", strip=True)
-                    if len(text2) < 200:
-                        picked2 = select_best_container(soup2)
-                        if picked2:
-                            text2 = picked2
-                    if len(text2) < 200:
-                        body2 = soup2.find("body") or soup2
-                        text2 = extract_from(body2) or body2.get_text(separator="\n", strip=True)
-                    if len(text2) > len(text):
-                        soup = soup2
-                        text = text2
-                except Exception:
-                    pass
-            
-            # テキストを整形（空行を削除、長すぎる行を分割）
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            # ナビ/フッタっぽい短文を軽く除外（最終フォールバック由来の混入対策）
-            noise_tokens = [
-                "ログイン",
-                "会員登録",
-                "メニュー",
-                "ホーム",
-                "プライバシー",
-                "利用規約",
-                "Cookie",
-                "©",
-                "All rights reserved",
-                "シェア",
-                "フォロー",
-                "人気記事",
-                "関連記事",
-                "次の記事",
-                "前の記事",
-            ]
-            filtered_lines = []
-            for ln in lines:
-                if len(ln) <= 3:
-                    continue
-                if any(tok in ln for tok in noise_tokens) and len(ln) <= 40:
-                    continue
-                # URLっぽい行は除外
-                if "http://" in ln or "https://" in ln:
-                    continue
-                filtered_lines.append(ln)
-            lines = filtered_lines
-            # 重複行を除去（ナビ/パンくず等の反復ノイズを軽減）
-            deduped = []
-            seen = set()
-            for line in lines:
-                if line in seen:
-                    continue
-                seen.add(line)
-                deduped.append(line)
-            lines = deduped
-            text = '\n'.join(lines)
-
-            # --- 対策(b): 0幅文字/方向制御/制御文字を除去して正規化（不可視テキスト混入対策） ---
-            # 例: ZWSP(200B) / ZWNJ(200C) / ZWJ(200D) / BOM(FEFF) / bidi制御(202A-202E,2066-2069)
-            def normalize_extracted_text(s: str) -> str:
-                t = "" if s is None else str(s)
-                # 互換正規化（全角/半角などを揃える）
-                t = unicodedata.normalize("NFKC", t)
-                # 不可視・方向制御
-                t = re.sub(r"[\u200b\u200c\u200d\ufeff\u202a-\u202e\u2066-\u2069]", "", t)
-                # 改行/タブ以外の制御文字を除去
-                t = "".join(ch for ch in t if (ch == "\n" or ch == "\t" or ch >= " "))
-                # 空白を軽く正規化
-                t = re.sub(r"[ \t]+", " ", t)
-                t = re.sub(r"\n{3,}", "\n\n", t)
-                return t.strip()
-
-            text = normalize_extracted_text(text)
-            
-            if len(text) < 120:
-                raise ValueError("記事テキストが短すぎます。正しいURLか確認してください。")
-
-            if include_header:
-                title = extract_title()
-                header_parts = [f"[source] {safe_url}"]
-                if title:
-                    header_parts.append(f"[title] {title}")
-                header = "\n".join(header_parts).strip()
-                return header + "\n\n" + text
-
-            return text
-            
-        except requests.exceptions.RequestException as e:
-            raise ValueError(f"URLから記事を取得できませんでした: {e}")
-        except UrlValidationError as e:
-            raise ValueError(f"危険/不正なURLのため取得を拒否しました: {e}")
-        except Exception as e:
-            raise ValueError(f"記事の解析中にエラーが発生しました: {e}")
-    
     def _search_with_tavily(self, query: str) -> str:
         """
         Tavily検索APIを使用して記事を検索
@@ -561,16 +344,10 @@ class ResearcherAgent:
         Raises:
             ValueError: 記事を取得できない場合
         """
-        if not topic or not topic.strip():
-            raise ValueError("トピックが指定されていません。")
-        
-        topic = topic.strip()
+        topic = self._normalize_topic(topic)
         
         # URLかキーワードかを判定
         if self._is_url(topic):
-            # security_spec.md: URL直入力を運用で無効化できるようにする
-            if (os.getenv("ALLOW_URL_FETCH") or "").strip() in ("0", "false", "False", "no", "off"):
-                raise ValueError("URL直入力による取得は無効です（ALLOW_URL_FETCH=0）。")
             # URLの場合: 直接コンテンツを取得
             return self._fetch_from_url(topic, include_header=True)
         else:
@@ -583,3 +360,28 @@ class ResearcherAgent:
                     return self._search_with_tavily(topic)
                 raise rss_err
 
+    async def arun(self, topic: str) -> str:
+        """
+        run の asyncio 版（URL取得/RSS集約検索をイベントループ上で待機する）。
+        """
+        topic = self._normalize_topic(topic)
+
+        if self._is_url(topic):
+            return await self._afetch_from_url(topic, include_header=True)
+        try:
+            return await self._asearch_with_rss(topic)
+        except Exception as rss_err:
+            if self.tavily_tool:
+                # Tavilyクライアントは同期APIのみのため、ワーカースレッドで実行する
+                return await asyncio.to_thread(self._search_with_tavily, topic)
+            raise rss_err
+
+    def _normalize_topic(self, topic: str) -> str:
+        if not topic or not topic.strip():
+            raise ValueError("トピックが指定されていません。")
+
+        topic = topic.strip()
+        # security_spec.md: URL直入力を運用で無効化できるようにする
+        if self._is_url(topic) and (os.getenv("ALLOW_URL_FETCH") or "").strip() in ("0", "false", "False", "no", "off"):
+            raise ValueError("URL直入力による取得は無効です（ALLOW_URL_FETCH=0）。")
+        return topic
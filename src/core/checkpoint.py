@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from src.core.state import DiscussionState
+from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+
+# pydantic モデルとして復元する state のキー
+_MODEL_KEYS: dict[str, type[BaseModel]] = {
+    "optimistic_argument": Argument,
+    "pessimistic_argument": Argument,
+    "critique": Critique,
+    "optimistic_rebuttal": Rebuttal,
+    "pessimistic_rebuttal": Rebuttal,
+    "final_report": FinalReport,
+}
+
+
+class CheckpointNotFoundError(KeyError):
+    """指定した request_id のチェックポイントが無い"""
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    request_id: str
+    state: DiscussionState
+    # 最後のフェーズまで終わっている（resume しても何も実行しない）
+    completed: bool
+    updated_at: float
+
+
+def dump_state(state: DiscussionState) -> str:
+    """state を JSON 文字列にする（pydantic モデルは dict に展開）"""
+    data: dict[str, Any] = {}
+    for key, value in (state or {}).items():
+        data[key] = value.model_dump() if isinstance(value, BaseModel) else value
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def load_state(text: str) -> DiscussionState:
+    """dump_state の逆。既知のキーは Argument / Critique / Rebuttal / FinalReport に戻す"""
+    data = json.loads(text)
+    for key, model in _MODEL_KEYS.items():
+        if data.get(key) is not None:
+            data[key] = model.model_validate(data[key])
+    return data
+
+
+class CheckpointStore:
+    """
+    フェーズごとの state を request_id 単位で保存するストレージの共通インタフェース。
+
+    OrchestrationAgent(checkpoint_store=...) に渡すと、各フェーズの完了後に save() が呼ばれ、
+    resume(request_id) が load() した state から続きを実行する。
+    """
+
+    def save(self, request_id: str, state: DiscussionState, *, completed: bool = False) -> None:
+        raise NotImplementedError
+
+    def load(self, request_id: str) -> Optional[Checkpoint]:
+        raise NotImplementedError
+
+    def delete(self, request_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_request_ids(self) -> list[str]:
+        raise NotImplementedError
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """SQLite の1テーブルに保存する（request_id ごとに上書き）"""
+
+    def __init__(self, path: str = ".cache/checkpoints.sqlite3") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " request_id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " completed INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def save(self, request_id: str, state: DiscussionState, *, completed: bool = False) -> None:
+        payload = dump_state(state)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (request_id, state, completed, updated_at) VALUES (?, ?, ?, ?)",
+                (request_id, payload, int(completed), time.time()),
+            )
+            self._conn.commit()
+
+    def load(self, request_id: str) -> Optional[Checkpoint]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, completed, updated_at FROM checkpoints WHERE request_id = ?", (request_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(request_id=request_id, state=load_state(row[0]), completed=bool(row[1]), updated_at=row[2])
+
+    def delete(self, request_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM checkpoints WHERE request_id = ?", (request_id,))
+            self._conn.commit()
+            return cur.rowcount > 0
+
+    def list_request_ids(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT request_id FROM checkpoints ORDER BY updated_at").fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}")
+
+
+class JsonFileCheckpointStore(CheckpointStore):
+    """ディレクトリに request_id ごとの JSON ファイルとして保存する（一時ファイル + rename で書き換える）"""
+
+    def __init__(self, directory: str = ".cache/checkpoints") -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _file(self, request_id: str) -> Path:
+        # request_id をそのままパスに使わない（区切り文字などを含む場合はハッシュ名にする）
+        name = request_id if _SAFE_NAME.fullmatch(request_id or "") else hashlib.sha256(request_id.encode("utf-8")).hexdigest()
+        return self.directory / f"{name}.json"
+
+    def save(self, request_id: str, state: DiscussionState, *, completed: bool = False) -> None:
+        record = {
+            "request_id": request_id,
+            "completed": bool(completed),
+            "updated_at": time.time(),
+            "state": json.loads(dump_state(state)),
+        }
+        path = self._file(request_id)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+
+    def load(self, request_id: str) -> Optional[Checkpoint]:
+        path = self._file(request_id)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        return Checkpoint(
+            request_id=record.get("request_id", request_id),
+            state=load_state(json.dumps(record.get("state") or {})),
+            completed=bool(record.get("completed")),
+            updated_at=float(record.get("updated_at") or 0.0),
+        )
+
+    def delete(self, request_id: str) -> bool:
+        try:
+            self._file(request_id).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list_request_ids(self) -> list[str]:
+        records = []
+        for path in self.directory.glob("*.json"):
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            records.append((float(record.get("updated_at") or 0.0), record.get("request_id") or path.stem))
+        return [rid for _, rid in sorted(records)]
+
+
+def checkpoint_store_from_env() -> Optional[CheckpointStore]:
+    """
+    環境変数からチェックポイントの保存先を作る（既定は無効）。
+    - CHECKPOINT_BACKEND: "sqlite" / "json"（未設定なら保存しない）
+    - CHECKPOINT_PATH: SQLite ファイル（既定 .cache/checkpoints.sqlite3）/ JSON の保存ディレクトリ（既定 .cache/checkpoints）
+    """
+    backend = (os.getenv("CHECKPOINT_BACKEND") or "").strip().lower()
+    path = (os.getenv("CHECKPOINT_PATH") or "").strip()
+    if backend == "sqlite":
+        return SQLiteCheckpointStore(path or ".cache/checkpoints.sqlite3")
+    if backend == "json":
+        return JsonFileCheckpointStore(path or ".cache/checkpoints")
+    return None
@@ -1,18 +1,39 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import logging
-from dataclasses import dataclass
-from typing import Optional
+import time
+import unicodedata
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, ContextManager, Iterable, Iterator, Optional, Union
 
 from src.agents.analyst_optimistic import OptimisticAnalystAgent
 from src.agents.analyst_pessimistic import PessimisticAnalystAgent
 from src.agents.fact_checker import FactCheckerAgent
 from src.agents.reporter import ReporterAgent
 from src.agents.researcher import ResearcherAgent, RssKeywordNotFoundError
+from src.core.checkpoint import Checkpoint, CheckpointNotFoundError, CheckpointStore, checkpoint_store_from_env
+from src.core.result_cache import (
+    RESULT_KEYS,
+    DebateResultCache,
+    get_result_cache,
+    llm_fingerprint,
+    prompt_fingerprint,
+    result_cache_key,
+)
+from src.core.singleflight import SingleFlight
 from src.core.state import DiscussionState
 from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+from src.utils.deadline import Deadline
+from src.utils.json_stream import JsonPath
 from src.utils.llm import get_llm
+from src.utils.llm_metrics import llm_call_scope, llm_metrics_path_from_env, write_llm_calls_jsonl
 from src.utils.llm_profiles import get_profile
+from src.utils.shared_context import shared_context_enabled
 
 
 @dataclass(frozen=True)
@@ -27,6 +48,214 @@ class OrchestrationOptions:
 
     truncate_for_prompt_chars: int = 4000
     truncate_article_for_report_chars: int = 8000
+    # 互いに依存しないフェーズ（楽観/悲観の分析、楽観/悲観の反論）を並行実行する
+    parallel_phases: bool = False
+    # 並行実行時の最大ワーカー数（1以下なら逐次実行と同じ）
+    max_parallelism: int = 2
+    # 同じトピックの実行が同時に来たら1回にまとめ、結果とイベントを共有する（stream/invoke のみ）。
+    # 合流した呼び出しは実行中の討論の結果/失敗を受け取り、on_token は最初の呼び出しのものだけが呼ばれるため既定は無効
+    coalesce_identical_requests: bool = False
+
+
+# deadline が近いため実行しなかったフェーズの PhaseEvent.error
+_DEADLINE_SKIPPED = "期限が近いため省略しました"
+
+# 呼び出しごとに異なり、同時実行をまとめても共有しない state のキー
+_PER_REQUEST_KEYS = ("topic", "request_id", "messages")
+
+# (stateキー, JSON内の位置, 追加された文字列) を受け取るトークン単位のコールバック
+TokenCallback = Callable[[str, JsonPath, str], None]
+
+
+@dataclass(frozen=True)
+class PhaseEvent:
+    """
+    OrchestrationAgent.stream()/astream() が、フェーズ（楽観/悲観は別々）の完了ごとに返すイベント。
+
+    - phase: "research" / "analysis" / "fact_check" / "rebuttal" / "report" / "done"
+    - key: 更新した state のキー（"article_text" / "optimistic_argument" / ... / "final_report"）。
+      RSSキーワード不一致で打ち切った場合は "halt_reason"、"done" では None
+    - value: そのキーの値
+    - duration_sec: このフェーズ（タスク）の所要時間
+    - elapsed_sec: 実行開始からの経過時間
+    - state: 実行中の state（イベント間で同じ dict を更新していく。"done" の state が最終結果）
+    - error: 例外のため value をフォールバック値（"エラー: ..."）にした場合、その例外メッセージ。
+      エージェントが内部で例外を捕まえてフォールバック値を返した場合も、そのタスクの LLM 計測値
+      （state["llm_calls"] の path="deterministic"。record_llm_path で記録される）から設定する
+    """
+
+    phase: str
+    key: Optional[str]
+    value: Any
+    duration_sec: float
+    elapsed_sec: float
+    state: DiscussionState
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.phase == "done"
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """
+    OrchestrationAgent.invoke_many() が完了順に返す1件分の結果。
+
+    - index: topics の中での位置
+    - state: 最終 state（例外で実行できなかった場合は None）
+    - error: 実行を中断した例外（"型名: メッセージ"）。フェーズ単位のフォールバックは phase_errors に入る
+    - phase_errors: フォールバック値になったフェーズ {stateキー: 例外メッセージ}
+    """
+
+    index: int
+    topic: str
+    state: Optional[DiscussionState]
+    error: Optional[str]
+    phase_errors: dict[str, str]
+    duration_sec: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _RunClock:
+    """
+    1回の実行の開始時刻を持ち、PhaseEvent を組み立てる。
+
+    llm_calls_start（この実行の開始時点の state["llm_calls"] の件数）以降に、そのタスクが最終的にフォールバック値にした記録
+    （path="deterministic"）があれば、error が無くても PhaseEvent.error にする（チェックポイント/結果キャッシュに保存しない）。
+    途中の呼び出しが失敗しても別の経路（JSON フォールバック等）で値を作れた場合は、失敗の記録があっても error にしない。
+    """
+
+    def __init__(self, llm_calls_start: int = 0) -> None:
+        self.started = time.perf_counter()
+        self.llm_calls_start = llm_calls_start
+
+    def event(
+        self,
+        phase: str,
+        key: Optional[str],
+        value: Any,
+        duration: float,
+        state: DiscussionState,
+        error: Optional[str] = None,
+    ) -> PhaseEvent:
+        if error is None and key is not None:
+            error = self._degradation(state, key)
+        return PhaseEvent(
+            phase=phase,
+            key=key,
+            value=value,
+            duration_sec=round(duration, 3),
+            elapsed_sec=round(time.perf_counter() - self.started, 3),
+            state=state,
+            error=error,
+        )
+
+    def _degradation(self, state: DiscussionState, key: str) -> Optional[str]:
+        for record in (state.get("llm_calls") or [])[self.llm_calls_start :]:
+            if record.get("task") == key and record.get("path") == "deterministic":
+                return record.get("error") or f"{record.get('step')}: LLM を使わない値にしました"
+        return None
+
+    def research_event(self, state: DiscussionState, duration: float, error: Optional[str] = None) -> PhaseEvent:
+        if state.get("halt"):
+            return self.event("research", "halt_reason", state.get("halt_reason"), duration, state)
+        return self.event("research", "article_text", state.get("article_text"), duration, state, error)
+
+
+class _CheckpointWriter:
+    """
+    stream 中の PhaseEvent を受け取り、フェーズが終わるたびに state を保存する。
+
+    フォールバック値（event.error あり。エージェント内で LLM の失敗を捕まえた場合も含む）になったフェーズ以降は保存せず、
+    completed=True にもしない。resume はそのフェーズ（と、その結果を使う後続のフェーズ）からやり直す。
+    """
+
+    def __init__(self, store: CheckpointStore, request_id: str, logger: logging.Logger) -> None:
+        self.store = store
+        self.request_id = request_id
+        self.logger = logger
+        self.failed = False
+
+    def record(self, event: PhaseEvent) -> None:
+        if event.error:
+            self.failed = True
+        if self.failed or event.key == "halt_reason":
+            return
+        try:
+            self.store.save(self.request_id, event.state, completed=event.done)
+        except Exception as e:
+            # 保存に失敗しても実行は続ける（resume できる地点が古くなるだけ）
+            self.logger.warning("[%s] チェックポイント保存エラー: %s", self.request_id, e)
+
+
+@dataclass
+class _AgentCall:
+    """
+    エージェントのメソッド1回分の呼び出し（_phase_steps が組み立て、_stream_phases / _astream_phases が実行する）。
+
+    - run(): agent.<name>(...) を呼ぶ
+    - arun(): agent.a<name> が async ならそれを await し、無ければ同期メソッドをワーカースレッドで実行する
+      （テスト/スモーク用に注入された同期専用エージェントとの互換のため）
+    - missing: 呼び出す前から分かっている入力の不足（あれば呼ばずに ValueError）
+    - scope: 呼び出しを囲むコンテキスト（LLM 計測の llm_call_scope など）
+    """
+
+    agent: Any
+    name: str
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    missing: Optional[str] = None
+    scope: Callable[[], ContextManager] = contextlib.nullcontext
+
+    def run(self) -> Any:
+        self._check_inputs()
+        with self.scope():
+            return getattr(self.agent, self.name)(*self.args, **self.kwargs)
+
+    async def arun(self) -> Any:
+        self._check_inputs()
+        with self.scope():
+            fn = getattr(self.agent, f"a{self.name}", None)
+            if fn is not None and asyncio.iscoroutinefunction(fn):
+                return await fn(*self.args, **self.kwargs)
+            return await asyncio.to_thread(getattr(self.agent, self.name), *self.args, **self.kwargs)
+
+    def _check_inputs(self) -> None:
+        if self.missing:
+            raise ValueError(self.missing)
+
+
+@dataclass
+class _PhaseTask:
+    """フェーズ1/3の1タスク。失敗したら fallback(例外メッセージ) の値にする（並行実行でも他方を巻き込まない）"""
+
+    key: str
+    call: _AgentCall
+    error_label: str
+    fallback: Callable[[str], Any]
+
+
+@dataclass
+class _TaskGroup:
+    """互いに依存しないタスク群（_iter_independent / _aiter_independent で実行し、完了ごとに event() を返す）"""
+
+    phase: str
+    tasks: list[_PhaseTask]
+    state: DiscussionState
+    clock: _RunClock
+
+    def event(self, key: str, outcome: tuple[Any, Optional[str]], duration: float) -> PhaseEvent:
+        value, error = outcome
+        self.state[key] = value
+        return self.clock.event(self.phase, key, value, duration, self.state, error)
+
+
+# _phase_steps が返すもの: イベントはそのまま流し、呼び出しは実行側が実行する
+_PhaseStep = Union[PhaseEvent, _AgentCall, _TaskGroup]
 
 
 class OrchestrationAgent:
@@ -48,9 +277,28 @@ class OrchestrationAgent:
         llm_fact_checker=None,
         researcher_agent=None,
         options: OrchestrationOptions | None = None,
+        checkpoint_store: CheckpointStore | bool | None = None,
+        result_cache: DebateResultCache | bool | None = None,
     ) -> None:
+        """
+        Args:
+            checkpoint_store: フェーズごとの state の保存先。None なら CHECKPOINT_BACKEND に従い（既定は保存しない）、
+                False で無効、CheckpointStore を渡せばそれを使う。
+            result_cache: 討論結果のキャッシュ。None なら RESULT_CACHE_ENABLED に従い（既定は無効）、
+                False で無効、DebateResultCache を渡せばそれを使う。
+        """
         self.logger = logging.getLogger(__name__)
         self.options = options or OrchestrationOptions()
+        if checkpoint_store is None:
+            checkpoint_store = checkpoint_store_from_env()
+        self.checkpoint_store: CheckpointStore | None = checkpoint_store or None
+        if result_cache is None:
+            result_cache = get_result_cache()
+        self.result_cache: DebateResultCache | None = result_cache or None
+        # 実行ごとの LLM 呼び出しの計測値（state["llm_calls"]）の追記先（LLM_METRICS_PATH。既定は書き出さない）
+        self.llm_metrics_path = llm_metrics_path_from_env()
+        # 実行中の討論（同じトピックの同時実行をまとめる）
+        self._inflight = SingleFlight("debate")
 
         # 通常はOllamaでLLMを生成するが、テスト/スモーク用途では外部から注入できるようにする
         if llm is None:
@@ -74,126 +322,844 @@ class OrchestrationAgent:
         tail = s[-(max_chars // 2) :]
         return head + "\n\n...(中略)...\n\n" + tail
 
-    def invoke(self, initial_state: DiscussionState) -> DiscussionState:
+    def _article_for_prompt(self, text: str, max_chars: int) -> str:
+        """
+        反論/レポートに渡す記事本文。
+
+        SHARED_CONTEXT_PROMPTS=1 のときは切り詰めずに渡す（全フェーズの先頭部分が同じになるよう、
+        切り詰めは各エージェントが shared_article_text で同じように行う）。
+        """
+        if shared_context_enabled():
+            return text
+        return self._truncate_for_prompt(text, max_chars)
+
+    @staticmethod
+    def _delta_kwargs(on_token: Optional[TokenCallback], key: str) -> dict:
+        """on_token 指定時だけ、エージェントに渡す on_delta（state キーを付けて on_token へ中継する）を作る"""
+        if on_token is None:
+            return {}
+        return {"on_delta": lambda path, delta: on_token(key, path, delta)}
+
+    def _analysis_task(
+        self, key: str, agent, article_text: str, error_label: str, on_token: Optional[TokenCallback]
+    ) -> _PhaseTask:
+        """フェーズ1の1タスク（失敗したら conclusion にエラーを入れた Argument）"""
+        return _PhaseTask(
+            key,
+            _AgentCall(
+                agent,
+                "analyze",
+                (article_text,),
+                self._delta_kwargs(on_token, key),
+                missing=None if article_text else "記事テキストがありません",
+            ),
+            error_label,
+            lambda message: Argument(conclusion=f"エラー: {message}", evidence=[]),
+        )
+
+    def _rebuttal_task(
+        self,
+        key: str,
+        agent,
+        critique: Critique,
+        opponent_argument: Argument,
+        original_argument: Argument,
+        article_text: str,
+        error_label: str,
+        on_token: Optional[TokenCallback],
+    ) -> _PhaseTask:
+        """フェーズ3の1タスク（失敗したら counter_points にエラーを入れた Rebuttal）"""
+        kwargs = {
+            "critique": critique,
+            "opponent_argument": opponent_argument,
+            "original_argument": original_argument,
+            "article_text": article_text,
+            **self._delta_kwargs(on_token, key),
+        }
+        return _PhaseTask(
+            key,
+            _AgentCall(agent, "debate", kwargs=kwargs),
+            error_label,
+            lambda message: Rebuttal(counter_points=[f"エラー: {message}"], strengthened_evidence=[]),
+        )
+
+    def _run_task(self, task: _PhaseTask, rid: str) -> tuple[Any, Optional[str]]:
+        """task を実行して (結果, 例外メッセージ) を返す。例外はここでフォールバック値に変換する"""
+        try:
+            return task.call.run(), None
+        except Exception as e:
+            return self._task_failed(task, rid, e)
+
+    async def _arun_task(self, task: _PhaseTask, rid: str) -> tuple[Any, Optional[str]]:
+        """_run_task の asyncio 版"""
+        try:
+            return await task.call.arun(), None
+        except Exception as e:
+            return self._task_failed(task, rid, e)
+
+    def _task_failed(self, task: _PhaseTask, rid: str, e: Exception) -> tuple[Any, str]:
+        self.logger.exception("[%s] %s: %s", rid, task.error_label, e)
+        return task.fallback(str(e)), str(e)
+
+    def _iter_independent(
+        self,
+        phase: str,
+        tasks: list[tuple[str, Callable[[], Any]]],
+        state: DiscussionState,
+        rid: str,
+    ) -> Iterator[tuple[str, Any, float]]:
+        """
+        互いに依存しないタスク群を実行し、完了したものから (stateキー, 結果, 所要秒) を返す。
+
+        - options.parallel_phases=True のときはスレッドプールで並行実行する（完了順に返す）
+        - 各タスクの所要時間と、フェーズ全体の壁時計時間を state["phase_timings"][phase] に記録する
+          （saved_sec = 逐次実行した場合の合計 - 実際の壁時計時間。呼び出し側がイベントを処理している時間は含めない）
+        """
+        if not tasks:
+            return
+
+        durations: dict[str, float] = {}
+        finished: list[float] = []
+
+        def timed(key: str, fn: Callable[[], Any]) -> Any:
+            t0 = time.perf_counter()
+            try:
+                with self._llm_scope(state, rid, phase, key):
+                    return fn()
+            finally:
+                durations[key] = time.perf_counter() - t0
+                finished.append(time.perf_counter())
+
+        workers = max(1, min(int(self.options.max_parallelism or 1), len(tasks)))
+        parallel = bool(self.options.parallel_phases) and workers > 1
+
+        started = time.perf_counter()
+        paused = 0.0
+        if parallel:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"orchestrator-{phase}") as ex:
+                futures = {ex.submit(timed, key, fn): key for key, fn in tasks}
+                for fut in as_completed(futures):
+                    key = futures[fut]
+                    yield key, fut.result(), durations[key]
+        else:
+            for key, fn in tasks:
+                value = timed(key, fn)
+                t_yield = time.perf_counter()
+                yield key, value, durations[key]
+                paused += time.perf_counter() - t_yield
+        # 並行時は他タスクが待たずに進むので、最後のタスク完了までを壁時計時間とする
+        wall = max(finished) - started - (0.0 if parallel else paused)
+
+        self._record_phase_timing(phase, durations, wall, parallel, state, rid)
+
+    @staticmethod
+    def _llm_scope(state: DiscussionState, rid: str, phase: str, key: str):
+        """この中のエージェントの LLM 呼び出しを state["llm_calls"] に記録する"""
+        return llm_call_scope(state.setdefault("llm_calls", []), rid, phase, key)
+
+    def _export_llm_calls(self, state: DiscussionState, start: int) -> None:
+        """この実行で増えた state["llm_calls"]（start 番目以降）を LLM_METRICS_PATH に JSONL で追記する"""
+        if self.llm_metrics_path is None:
+            return
+        try:
+            write_llm_calls_jsonl((state.get("llm_calls") or [])[start:], self.llm_metrics_path)
+        except Exception as e:
+            self.logger.warning("[%s] LLM計測値の書き出しエラー: %s", state.get("request_id", "-"), e)
+
+    def _record_phase_timing(
+        self,
+        phase: str,
+        durations: dict[str, float],
+        wall: float,
+        parallel: bool,
+        state: DiscussionState,
+        rid: str,
+    ) -> None:
+        serial = sum(durations.values())
+        timing = {
+            "parallel": parallel,
+            "wall_sec": round(wall, 3),
+            "serial_sec": round(serial, 3),
+            "saved_sec": round(max(0.0, serial - wall), 3),
+            "tasks": {k: round(v, 3) for k, v in durations.items()},
+        }
+        state.setdefault("phase_timings", {})[phase] = timing
+        self.logger.info(
+            "[%s] phase=%s parallel=%s wall=%.2fs serial=%.2fs saved=%.2fs",
+            rid,
+            phase,
+            parallel,
+            timing["wall_sec"],
+            timing["serial_sec"],
+            timing["saved_sec"],
+        )
+
+    async def _aiter_independent(
+        self,
+        phase: str,
+        tasks: list[tuple[str, Callable[[], Any]]],
+        state: DiscussionState,
+        rid: str,
+    ) -> AsyncIterator[tuple[str, Any, float]]:
+        """
+        _iter_independent の asyncio 版。tasks の各要素はコルーチンを返す callable。
+        - options.parallel_phases=True のときは並行に待機し（max_parallelism で上限）、完了順に返す
+        """
+        if not tasks:
+            return
+
+        durations: dict[str, float] = {}
+        finished: list[float] = []
+        workers = max(1, min(int(self.options.max_parallelism or 1), len(tasks)))
+        parallel = bool(self.options.parallel_phases) and workers > 1
+        sem = asyncio.Semaphore(workers)
+
+        async def timed(key: str, fn: Callable[[], Any]) -> tuple[str, Any]:
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    with self._llm_scope(state, rid, phase, key):
+                        return key, await fn()
+                finally:
+                    durations[key] = time.perf_counter() - t0
+                    finished.append(time.perf_counter())
+
+        started = time.perf_counter()
+        paused = 0.0
+        if parallel:
+            pending = [asyncio.ensure_future(timed(key, fn)) for key, fn in tasks]
+            try:
+                for fut in asyncio.as_completed(pending):
+                    key, value = await fut
+                    yield key, value, durations[key]
+            finally:
+                # 途中で反復をやめた場合は残りのタスクを止める
+                for task in pending:
+                    task.cancel()
+        else:
+            for key, fn in tasks:
+                _, value = await timed(key, fn)
+                t_yield = time.perf_counter()
+                yield key, value, durations[key]
+                paused += time.perf_counter() - t_yield
+        wall = max(finished) - started - (0.0 if parallel else paused)
+
+        self._record_phase_timing(phase, durations, wall, parallel, state, rid)
+
+    def invoke(
+        self,
+        initial_state: DiscussionState,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | float | None = None,
+    ) -> DiscussionState:
         """
         LangGraph の graph.invoke(...) 互換の実行メソッド。
 
         返り値は DiscussionState を拡張した dict（既存UI/スモーク互換）とする。
+        deadline（秒数または Deadline）を渡した場合の挙動は stream を参照。
         """
         state: DiscussionState = dict(initial_state or {})
-        rid = state.get("request_id", "-")
+        for event in self.stream(state, bypass_cache=bypass_cache, deadline=deadline):
+            state = event.state
+        return state
 
-        # ---- Phase0: Research ----
+    def invoke_many(
+        self,
+        topics: Iterable[str],
+        *,
+        max_concurrency: int = 4,
+        bypass_cache: bool = False,
+        deadline: float | None = None,
+    ) -> Iterator[BatchResult]:
+        """
+        複数のトピックを最大 max_concurrency 件ずつ並行して実行し、終わったものから BatchResult を返す。
+        deadline（秒）は1件ごとの予算で、各件の開始時から数える。
+
+        - LLM クライアント/HTTP の接続・キャッシュはこのインスタンスのものを共有する
+        - 1件の例外は BatchResult.error に入れて他の実行を続ける
+        - topics は必要な分だけ読み進める（ファイル/標準入力をそのまま渡せる）。途中でイテレータを閉じると未開始の分は実行しない
+        """
+        workers = max(1, int(max_concurrency or 1))
+        items = enumerate(topics)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="orchestrator-batch") as ex:
+            pending: set[Future] = set()
+
+            def fill() -> None:
+                while len(pending) < workers:
+                    nxt = next(items, None)
+                    if nxt is None:
+                        return
+                    pending.add(ex.submit(self._invoke_one, nxt[0], nxt[1], bypass_cache, deadline))
+
+            try:
+                fill()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        pending.discard(fut)
+                        yield fut.result()
+                    fill()
+            finally:
+                for fut in pending:
+                    fut.cancel()
+
+    def _invoke_one(self, index: int, topic: str, bypass_cache: bool, deadline: float | None = None) -> BatchResult:
+        """invoke_many の1件分（例外は BatchResult.error に変換する）"""
+        t0 = time.perf_counter()
+        state: Optional[DiscussionState] = None
+        phase_errors: dict[str, str] = {}
+        error = None
         try:
-            if not state.get("topic"):
-                raise ValueError("トピックが指定されていません")
-            article = self.researcher.run(state["topic"])
-            if not article:
-                raise ValueError("記事の取得に失敗しました")
-            state["article_text"] = article
-        except RssKeywordNotFoundError as e:
-            self.logger.info("[%s] RSSキーワード一致なし: %s", rid, e)
-            state["halt"] = True
-            state["halt_reason"] = str(e)
-            return state
+            initial: DiscussionState = {"topic": topic, "messages": [], "request_id": str(uuid.uuid4())}
+            extra = {} if deadline is None else {"deadline": deadline}
+            for event in self.stream(initial, bypass_cache=bypass_cache, **extra):
+                state = event.state
+                if event.error and event.key:
+                    phase_errors[event.key] = event.error
         except Exception as e:
-            self.logger.exception("[%s] リサーチエラー: %s", rid, e)
-            state["article_text"] = f"エラー: {str(e)}"
+            self.logger.exception("[batch:%d] 実行エラー: %s", index, e)
+            error = f"{type(e).__name__}: {e}"
+            state = None
+        return BatchResult(
+            index=index,
+            topic=topic,
+            state=state,
+            error=error,
+            phase_errors=phase_errors,
+            duration_sec=round(time.perf_counter() - t0, 3),
+        )
+
+    def stream(
+        self,
+        initial_state: DiscussionState,
+        on_token: Optional[TokenCallback] = None,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | float | None = None,
+    ) -> Iterator[PhaseEvent]:
+        """
+        invoke と同じ処理を進めながら、各フェーズ（楽観/悲観は別々）が終わるたびに PhaseEvent を返す。
+        最後に phase="done" のイベントを返し、その state が invoke の返り値と同じになる。
+
+        on_token を渡すと、主張・反論・最終レポート（summary / final_conclusion）の生成をトークン単位で受け取り、
+        文字列が伸びるたびに on_token(stateキー, 位置, 差分) を呼ぶ（位置は ("conclusion",) / ("counter_points", 0) など）。
+        確定値はそのフェーズの PhaseEvent で届く。parallel_phases=True のときはワーカースレッドから呼ばれる。
+
+        チェックポイントの保存先があれば、フェーズが終わるたびに state を request_id（無ければ採番）で保存する。
+
+        結果キャッシュが有効なら、記事本文の取得後に同じ記事・同じ設定の結果を探し、あれば残りのフェーズを実行せずに
+        "done" を返す（state["result_cache_hit"] = True）。bypass_cache=True で参照しない（結果は保存し直す）。
+
+        options.coalesce_identical_requests が有効なら、同じトピック（正規化後）の実行中の討論に合流し、
+        1回の実行の PhaseEvent を共有する（state の request_id / topic / messages は呼び出しごとの値のまま）。
+
+        deadline（秒数または Deadline）を渡すと、フェーズごとの目安（src.utils.deadline.PHASE_BUDGET_SHARES）に対して
+        残り時間が足りない省略可能な処理を省く: 反論フェーズ（空の Rebuttal）と、レポートの LLM 呼び出し/JSONフォールバック/
+        日本語化（本文からの決定的な要約/結論にする）。省いた処理は state["degraded"] に入り、そのフェーズの
+        PhaseEvent.error が設定される（チェックポイント/結果キャッシュには保存しない）。deadline 付きの実行はまとめない。
+        """
+        state = self._prepare_state(initial_state)
+        writer = self._checkpoint_writer(state)
+        deadline = Deadline.coerce(deadline)
+        key = self._coalesce_key(state, bypass_cache) if deadline is None else None
+        if key is None:
+            events = self._stream_cached(state, on_token, bypass_cache, deadline)
+        else:
+            events = self._stream_coalesced(key, state, on_token, bypass_cache)
+        try:
+            for event in events:
+                if writer is not None:
+                    writer.record(event)
+                yield event
+        finally:
+            events.close()
+
+    def resume(self, request_id: str) -> DiscussionState:
+        """
+        request_id のチェックポイントから state を復元し、最後に完了したフェーズの続きから実行して最終 state を返す。
+
+        Raises:
+            ValueError: チェックポイントの保存先が設定されていない
+            CheckpointNotFoundError: request_id のチェックポイントが無い
+        """
+        state: DiscussionState = {}
+        for event in self.resume_stream(request_id):
+            state = event.state
+        return state
+
+    def resume_stream(self, request_id: str, on_token: Optional[TokenCallback] = None) -> Iterator[PhaseEvent]:
+        """resume の stream 版（実行したフェーズの PhaseEvent だけを返す）。"""
+        checkpoint = self._load_checkpoint(request_id)
+        if checkpoint.completed:
+            yield _RunClock().event("done", None, None, 0.0, checkpoint.state)
+            return
+        yield from self.stream(checkpoint.state, on_token=on_token)
+
+    def _result_cache_key(self, article_text: str) -> str:
+        agents = (self.optimist, self.pessimist, self.checker, self.reporter)
+        return result_cache_key(
+            article_text,
+            llm_fingerprints=[llm_fingerprint(getattr(a, "model", None)) for a in agents],
+            prompts=prompt_fingerprint(agents),
+            # 並行実行の有無は結果に影響しないので、プロンプトに入る文字数の設定とプロンプトの並びだけをキーに含める
+            options=(
+                self.options.truncate_for_prompt_chars,
+                self.options.truncate_article_for_report_chars,
+                shared_context_enabled(),
+            ),
+        )
+
+    def _cache_hit_event(self, state: DiscussionState, cached: DiscussionState) -> PhaseEvent:
+        state.update({k: v for k, v in cached.items() if k in RESULT_KEYS})
+        state["result_cache_hit"] = True
+        self.logger.info("[%s] 結果キャッシュを使用", state.get("request_id", "-"))
+        return _RunClock().event("done", None, None, 0.0, state)
+
+    def _stream_cached(
+        self,
+        state: DiscussionState,
+        on_token: Optional[TokenCallback],
+        bypass_cache: bool,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[PhaseEvent]:
+        """
+        _stream_phases を結果キャッシュで包む（記事本文が決まった時点で参照し、エラー無く完了した結果を保存する）。
+        エージェント内でフォールバック値にしたフェーズも PhaseEvent.error になるため（_RunClock）、その結果は保存しない。
+        """
+        cache = self.result_cache
+        if cache is None:
+            yield from self._stream_phases(state, on_token, deadline)
+            return
+        key = self._result_cache_key(state["article_text"]) if state.get("article_text") else None
+        cached = cache.get(key) if key is not None and not bypass_cache else None
+        if cached is not None:
+            yield self._cache_hit_event(state, cached)
+            return
+
+        failed = False
+        events = self._stream_phases(state, on_token, deadline)
+        try:
+            for event in events:
+                failed = failed or bool(event.error)
+                if key is None and event.key == "article_text" and not event.error:
+                    key = self._result_cache_key(event.value)
+                    cached = None if bypass_cache else cache.get(key)
+                    if cached is not None:
+                        yield event
+                        yield self._cache_hit_event(state, cached)
+                        return
+                if event.done and key is not None and not failed and not event.state.get("halt"):
+                    cache.put(key, event.state)
+                yield event
+        finally:
+            events.close()
+
+    def _coalesce_key(self, state: DiscussionState, bypass_cache: bool) -> Optional[tuple]:
+        """同時実行をまとめるキー。途中結果を持つ state（resume 等）やトピック無しはまとめない"""
+        if not self.options.coalesce_identical_requests:
+            return None
+        if any(state.get(k) for k in state if k not in _PER_REQUEST_KEYS):
+            return None
+        topic = " ".join(unicodedata.normalize("NFKC", state.get("topic") or "").split())
+        if not topic:
+            return None
+        if topic.startswith(("http://", "https://")):
+            topic = topic.split("#", 1)[0]
+        else:
+            topic = topic.casefold()
+        return topic, bypass_cache
+
+    def _stream_coalesced(
+        self, key: tuple, state: DiscussionState, on_token: Optional[TokenCallback], bypass_cache: bool
+    ) -> Iterator[PhaseEvent]:
+        """
+        同じキーの実行に合流して PhaseEvent を受け取り、この呼び出しの state に反映して返す。
+        トークンは最初の呼び出しが on_token を渡した場合だけ流れる（合流した側にも途中から再生する）。
+        """
+        own = {k: state[k] for k in _PER_REQUEST_KEYS if k in state}
+
+        def start(emit):
+            delta = (lambda k, path, d: emit((k, path, d))) if on_token is not None else None
+            # 実行側は次のフェーズで state を更新していくので、購読者にはイベント時点の写しを渡す
+            events = self._stream_cached(dict(state), delta, bypass_cache)
+            try:
+                for event in events:
+                    snapshot = dict(event.state)
+                    if "phase_timings" in snapshot:
+                        snapshot["phase_timings"] = dict(snapshot["phase_timings"])
+                    yield replace(event, state=snapshot)
+            finally:
+                events.close()
+
+        forward_tokens = on_token is not None
+        items = self._inflight.stream(key, start)
+        try:
+            for kind, payload in items:
+                if kind == "token":
+                    if forward_tokens:
+                        try:
+                            on_token(*payload)
+                        except Exception as e:
+                            # この呼び出しのコールバックの失敗（キャンセル等）で共有の実行は止めない
+                            self.logger.info("[%s] トークンの受け取りを停止: %s", own.get("request_id", "-"), e)
+                            forward_tokens = False
+                    continue
+                state.update(payload.state)
+                state.update(own)
+                yield replace(payload, state=state)
+        finally:
+            items.close()
+
+    def _prepare_state(self, initial_state: DiscussionState) -> DiscussionState:
+        state: DiscussionState = dict(initial_state or {})
+        if self.checkpoint_store is not None and not state.get("request_id"):
+            # チェックポイントは request_id 単位で保存するため、無ければ採番する（event.state["request_id"] で参照できる）
+            state["request_id"] = str(uuid.uuid4())
+        return state
+
+    def _checkpoint_writer(self, state: DiscussionState) -> Optional["_CheckpointWriter"]:
+        if self.checkpoint_store is None:
+            return None
+        return _CheckpointWriter(self.checkpoint_store, state["request_id"], self.logger)
+
+    def _load_checkpoint(self, request_id: str) -> Checkpoint:
+        if self.checkpoint_store is None:
+            raise ValueError("チェックポイントの保存先が設定されていません（CHECKPOINT_BACKEND または checkpoint_store）")
+        checkpoint = self.checkpoint_store.load(request_id)
+        if checkpoint is None:
+            raise CheckpointNotFoundError(request_id)
+        return checkpoint
+
+    def _deadline_skips(self, deadline: Optional[Deadline], rid: str, *phases: str) -> bool:
+        """phases の予算分の残り時間が無ければ True（そのフェーズの省略可能な処理を省く）"""
+        if deadline is None or deadline.allows(deadline.budget_for(*phases)):
+            return False
+        self.logger.info("[%s] 期限が近いため省略: %s（残り %.1f秒）", rid, phases[0], deadline.remaining())
+        return True
+
+    def _skip_rebuttals(
+        self, tasks: list[_PhaseTask], state: DiscussionState, deadline: Deadline, clock: "_RunClock"
+    ) -> Iterator[PhaseEvent]:
+        for task in tasks:
+            deadline.skip(task.key)
+            state[task.key] = Rebuttal(counter_points=[], strengthened_evidence=[])
+            yield clock.event("rebuttal", task.key, state[task.key], 0.0, state, _DEADLINE_SKIPPED)
+
+    @staticmethod
+    def _deadline_kwargs(deadline: Optional[Deadline]) -> dict:
+        return {} if deadline is None else {"deadline": deadline}
+
+    @staticmethod
+    def _report_degradation(deadline: Optional[Deadline], state: DiscussionState) -> Optional[str]:
+        """レポートで省いた処理があれば state["degraded"] に反映し、PhaseEvent.error 用のメッセージを返す"""
+        if deadline is None or not deadline.skipped:
+            return None
+        state["degraded"] = deadline.skipped
+        steps = [s for s in deadline.skipped if s.startswith("report:")]
+        return f"{_DEADLINE_SKIPPED}: {', '.join(steps)}" if steps else None
+
+    def _stream_phases(
+        self, state: DiscussionState, on_token: Optional[TokenCallback], deadline: Optional[Deadline] = None
+    ) -> Iterator[PhaseEvent]:
+        """stream の本体。フェーズの進行は _phase_steps にあり、ここではエージェントを直接呼ぶ"""
+        rid = state.get("request_id", "-")
+        steps = self._phase_steps(state, on_token, deadline)
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, PhaseEvent):
+                    yield step
+                    step = next(steps)
+                elif isinstance(step, _TaskGroup):
+                    calls = [(t.key, functools.partial(self._run_task, t, rid)) for t in step.tasks]
+                    for key, outcome, duration in self._iter_independent(step.phase, calls, state, rid):
+                        yield step.event(key, outcome, duration)
+                    step = next(steps)
+                else:
+                    try:
+                        value = step.run()
+                    except Exception as e:
+                        step = steps.throw(e)
+                    else:
+                        step = steps.send(value)
+        except StopIteration:
+            return
+        finally:
+            steps.close()
+
+    def _phase_steps(
+        self, state: DiscussionState, on_token: Optional[TokenCallback], deadline: Optional[Deadline]
+    ) -> Iterator[_PhaseStep]:
+        """
+        stream / astream で共通のフェーズ進行（各フェーズの入力の組み立て、イベント、劣化と期限の判定）。
+
+        エージェントの呼び出しは _AgentCall / _TaskGroup として返す。実行側（_stream_phases / _astream_phases）は
+        _AgentCall の結果を send し（例外は throw する）、_TaskGroup は完了ごとのイベントを自分で流す。
+        state はこの中で更新していく。
+        """
+        rid = state.get("request_id", "-")
+        llm_calls_start = len(state.get("llm_calls") or [])
+        clock = _RunClock(llm_calls_start)
+
+        # ---- Phase0: Research ----（他のフェーズと同じく、記事本文が既にあれば取得しない）
+        if not state.get("article_text"):
+            t0 = time.perf_counter()
+            error = None
+            try:
+                if not state.get("topic"):
+                    raise ValueError("トピックが指定されていません")
+                article = yield _AgentCall(self.researcher, "run", (state["topic"],))
+                if not article:
+                    raise ValueError("記事の取得に失敗しました")
+                state["article_text"] = article
+            except RssKeywordNotFoundError as e:
+                self.logger.info("[%s] RSSキーワード一致なし: %s", rid, e)
+                state["halt"] = True
+                state["halt_reason"] = str(e)
+            except Exception as e:
+                self.logger.exception("[%s] リサーチエラー: %s", rid, e)
+                state["article_text"] = f"エラー: {str(e)}"
+                error = str(e)
+            yield clock.research_event(state, time.perf_counter() - t0, error)
 
         # ---- Guard: early exit ----
         if state.get("halt"):
-            return state
+            yield clock.event("done", None, None, 0.0, state)
+            return
 
         article_text = state.get("article_text") or ""
 
         # ---- Phase1: Analysts ----
-        try:
-            if state.get("optimistic_argument") is None:
-                if not article_text:
-                    raise ValueError("記事テキストがありません")
-                state["optimistic_argument"] = self.optimist.analyze(article_text)
-        except Exception as e:
-            self.logger.exception("[%s] 楽観的分析エラー: %s", rid, e)
-            state["optimistic_argument"] = Argument(conclusion=f"エラー: {str(e)}", evidence=[])
-
-        try:
-            if state.get("pessimistic_argument") is None:
-                if not article_text:
-                    raise ValueError("記事テキストがありません")
-                state["pessimistic_argument"] = self.pessimist.analyze(article_text)
-        except Exception as e:
-            self.logger.exception("[%s] 悲観的分析エラー: %s", rid, e)
-            state["pessimistic_argument"] = Argument(conclusion=f"エラー: {str(e)}", evidence=[])
+        tasks: list[_PhaseTask] = []
+        if state.get("optimistic_argument") is None:
+            tasks.append(self._analysis_task("optimistic_argument", self.optimist, article_text, "楽観的分析エラー", on_token))
+        if state.get("pessimistic_argument") is None:
+            tasks.append(self._analysis_task("pessimistic_argument", self.pessimist, article_text, "悲観的分析エラー", on_token))
+        yield _TaskGroup("analysis", tasks, state, clock)
 
         optimistic_arg = state.get("optimistic_argument") or Argument(conclusion="", evidence=[])
         pessimistic_arg = state.get("pessimistic_argument") or Argument(conclusion="", evidence=[])
 
         # ---- Phase2: Fact check ----
-        try:
-            if state.get("critique") is None:
-                if not article_text:
-                    raise ValueError("記事テキストがありません")
-                critique = self.checker.validate(optimistic_arg, pessimistic_arg, article_text)
-                state["critique"] = critique
-        except Exception as e:
-            self.logger.exception("[%s] ファクトチェックエラー: %s", rid, e)
-            state["critique"] = Critique(bias_points=[], factual_errors=[f"エラー: {str(e)}"])
+        if state.get("critique") is None:
+            t0 = time.perf_counter()
+            error = None
+            try:
+                state["critique"] = yield _AgentCall(
+                    self.checker,
+                    "validate",
+                    (optimistic_arg, pessimistic_arg, article_text),
+                    missing=None if article_text else "記事テキストがありません",
+                    scope=functools.partial(self._llm_scope, state, rid, "fact_check", "critique"),
+                )
+            except Exception as e:
+                self.logger.exception("[%s] ファクトチェックエラー: %s", rid, e)
+                state["critique"] = Critique(bias_points=[], factual_errors=[f"エラー: {str(e)}"])
+                error = str(e)
+            yield clock.event("fact_check", "critique", state["critique"], time.perf_counter() - t0, state, error)
 
         critique = state.get("critique") or Critique(bias_points=[], factual_errors=[])
 
         # ---- Phase3: Rebuttals ----
-        try:
-            if state.get("optimistic_rebuttal") is None:
-                rebuttal = self.optimist.debate(
-                    critique=critique,
-                    opponent_argument=pessimistic_arg,
-                    original_argument=optimistic_arg,
-                    article_text=self._truncate_for_prompt(article_text, self.options.truncate_for_prompt_chars),
+        article_for_prompt = self._article_for_prompt(article_text, self.options.truncate_for_prompt_chars)
+        tasks = []
+        if state.get("optimistic_rebuttal") is None:
+            tasks.append(
+                self._rebuttal_task(
+                    "optimistic_rebuttal",
+                    self.optimist,
+                    critique,
+                    pessimistic_arg,
+                    optimistic_arg,
+                    article_for_prompt,
+                    "楽観的反論エラー",
+                    on_token,
                 )
-                state["optimistic_rebuttal"] = rebuttal
-        except Exception as e:
-            self.logger.exception("[%s] 楽観的反論エラー: %s", rid, e)
-            state["optimistic_rebuttal"] = Rebuttal(counter_points=[f"エラー: {str(e)}"], strengthened_evidence=[])
-
-        try:
-            if state.get("pessimistic_rebuttal") is None:
-                rebuttal = self.pessimist.debate(
-                    critique=critique,
-                    opponent_argument=optimistic_arg,
-                    original_argument=pessimistic_arg,
-                    article_text=self._truncate_for_prompt(article_text, self.options.truncate_for_prompt_chars),
+            )
+        if state.get("pessimistic_rebuttal") is None:
+            tasks.append(
+                self._rebuttal_task(
+                    "pessimistic_rebuttal",
+                    self.pessimist,
+                    critique,
+                    optimistic_arg,
+                    pessimistic_arg,
+                    article_for_prompt,
+                    "悲観的反論エラー",
+                    on_token,
                 )
-                state["pessimistic_rebuttal"] = rebuttal
-        except Exception as e:
-            self.logger.exception("[%s] 悲観的反論エラー: %s", rid, e)
-            state["pessimistic_rebuttal"] = Rebuttal(counter_points=[f"エラー: {str(e)}"], strengthened_evidence=[])
+            )
+        if tasks and self._deadline_skips(deadline, rid, "rebuttal", "report"):
+            yield from self._skip_rebuttals(tasks, state, deadline, clock)
+            tasks = []
+        yield _TaskGroup("rebuttal", tasks, state, clock)
 
         optimistic_rebuttal = state.get("optimistic_rebuttal") or Rebuttal(counter_points=[], strengthened_evidence=[])
         pessimistic_rebuttal = state.get("pessimistic_rebuttal") or Rebuttal(counter_points=[], strengthened_evidence=[])
 
         # ---- Phase4: Report ----
-        try:
-            if state.get("final_report") is None:
-                final_report = self.reporter.create_report(
-                    article_text=self._truncate_for_prompt(article_text, self.options.truncate_article_for_report_chars),
-                    optimistic_argument=optimistic_arg,
-                    pessimistic_argument=pessimistic_arg,
-                    critique=critique,
-                    optimistic_rebuttal=optimistic_rebuttal,
-                    pessimistic_rebuttal=pessimistic_rebuttal,
-                    article_url=state.get("topic"),
+        if state.get("final_report") is None:
+            t0 = time.perf_counter()
+            error = None
+            try:
+                state["final_report"] = yield _AgentCall(
+                    self.reporter,
+                    "create_report",
+                    kwargs={
+                        "article_text": self._article_for_prompt(article_text, self.options.truncate_article_for_report_chars),
+                        "optimistic_argument": optimistic_arg,
+                        "pessimistic_argument": pessimistic_arg,
+                        "critique": critique,
+                        "optimistic_rebuttal": optimistic_rebuttal,
+                        "pessimistic_rebuttal": pessimistic_rebuttal,
+                        "article_url": state.get("topic"),
+                        **self._delta_kwargs(on_token, "final_report"),
+                        **self._deadline_kwargs(deadline),
+                    },
+                    scope=functools.partial(self._llm_scope, state, rid, "report", "final_report"),
                 )
-                state["final_report"] = final_report
-        except Exception as e:
-            self.logger.exception("[%s] レポート生成エラー: %s", rid, e)
-            state["final_report"] = FinalReport(
-                article_info="",
-                optimistic_view=optimistic_arg,
-                pessimistic_view=pessimistic_arg,
-                critique_points=[],
-                final_conclusion=f"エラー: {str(e)}",
-            )
+                error = self._report_degradation(deadline, state)
+            except Exception as e:
+                self.logger.exception("[%s] レポート生成エラー: %s", rid, e)
+                state["final_report"] = self._fallback_report(optimistic_arg, pessimistic_arg, e)
+                error = str(e)
+            yield clock.event("report", "final_report", state["final_report"], time.perf_counter() - t0, state, error)
+
+        self._report_degradation(deadline, state)
+        self._export_llm_calls(state, llm_calls_start)
+        yield clock.event("done", None, None, 0.0, state)
+
+    async def ainvoke(
+        self,
+        initial_state: DiscussionState,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | float | None = None,
+    ) -> DiscussionState:
+        """
+        invoke の asyncio 版。
 
+        各エージェントの async メソッド（arun/aanalyze/avalidate/adebate/acreate_report）を await するため、
+        1つのイベントループで複数の討論を同時に進行できる（OSスレッドを討論ごとに占有しない）。
+        """
+        state: DiscussionState = dict(initial_state or {})
+        async for event in self.astream(state, bypass_cache=bypass_cache, deadline=deadline):
+            state = event.state
         return state
 
+    async def astream(
+        self,
+        initial_state: DiscussionState,
+        on_token: Optional[TokenCallback] = None,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | float | None = None,
+    ) -> AsyncIterator[PhaseEvent]:
+        """
+        stream の asyncio 版（ainvoke と同じ処理を進めながら PhaseEvent を返す。on_token・チェックポイント・結果キャッシュ・
+        deadline も同じ）。
+        """
+        state = self._prepare_state(initial_state)
+        writer = self._checkpoint_writer(state)
+        events = self._astream_cached(state, on_token, bypass_cache, Deadline.coerce(deadline))
+        try:
+            async for event in events:
+                if writer is not None:
+                    # 保存（SQLite/ファイル書き込み）はイベントループを止めないようワーカースレッドで行う
+                    await asyncio.to_thread(writer.record, event)
+                yield event
+        finally:
+            await events.aclose()
+
+    async def aresume(self, request_id: str) -> DiscussionState:
+        """resume の asyncio 版"""
+        state: DiscussionState = {}
+        async for event in self.aresume_stream(request_id):
+            state = event.state
+        return state
+
+    async def aresume_stream(self, request_id: str, on_token: Optional[TokenCallback] = None) -> AsyncIterator[PhaseEvent]:
+        """resume_stream の asyncio 版"""
+        checkpoint = self._load_checkpoint(request_id)
+        if checkpoint.completed:
+            yield _RunClock().event("done", None, None, 0.0, checkpoint.state)
+            return
+        async for event in self.astream(checkpoint.state, on_token=on_token):
+            yield event
+
+    async def _astream_cached(
+        self,
+        state: DiscussionState,
+        on_token: Optional[TokenCallback],
+        bypass_cache: bool,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[PhaseEvent]:
+        """_stream_cached の asyncio 版（SQLite の読み書きはワーカースレッドで行う）"""
+        cache = self.result_cache
+        if cache is None:
+            async for event in self._astream_phases(state, on_token, deadline):
+                yield event
+            return
+        key = self._result_cache_key(state["article_text"]) if state.get("article_text") else None
+        cached = await asyncio.to_thread(cache.get, key) if key is not None and not bypass_cache else None
+        if cached is not None:
+            yield self._cache_hit_event(state, cached)
+            return
 
+        failed = False
+        events = self._astream_phases(state, on_token, deadline)
+        try:
+            async for event in events:
+                failed = failed or bool(event.error)
+                if key is None and event.key == "article_text" and not event.error:
+                    key = self._result_cache_key(event.value)
+                    cached = None if bypass_cache else await asyncio.to_thread(cache.get, key)
+                    if cached is not None:
+                        yield event
+                        yield self._cache_hit_event(state, cached)
+                        return
+                if event.done and key is not None and not failed and not event.state.get("halt"):
+                    await asyncio.to_thread(cache.put, key, event.state)
+                yield event
+        finally:
+            await events.aclose()
+
+    async def _astream_phases(
+        self, state: DiscussionState, on_token: Optional[TokenCallback], deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[PhaseEvent]:
+        """astream の本体。_stream_phases と同じく _phase_steps を進め、エージェントの呼び出しを await する"""
+        rid = state.get("request_id", "-")
+        steps = self._phase_steps(state, on_token, deadline)
+        try:
+            step = next(steps)
+            while True:
+                if isinstance(step, PhaseEvent):
+                    yield step
+                    step = next(steps)
+                elif isinstance(step, _TaskGroup):
+                    calls = [(t.key, functools.partial(self._arun_task, t, rid)) for t in step.tasks]
+                    async for key, outcome, duration in self._aiter_independent(step.phase, calls, state, rid):
+                        yield step.event(key, outcome, duration)
+                    step = next(steps)
+                else:
+                    try:
+                        value = await step.arun()
+                    except Exception as e:
+                        step = steps.throw(e)
+                    else:
+                        step = steps.send(value)
+        except StopIteration:
+            return
+        finally:
+            steps.close()
+
+    @staticmethod
+    def _fallback_report(optimistic_arg: Argument, pessimistic_arg: Argument, error: Exception) -> FinalReport:
+        return FinalReport(
+            article_info="",
+            optimistic_view=optimistic_arg,
+            pessimistic_view=pessimistic_arg,
+            critique_points=[],
+            final_conclusion=f"エラー: {str(error)}",
+        )
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.utils.llm import get_llm
+from src.utils.llm_profiles import get_profile
+
+# OrchestrationAgent の構築内容に影響する環境変数（値が変わったら作り直す）
+_CONFIG_ENV_VARS = (
+    "RSS_FEED_URLS",
+    "RSS_FEEDS_FILE_ONLY",
+    "TAVILY_API_KEY",
+    "LLM_CACHE_ENABLED",
+    "LLM_CACHE_PATH",
+    "CHECKPOINT_BACKEND",
+    "CHECKPOINT_PATH",
+    "RESULT_CACHE_ENABLED",
+    "RESULT_CACHE_PATH",
+    "LLM_METRICS_PATH",
+    "OLLAMA_BASE_URLS",
+)
+_RSS_FEEDS_FILE = "config/rss_feeds.txt"
+
+
+def config_fingerprint(rss_feeds_file: str = _RSS_FEEDS_FILE) -> tuple:
+    """
+    構築時に読む設定（環境変数 + config/rss_feeds.txt の更新時刻/サイズ）の指紋。
+    秘密情報は値そのものではなくハッシュで持つ。
+    """
+    env = tuple(
+        (name, hashlib.sha256((os.getenv(name) or "").encode("utf-8")).hexdigest()[:16]) for name in _CONFIG_ENV_VARS
+    )
+    try:
+        st = Path(rss_feeds_file).stat()
+        feeds_file = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        feeds_file = None
+    return env, feeds_file
+
+
+class OrchestratorRegistry:
+    """
+    OrchestrationAgent と LLM クライアントをプロセス内で使い回すレジストリ（Streamlit の再実行/セッション間で共有）。
+
+    - LLM クライアントは (モデル名, プロファイル名, プロファイル値)、OrchestrationAgent は (モデル名, options) で共有する
+    - 取得時に config_fingerprint() が前回と変わっていれば、全エントリを捨てて作り直す
+    - invalidate() で明示的に破棄できる（モデル名を渡せばそのモデルだけ）
+
+    Note:
+    - OrchestrationAgent は実行ごとの state を引数で受け取り、インスタンスには持たないため、
+      同じインスタンスを複数セッション/スレッドから同時に使ってよい
+    """
+
+    def __init__(
+        self,
+        *,
+        llm_factory: Callable[..., Any] = get_llm,
+        agent_factory: Callable[..., OrchestrationAgent] = OrchestrationAgent,
+        fingerprint: Callable[[], Any] = config_fingerprint,
+    ) -> None:
+        self._llm_factory = llm_factory
+        self._agent_factory = agent_factory
+        self._fingerprint = fingerprint
+        # 構築（Ollama/Tavily クライアント生成・設定ファイル読込）は重いので、同じキーの同時構築はロック内で1回にする
+        self._lock = threading.RLock()
+        self._llms: dict[tuple, Any] = {}
+        self._agents: dict[tuple, OrchestrationAgent] = {}
+        self._config: Any = None
+        self._stats = {"hits": 0, "builds": 0, "llm_builds": 0, "invalidations": 0}
+
+    def _check_config(self) -> None:
+        current = self._fingerprint()
+        if self._config is not None and current != self._config:
+            logging.getLogger(__name__).info("設定の変更を検知したため、OrchestrationAgent を作り直します")
+            self._clear()
+        self._config = current
+
+    def _clear(self) -> None:
+        self._llms.clear()
+        self._agents.clear()
+        self._stats["invalidations"] += 1
+
+    def get_llm(self, model_name: str, profile: str):
+        """(モデル名, プロファイル) ごとに共有する LLM クライアントを返す。"""
+        prof = get_profile(profile)
+        key = (model_name, profile, tuple(sorted((k, repr(v)) for k, v in prof.to_kwargs().items())))
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = self._llm_factory(model_name, verify_model=False, **prof.to_kwargs())
+                self._llms[key] = llm
+                self._stats["llm_builds"] += 1
+            return llm
+
+    def get(self, model_name: str = "gemma3:4b", *, options: OrchestrationOptions | None = None) -> OrchestrationAgent:
+        """モデル名と options に対応する OrchestrationAgent を返す（無ければ作る）。"""
+        options = options or OrchestrationOptions()
+        key = (model_name, options)
+        with self._lock:
+            self._check_config()
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._stats["hits"] += 1
+                return agent
+            agent = self._agent_factory(
+                model_name,
+                llm=self.get_llm(model_name, "analysis"),
+                llm_fact_checker=self.get_llm(model_name, "fact_check"),
+                options=options,
+            )
+            self._agents[key] = agent
+            self._stats["builds"] += 1
+            return agent
+
+    def invalidate(self, model_name: Optional[str] = None) -> int:
+        """
+        キャッシュ済みの OrchestrationAgent / LLM クライアントを破棄し、破棄した OrchestrationAgent の数を返す。
+        model_name を渡した場合はそのモデルの分だけ破棄する。
+        """
+        with self._lock:
+            if model_name is None:
+                n = len(self._agents)
+                self._clear()
+                self._config = None
+                return n
+            agent_keys = [k for k in self._agents if k[0] == model_name]
+            for k in agent_keys:
+                del self._agents[k]
+            for k in [k for k in self._llms if k[0] == model_name]:
+                del self._llms[k]
+            self._stats["invalidations"] += 1
+            return len(agent_keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "agents": len(self._agents),
+                "llms": len(self._llms),
+            }
+
+
+_registry: OrchestratorRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> OrchestratorRegistry:
+    """プロセス共通のレジストリを返す（初回呼び出し時に作成）。"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = OrchestratorRegistry()
+        return _registry
+
+
+def get_orchestrator(model_name: str = "gemma3:4b", *, options: OrchestrationOptions | None = None) -> OrchestrationAgent:
+    """プロセス共通のレジストリから OrchestrationAgent を取得する。"""
+    return get_registry().get(model_name, options=options)
+
+
+def invalidate_orchestrators(model_name: Optional[str] = None) -> int:
+    """プロセス共通のレジストリを破棄する（設定変更を即時に反映したいとき）。"""
+    return get_registry().invalidate(model_name)
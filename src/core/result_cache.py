@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from langchain_core.prompts import BasePromptTemplate
+
+from src.core.checkpoint import dump_state, load_state
+from src.core.state import DiscussionState
+from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+
+# プロンプト以外（フォールバック処理や後処理）を変えて過去の結果を使わせたくないときに上げる
+RESULT_CACHE_VERSION = 1
+
+# キャッシュに保存/復元する討論結果のキー（topic / request_id / article_text 等のリクエスト固有の値は持たない）
+RESULT_KEYS = (
+    "optimistic_argument",
+    "pessimistic_argument",
+    "critique",
+    "optimistic_rebuttal",
+    "pessimistic_rebuttal",
+    "final_report",
+)
+
+# 取得経路（URL直指定 / RSS）で変わるヘッダ行
+_HEADER_LINE = re.compile(r"^\[(source|title)\][^\n]*$", re.MULTILINE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_article_text(text: str) -> str:
+    """[source]/[title] ヘッダを除き、NFKC 正規化と空白の畳み込みをした本文（同じ記事なら経路によらず同じ文字列になる）"""
+    body = _HEADER_LINE.sub("", unicodedata.normalize("NFKC", text or ""))
+    return _SPACES.sub(" ", body).strip()
+
+
+def prompt_fingerprint(agents: Iterable[Any]) -> str:
+    """エージェントが持つプロンプトテンプレートと出力スキーマのハッシュ（プロンプトを変えたら別のキーになる）"""
+    h = hashlib.sha256(f"v{RESULT_CACHE_VERSION}".encode("utf-8"))
+    for agent in agents:
+        for name, value in sorted(vars(agent).items()):
+            if isinstance(value, BasePromptTemplate):
+                h.update(f"\x00{type(agent).__name__}.{name}={value!r}".encode("utf-8"))
+    for model in (Argument, Critique, Rebuttal, FinalReport):
+        h.update(repr(model.model_json_schema()).encode("utf-8"))
+    return h.hexdigest()
+
+
+def llm_fingerprint(llm: Any) -> str:
+    """モデル名と生成パラメータ（LLMProfile 由来の temperature 等）。LangChain の LLM キャッシュと同じ llm_string を使う"""
+    get_llm_string = getattr(llm, "_get_llm_string", None)
+    if get_llm_string is not None:
+        try:
+            return get_llm_string()
+        except Exception:
+            pass
+    return f"{type(llm).__module__}.{type(llm).__qualname__}:{getattr(llm, 'model', '')}"
+
+
+def result_cache_key(article_text: str, *, llm_fingerprints: Iterable[str], prompts: str, options: Any = None) -> str:
+    h = hashlib.sha256(normalize_article_text(article_text).encode("utf-8"))
+    for part in (*llm_fingerprints, prompts, repr(options)):
+        h.update(b"\x00")
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+
+class DebateResultCache:
+    """
+    討論全体の結果（RESULT_KEYS の値）のキャッシュ（メモリLRU → SQLite の2段）。
+
+    - キーは result_cache_key()（正規化した記事本文 + LLM設定 + プロンプト）。別URL/RSS経由でも同じ記事なら当たる
+    - TTL を過ぎたエントリは参照時に破棄し、書き込み時に期限切れ/件数超過分を掃除する
+    - 既定は無効（OrchestrationAgent(result_cache=...) または RESULT_CACHE_ENABLED=1 で有効化）
+    """
+
+    def __init__(
+        self,
+        path: str | None = ".cache/result_cache.sqlite3",
+        *,
+        ttl_sec: float = 86400.0,
+        max_entries: int = 256,
+    ) -> None:
+        self.path = path
+        self.ttl_sec = float(ttl_sec)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        # key -> (created_at, 結果)
+        self._memory: OrderedDict[str, tuple[float, DiscussionState]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0}
+
+        self._conn: sqlite3.Connection | None = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_sec > 0 and (now - created_at) > self.ttl_sec
+
+    def get(self, key: str) -> Optional[DiscussionState]:
+        """キャッシュ済みの結果（RESULT_KEYS のみの dict のコピー）を返す。無い/期限切れなら None。"""
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if not self._expired(hit[0], now):
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return dict(hit[1])
+                self._memory.pop(key, None)
+                self._stats["expired"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, created_at FROM result_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    raw, created_at = row
+                    value = None
+                    if self._expired(created_at, now):
+                        self._stats["expired"] += 1
+                    else:
+                        try:
+                            value = load_state(raw)
+                        except Exception as e:
+                            # スキーマ変更などで復元できないエントリは捨てる
+                            logging.getLogger(__name__).info("結果キャッシュの復元に失敗（破棄）: %s", e)
+                    if value is None:
+                        self._conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                    else:
+                        self._conn.execute("UPDATE result_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._remember(key, created_at, value)
+                        self._stats["hits"] += 1
+                    self._conn.commit()
+                    if value is not None:
+                        return dict(value)
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, state: DiscussionState) -> None:
+        """state のうち RESULT_KEYS の値だけを保存する。"""
+        value: DiscussionState = {k: state[k] for k in RESULT_KEYS if state.get(k) is not None}
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats["writes"] += 1
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, dump_state(value), now, now),
+                )
+                if self.ttl_sec > 0:
+                    self._conn.execute("DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_sec,))
+                cur = self._conn.execute(
+                    "DELETE FROM result_cache WHERE key NOT IN"
+                    " (SELECT key FROM result_cache ORDER BY last_access DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._stats["evictions"] += max(0, cur.rowcount)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.getLogger(__name__).info("結果キャッシュの保存に失敗: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM result_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "memory_entries": len(self._memory)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, created_at: float, value: DiscussionState) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+def _env_float(name: str, default: float) -> float:
+    v = (os.getenv(name) or "").strip()
+    try:
+        return float(v) if v else default
+    except ValueError:
+        return default
+
+
+_shared_cache: DebateResultCache | None = None
+_shared_lock = threading.Lock()
+
+
+def result_cache_enabled() -> bool:
+    v = (os.getenv("RESULT_CACHE_ENABLED") or "").strip().lower()
+    return v in ("1", "true", "yes", "y", "on")
+
+
+def get_result_cache() -> DebateResultCache | None:
+    """
+    プロセス共通の DebateResultCache を返す（RESULT_CACHE_ENABLED=1 のときだけ。既定は None）。
+
+    - RESULT_CACHE_PATH: SQLiteファイル（既定: .cache/result_cache.sqlite3、空文字でメモリのみ）
+    - RESULT_CACHE_TTL_SEC: TTL秒（既定: 86400、0以下で無期限）
+    - RESULT_CACHE_MAX_ENTRIES: 保持する件数の上限（既定: 256）
+    """
+    global _shared_cache
+    if not result_cache_enabled():
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            path = os.getenv("RESULT_CACHE_PATH")
+            _shared_cache = DebateResultCache(
+                ".cache/result_cache.sqlite3" if path is None else (path.strip() or None),
+                ttl_sec=_env_float("RESULT_CACHE_TTL_SEC", 86400.0),
+                max_entries=int(_env_float("RESULT_CACHE_MAX_ENTRIES", 256)),
+            )
+        return _shared_cache
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from src.core.orchestrator import PhaseEvent
+from src.core.state import DiscussionState
+from src.utils.json_stream import JsonPath
+
+# 実行状態: queued → running → done / failed / cancelled
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+class RunCancelledError(RuntimeError):
+    """キャンセル済みの実行で、生成中のLLM出力の受け取りを打ち切るための例外"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class RunSnapshot:
+    """
+    RunManager.get() が返す、ある時点の実行状態のコピー。
+
+    - events: これまでに届いた PhaseEvent（順番どおり）
+    - drafts: 生成中のテキスト {stateキー: {JSON内の位置: 文字列}}（確定値は events 側を使う）
+    - state: 最後のイベントの state（イベントが無ければ None）
+    - version: 更新のたびに増える番号（wait_for_update で変化待ちに使う）
+    """
+
+    request_id: str
+    status: str
+    events: tuple[PhaseEvent, ...]
+    drafts: dict[str, dict[JsonPath, str]]
+    state: Optional[DiscussionState]
+    error: Optional[BaseException]
+    version: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def last_event(self) -> Optional[PhaseEvent]:
+        return self.events[-1] if self.events else None
+
+
+@dataclass
+class _Run:
+    request_id: str
+    status: str = "queued"
+    events: list[PhaseEvent] = field(default_factory=list)
+    drafts: dict[str, dict[JsonPath, str]] = field(default_factory=dict)
+    error: Optional[BaseException] = None
+    version: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def snapshot(self) -> RunSnapshot:
+        return RunSnapshot(
+            request_id=self.request_id,
+            status=self.status,
+            events=tuple(self.events),
+            drafts={k: dict(v) for k, v in self.drafts.items()},
+            state=self.events[-1].state if self.events else None,
+            error=self.error,
+            version=self.version,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+
+class RunManager:
+    """
+    討論の実行を共有のワーカープールで行い、request_id ごとに進捗を保持する。
+
+    - Streamlit の再実行やタブを閉じても実行は続き、同じ request_id で結果/途中経過を取り出せる
+    - 同時に走る実行は max_workers（RUN_MAX_WORKERS、既定2）までで、超えた分は queued で待つ
+    - cancel() で中止できる。生成中のLLM出力（ストリーミング）はトークンを受け取った時点で打ち切り、
+      ストリーミングしないフェーズ（記事取得・ファクトチェック）はそのフェーズの完了後に止まる
+    - 完了した実行は max_finished（RUN_HISTORY_MAX、既定100）件まで保持し、古いものから捨てる
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_finished: Optional[int] = None) -> None:
+        self.max_workers = max(1, max_workers if max_workers is not None else _env_int("RUN_MAX_WORKERS", 2))
+        self.max_finished = max(0, max_finished if max_finished is not None else _env_int("RUN_HISTORY_MAX", 100))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="discussion-run")
+        self._cond = threading.Condition()
+        self._runs: dict[str, _Run] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def submit(
+        self, request_id: str, orchestrator: Any, initial_state: DiscussionState, *, bypass_cache: bool = False
+    ) -> RunSnapshot:
+        """
+        実行を登録する。同じ request_id の実行が未完了なら、新たに始めずにその状態を返す
+        （二重クリック/再実行で同じ討論を重ねて走らせない）。
+        bypass_cache=True なら結果キャッシュを参照せずに実行する（orchestrator.stream に渡す）。
+        """
+        with self._cond:
+            run = self._runs.get(request_id)
+            if run is not None and run.status not in FINISHED_STATUSES:
+                return run.snapshot()
+            run = _Run(request_id=request_id)
+            self._runs[request_id] = run
+            snap = run.snapshot()
+        state = dict(initial_state or {})
+        state.setdefault("request_id", request_id)
+        kwargs = {"bypass_cache": True} if bypass_cache else {}
+        self._executor.submit(
+            self._execute, run, lambda on_token: orchestrator.stream(state, on_token=on_token, **kwargs)
+        )
+        return snap
+
+    def resume(self, request_id: str, orchestrator: Any) -> RunSnapshot:
+        """
+        中断/失敗した実行を、orchestrator のチェックポイントから続きを実行する（resume_stream を使う）。
+        実行が未完了なら submit と同じく何もしない。
+        """
+        with self._cond:
+            run = self._runs.get(request_id)
+            if run is not None and run.status not in FINISHED_STATUSES:
+                return run.snapshot()
+            run = _Run(request_id=request_id)
+            self._runs[request_id] = run
+            snap = run.snapshot()
+        self._executor.submit(
+            self._execute, run, lambda on_token: orchestrator.resume_stream(request_id, on_token=on_token)
+        )
+        return snap
+
+    def get(self, request_id: str) -> Optional[RunSnapshot]:
+        with self._cond:
+            run = self._runs.get(request_id)
+            return run.snapshot() if run is not None else None
+
+    def cancel(self, request_id: str) -> bool:
+        """未完了の実行に中止を指示する。対象が無い/完了済みなら False。"""
+        with self._cond:
+            run = self._runs.get(request_id)
+            if run is None or run.status in FINISHED_STATUSES:
+                return False
+            run.cancel_event.set()
+            if run.status == "queued":
+                # まだワーカーに乗っていなければ、その場で終わらせる（ワーカーは開始時に何もせず抜ける）
+                self._finish(run, "cancelled")
+            return True
+
+    def wait_for_update(self, request_id: str, since_version: int, timeout: Optional[float] = None) -> Optional[RunSnapshot]:
+        """version が since_version より進むか、完了するまで待って状態を返す（timeout 経過時はその時点の状態）。"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (run := self._runs.get(request_id)) is None
+                or run.version > since_version
+                or run.status in FINISHED_STATUSES,
+                timeout=timeout,
+            )
+            run = self._runs.get(request_id)
+            return run.snapshot() if run is not None else None
+
+    def wait(self, request_id: str, timeout: Optional[float] = None) -> Optional[RunSnapshot]:
+        """完了まで待って状態を返す（timeout 経過時はその時点の状態）。"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (run := self._runs.get(request_id)) is None or run.status in FINISHED_STATUSES,
+                timeout=timeout,
+            )
+            run = self._runs.get(request_id)
+            return run.snapshot() if run is not None else None
+
+    def stats(self) -> dict:
+        with self._cond:
+            counts: dict[str, int] = {}
+            for run in self._runs.values():
+                counts[run.status] = counts.get(run.status, 0) + 1
+            return {"max_workers": self.max_workers, "runs": len(self._runs), **counts}
+
+    def shutdown(self, *, cancel: bool = True) -> None:
+        """未完了の実行を（cancel=True なら）中止し、ワーカープールを閉じる。"""
+        if cancel:
+            with self._cond:
+                ids = [r.request_id for r in self._runs.values() if r.status not in FINISHED_STATUSES]
+            for request_id in ids:
+                self.cancel(request_id)
+        self._executor.shutdown(wait=True)
+
+    # ---- 内部処理 ----
+
+    def _touch(self, run: _Run) -> None:
+        run.version += 1
+        self._cond.notify_all()
+
+    def _finish(self, run: _Run, status: str, error: Optional[BaseException] = None) -> None:
+        run.status = status
+        run.error = error
+        run.finished_at = time.time()
+        self._touch(run)
+        self._prune()
+
+    def _prune(self) -> None:
+        finished = [r for r in self._runs.values() if r.status in FINISHED_STATUSES]
+        excess = len(finished) - self.max_finished
+        if excess > 0:
+            for run in sorted(finished, key=lambda r: r.finished_at or 0.0)[:excess]:
+                del self._runs[run.request_id]
+
+    def _execute(self, run: _Run, start: Callable[[Callable], Iterator[PhaseEvent]]) -> None:
+        with self._cond:
+            if run.cancel_event.is_set():
+                return
+            run.status = "running"
+            run.started_at = time.time()
+            self._touch(run)
+
+        def on_token(key: str, path: JsonPath, delta: str) -> None:
+            if run.cancel_event.is_set():
+                raise RunCancelledError("実行はキャンセルされました")
+            with self._cond:
+                fields = run.drafts.setdefault(key, {})
+                fields[path] = fields.get(path, "") + delta
+                self._touch(run)
+
+        try:
+            stream = start(on_token)
+        except Exception as e:
+            self.logger.exception("[%s] 実行エラー: %s", run.request_id, e)
+            with self._cond:
+                self._finish(run, "failed", e)
+            return
+        try:
+            for event in stream:
+                with self._cond:
+                    run.events.append(event)
+                    self._touch(run)
+                if run.cancel_event.is_set():
+                    break
+        except Exception as e:
+            self.logger.exception("[%s] 実行エラー: %s", run.request_id, e)
+            with self._cond:
+                self._finish(run, "failed", e)
+            return
+        finally:
+            stream.close()
+
+        with self._cond:
+            completed = bool(run.events) and run.events[-1].done
+            self._finish(run, "done" if completed else "cancelled")
+
+
+_run_manager: RunManager | None = None
+_run_manager_lock = threading.Lock()
+
+
+def get_run_manager() -> RunManager:
+    """プロセス共通の RunManager を返す（初回呼び出し時に作成）。"""
+    global _run_manager
+    with _run_manager_lock:
+        if _run_manager is None:
+            _run_manager = RunManager()
+        return _run_manager
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+# start(emit) が返すイテレータの要素は ("event", 要素)、emit(x) で送った値は ("token", x) として購読者に届く
+FlightItem = tuple[str, Any]
+
+
+class FlightAbandonedError(RuntimeError):
+    """購読者が全員離脱したため、共有していた実行を打ち切った"""
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.items: list[FlightItem] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.abandoned = False
+
+    def publish(self, kind: str, payload: Any) -> None:
+        with self.cond:
+            self.items.append((kind, payload))
+            self.cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    def wait_items(self, index: int) -> tuple[list[FlightItem], bool, Optional[BaseException]]:
+        """index 以降の要素が届くか終了するまで待ち、(新しい要素, 終了したか, 例外) を返す"""
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.items) > index or self.finished)
+            return self.items[index:], self.finished, self.error
+
+
+class SingleFlight:
+    """
+    同じキーで同時に来た実行を1回にまとめ、その出力（イベント列）を全員で共有する。
+
+    - 最初の呼び出しで start(emit) をドライバスレッドで実行し、後から来た同じキーの呼び出しは途中から合流する
+      （合流した時点までの要素も最初から受け取る）
+    - 実行中の例外は購読者全員に同じ例外として届く
+    - 購読者が全員離脱（ジェネレータを close）したら emit が FlightAbandonedError を送出し、
+      次の要素を受け取った時点で実行を打ち切る。1人でも残っていれば実行は続く
+    - 終了した実行は破棄する（完了後の同じ呼び出しは新しく実行する）
+    """
+
+    def __init__(self, name: str = "singleflight") -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._stats = {"executions": 0, "coalesced": 0, "abandoned": 0}
+        self.logger = logging.getLogger(__name__)
+
+    def stream(self, key: Hashable, start: Callable[[Callable[[Any], None]], Iterator[Any]]) -> Iterator[FlightItem]:
+        """key の実行に合流し（無ければ start で始め）、その要素を順に返す"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._stats["executions"] += 1
+                leader = True
+            else:
+                self._stats["coalesced"] += 1
+                leader = False
+            flight.subscribers += 1
+        if leader:
+            # 呼び出し元のコンテキスト（contextvars）を引き継いで実行する
+            ctx = contextvars.copy_context()
+            threading.Thread(
+                target=ctx.run, args=(self._drive, key, flight, start), name=f"{self.name}-driver", daemon=True
+            ).start()
+        return self._subscribe(key, flight)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+    def _drive(self, key: Hashable, flight: _Flight, start: Callable[[Callable[[Any], None]], Iterator[Any]]) -> None:
+        def emit(payload: Any) -> None:
+            if flight.abandoned:
+                raise FlightAbandonedError("購読者がいないため実行を打ち切りました")
+            flight.publish("token", payload)
+
+        error: Optional[BaseException] = None
+        try:
+            items = start(emit)
+            try:
+                for item in items:
+                    flight.publish("event", item)
+                    if flight.abandoned:
+                        error = FlightAbandonedError("購読者がいないため実行を打ち切りました")
+                        break
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+        except BaseException as e:
+            error = e
+        finally:
+            self._forget(key, flight)
+            flight.finish(error)
+
+    def _subscribe(self, key: Hashable, flight: _Flight) -> Iterator[FlightItem]:
+        index = 0
+        try:
+            while True:
+                items, finished, error = flight.wait_items(index)
+                for item in items:
+                    index += 1
+                    yield item
+                if finished and not items:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._detach(key, flight)
+
+    def _detach(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers > 0 or flight.finished:
+                return
+            flight.abandoned = True
+            self._stats["abandoned"] += 1
+            # 打ち切り中の実行に新しい呼び出しを合流させない
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
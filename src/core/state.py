@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Optional
+from typing import Any, Dict, TypedDict, List, Optional
 from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
 
 class DiscussionState(TypedDict, total=False):
@@ -19,5 +19,9 @@ class DiscussionState(TypedDict, total=False):
     optimistic_rebuttal: Optional[Rebuttal]
     pessimistic_rebuttal: Optional[Rebuttal]
     final_report: Optional[FinalReport]
+    degraded: List[str]  # 期限（deadline）が近いため省いた処理（"optimistic_rebuttal" / "report:llm" など）
+    result_cache_hit: bool  # 結果キャッシュの値を返した（フェーズを実行していない）
+    phase_timings: Dict[str, Dict[str, Any]]  # フェーズ別の所要時間（並行実行による短縮量を含む）
+    llm_calls: List[Dict[str, Any]]  # LLM 呼び出しごとの計測値（src.utils.llm_metrics.LLMCallRecord.to_dict()）
     messages: List[str]  # For history tracking
 
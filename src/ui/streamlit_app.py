@@ -14,13 +14,18 @@ project_root = Path(__file__).parent.parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from src.core.orchestrator import OrchestrationAgent
+from src.core.orchestrator import OrchestrationOptions
+from src.core.registry import get_orchestrator, invalidate_orchestrators
+from src.core.runs import get_run_manager
 from src.utils.logging_config import setup_logging
 from src.utils.security import sanitize_url_for_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# 複数の利用者が同じトピックを同時に分析したら1回の実行にまとめる（OrchestrationAgent の既定では無効）
+_UI_OPTIONS = OrchestrationOptions(coalesce_identical_requests=True)
+
 st.set_page_config(page_title="Discussion News Analysis", layout="wide")
 
 st.title("討論型ニュース分析システム")
@@ -38,6 +43,224 @@ def _classify_ollama_error_message(msg: str) -> str:
     return "other"
 
 
+_PHASE_LABELS = {
+    "research": "記事の取得",
+    "analysis": "分析",
+    "fact_check": "ファクトチェック",
+    "rebuttal": "反論",
+    "report": "最終レポート",
+}
+
+
+def _render_argument(arg) -> None:
+    if arg:
+        if hasattr(arg, 'conclusion'):
+            st.write(f"**結論**: {arg.conclusion}")
+            if arg.evidence:
+                st.write("**証拠**:")
+                for evidence in arg.evidence:
+                    st.write(f"- {evidence}")
+        else:
+            st.write(arg)
+    else:
+        st.info("データがありません")
+
+
+def _render_critique(critique) -> None:
+    if critique:
+        if hasattr(critique, 'bias_points'):
+            if critique.bias_points:
+                st.write("**バイアス指摘**:")
+                for point in critique.bias_points:
+                    st.write(f"- {point}")
+            if critique.factual_errors:
+                st.write("**事実誤り**:")
+                for error in critique.factual_errors:
+                    st.write(f"- {error}")
+        else:
+            st.write(critique)
+    else:
+        st.info("データがありません")
+
+
+def _render_rebuttal(rebuttal) -> None:
+    if rebuttal and hasattr(rebuttal, "counter_points"):
+        if rebuttal.counter_points:
+            st.write("**反論ポイント**:")
+            for p in rebuttal.counter_points:
+                st.write(f"- {p}")
+        if rebuttal.strengthened_evidence:
+            st.write("**補強証拠**:")
+            for ev in rebuttal.strengthened_evidence:
+                st.write(f"- {ev}")
+    elif rebuttal:
+        st.write(rebuttal)
+    else:
+        st.info("データがありません")
+
+
+def _render_final_report(final_report) -> None:
+    if final_report:
+        if hasattr(final_report, 'final_conclusion'):
+            if getattr(final_report, "article_info", ""):
+                st.write("**記事情報**:")
+                st.write(final_report.article_info)
+            st.write(f"**最終結論**: {final_report.final_conclusion}")
+            if final_report.critique_points:
+                st.write("**批評ポイント**:")
+                for point in final_report.critique_points:
+                    st.write(f"- {point}")
+        else:
+            st.write(final_report)
+    else:
+        st.info("データがありません")
+
+
+# トークン単位で下書き表示する項目（stateキー -> [(フィールド, 見出し)]）
+_DRAFT_FIELDS = {
+    "optimistic_argument": [("conclusion", "結論")],
+    "pessimistic_argument": [("conclusion", "結論")],
+    "optimistic_rebuttal": [("counter_points", "反論ポイント")],
+    "pessimistic_rebuttal": [("counter_points", "反論ポイント")],
+    "final_report": [("summary", "要約"), ("final_conclusion", "最終結論")],
+}
+
+
+def _format_draft(key: str, fields: dict) -> str:
+    """生成途中のフィールド {位置: 文字列} を Markdown にする（確定値は PhaseEvent で描画し直す）"""
+    lines = []
+    for field, label in _DRAFT_FIELDS.get(key, []):
+        if (field,) in fields:
+            lines.append(f"**{label}**: {fields[(field,)]}")
+            continue
+        paths = sorted((p for p in fields if p[0] == field and len(p) == 2), key=lambda p: p[1])
+        items = [fields[p] for p in paths]
+        if items:
+            lines.append(f"**{label}**:")
+            lines.extend(f"- {text}" for text in items)
+    return "\n\n".join(lines) + " ▌" if lines else ""
+
+
+def _build_result_slots() -> dict:
+    """
+    結果の表示枠を先に作り、{stateキー: (枠, 描画関数)} を返す。
+    各枠はフェーズが終わるまで「処理中」を表示しておく。
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("楽観的視点")
+        optimistic_slot = st.empty()
+    with col2:
+        st.subheader("悲観的視点")
+        pessimistic_slot = st.empty()
+
+    st.subheader("ファクトチェック・批評")
+    critique_slot = st.empty()
+
+    st.subheader("討論（反論）")
+    col3, col4 = st.columns(2)
+    with col3:
+        st.markdown("**楽観的アナリストの反論**")
+        optimistic_rebuttal_slot = st.empty()
+    with col4:
+        st.markdown("**悲観的アナリストの反論**")
+        pessimistic_rebuttal_slot = st.empty()
+
+    st.header("最終レポート")
+    report_slot = st.empty()
+
+    slots = {
+        "optimistic_argument": (optimistic_slot, _render_argument),
+        "pessimistic_argument": (pessimistic_slot, _render_argument),
+        "critique": (critique_slot, _render_critique),
+        "optimistic_rebuttal": (optimistic_rebuttal_slot, _render_rebuttal),
+        "pessimistic_rebuttal": (pessimistic_rebuttal_slot, _render_rebuttal),
+        "final_report": (report_slot, _render_final_report),
+    }
+    for slot, _ in slots.values():
+        slot.caption("処理中...")
+    return slots
+
+
+def _render_run_error(e: Exception, model_name: str) -> None:
+    """実行/準備中の例外を、原因別の対処方法付きで表示する"""
+    if isinstance(e, ValueError):
+        st.error(f"**設定エラー**: {e}")
+        st.info("💡 **対処方法**:\n"
+               "- モデルがダウンロードされているか確認: `ollama list`\n"
+               "- モデルをダウンロード: `ollama pull {model_name}`")
+        return
+    if isinstance(e, ConnectionError):
+        st.error(f"**接続エラー**: {e}")
+        st.info("💡 **対処方法**:\n"
+               "- Ollamaサービスが起動しているか確認\n"
+               "- ターミナルで `ollama serve` を実行するか、Ollamaアプリを起動\n"
+               "- ファイアウォールがブロックしていないか確認")
+        return
+    # 実行時に出るOllama系エラーを分かりやすく整形
+    msg = str(e)
+    kind = _classify_ollama_error_message(msg)
+    if kind == "connection":
+        st.error("**接続エラー**: Ollamaに接続できませんでした。")
+        st.info("💡 **対処方法**:\n"
+                "- Ollamaが起動しているか確認（アプリ起動 or `ollama serve`）\n"
+                "- 既定ポート(11434)がブロックされていないか確認\n"
+                "- しばらく待って再実行（起動直後はタイムアウトすることがあります）")
+    elif kind == "model_not_found":
+        st.error(f"**モデルエラー**: モデル `{model_name}` が見つからない可能性があります。")
+        st.info("💡 **対処方法**:\n"
+                "- `ollama list` でモデル一覧を確認\n"
+                f"- `ollama pull {model_name}` でモデルを取得\n"
+                "- UIの「使用するモデル」が実際のモデル名と一致しているか確認")
+    else:
+        st.error(f"**予期しないエラーが発生しました**: {e}")
+    with st.expander("詳細なエラー情報"):
+        st.exception(e)  # 詳細なエラー情報を表示
+
+
+def _render_run(snapshot, model_name: str) -> None:
+    """
+    実行の途中経過/結果を描画する。確定したフェーズは PhaseEvent の値、生成中のフェーズは下書きを表示する。
+    """
+    state = snapshot.state or {}
+    last = snapshot.last_event
+
+    if snapshot.status == "queued":
+        st.info("分析の順番を待っています...")
+    elif last is not None and not snapshot.finished:
+        st.caption(
+            f"{_PHASE_LABELS.get(last.phase, last.phase)} 完了"
+            f"（{last.duration_sec:.1f}秒 / 経過 {last.elapsed_sec:.1f}秒）"
+        )
+    elif not snapshot.finished:
+        st.info("分析を開始します...")
+
+    if state.get("halt"):
+        st.warning(state.get("halt_reason") or "処理を終了しました。")
+        return
+
+    if last is not None:
+        slots = _build_result_slots()
+        done_keys = {ev.key for ev in snapshot.events}
+        for key, (slot, render) in slots.items():
+            draft = _format_draft(key, snapshot.drafts.get(key, {}))
+            # 再開した実行では、チェックポイントから復元したフェーズも state に入っている
+            if key in done_keys or state.get(key) is not None or snapshot.finished:
+                with slot.container():
+                    render(state.get(key))
+            elif draft:
+                slot.markdown(draft)
+
+    if snapshot.status == "failed" and snapshot.error is not None:
+        _render_run_error(snapshot.error, model_name)
+    elif snapshot.status == "cancelled":
+        st.warning("分析をキャンセルしました。")
+    elif snapshot.status == "done":
+        if state.get("result_cache_hit"):
+            st.info("同じ記事の分析結果（キャッシュ）を表示しています。再分析する場合はサイドバーで「キャッシュを使わずに分析する」を選んでください。")
+        st.success("分析完了！")
+
+
 # OpenAI用（コメントアウト）
 # api_key = st.sidebar.text_input("OpenAI API Key", type="password")
 # if api_key:
@@ -50,166 +273,65 @@ model_name = st.sidebar.selectbox(
     index=0
 )
 
+if st.sidebar.button("設定を再読み込み"):
+    # config/rss_feeds.txt 等を編集した直後に、キャッシュ済みのエージェントを確実に作り直す
+    invalidate_orchestrators()
+    st.sidebar.success("設定を再読み込みしました")
+
+# 結果キャッシュ（RESULT_CACHE_ENABLED=1）が有効でも、同じ記事をもう一度分析し直したいときに使う
+bypass_cache = st.sidebar.checkbox("キャッシュを使わずに分析する", value=False)
+
 topic = st.text_input("分析したいトピックまたはURLを入力してください")
 
+run_manager = get_run_manager()
+# 実行中/直近の実行は request_id で追跡する（URLにも載せるので、タブを開き直しても結果を表示できる）
+run_id = st.session_state.get("run_id") or st.query_params.get("run")
+
 if st.button("分析開始"):
+    active = run_manager.get(run_id) if run_id else None
     if not topic:
         st.warning("トピックを入力してください。")
+    elif active is not None and not active.finished:
+        # 再クリック/再実行で同じ討論を重ねて走らせない
+        st.info("実行中の分析があります。完了するかキャンセルしてから開始してください。")
     else:
-        st.info("分析を開始します...")
-        
         try:
-            # オーケストレーションの作成（LangGraphではなく専用Agentで進行）
-            orchestrator = OrchestrationAgent(model_name)
-            
-            # 初期状態の設定
-            request_id = str(uuid.uuid4())
-            initial_state = {"topic": topic, "messages": [], "request_id": request_id}
-            logger.info("[%s] UI開始 topic=%s model=%s", request_id, sanitize_url_for_logging(topic), model_name)
-            
-            # 実行
-            with st.spinner("分析中..."):
-                result = orchestrator.invoke(initial_state)
-            
-            st.success("分析完了！")
-
-            if result.get("halt"):
-                st.warning(result.get("halt_reason") or "処理を終了しました。")
-                st.stop()
-            
-            # 結果の表示
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("楽観的視点")
-                optimistic_arg = result.get("optimistic_argument")
-                if optimistic_arg:
-                    if hasattr(optimistic_arg, 'conclusion'):
-                        st.write(f"**結論**: {optimistic_arg.conclusion}")
-                        if optimistic_arg.evidence:
-                            st.write("**証拠**:")
-                            for evidence in optimistic_arg.evidence:
-                                st.write(f"- {evidence}")
-                    else:
-                        st.write(optimistic_arg)
-                else:
-                    st.info("データがありません")
-                
-            with col2:
-                st.subheader("悲観的視点")
-                pessimistic_arg = result.get("pessimistic_argument")
-                if pessimistic_arg:
-                    if hasattr(pessimistic_arg, 'conclusion'):
-                        st.write(f"**結論**: {pessimistic_arg.conclusion}")
-                        if pessimistic_arg.evidence:
-                            st.write("**証拠**:")
-                            for evidence in pessimistic_arg.evidence:
-                                st.write(f"- {evidence}")
-                    else:
-                        st.write(pessimistic_arg)
-                else:
-                    st.info("データがありません")
-            
-            st.subheader("ファクトチェック・批評")
-            critique = result.get("critique")
-            if critique:
-                if hasattr(critique, 'bias_points'):
-                    if critique.bias_points:
-                        st.write("**バイアス指摘**:")
-                        for point in critique.bias_points:
-                            st.write(f"- {point}")
-                    if critique.factual_errors:
-                        st.write("**事実誤り**:")
-                        for error in critique.factual_errors:
-                            st.write(f"- {error}")
-                else:
-                    st.write(critique)
-            else:
-                st.info("データがありません")
-
-            st.subheader("討論（反論）")
-            col3, col4 = st.columns(2)
-
-            with col3:
-                st.markdown("**楽観的アナリストの反論**")
-                optimistic_rebuttal = result.get("optimistic_rebuttal")
-                if optimistic_rebuttal and hasattr(optimistic_rebuttal, "counter_points"):
-                    if optimistic_rebuttal.counter_points:
-                        st.write("**反論ポイント**:")
-                        for p in optimistic_rebuttal.counter_points:
-                            st.write(f"- {p}")
-                    if optimistic_rebuttal.strengthened_evidence:
-                        st.write("**補強証拠**:")
-                        for ev in optimistic_rebuttal.strengthened_evidence:
-                            st.write(f"- {ev}")
-                elif optimistic_rebuttal:
-                    st.write(optimistic_rebuttal)
-                else:
-                    st.info("データがありません")
-
-            with col4:
-                st.markdown("**悲観的アナリストの反論**")
-                pessimistic_rebuttal = result.get("pessimistic_rebuttal")
-                if pessimistic_rebuttal and hasattr(pessimistic_rebuttal, "counter_points"):
-                    if pessimistic_rebuttal.counter_points:
-                        st.write("**反論ポイント**:")
-                        for p in pessimistic_rebuttal.counter_points:
-                            st.write(f"- {p}")
-                    if pessimistic_rebuttal.strengthened_evidence:
-                        st.write("**補強証拠**:")
-                        for ev in pessimistic_rebuttal.strengthened_evidence:
-                            st.write(f"- {ev}")
-                elif pessimistic_rebuttal:
-                    st.write(pessimistic_rebuttal)
-                else:
-                    st.info("データがありません")
-            
-            st.header("最終レポート")
-            final_report = result.get("final_report")
-            if final_report:
-                if hasattr(final_report, 'final_conclusion'):
-                    if getattr(final_report, "article_info", ""):
-                        st.write("**記事情報**:")
-                        st.write(final_report.article_info)
-                    st.write(f"**最終結論**: {final_report.final_conclusion}")
-                    if final_report.critique_points:
-                        st.write("**批評ポイント**:")
-                        for point in final_report.critique_points:
-                            st.write(f"- {point}")
-                else:
-                    st.write(final_report)
-            else:
-                st.info("データがありません")
-            
-        except ValueError as e:
-            st.error(f"**設定エラー**: {e}")
-            st.info("💡 **対処方法**:\n"
-                   "- モデルがダウンロードされているか確認: `ollama list`\n"
-                   "- モデルをダウンロード: `ollama pull {model_name}`")
-        except ConnectionError as e:
-            st.error(f"**接続エラー**: {e}")
-            st.info("💡 **対処方法**:\n"
-                   "- Ollamaサービスが起動しているか確認\n"
-                   "- ターミナルで `ollama serve` を実行するか、Ollamaアプリを起動\n"
-                   "- ファイアウォールがブロックしていないか確認")
+            # オーケストレーションの取得（LangGraphではなく専用Agentで進行）
+            # 再実行/セッションをまたいでモデルごとに使い回す（設定変更を検知したら作り直す）
+            orchestrator = get_orchestrator(model_name, options=_UI_OPTIONS)
         except Exception as e:
-            # 実行時に出るOllama系エラーを分かりやすく整形
-            msg = str(e)
-            kind = _classify_ollama_error_message(msg)
-            if kind == "connection":
-                st.error("**接続エラー**: Ollamaに接続できませんでした。")
-                st.info("💡 **対処方法**:\n"
-                        "- Ollamaが起動しているか確認（アプリ起動 or `ollama serve`）\n"
-                        "- 既定ポート(11434)がブロックされていないか確認\n"
-                        "- しばらく待って再実行（起動直後はタイムアウトすることがあります）")
-            elif kind == "model_not_found":
-                st.error(f"**モデルエラー**: モデル `{model_name}` が見つからない可能性があります。")
-                st.info("💡 **対処方法**:\n"
-                        "- `ollama list` でモデル一覧を確認\n"
-                        f"- `ollama pull {model_name}` でモデルを取得\n"
-                        "- UIの「使用するモデル」が実際のモデル名と一致しているか確認")
-            else:
-                st.error(f"**予期しないエラーが発生しました**: {e}")
-            with st.expander("詳細なエラー情報"):
-                st.exception(e)  # 詳細なエラー情報を表示
+            _render_run_error(e, model_name)
+            st.stop()
+
+        # 初期状態の設定
+        request_id = str(uuid.uuid4())
+        initial_state = {"topic": topic, "messages": [], "request_id": request_id}
+        logger.info("[%s] UI開始 topic=%s model=%s", request_id, sanitize_url_for_logging(topic), model_name)
+
+        # 実行は共有のワーカープールで行う（スクリプトのスレッドを占有しない）
+        run_manager.submit(request_id, orchestrator, initial_state, bypass_cache=bypass_cache)
+        st.session_state["run_id"] = request_id
+        st.session_state["run_model"] = model_name
+        st.query_params["run"] = request_id
+        run_id = request_id
+
+snapshot = run_manager.get(run_id) if run_id else None
+if snapshot is not None:
+    if not snapshot.finished and st.button("キャンセル"):
+        run_manager.cancel(snapshot.request_id)
+        snapshot = run_manager.get(snapshot.request_id) or snapshot
+
+    _render_run(snapshot, st.session_state.get("run_model", model_name))
+
+    if snapshot.status in ("failed", "cancelled"):
+        run_model = st.session_state.get("run_model", model_name)
+        orchestrator = get_orchestrator(run_model, options=_UI_OPTIONS)
+        # チェックポイントが有効なら、完了済みのフェーズを飛ばして続きから実行できる
+        if orchestrator.checkpoint_store is not None and st.button("続きから再開"):
+            snapshot = run_manager.resume(snapshot.request_id, orchestrator)
+            st.rerun()
 
+    if not snapshot.finished:
+        # 次のイベント/トークンが届くまで（最大1秒）待ってから描き直す
+        run_manager.wait_for_update(snapshot.request_id, snapshot.version, timeout=1.0)
+        st.rerun()
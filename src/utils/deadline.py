@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional, Union
+
+# 全体の予算に対する各フェーズの目安の割合（合計 1.0）
+PHASE_BUDGET_SHARES: dict[str, float] = {
+    "research": 0.10,
+    "analysis": 0.30,
+    "fact_check": 0.15,
+    "rebuttal": 0.20,
+    "report": 0.25,
+}
+
+
+class Deadline:
+    """
+    1回の実行の締め切り（time.monotonic 基準）。
+
+    - budget_for("rebuttal", "report") で、そのフェーズ群に割り当てた目安の秒数（全体 × PHASE_BUDGET_SHARES）を返す
+    - allows(秒) で残り時間が足りるかを判定し、足りずに省いた処理は skip(名前) で記録する（skipped で参照）
+
+    Note:
+    - 実行中の LLM 呼び出しを中断はしない。省略できる処理（反論・日本語化・JSONフォールバック等）の前に判定する
+    """
+
+    def __init__(self, seconds: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.total_sec = max(0.0, float(seconds))
+        self._clock = clock
+        self.expires_at = clock() + self.total_sec
+        self._lock = threading.Lock()
+        self._skipped: list[str] = []
+
+    @classmethod
+    def coerce(cls, value: Union["Deadline", float, int, None]) -> Optional["Deadline"]:
+        """秒数なら今から数えた Deadline を作る（None はそのまま、Deadline は使い回す）"""
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(float(value))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def budget_for(self, *phases: str) -> float:
+        return self.total_sec * sum(PHASE_BUDGET_SHARES.get(p, 0.0) for p in phases)
+
+    def allows(self, seconds: float) -> bool:
+        """残り時間が seconds 以上あるか（期限切れなら常に False）"""
+        remaining = self.remaining()
+        return remaining > 0.0 and remaining >= seconds
+
+    def skip(self, step: str) -> None:
+        with self._lock:
+            if step not in self._skipped:
+                self._skipped.append(step)
+
+    @property
+    def skipped(self) -> list[str]:
+        with self._lock:
+            return list(self._skipped)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from src.utils.security import FetchResult, fetch_url_bytes
+
+
+@dataclass
+class _FeedEntry:
+    etag: str
+    last_modified: str
+    body: bytes
+    fetched_at: float
+    # パース済みの記事候補（ディスクから読んだ直後は None。304 時に1回だけパースする）
+    items: list | None = None
+
+
+class FeedCache:
+    """
+    RSS/Atom フィードの条件付きGETキャッシュ（メモリLRU + SQLite）。
+
+    - 本文と ETag / Last-Modified を保存し、再取得時に If-None-Match / If-Modified-Since を送る
+    - 304 のときはダウンロードもパースもせず、保存済みの（パース済み）記事候補を返す
+    - バリデータ（ETag/Last-Modified）を返さないフィードは保存しない（条件付きGETできないため）
+    """
+
+    def __init__(
+        self,
+        path: str | None = ".cache/feed_cache.sqlite3",
+        *,
+        max_memory_entries: int = 200,
+        fetch: Callable[..., FetchResult] = fetch_url_bytes,
+    ) -> None:
+        self.path = path
+        self.max_memory_entries = max(1, int(max_memory_entries))
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, _FeedEntry] = OrderedDict()
+        self._stats = {"not_modified": 0, "downloads": 0, "bytes_downloaded": 0, "parses": 0}
+
+        self._conn: sqlite3.Connection | None = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feed_cache ("
+                " url TEXT PRIMARY KEY,"
+                " etag TEXT NOT NULL,"
+                " last_modified TEXT NOT NULL,"
+                " body BLOB NOT NULL,"
+                " fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def fetch_items(self, feed_url: str, parse: Callable[[bytes, str], list]) -> list:
+        """
+        feed_url を条件付きGETで取得し、parse(body, feed_url) の結果を返す。
+        304 のときは前回のパース結果をそのまま返す。
+        """
+        entry = self._get(feed_url)
+        headers: dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        result = self._fetch(feed_url, purpose="rss", headers=headers or None)
+
+        if result.status_code == 304 and entry is not None:
+            with self._lock:
+                self._stats["not_modified"] += 1
+                if entry.items is None:
+                    entry.items = parse(entry.body, feed_url)
+                    self._stats["parses"] += 1
+                return list(entry.items)
+
+        items = parse(result.content, feed_url)
+        with self._lock:
+            self._stats["downloads"] += 1
+            self._stats["bytes_downloaded"] += len(result.content)
+            self._stats["parses"] += 1
+        if result.etag or result.last_modified:
+            self._put(
+                feed_url,
+                _FeedEntry(
+                    etag=result.etag,
+                    last_modified=result.last_modified,
+                    body=result.content,
+                    fetched_at=time.time(),
+                    items=list(items),
+                ),
+            )
+        return items
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["memory_entries"] = len(self._memory)
+            return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM feed_cache")
+                self._conn.commit()
+
+    def _get(self, feed_url: str) -> _FeedEntry | None:
+        with self._lock:
+            entry = self._memory.get(feed_url)
+            if entry is not None:
+                self._memory.move_to_end(feed_url)
+                return entry
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM feed_cache WHERE url = ?", (feed_url,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = _FeedEntry(etag=row[0], last_modified=row[1], body=bytes(row[2]), fetched_at=row[3])
+            self._remember(feed_url, entry)
+            return entry
+
+    def _put(self, feed_url: str, entry: _FeedEntry) -> None:
+        with self._lock:
+            self._remember(feed_url, entry)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO feed_cache(url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (feed_url, entry.etag, entry.last_modified, entry.body, entry.fetched_at),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.getLogger(__name__).info("フィードキャッシュの保存に失敗: %s", e)
+
+    def _remember(self, feed_url: str, entry: _FeedEntry) -> None:
+        self._memory[feed_url] = entry
+        self._memory.move_to_end(feed_url)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+_shared_cache: FeedCache | None = None
+_shared_lock = threading.Lock()
+
+
+def feed_cache_enabled() -> bool:
+    v = (os.getenv("RSS_CACHE_ENABLED") or "").strip().lower()
+    return v in ("1", "true", "yes", "y", "on")
+
+
+def get_feed_cache() -> FeedCache | None:
+    """
+    プロセス共通の FeedCache を返す（既定は無効。RSS_CACHE_ENABLED=1 で有効化）。
+    - RSS_CACHE_PATH: SQLiteファイル（既定: .cache/feed_cache.sqlite3、空文字でメモリのみ）
+    """
+    global _shared_cache
+    if not feed_cache_enabled():
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            path = os.getenv("RSS_CACHE_PATH")
+            _shared_cache = FeedCache(".cache/feed_cache.sqlite3" if path is None else (path.strip() or None))
+        return _shared_cache
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from src.utils.rss import (
+    BM25Index,
+    FeedFetchLimits,
+    FeedItem,
+    _dedupe_preserve_order,
+    fetch_feed_xml,
+    fetch_feeds_by_url,
+)
+
+
+class FeedIndex:
+    """
+    許可リスト全体の FeedItem を保持する BM25 インデックス（メモリ内、スレッドセーフ）。
+
+    - フィード単位で差し替える（ポーリングで取得できたフィードだけ更新し、失敗したフィードは前回分を残す）
+    - 前回と同じ記事一覧のフィード（条件付きGETの 304 など）は索引し直さない
+    - 同点時の並びはフィード順 → フィード内の順（ネットワーク経由で rank_items_by_query した場合と同じ）
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._bm25 = BM25Index()
+        self._feed_order: dict[str, int] = {}
+        # feed_url -> [doc_id]
+        self._docs_by_feed: dict[str, list[int]] = {}
+        # feed_url -> 索引済みの記事一覧（変わっていなければ replace_feed で索引し直さない）
+        self._items_by_feed: dict[str, tuple[FeedItem, ...]] = {}
+        self.updated_at: float | None = None
+
+    def set_feed_order(self, feed_urls: list[str]) -> None:
+        """search 結果の同点時の並びを、許可リストの順（ネットワーク取得時と同じ）に揃える。"""
+        with self._lock:
+            self._feed_order = {u: i for i, u in enumerate(feed_urls)}
+            for feed_url, doc_ids in self._docs_by_feed.items():
+                pos = self._feed_order.setdefault(feed_url, len(self._feed_order))
+                for j, doc_id in enumerate(doc_ids):
+                    self._bm25.set_order(doc_id, (pos, j))
+
+    def replace_feed(self, feed_url: str, items: list[FeedItem]) -> None:
+        items = tuple(items)
+        with self._lock:
+            if self._items_by_feed.get(feed_url) != items:
+                self._remove_feed(feed_url)
+                # 未登録のフィードは追加順に並べる
+                pos = self._feed_order.setdefault(feed_url, len(self._feed_order))
+                self._docs_by_feed[feed_url] = [self._bm25.add(it, order_key=(pos, j)) for j, it in enumerate(items)]
+                self._items_by_feed[feed_url] = items
+            self.updated_at = time.time()
+
+    def remove_feed(self, feed_url: str) -> None:
+        with self._lock:
+            self._remove_feed(feed_url)
+
+    def _remove_feed(self, feed_url: str) -> None:
+        self._items_by_feed.pop(feed_url, None)
+        for doc_id in self._docs_by_feed.pop(feed_url, []):
+            self._bm25.remove(doc_id)
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return len(self._bm25)
+
+    @property
+    def feeds(self) -> list[str]:
+        with self._lock:
+            return list(self._docs_by_feed)
+
+    def search(self, query: str, limit: int = 5) -> list[FeedItem]:
+        with self._lock:
+            return self._bm25.search(query, limit=limit)
+
+    def search_feeds(self, by_feed: dict[str, list[FeedItem]], query: str, limit: int = 5) -> list[FeedItem]:
+        """
+        インデックスを by_feed（今回取得できたフィード）と同じ内容に揃えてから検索する。
+        by_feed に無いフィードは削除するので、取得に失敗したフィードの古い記事は候補にしない。
+        """
+        with self._lock:
+            for feed_url in set(self._docs_by_feed) - set(by_feed):
+                self._remove_feed(feed_url)
+            for feed_url, items in by_feed.items():
+                self.replace_feed(feed_url, items)
+            return self._bm25.search(query, limit=limit)
+
+
+class FeedPoller:
+    """
+    許可リストのフィードを定期取得して FeedIndex を最新に保つバックグラウンドスレッド。
+
+    - 取得は fetch_feeds_by_url（並行取得・ホスト別上限・締め切り）を使う
+    - ready は「1回以上ポーリングが完了し、最終更新が古すぎない」こと
+    """
+
+    def __init__(
+        self,
+        feed_urls: list[str],
+        *,
+        index: FeedIndex | None = None,
+        interval_sec: float = 300.0,
+        fetch_xml: Callable[..., str] = fetch_feed_xml,
+        limits: FeedFetchLimits | None = None,
+    ) -> None:
+        self.feed_urls = _dedupe_preserve_order(list(feed_urls))
+        self.index = index or FeedIndex()
+        self.index.set_feed_order(self.feed_urls)
+        self.interval_sec = max(1.0, float(interval_sec))
+        self.fetch_xml = fetch_xml
+        self.limits = limits
+        self.last_poll_at: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def poll_once(self) -> int:
+        """全フィードを1回取得してインデックスを更新し、更新できたフィード数を返す。"""
+        by_feed = fetch_feeds_by_url(self.feed_urls, fetch_xml=self.fetch_xml, limits=self.limits)
+        for feed_url, items in by_feed.items():
+            self.index.replace_feed(feed_url, items)
+        # 許可リストから外れたフィードは削除する
+        for feed_url in set(self.index.feeds) - set(self.feed_urls):
+            self.index.remove_feed(feed_url)
+        self.last_poll_at = time.time()
+        logging.getLogger(__name__).info(
+            "RSSインデックス更新: %s/%s フィード, %s 件", len(by_feed), len(self.feed_urls), self.index.size
+        )
+        return len(by_feed)
+
+    @property
+    def ready(self) -> bool:
+        if self.last_poll_at is None:
+            return False
+        # ポーリングが止まっている（3周期以上更新なし）なら古い結果は使わない
+        return (time.time() - self.last_poll_at) <= self.interval_sec * 3
+
+    def start(self) -> "FeedPoller":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-feed-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logging.getLogger(__name__).warning("RSSポーリング失敗: %s", e)
+            self._stop.wait(self.interval_sec)
+
+
+def background_poll_enabled() -> bool:
+    return (os.getenv("RSS_BACKGROUND_POLL") or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+_pollers: dict[tuple[str, ...], FeedPoller] = {}
+_pollers_lock = threading.Lock()
+_indexes: OrderedDict[tuple[str, ...], FeedIndex] = OrderedDict()
+# get_feed_index で保持する許可リストの数（超えたら最後に使ってから最も古いものを捨てる）
+_MAX_FEED_INDEXES = 4
+
+
+def get_feed_poller(feed_urls: list[str]) -> FeedPoller | None:
+    """
+    RSS_BACKGROUND_POLL=1 のとき、許可リストごとのプロセス共通ポーラーを（必要なら起動して）返す。
+    無効時は None。周期は RSS_POLL_INTERVAL_SEC（既定: 300秒）。
+    """
+    if not background_poll_enabled():
+        return None
+    key = tuple(_dedupe_preserve_order(list(feed_urls)))
+    if not key:
+        return None
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None:
+            try:
+                interval = float((os.getenv("RSS_POLL_INTERVAL_SEC") or "300").strip())
+            except Exception:
+                interval = 300.0
+            poller = FeedPoller(list(key), interval_sec=interval).start()
+            _pollers[key] = poller
+        return poller
+
+
+def get_feed_index(feed_urls: list[str]) -> FeedIndex:
+    """
+    許可リストごとのプロセス共通 FeedIndex（ポーラーを使わない、ネットワーク経由の検索用）。
+    取得したフィードを search_feeds で反映して検索すれば、前回から変わっていないフィードは索引し直さない。
+    保持するのは最近使った _MAX_FEED_INDEXES 個の許可リストまで。
+    """
+    key = tuple(_dedupe_preserve_order(list(feed_urls)))
+    with _pollers_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = FeedIndex()
+            index.set_feed_order(list(key))
+            while len(_indexes) > _MAX_FEED_INDEXES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
+
+
+def clear_feed_indexes() -> None:
+    """get_feed_index のインデックスをすべて破棄する（テスト用）。"""
+    with _pollers_lock:
+        _indexes.clear()
+
+
+def stop_feed_pollers() -> None:
+    """起動済みのポーラーをすべて停止する（テスト/終了処理用）。"""
+    with _pollers_lock:
+        pollers = list(_pollers.values())
+        _pollers.clear()
+    for p in pollers:
+        p.stop(timeout=1.0)
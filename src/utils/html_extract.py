@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import copy
+import re
+import unicodedata
+from typing import Iterator
+
+import lxml.html
+from lxml import etree
+
+
+# 記事HTMLから本文と [source]/[title] ヘッダを抽出する。
+# - 生HTMLは lxml で1回だけパースし、readability（コピーを渡す）/本文抽出/生HTMLでの再抽出で同じ木を使い回す
+# - テキストの区切り（get_text 相当）や要素の削除は BeautifulSoup(..., "lxml") と同じ結果になるようにしている
+
+
+_REMOVE_TAGS = ("script", "style", "nav", "footer", "header", "aside", "noscript", "svg")
+
+# --- 対策(a): 人間が見えないDOM（hidden/aria-hidden/CSSで不可視）を除去 ---
+_INVISIBLE_STYLE_PAT = re.compile(
+    r"(display\s*:\s*none|visibility\s*:\s*hidden|opacity\s*:\s*0\b|font-size\s*:\s*0\b|text-indent\s*:\s*-9\d{2,}px)",
+    re.IGNORECASE,
+)
+# よくある視覚非表示クラス（スクリーンリーダー向け等）
+_HIDDEN_CLASSES = ("sr-only", "visually-hidden", "sr_hidden", "u-hidden")
+
+# 本文っぽいコンテナ候補（CSSセレクタ相当: tag / [attr='v'] / #id / .class）
+_CONTAINER_SELECTORS: list[tuple[str | None, str | None, str | None]] = [
+    ("article", None, None),
+    ("main", None, None),
+    ("div", "role", "main"),
+    (None, "itemprop", "articleBody"),
+    (None, "id", "content"),
+    (None, "class", "content"),
+    (None, "class", "article"),
+    (None, "class", "post"),
+    (None, "class", "entry-content"),
+    (None, "class", "post-content"),
+    (None, "class", "article-body"),
+    (None, "class", "story-body"),
+    (None, "class", "main-content"),
+]
+
+_NOISE_TOKENS = [
+    "ログイン",
+    "会員登録",
+    "メニュー",
+    "ホーム",
+    "プライバシー",
+    "利用規約",
+    "Cookie",
+    "©",
+    "All rights reserved",
+    "シェア",
+    "フォロー",
+    "人気記事",
+    "関連記事",
+    "次の記事",
+    "前の記事",
+]
+
+# BeautifulSoup が本文以外の文字列（RubyTextString/Script 等）として扱うタグ
+_NON_CONTENT_STRING_TAGS = frozenset({"rt", "rp", "template", "script", "style"})
+
+# _decompose で残す目印コメントの中身
+_DECOMPOSED_MARKER = "decomposed"
+
+# readability と同じパーサ設定（同じ木を渡せるようにする）
+_UTF8_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def extract_article_text(raw_html: str, safe_url: str, include_header: bool = True) -> str:
+    """
+    取得済みHTMLから本文（と任意で [source]/[title] ヘッダ）を抽出する。
+
+    Raises:
+        ValueError: 本文が短すぎる場合
+    """
+    raw_root = parse_html(raw_html)
+
+    # 可能なら readability で本文抽出（別記事一覧/ナビ混入を抑える）
+    extracted_root = None
+    extracted_title = ""
+    try:
+        # readability は渡した木を書き換えるのでコピーを渡す（再パースよりずっと安い）
+        doc = _readability_document(copy.deepcopy(raw_root))
+        extracted_html = doc.summary(html_partial=True)
+        extracted_title = (doc.short_title() or "").strip()
+        if extracted_html:
+            extracted_root = parse_html(extracted_html)
+    except Exception:
+        extracted_root = None
+        extracted_title = ""
+
+    # readability が短すぎる/空の場合は、生HTMLにフォールバック（サイトによっては本文が落ちる）
+    if extracted_root is not None and len(get_text(extracted_root, " ")) < 200:
+        extracted_root = None
+
+    soup = extracted_root if extracted_root is not None else raw_root
+    text = _extract_body_text(soup)
+
+    # readability利用時に短文になりやすいサイト向け: 生HTMLで再抽出を試す（パース済みの木を使う）
+    if extracted_root is not None and len(text) < 200:
+        try:
+            text2 = _extract_body_text(raw_root, prefer_picked=True)
+            if len(text2) > len(text):
+                soup = raw_root
+                text = text2
+        except Exception:
+            pass
+
+    text = _filter_lines(text)
+    text = normalize_extracted_text(text)
+
+    if len(text) < 120:
+        raise ValueError("記事テキストが短すぎます。正しいURLか確認してください。")
+
+    if include_header:
+        title = _clean_title(extracted_title) if extracted_title else _extract_title(soup)
+        header_parts = [f"[source] {safe_url}"]
+        if title:
+            header_parts.append(f"[title] {title}")
+        header = "\n".join(header_parts).strip()
+        return header + "\n\n" + text
+
+    return text
+
+
+def _readability_document(root):
+    from readability import Document  # readability-lxml
+
+    class _CleanOnceDocument(Document):
+        """
+        summary()/short_title() は呼ぶたびに入力を clean_html し直す（大きなページでは支配的なコスト）。
+        入力の木は同じなので、最初の結果を保持してコピーを返す（結果は同一）。
+        """
+
+        _cleaned = None
+
+        def _parse(self, input):
+            if self._cleaned is None:
+                self._cleaned = super()._parse(input)
+            return copy.deepcopy(self._cleaned)
+
+    return _CleanOnceDocument(root)
+
+
+def parse_html(html: str):
+    """HTML文字列を lxml でパースしてルート要素を返す（空文書は空の <html> として扱う）。"""
+    try:
+        return lxml.html.document_fromstring((html or "").encode("utf-8", "replace"), parser=_UTF8_PARSER)
+    except (etree.ParserError, ValueError):
+        return lxml.html.document_fromstring(b"<html></html>", parser=_UTF8_PARSER)
+
+
+def get_text(el, separator: str = "") -> str:
+    """
+    BeautifulSoup の get_text(separator=..., strip=True) 相当。
+    ルビ（rt/rp）・template・script/style 内の文字列は本文扱いしない（BeautifulSoup と同じ）。
+    """
+    if any(a.tag in _NON_CONTENT_STRING_TAGS for a in el.iterancestors()):
+        return ""
+    out = []
+    for s in _iter_content_strings(el):
+        s = s.strip()
+        if s:
+            out.append(s)
+    return separator.join(out)
+
+
+def _iter_content_strings(el) -> Iterator[str]:
+    if el.text and _is_element(el):
+        yield el.text
+    for child in el:
+        if _is_element(child) and child.tag not in _NON_CONTENT_STRING_TAGS:
+            yield from _iter_content_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _decompose(el) -> None:
+    """
+    要素を子孫ごと取り除く（BeautifulSoup の decompose 相当）。
+    後ろのテキストは前のテキストと連結させないよう、目印のコメントに持たせて残す。
+    """
+    parent = el.getparent()
+    if parent is None:
+        return
+    marker = etree.Comment(_DECOMPOSED_MARKER)
+    marker.tail = el.tail
+    parent.replace(el, marker)
+
+
+def _is_element(el) -> bool:
+    return isinstance(el.tag, str)
+
+
+def _has_class(el, cls: str) -> bool:
+    return cls in (el.get("class") or "").split()
+
+
+def _remove_noise_elements(root) -> None:
+    # まず不要要素を削除（ノイズ混入を減らす）
+    for el in list(root.iterdescendants(*_REMOVE_TAGS)):
+        _decompose(el)
+    drop_hidden_elements(root)
+
+
+def drop_hidden_elements(root) -> None:
+    # 明示属性
+    for el in [e for e in root.iter() if _is_element(e) and (e.get("hidden") is not None or e.get("aria-hidden") == "true")]:
+        _decompose(el)
+
+    # よくある視覚非表示クラス（スクリーンリーダー向け等）
+    for cls in _HIDDEN_CLASSES:
+        for el in [e for e in root.iter() if _is_element(e) and _has_class(e, cls)]:
+            _decompose(el)
+
+    # style属性（最小限の判定に留める）
+    for el in [e for e in root.iter() if _is_element(e) and e.get("style") is not None]:
+        st = el.get("style") or ""
+        if st and _INVISIBLE_STYLE_PAT.search(st):
+            _decompose(el)
+
+
+def extract_from(container) -> str:
+    # 段落中心に拾う（body全文のメニュー等を避ける）
+    parts = []
+    # li は「関連記事/一覧」を拾いやすいので除外（本文混入対策）
+    for el in container.iterdescendants("h1", "h2", "h3", "p"):
+        t = get_text(el, " ")
+        if not t:
+            continue
+        # 短すぎる断片は捨てる（シェア/ボタン等が混じりやすい）
+        if len(t) < 5:
+            continue
+        parts.append(t)
+    return "\n".join(parts)
+
+
+def select_best_container(root) -> str:
+    """
+    article/mainが無い or 本文が落ちるサイト向けの追加ヒューリスティック。
+    いくつかの「本文っぽい」コンテナ候補から、段落テキスト量が最大のものを採用する。
+    """
+    # 1回の走査で各セレクタの一致（文書順・先頭10件まで）を集める
+    matches: list[list] = [[] for _ in _CONTAINER_SELECTORS]
+    for el in root.iter():
+        if not _is_element(el):
+            continue
+        for i, (tag, attr, value) in enumerate(_CONTAINER_SELECTORS):
+            if len(matches[i]) >= 10:
+                continue
+            if tag is not None and el.tag != tag:
+                continue
+            if attr == "class":
+                if not _has_class(el, value):
+                    continue
+            elif attr is not None and el.get(attr) != value:
+                continue
+            matches[i].append(el)
+
+    # 重複除去（同じ要素が複数のセレクタに一致する場合）
+    uniq = []
+    seen = set()
+    for group in matches:
+        for el in group:
+            if el in seen:
+                continue
+            seen.add(el)
+            uniq.append(el)
+
+    best_text = ""
+    best_len = 0
+    for el in uniq[:50]:
+        t = extract_from(el)
+        # 極端に短いコンテナは無視
+        tl = len(t or "")
+        if tl > best_len:
+            best_len = tl
+            best_text = t
+    return best_text
+
+
+def _extract_body_text(root, *, prefer_picked: bool = False) -> str:
+    """
+    不要/不可視要素を除いたうえで、article → main → 本文っぽいコンテナ → body の順に本文を探す。
+    （root は書き換わる）
+    """
+    _remove_noise_elements(root)
+
+    # - サイトによっては <article> が「見出しのみ」で本文が別DOMにあるケースがあるため
+    #   短すぎる場合は別の抽出方法へフォールバックする
+    text = ""
+
+    # 1) article
+    article = _find(root, "article")
+    if article is not None:
+        text = extract_from(article) or get_text(article, "\n")
+
+    # 2) main
+    if len(text) < 200:
+        main = _find(root, "main")
+        if main is not None:
+            text = extract_from(main) or get_text(main, "\n")
+
+    # 2.5) 本文っぽいコンテナの最大選択（サイト別DOM差異の吸収）
+    #   生HTMLでの再抽出時は、見つかればそちらを優先する
+    if len(text) < 200:
+        picked = select_best_container(root)
+        if picked and (prefer_picked or len(picked) > len(text)):
+            text = picked
+
+    # 3) body全体（最終フォールバック）
+    if len(text) < 200:
+        body = _find(root, "body")
+        if body is None:
+            body = root
+        text = extract_from(body) or get_text(body, "\n")
+
+    return text
+
+
+def _find(root, tag: str):
+    """文書（ルート要素を含む）から最初の tag 要素を返す。"""
+    return next(root.iter(tag), None)
+
+
+def _filter_lines(text: str) -> str:
+    # テキストを整形（空行を削除、長すぎる行を分割）
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+    # ナビ/フッタっぽい短文を軽く除外（最終フォールバック由来の混入対策）
+    filtered_lines = []
+    for ln in lines:
+        if len(ln) <= 3:
+            continue
+        if any(tok in ln for tok in _NOISE_TOKENS) and len(ln) <= 40:
+            continue
+        # URLっぽい行は除外
+        if "http://" in ln or "https://" in ln:
+            continue
+        filtered_lines.append(ln)
+    # 重複行を除去（ナビ/パンくず等の反復ノイズを軽減）
+    deduped = []
+    seen = set()
+    for line in filtered_lines:
+        if line in seen:
+            continue
+        seen.add(line)
+        deduped.append(line)
+    return "\n".join(deduped)
+
+
+# --- 対策(b): 0幅文字/方向制御/制御文字を除去して正規化（不可視テキスト混入対策） ---
+# 例: ZWSP(200B) / ZWNJ(200C) / ZWJ(200D) / BOM(FEFF) / bidi制御(202A-202E,2066-2069)
+def normalize_extracted_text(s: str) -> str:
+    t = "" if s is None else str(s)
+    # 互換正規化（全角/半角などを揃える）
+    t = unicodedata.normalize("NFKC", t)
+    # 不可視・方向制御
+    t = re.sub(r"[\u200b\u200c\u200d\ufeff\u202a-\u202e\u2066-\u2069]", "", t)
+    # 改行/タブ以外の制御文字を除去
+    t = "".join(ch for ch in t if (ch == "\n" or ch == "\t" or ch >= " "))
+    # 空白を軽く正規化
+    t = re.sub(r"[ \t]+", " ", t)
+    t = re.sub(r"\n{3,}", "\n\n", t)
+    return t.strip()
+
+
+# タイトル抽出（後段のレポートで利用）
+def _clean_title(t: str) -> str:
+    s = (t or "").strip()
+    s = " ".join(s.split())
+    if not s:
+        return ""
+    # サイト名サフィックスを落としやすい区切りを試す（長さが極端に短くなる場合は採用しない）
+    seps = [" | ", " - ", "｜", "–", "—", "：", ":"]
+    best = s
+    for sep in seps:
+        if sep in s:
+            head = s.split(sep, 1)[0].strip()
+            if 8 <= len(head) <= len(best):
+                best = head
+    return best.strip()
+
+
+def _extract_title(root) -> str:
+    # 1) og:title / twitter:title / meta name=title
+    for attr, value in [("property", "og:title"), ("name", "twitter:title"), ("name", "title")]:
+        tag = next((m for m in root.iter("meta") if m.get(attr) == value), None)
+        if tag is not None and tag.get("content"):
+            t = str(tag.get("content")).strip()
+            if t:
+                return _clean_title(t)
+
+    # 2) h1（article→main→body優先）
+    containers = [_find(root, "article"), _find(root, "main"), _find(root, "body")]
+    for container in containers:
+        if container is None:
+            continue
+        h1 = next(container.iterdescendants("h1"), None)
+        if h1 is not None:
+            t = get_text(h1, " ")
+            if t:
+                return _clean_title(t)
+    h1 = _find(root, "h1")
+    if h1 is not None:
+        t = get_text(h1, " ")
+        if t:
+            return _clean_title(t)
+
+    # 3) <title>
+    title = _find(root, "title")
+    if title is not None:
+        t = (_single_string(title) or "").strip()
+        if t:
+            return _clean_title(t)
+
+    return ""
+
+
+def _single_string(el) -> str | None:
+    """BeautifulSoup の Tag.string 相当（子が文字列1つ、または子要素1つの場合のみ値を返す）。"""
+    nodes: list = []
+    if el.text:
+        nodes.append(el.text)
+    for child in el:
+        if not _is_element(child) and child.text == _DECOMPOSED_MARKER:
+            if child.tail:
+                nodes.append(child.tail)
+            continue
+        nodes.append(child)
+        if child.tail:
+            nodes.append(child.tail)
+    if len(nodes) != 1:
+        return None
+    node = nodes[0]
+    if isinstance(node, str):
+        return node
+    if not _is_element(node):
+        return node.text
+    return _single_string(node)
+
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Callable, Iterable, Optional, Union
+
+from langchain_core.language_models import BaseChatModel
+from pydantic import BaseModel
+
+from src.utils.structured_output import constrained_model, constrained_strategy, parse_and_record, structured_chain
+
+# JSON内の位置。オブジェクトのキー（str）と配列の添字（int）の並び
+JsonPath = tuple[Union[str, int], ...]
+# (位置, 追加された文字列) を受け取るコールバック
+DeltaCallback = Callable[[JsonPath, str], None]
+
+_WS = " \t\r\n"
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonStreamError(ValueError):
+    """ストリーミング中のJSONが不正、または途中で終わった"""
+
+
+class _Frame:
+    __slots__ = ("container", "key")
+
+    def __init__(self, container: Union[dict, list]) -> None:
+        self.container = container
+        # オブジェクト: 直近に読んだキー / 配列: 次に入る要素の添字
+        self.key: Union[str, int, None] = None if isinstance(container, dict) else 0
+
+
+class IncrementalJsonParser:
+    """
+    チャンク単位で届くJSONテキストを逐次パースする。
+
+    - feed() は、そのチャンクで値の文字列に追加された部分を (位置, 差分) のリストで返す
+      （キーの文字列は返さない。同じ位置の差分はチャンクごとに1つにまとめる）
+    - value は途中までの値（閉じていない文字列/配列/オブジェクトも、その時点の中身で入っている）
+    - 最初の "{" / "[" より前（```json などのコードフェンス）と、ルートの値が閉じた後の文字は無視する
+    """
+
+    def __init__(self) -> None:
+        self._stack: list[_Frame] = []
+        self._root: Any = None
+        self._started = False
+        self._done = False
+        # "value" / "key_or_end" / "key" / "colon" / "after_value" / "string" / "literal"
+        self._mode = "value"
+        self._string_is_key = False
+        self._buf: list[str] = []
+        self._escape: Optional[str] = None  # None / "\\" / "u" + 集めた16進数
+        self._high_surrogate: Optional[int] = None
+        self._literal: list[str] = []
+        self._pending: dict[JsonPath, list[str]] = {}
+
+    @property
+    def value(self) -> Any:
+        return self._root
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> list[tuple[JsonPath, str]]:
+        for ch in chunk or "":
+            if self._done:
+                break
+            if not self._started:
+                if ch in "{[":
+                    self._started = True
+                else:
+                    continue
+            self._step(ch)
+        if self._mode == "string" and not self._string_is_key:
+            self._sync_string()
+        return self._flush()
+
+    def close(self) -> Any:
+        """入力の終わり。ルートの値が閉じていなければ JsonStreamError。"""
+        if self._mode == "literal" and not self._stack:
+            self._end_literal()
+        if not self._done:
+            raise JsonStreamError("JSONが途中で終わっています")
+        return self._root
+
+    # ---- 内部処理 ----
+
+    def _path(self) -> JsonPath:
+        return tuple(f.key for f in self._stack)
+
+    def _flush(self) -> list[tuple[JsonPath, str]]:
+        out = [(path, "".join(parts)) for path, parts in self._pending.items() if parts]
+        self._pending = {}
+        return out
+
+    def _step(self, ch: str) -> None:
+        mode = self._mode
+        if mode == "string":
+            self._string_char(ch)
+            return
+        if mode == "literal":
+            if ch in _WS or ch in ",}]":
+                self._end_literal()
+                self._step(ch)
+            else:
+                self._literal.append(ch)
+            return
+        if ch in _WS:
+            return
+        if mode == "value":
+            self._begin_value(ch)
+        elif mode in ("key_or_end", "key"):
+            if ch == '"':
+                self._begin_string(is_key=True)
+            elif ch == "}" and mode == "key_or_end":
+                self._close_container(dict)
+            else:
+                raise JsonStreamError(f"オブジェクトのキーが必要な位置に {ch!r} があります")
+        elif mode == "colon":
+            if ch != ":":
+                raise JsonStreamError(f"':' が必要な位置に {ch!r} があります")
+            self._mode = "value"
+        elif mode == "after_value":
+            frame = self._stack[-1]
+            if ch == ",":
+                self._mode = "key" if isinstance(frame.container, dict) else "value"
+            elif ch == "}":
+                self._close_container(dict)
+            elif ch == "]":
+                self._close_container(list)
+            else:
+                raise JsonStreamError(f"',' か閉じ括弧が必要な位置に {ch!r} があります")
+
+    def _begin_value(self, ch: str) -> None:
+        if ch == "{":
+            self._push(_Frame({}))
+            self._mode = "key_or_end"
+        elif ch == "[":
+            self._push(_Frame([]))
+            self._mode = "value"
+        elif ch == "]" and self._stack and isinstance(self._stack[-1].container, list) and not self._stack[-1].container:
+            # 空配列 "[]"
+            self._close_container(list)
+        elif ch == '"':
+            self._begin_string(is_key=False)
+        elif ch in "-0123456789tfn":
+            self._literal = [ch]
+            self._mode = "literal"
+        else:
+            raise JsonStreamError(f"値が必要な位置に {ch!r} があります")
+
+    def _push(self, frame: _Frame) -> None:
+        self._assign(frame.container)
+        self._stack.append(frame)
+
+    def _assign(self, value: Any) -> None:
+        """現在の位置に値を置く（ルートなら root）。"""
+        if not self._stack:
+            self._root = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+
+    def _value_done(self) -> None:
+        if not self._stack:
+            self._done = True
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, list):
+            frame.key = len(frame.container)
+        self._mode = "after_value"
+
+    def _close_container(self, kind: type) -> None:
+        frame = self._stack[-1]
+        if not isinstance(frame.container, kind):
+            raise JsonStreamError("括弧の対応が取れていません")
+        self._stack.pop()
+        self._value_done()
+
+    def _begin_string(self, *, is_key: bool) -> None:
+        self._string_is_key = is_key
+        self._buf = []
+        self._escape = None
+        self._high_surrogate = None
+        self._mode = "string"
+        if not is_key:
+            self._assign("")
+
+    def _string_char(self, ch: str) -> None:
+        esc = self._escape
+        if esc is None:
+            if ch == "\\":
+                self._escape = "\\"
+            elif ch == '"':
+                self._end_string()
+            else:
+                self._emit(ch)
+        elif esc == "\\":
+            if ch == "u":
+                self._escape = "u"
+            elif ch in _ESCAPES:
+                self._escape = None
+                self._emit(_ESCAPES[ch])
+            else:
+                raise JsonStreamError(f"不正なエスケープ: \\{ch}")
+        else:
+            esc += ch
+            if len(esc) < 5:
+                self._escape = esc
+                return
+            self._escape = None
+            try:
+                code = int(esc[1:], 16)
+            except ValueError:
+                raise JsonStreamError(f"不正なエスケープ: \\{esc}") from None
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            self._emit(chr(code))
+
+    def _emit(self, text: str) -> None:
+        self._buf.append(text)
+        if not self._string_is_key:
+            self._pending.setdefault(self._path(), []).append(text)
+
+    def _sync_string(self) -> None:
+        """読みかけの文字列値を value に反映する（文字ごとではなくチャンクごとに行う）"""
+        frame = self._stack[-1]
+        frame.container[frame.key] = "".join(self._buf)
+
+    def _end_string(self) -> None:
+        text = "".join(self._buf)
+        self._buf = []
+        if self._string_is_key:
+            self._stack[-1].key = text
+            self._mode = "colon"
+            return
+        frame = self._stack[-1]
+        frame.container[frame.key] = text
+        self._value_done()
+
+    def _end_literal(self) -> None:
+        token = "".join(self._literal)
+        self._literal = []
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError:
+            raise JsonStreamError(f"不正な値: {token!r}") from None
+        self._assign(value)
+        self._value_done()
+
+
+def _chunk_text(chunk: Any) -> str:
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else str(part.get("text", "")) for part in content)
+    return str(content)
+
+
+def _iter_strings(value: Any, path: JsonPath = ()) -> Iterable[tuple[JsonPath, str]]:
+    if isinstance(value, str):
+        yield path, value
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            yield from _iter_strings(v, path + (k,))
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            yield from _iter_strings(v, path + (i,))
+
+
+def _emit_all(result: BaseModel, on_delta: DeltaCallback) -> None:
+    for path, text in _iter_strings(result.model_dump()):
+        if text:
+            on_delta(path, text)
+
+
+class _StreamCollector:
+    """
+    届いたチャンクを貯めつつ、IncrementalJsonParser で文字列値の差分を on_delta に渡す。
+    途中で JSON として読めなくなったら差分の通知だけやめる（最後に全文を parse_structured で検証/修復する）。
+    """
+
+    def __init__(self, on_delta: DeltaCallback) -> None:
+        self.on_delta = on_delta
+        self.parser: Optional[IncrementalJsonParser] = IncrementalJsonParser()
+        self.parts: list[str] = []
+
+    def add(self, chunk: Any) -> None:
+        text = _chunk_text(chunk)
+        self.parts.append(text)
+        if self.parser is None:
+            return
+        try:
+            deltas = self.parser.feed(text)
+        except JsonStreamError as e:
+            logging.getLogger(__name__).info("ストリーミング中のJSONを逐次パースできませんでした: %s", e)
+            self.parser = None
+            return
+        for path, delta in deltas:
+            self.on_delta(path, delta)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _uses_response_cache(model: BaseChatModel) -> bool:
+    # stream() は LangChain の応答キャッシュを参照/保存しないため、キャッシュ有効時は通常の invoke を使う
+    return getattr(model, "cache", None) not in (None, False)
+
+
+def stream_structured(
+    model: BaseChatModel,
+    prompt,
+    inputs: dict,
+    schema: type[BaseModel],
+    on_delta: DeltaCallback,
+    config: Optional[dict] = None,
+) -> BaseModel:
+    """
+    prompt | model を stream() し、JSONの文字列値が伸びるたびに on_delta(位置, 差分) を呼ぶ。
+    最後に全文を parse_structured で検証/修復して返し（structured_chain と同じ）、成否を ModelCapabilities に記録する。
+    config は LangChain の RunnableConfig（コールバック等）としてそのまま渡す。
+
+    Raises:
+        StructuredOutputError: 応答が schema に合う値にならなかった
+    """
+    if _uses_response_cache(model):
+        result = structured_chain(prompt, model, schema).invoke(inputs, config=config)
+        _emit_all(result, on_delta)
+        return result
+
+    strategy = constrained_strategy(model)
+    collector = _StreamCollector(on_delta)
+    for chunk in (prompt | constrained_model(model, schema, strategy)).stream(inputs, config=config):
+        collector.add(chunk)
+    return parse_and_record(collector.text, schema, model, strategy)
+
+
+async def astream_structured(
+    model: BaseChatModel,
+    prompt,
+    inputs: dict,
+    schema: type[BaseModel],
+    on_delta: DeltaCallback,
+    config: Optional[dict] = None,
+) -> BaseModel:
+    """stream_structured の asyncio 版（astream を使用）"""
+    if _uses_response_cache(model):
+        result = await structured_chain(prompt, model, schema).ainvoke(inputs, config=config)
+        _emit_all(result, on_delta)
+        return result
+
+    strategy = constrained_strategy(model)
+    collector = _StreamCollector(on_delta)
+    async for chunk in (prompt | constrained_model(model, schema, strategy)).astream(inputs, config=config):
+        collector.add(chunk)
+    return parse_and_record(collector.text, schema, model, strategy)
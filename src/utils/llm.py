@@ -3,11 +3,17 @@
 # from langchain_openai import ChatOpenAI
 
 # Ollama用
+from langchain_core.caches import BaseCache
 from langchain_ollama import ChatOllama
 import requests
 import json
 
-def _fetch_ollama_tags(base_url: str = "http://localhost:11434") -> dict:
+from src.utils.llm_cache import get_llm_cache, llm_cache_enabled
+from src.utils.llm_limiter import chat_ollama_class
+
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+
+def _fetch_ollama_tags(base_url: str = DEFAULT_OLLAMA_BASE_URL, timeout: float = 5) -> dict:
     """
     Ollamaの /api/tags を取得する（モデル一覧取得）。
 
@@ -16,7 +22,7 @@ def _fetch_ollama_tags(base_url: str = "http://localhost:11434") -> dict:
         ValueError: JSONとして解釈できない
     """
     try:
-        response = requests.get(f"{base_url}/api/tags", timeout=5)
+        response = requests.get(f"{base_url}/api/tags", timeout=timeout)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         raise ConnectionError(
@@ -30,7 +36,7 @@ def _fetch_ollama_tags(base_url: str = "http://localhost:11434") -> dict:
     except json.JSONDecodeError as e:
         raise ValueError(f"Ollama APIの応答がJSONではありません: {e}")
 
-def check_ollama_connection(base_url: str = "http://localhost:11434") -> bool:
+def check_ollama_connection(base_url: str = DEFAULT_OLLAMA_BASE_URL) -> bool:
     """
     Ollamaサービスへの接続を確認する
     
@@ -48,37 +54,67 @@ def check_ollama_connection(base_url: str = "http://localhost:11434") -> bool:
 
 def get_llm(
     model_name: str = "gemma3:4b",
-    base_url: str = "http://localhost:11434",
+    base_url: str | None = None,
     temperature: float = 0.7,
     num_predict: int | None = None,
     repeat_penalty: float | None = None,
     repeat_last_n: int | None = None,
     stop: list[str] | None = None,
     verify_model: bool = True,
+    cache: BaseCache | bool | None = None,
+    base_urls: list[str] | None = None,
 ):
     """
     Ollamaを使用してLLMを取得する
     
     Args:
         model_name: 使用するOllamaモデル名（デフォルト: gemma3:4b）
-        base_url: OllamaのベースURL（デフォルト: http://localhost:11434）
+        base_url: OllamaのベースURL（None なら OLLAMA_BASE_URLS、それも無ければ http://localhost:11434）
         temperature: 温度パラメータ（デフォルト: 0.7）
         num_predict: 生成する最大トークン数（Ollama側の上限）
         repeat_penalty: 反復抑制（1.0より大きいほど反復しにくい）
         repeat_last_n: 直近Nトークンを反復判定に使う
         stop: 生成停止シーケンス
+        cache: 応答キャッシュ。None なら LLM_CACHE_ENABLED=1 のときのみ共有キャッシュ（メモリLRU+SQLite）を使う。
+            True で共有キャッシュを強制、False で無効、BaseCache を渡せばそれを使う。
+        base_urls: 振り分け先の Ollama のベースURL。2台以上なら各呼び出しを実行中の少ない正常な Ollama へ
+            振り分ける RoutingChatModel を返し、1台ならその base_url を使う。
+            優先順位は base_urls > base_url > OLLAMA_BASE_URLS（カンマ区切り）> DEFAULT_OLLAMA_BASE_URL。
+            環境変数は、base_urls も base_url も渡されなかったときだけ使う（既定と同じ URL を明示した場合も使わない）。
     
     Returns:
-        ChatOllamaインスタンス
+        ChatOllamaインスタンス（複数台なら ChatOllama のサブクラス RoutingChatModel。
+        LLM_MAX_CONCURRENCY が有効なら、呼び出しごとにプロセス共有の同時実行数の枠を取る LimitedChatOllama）
     
     Raises:
         ConnectionError: Ollamaサービスに接続できない場合
         ValueError: モデルが存在しない場合
     """
+    # 循環 import を避けるためここで読み込む（llm_router はヘルスチェックに _fetch_ollama_tags を使う）
+    from src.utils.llm_router import RoutingChatModel, ollama_base_urls_from_env
+
+    if base_urls is None:
+        # 明示的に渡された base_url は環境変数より優先する
+        base_urls = ollama_base_urls_from_env() if base_url is None else []
+    urls = list(dict.fromkeys(base_urls))
+    if len(urls) == 1:
+        base_url = urls[0]
+    base_url = base_url or DEFAULT_OLLAMA_BASE_URL
+
     if verify_model:
-        # /api/tags を1回だけ取得して、接続確認とモデル存在確認をまとめて行う
-        tags = _fetch_ollama_tags(base_url)
-        models = [m.get("name") for m in tags.get("models", []) if isinstance(m, dict) and m.get("name")]
+        # /api/tags を1回だけ取得して、接続確認とモデル存在確認をまとめて行う（複数台なら、つながる全台のモデルの和）
+        targets = urls if len(urls) > 1 else [base_url]
+        models = []
+        errors = []
+        for url in targets:
+            try:
+                tags = _fetch_ollama_tags(url)
+            except ConnectionError as e:
+                errors.append(e)
+                continue
+            models += [m.get("name") for m in tags.get("models", []) if isinstance(m, dict) and m.get("name")]
+        if len(errors) == len(targets):
+            raise errors[0]
         if model_name not in models:
             raise ValueError(
                 f"モデル '{model_name}' が見つかりません。\n"
@@ -86,7 +122,12 @@ def get_llm(
                 f"モデルをダウンロードするには: `ollama pull {model_name}`"
             )
     
-    return ChatOllama(
+    if cache is None:
+        cache = llm_cache_enabled()
+    if cache is True:
+        cache = get_llm_cache()
+
+    params = dict(
         model=model_name,
         temperature=temperature,
         base_url=base_url,
@@ -94,7 +135,11 @@ def get_llm(
         repeat_penalty=repeat_penalty,
         repeat_last_n=repeat_last_n,
         stop=stop,
+        cache=cache,
     )
+    if len(urls) > 1:
+        return RoutingChatModel(**params, base_urls=urls)
+    return chat_ollama_class()(**params)
     
     # OpenAI用（コメントアウト）
     # api_key = os.getenv("OPENAI_API_KEY")
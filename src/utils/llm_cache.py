@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LLM応答キャッシュ（メモリLRU → SQLite の2段）。
+
+    LangChain の BaseCache として ChatOllama(cache=...) に渡して使う。
+    キーは LangChain が渡す (prompt, llm_string) のハッシュ:
+    - prompt: 描画済みメッセージ列のシリアライズ
+    - llm_string: モデル名と生成パラメータ（temperature / num_predict / repeat_penalty 等の LLMProfile 由来の値、
+      with_structured_output で bind された tools/format も含む）
+
+    Note:
+    - 既定は無効（get_llm(cache=...) または LLM_CACHE_ENABLED=1 で有効化）
+    - TTL を過ぎたエントリは参照時に破棄し、書き込み時に期限切れ/件数超過分を掃除する
+    """
+
+    def __init__(
+        self,
+        path: str | None = ".cache/llm_cache.sqlite3",
+        *,
+        ttl_sec: float = 3600.0,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 10_000,
+    ) -> None:
+        self.path = path
+        self.ttl_sec = float(ttl_sec)
+        self.max_memory_entries = max(0, int(max_memory_entries))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+
+        self._lock = threading.Lock()
+        # key -> (created_at, return_val)
+        self._memory: OrderedDict[str, tuple[float, RETURN_VAL_TYPE]] = OrderedDict()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+        self._conn: sqlite3.Connection | None = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+            self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        h = hashlib.sha256()
+        h.update((llm_string or "").encode("utf-8"))
+        h.update(b"\x00")
+        h.update((prompt or "").encode("utf-8"))
+        return h.hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_sec > 0 and (now - created_at) > self.ttl_sec
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                created_at, value = hit
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                self._memory.pop(key, None)
+                self._stats["expired"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    raw, created_at = row
+                    if self._expired(created_at, now):
+                        self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._stats["expired"] += 1
+                    else:
+                        try:
+                            value = _deserialize(raw)
+                        except Exception as e:
+                            # 形式変更などで復元できないエントリは捨てる
+                            logging.getLogger(__name__).info("LLMキャッシュの復元に失敗（破棄）: %s", e)
+                            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                            self._conn.commit()
+                        else:
+                            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                            self._conn.commit()
+                            self._remember(key, created_at, value)
+                            self._stats["disk_hits"] += 1
+                            return value
+
+            self._stats["misses"] += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, return_val)
+            self._stats["writes"] += 1
+            if self._conn is None:
+                return
+            try:
+                raw = dumps(list(return_val))
+            except Exception as e:
+                logging.getLogger(__name__).info("LLMキャッシュへの保存をスキップ（シリアライズ不可）: %s", e)
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, raw, now, now),
+            )
+            self._prune_disk(now)
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """ヒット/ミス等のカウンタと現在の件数を返す。"""
+        with self._lock:
+            out: dict[str, Any] = dict(self._stats)
+            out["memory_entries"] = len(self._memory)
+            if self._conn is not None:
+                out["disk_entries"] = int(self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+            lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+            out["hit_rate"] = round((out["memory_hits"] + out["disk_hits"]) / lookups, 3) if lookups else 0.0
+            return out
+
+    def _remember(self, key: str, created_at: float, value: RETURN_VAL_TYPE) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune_disk(self, now: float) -> None:
+        assert self._conn is not None
+        if self.ttl_sec > 0:
+            cur = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_sec,))
+            self._stats["expired"] += max(0, cur.rowcount or 0)
+        if self.max_disk_entries > 0:
+            count = int(self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+            over = count - self.max_disk_entries
+            if over > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (over,),
+                )
+                self._stats["evictions"] += over
+
+
+def _deserialize(raw: str) -> RETURN_VAL_TYPE:
+    # キャッシュは自プロセスが書いたものだけを読む前提だが、復元対象は LangChain core のクラスに限定する
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            value = loads(raw, allowed_objects="core")
+        except TypeError:
+            # allowed_objects 引数の無い旧バージョン
+            value = loads(raw)
+    if not isinstance(value, list):
+        raise ValueError("キャッシュ値の形式が不正です")
+    return value
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    v = (os.getenv(name) or "").strip().lower()
+    if v in ("1", "true", "yes", "y", "on"):
+        return True
+    if v in ("0", "false", "no", "n", "off"):
+        return False
+    return default
+
+
+def _env_float(name: str, default: float) -> float:
+    v = (os.getenv(name) or "").strip()
+    try:
+        return float(v) if v else default
+    except Exception:
+        return default
+
+
+_shared_cache: LLMResponseCache | None = None
+_shared_lock = threading.Lock()
+
+
+def llm_cache_enabled() -> bool:
+    return _env_bool("LLM_CACHE_ENABLED", False)
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    プロセス共通の LLMResponseCache を返す（環境変数で設定）。
+
+    - LLM_CACHE_PATH: SQLiteファイル（既定: .cache/llm_cache.sqlite3、空文字でメモリのみ）
+    - LLM_CACHE_TTL_SEC: TTL秒（既定: 3600、0以下で無期限）
+    - LLM_CACHE_MAX_MEMORY_ENTRIES: メモリLRUの件数上限（既定: 256）
+    - LLM_CACHE_MAX_DISK_ENTRIES: SQLiteの件数上限（既定: 10000）
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            path = os.getenv("LLM_CACHE_PATH")
+            _shared_cache = LLMResponseCache(
+                ".cache/llm_cache.sqlite3" if path is None else (path.strip() or None),
+                ttl_sec=_env_float("LLM_CACHE_TTL_SEC", 3600.0),
+                max_memory_entries=int(_env_float("LLM_CACHE_MAX_MEMORY_ENTRIES", 256)),
+                max_disk_entries=int(_env_float("LLM_CACHE_MAX_DISK_ENTRIES", 10_000)),
+            )
+        return _shared_cache
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+import httpx
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+
+# 呼び出しの所要時間が、その処理（llm_step）の基準の何倍を超えたら混雑とみなして同時実行数を減らすか
+_LATENCY_TOLERANCE = 2.0
+# 混雑時に同時実行数に掛ける係数（multiplicative decrease）
+_BACKOFF = 0.5
+# 基準の所要時間は観測の最小値に寄せるが、遅い観測にもこの割合で追従する（古い速すぎる値に張り付かないように）
+_BASELINE_DRIFT = 0.05
+
+
+def _is_overload(e: BaseException) -> bool:
+    """混雑を示す失敗か（タイムアウト、Ollama のキュー溢れ 503 などの 5xx / 429）"""
+    if isinstance(e, httpx.TimeoutException):
+        return True
+    if isinstance(e, ResponseError):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+
+class _Waiter:
+    """順番待ちの1件。release() で枠を渡されたら wake() される"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future: Optional[asyncio.Future] = loop.create_future() if loop is not None else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AIMDLimiter:
+    """
+    LLM 呼び出しの同時実行数をプロセス全体で制限する（スレッド/asyncio の両方から使える）。
+
+    - 上限 max_limit（LLM_MAX_CONCURRENCY）以下で、実際の同時実行数 limit を観測した所要時間から調整する
+      - 所要時間が処理ごとの基準の _LATENCY_TOLERANCE 倍以下なら加算的に増やす（limit 件の完了ごとに +1。枠が埋まっているときだけ）
+      - 基準を超えた、またはタイムアウト/5xx なら _BACKOFF 倍に減らす（減らす前に始まった呼び出しでは重ねて減らさない）
+    - 空きが無ければ先着順に待たせ、待ち行列の長さと待ち時間を snapshot() で参照できる
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        *,
+        min_limit: int = 1,
+        initial: Optional[int] = None,
+        tolerance: float = _LATENCY_TOLERANCE,
+        backoff: float = _BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_limit < 1:
+            raise ValueError("max_limit は1以上にしてください")
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self._limit = float(max(self.min_limit, min(initial if initial is not None else max_limit, max_limit)))
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._waiters: deque[_Waiter] = deque()
+        self._in_flight = 0
+        self._baselines: dict[str, float] = {}
+        self._last_decrease = float("-inf")
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_sec_total": 0.0,
+            "wait_sec_max": 0.0,
+            "max_queue_depth": 0,
+            "increases": 0,
+            "decreases": 0,
+        }
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    # ---- 枠の取得/返却 ----
+
+    def _try_acquire(self) -> bool:
+        # ロック内で呼ぶ。先に待っている呼び出しがあれば追い越さない
+        if not self._waiters and self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        self._waiters.append(waiter)
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiters))
+
+    def _record_acquired(self, wait_sec: Optional[float]) -> None:
+        with self._lock:
+            self._stats["acquired"] += 1
+            if wait_sec is not None:
+                self._stats["waited"] += 1
+                self._stats["wait_sec_total"] += wait_sec
+                self._stats["wait_sec_max"] = max(self._stats["wait_sec_max"], wait_sec)
+
+    def acquire(self) -> float:
+        """空きができるまで待って枠を1つ取り、取得時刻を返す（release に渡す）"""
+        t0 = self._clock()
+        with self._lock:
+            if self._try_acquire():
+                waiter = None
+            else:
+                waiter = _Waiter()
+                self._enqueue(waiter)
+        if waiter is not None:
+            waiter.event.wait()
+        now = self._clock()
+        self._record_acquired(None if waiter is None else now - t0)
+        return now
+
+    async def aacquire(self) -> float:
+        """acquire の asyncio 版（イベントループを止めずに待つ）"""
+        t0 = self._clock()
+        with self._lock:
+            if self._try_acquire():
+                waiter = None
+            else:
+                waiter = _Waiter(asyncio.get_running_loop())
+                self._enqueue(waiter)
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        granted = False
+                    else:
+                        granted = True
+                if granted:
+                    # 枠を渡された直後に取り消された: 所要時間は記録せずに返す
+                    self.release(self._clock(), None)
+                raise
+        now = self._clock()
+        self._record_acquired(None if waiter is None else now - t0)
+        return now
+
+    def release(self, started_at: float, latency: Optional[float], key: str = "llm", overloaded: bool = False) -> None:
+        """
+        枠を返し、所要時間 latency（None なら調整しない）か overloaded で limit を調整してから、待っている呼び出しへ枠を渡す。
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease(started_at, f"{key}: タイムアウト/混雑エラー")
+            elif latency is not None:
+                self._adjust(started_at, latency, key)
+            while self._waiters and self._in_flight < int(self._limit):
+                self._in_flight += 1
+                self._waiters.popleft().wake()
+
+    def _adjust(self, started_at: float, latency: float, key: str) -> None:
+        baseline = self._baselines.get(key)
+        if baseline is not None and latency > baseline * self._tolerance:
+            self._decrease(started_at, f"{key}: {latency:.2f}s（基準 {baseline:.2f}s）")
+        elif self._waiters or self._in_flight + 1 >= int(self._limit):
+            # 枠を使い切っている（需要がある）ときだけ増やす
+            before = int(self._limit)
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            if int(self._limit) > before:
+                self._stats["increases"] += 1
+        if baseline is None or latency < baseline:
+            self._baselines[key] = latency
+        else:
+            self._baselines[key] = baseline + (latency - baseline) * _BASELINE_DRIFT
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        if started_at < self._last_decrease:
+            # 前回減らす前から実行中だった呼び出し（高い同時実行数のときの観測）では重ねて減らさない
+            return
+        before = int(self._limit)
+        self._limit = max(float(self.min_limit), self._limit * self._backoff)
+        self._last_decrease = self._clock()
+        if int(self._limit) < before:
+            self._stats["decreases"] += 1
+            logging.getLogger(__name__).info("LLM の同時実行数を %d → %d に減らしました（%s）", before, int(self._limit), reason)
+
+    # ---- 呼び出しを囲む ----
+
+    @contextmanager
+    def slot(self, key: str = "llm") -> Iterator[None]:
+        started_at = self.acquire()
+        latency, overloaded = None, False
+        try:
+            yield
+            latency = self._clock() - started_at
+        except Exception as e:
+            overloaded = _is_overload(e)
+            raise
+        finally:
+            self.release(started_at, latency, key, overloaded)
+
+    @asynccontextmanager
+    async def aslot(self, key: str = "llm") -> AsyncIterator[None]:
+        started_at = await self.aacquire()
+        latency, overloaded = None, False
+        try:
+            yield
+            latency = self._clock() - started_at
+        except Exception as e:
+            overloaded = _is_overload(e)
+            raise
+        finally:
+            self.release(started_at, latency, key, overloaded)
+
+    def snapshot(self) -> dict:
+        """limit / max_limit / in_flight / queue_depth と、枠の取得数・待ち時間（平均/最大）・増減の回数"""
+        with self._lock:
+            stats = dict(self._stats)
+            waited = stats["waited"]
+            return {
+                "limit": int(self._limit),
+                "max_limit": self.max_limit,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": stats["max_queue_depth"],
+                "acquired": stats["acquired"],
+                "waited": waited,
+                "wait_sec_avg": round(stats["wait_sec_total"] / waited, 3) if waited else 0.0,
+                "wait_sec_max": round(stats["wait_sec_max"], 3),
+                "increases": stats["increases"],
+                "decreases": stats["decreases"],
+                "baseline_sec": {k: round(v, 3) for k, v in self._baselines.items()},
+            }
+
+
+def _max_concurrency_from_env() -> Optional[int]:
+    try:
+        value = int(os.getenv("LLM_MAX_CONCURRENCY") or 0)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+_limiter: AIMDLimiter | None = None
+_limiter_loaded = False
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> AIMDLimiter | None:
+    """プロセス内で共有する AIMDLimiter（LLM_MAX_CONCURRENCY が1以上のときだけ。未設定なら None = 制限しない）"""
+    global _limiter, _limiter_loaded
+    with _limiter_lock:
+        if not _limiter_loaded:
+            max_limit = _max_concurrency_from_env()
+            _limiter = AIMDLimiter(max_limit) if max_limit else None
+            _limiter_loaded = True
+        return _limiter
+
+
+def get_llm_limiter_stats() -> dict:
+    """AIMDLimiter.snapshot()（制限していなければ空）"""
+    limiter = get_llm_limiter()
+    return limiter.snapshot() if limiter is not None else {}
+
+
+def reset_llm_limiter() -> None:
+    """共有の AIMDLimiter を捨て、次の get_llm_limiter() で LLM_MAX_CONCURRENCY を読み直す"""
+    global _limiter, _limiter_loaded
+    with _limiter_lock:
+        _limiter, _limiter_loaded = None, False
+
+
+def chat_ollama_class() -> type[ChatOllama]:
+    """get_llm / RoutingChatModel が Ollama のクライアントに使うクラス（制限が有効なら LimitedChatOllama）"""
+    return LimitedChatOllama if get_llm_limiter() is not None else ChatOllama
+
+
+def _step(run_manager: Any) -> str:
+    # llm_config(step) が付けたメタデータ。所要時間の基準を処理ごとに分ける
+    metadata = getattr(run_manager, "metadata", None) or {}
+    return str(metadata.get("llm_step") or "llm")
+
+
+class LimitedChatOllama(ChatOllama):
+    """
+    呼び出しのたびに共有の AIMDLimiter（get_llm_limiter）の枠を取ってから Ollama を呼ぶ ChatOllama。
+
+    ストリーミングは最後の chunk を受け取るまで枠を持つ。limiter が無効（LLM_MAX_CONCURRENCY 未設定）なら ChatOllama と同じ。
+    """
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        limiter = get_llm_limiter()
+        if limiter is None:
+            return super()._generate(messages, stop, run_manager, **kwargs)
+        with limiter.slot(_step(run_manager)):
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        limiter = get_llm_limiter()
+        if limiter is None:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        async with limiter.aslot(_step(run_manager)):
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        limiter = get_llm_limiter()
+        if limiter is None:
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+            return
+        with limiter.slot(_step(run_manager)):
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        limiter = get_llm_limiter()
+        if limiter is None:
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+            return
+        async with limiter.aslot(_step(run_manager)):
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
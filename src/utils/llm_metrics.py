@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# LLM 呼び出しの経路（エージェントが llm_config / record_llm_path で指定する）
+# - structured: structured_chain（format 制約 + 手元で検証）/ streaming: json_stream の stream_structured
+# - json: 最初から JSON 文字列で出させる経路（FactChecker・日本語化）/ json_fallback: structured 失敗後の JSON 文字列
+# - deterministic: LLM を使わない（または失敗した）ため、本文からの機械的な値/フォールバック値にした
+LLM_PATHS = ("structured", "streaming", "json", "json_fallback", "deterministic")
+
+# Ollama の応答メタデータ（generation_info / response_metadata）から拾う値。*_duration はナノ秒
+_OLLAMA_COUNTS = ("prompt_eval_count", "eval_count")
+_OLLAMA_DURATIONS = ("prompt_eval_duration", "eval_duration", "total_duration", "load_duration")
+
+
+@dataclass(frozen=True)
+class LLMCallRecord:
+    """
+    LLM 呼び出し1回分の計測値（state["llm_calls"] には to_dict() した dict で入る）。
+
+    - phase / task: オーケストレーターのフェーズと state キー（"analysis" / "optimistic_argument" など）
+    - step / path: エージェント内の処理名（"analyze" / "facts" など）と経路（LLM_PATHS）
+    - Ollama 以外のモデルでは prompt_eval_count 以降が None になる
+    """
+
+    request_id: str
+    phase: str
+    task: Optional[str]
+    step: str
+    path: str
+    model: Optional[str]
+    started_at: float
+    wall_sec: float
+    prompt_chars: int
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+    prompt_eval_duration_sec: Optional[float] = None
+    eval_duration_sec: Optional[float] = None
+    total_duration_sec: Optional[float] = None
+    load_duration_sec: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class _Scope:
+    sink: list
+    request_id: str
+    phase: str
+    task: Optional[str]
+
+    def add(self, record: LLMCallRecord) -> None:
+        # list.append はスレッドセーフ（並行実行中のタスクが同じ state に追記する）
+        self.sink.append(record.to_dict())
+
+
+_scope: ContextVar[Optional[_Scope]] = ContextVar("llm_call_scope", default=None)
+
+
+@contextmanager
+def llm_call_scope(sink: list, request_id: str, phase: str, task: Optional[str] = None) -> Iterator[None]:
+    """
+    この中で行われた LLM 呼び出し（llm_config を渡したもの）の計測値を sink に追記する。
+
+    contextvars で伝わるため、スレッド（asyncio.to_thread 等）やタスクをまたいでも同じ request_id/phase が付く。
+    """
+    token = _scope.set(_Scope(sink, request_id, phase, task))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def record_llm_path(step: str, path: str = "deterministic", error: Optional[BaseException | str] = None) -> None:
+    """LLM を呼ばなかった経路（決定的なフォールバック等）を記録する（llm_call_scope の外では何もしない）"""
+    scope = _scope.get()
+    if scope is None:
+        return
+    scope.add(
+        LLMCallRecord(
+            request_id=scope.request_id,
+            phase=scope.phase,
+            task=scope.task,
+            step=step,
+            path=path,
+            model=None,
+            started_at=time.time(),
+            wall_sec=0.0,
+            prompt_chars=0,
+            error=None if error is None else str(error),
+        )
+    )
+
+
+class LLMInstrumentationHandler(BaseCallbackHandler):
+    """
+    LangChain のコールバックで LLM 呼び出しの壁時計時間・プロンプト文字数・Ollama のトークン数/所要時間を計測する。
+
+    llm_call_scope の外の呼び出しは記録しない（オーケストレーター以外から使ったエージェントでは何もしない）。
+    """
+
+    # 計測だけなので、イベントループ上でもそのまま呼ぶ（スレッドに逃がさない）
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[UUID, tuple[_Scope, str, str, Optional[str], float, float, int]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        chars = sum(len(_content_text(m)) for batch in messages for m in batch)
+        self._start(run_id, metadata, chars)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._start(run_id, metadata, sum(len(p) for p in prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, _ollama_usage(response), None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, {}, str(error))
+
+    def _start(self, run_id: UUID, metadata: Optional[dict], prompt_chars: int) -> None:
+        scope = _scope.get()
+        if scope is None:
+            return
+        metadata = metadata or {}
+        entry = (
+            scope,
+            str(metadata.get("llm_step") or "llm"),
+            str(metadata.get("llm_path") or "structured"),
+            metadata.get("ls_model_name"),
+            time.time(),
+            time.perf_counter(),
+            prompt_chars,
+        )
+        with self._lock:
+            self._pending[run_id] = entry
+
+    def _finish(self, run_id: UUID, usage: dict, error: Optional[str]) -> None:
+        with self._lock:
+            entry = self._pending.pop(run_id, None)
+        if entry is None:
+            return
+        scope, step, path, model, started_at, t0, prompt_chars = entry
+        scope.add(
+            LLMCallRecord(
+                request_id=scope.request_id,
+                phase=scope.phase,
+                task=scope.task,
+                step=step,
+                path=path,
+                model=model,
+                started_at=round(started_at, 3),
+                wall_sec=round(time.perf_counter() - t0, 3),
+                prompt_chars=prompt_chars,
+                error=error,
+                **usage,
+            )
+        )
+
+
+_handler = LLMInstrumentationHandler()
+
+
+def llm_config(step: str, path: str = "structured") -> dict:
+    """chain.invoke(inputs, config=...) に渡す RunnableConfig（計測コールバックと経路のメタデータ）"""
+    return {"callbacks": [_handler], "metadata": {"llm_step": step, "llm_path": path}}
+
+
+def write_llm_calls_jsonl(records: Iterable[dict], path: str) -> int:
+    """計測値を JSONL として path に追記し、書いた行数を返す"""
+    lines = [json.dumps(r, ensure_ascii=False) for r in records]
+    if not lines:
+        return 0
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+def llm_metrics_path_from_env() -> Optional[str]:
+    """LLM_METRICS_PATH（未設定なら None = 書き出さない）"""
+    return os.getenv("LLM_METRICS_PATH") or None
+
+
+def _content_text(message) -> str:
+    content = getattr(message, "content", message)
+    return content if isinstance(content, str) else str(content)
+
+
+def _ollama_usage(response: LLMResult) -> dict:
+    """最後の generation の generation_info / response_metadata から Ollama の計測値を取り出す"""
+    info: dict = {}
+    for generations in response.generations or []:
+        for gen in generations:
+            info.update(getattr(gen, "generation_info", None) or {})
+            message = getattr(gen, "message", None)
+            info.update(getattr(message, "response_metadata", None) or {})
+    usage: dict = {}
+    for key in _OLLAMA_COUNTS:
+        if isinstance(info.get(key), int):
+            usage[key] = info[key]
+    for key in _OLLAMA_DURATIONS:
+        if isinstance(info.get(key), (int, float)):
+            usage[f"{key}_sec"] = round(info[key] / 1e9, 3)
+    return usage
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional
+
+import httpx
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+from pydantic import Field, PrivateAttr
+
+from src.utils.llm_limiter import chat_ollama_class
+
+# ヘルスチェック（/api/tags）の間隔。正常なバックエンドは _HEALTH_INTERVAL 秒ごと、
+# 失敗したバックエンドは _RETRY_AFTER 秒たってから次の振り分け時に確認し直す
+_HEALTH_INTERVAL = 30.0
+_RETRY_AFTER = 5.0
+# 振り分けの途中で行うので、通常の接続確認（5秒）より短くする
+_PROBE_TIMEOUT = 2.0
+
+# ルーターからバックエンドへそのまま渡さない ChatOllama のフィールド
+# （キャッシュ/コールバックはルーター側で1回だけ処理する。base_url はバックエンドごとに変える）
+_ROUTER_ONLY_FIELDS = {"base_url", "base_urls", "cache", "callbacks", "callback_manager", "rate_limiter"}
+
+
+def ollama_base_urls_from_env() -> list[str]:
+    """OLLAMA_BASE_URLS（カンマ区切り。未設定なら空）"""
+    return [u.strip().rstrip("/") for u in (os.getenv("OLLAMA_BASE_URLS") or "").split(",") if u.strip()]
+
+
+def _model_tag(name: str) -> str:
+    # /api/tags は "gemma3:latest" のようにタグ付きで返す
+    return name if ":" in name else f"{name}:latest"
+
+
+def is_backend_failure(e: BaseException) -> bool:
+    """
+    別のバックエンドで再試行すべき失敗か（接続できない/タイムアウト/5xx、そのバックエンドにモデルが無い 404）。
+    出力の検証失敗などリクエスト自体の問題は含めない。
+    """
+    if isinstance(e, (ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(e, ResponseError):
+        return e.status_code == 404 or e.status_code >= 500
+    return False
+
+
+@dataclass
+class BackendStatus:
+    """バックエンド1台の状態（OllamaBackendPool のロック内で更新する）"""
+
+    url: str
+    healthy: bool = True
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    # /api/tags のモデル名（None = まだ取得していない）
+    models: Optional[frozenset[str]] = None
+    checked_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def serves(self, model: str) -> bool:
+        return not self.models or _model_tag(model) in self.models
+
+
+def _probe_models(url: str) -> frozenset[str]:
+    # src.utils.llm は get_llm から本モジュールを使うため、ここで import する
+    from src.utils.llm import _fetch_ollama_tags
+
+    tags = _fetch_ollama_tags(url, timeout=_PROBE_TIMEOUT)
+    return frozenset(m["name"] for m in tags.get("models", []) if isinstance(m, dict) and m.get("name"))
+
+
+class NoHealthyBackendError(ConnectionError):
+    """振り分け先にできる Ollama が残っていない（全台が停止中、または試行済み）"""
+
+
+class OllamaBackendPool:
+    """
+    複数の Ollama の健全性と実行中のリクエスト数を管理し、振り分け先を選ぶ。
+
+    - acquire(): そのモデルを持つ正常なバックエンドのうち、実行中が最も少ないもの（同数なら累計が少ないもの）を返す。
+      正常なものが無ければ、停止中と判定したものも試す（判定が古い可能性があるため）
+    - release(): 呼び出しの終了を記録する。is_backend_failure な失敗なら停止中とし、_RETRY_AFTER 秒後に確認し直す
+    - ヘルスチェックは acquire() のついでに、確認時期が来たバックエンドだけ /api/tags で行う（常駐スレッドは持たない）
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        *,
+        probe: Callable[[str], frozenset[str]] = _probe_models,
+        clock: Callable[[], float] = time.monotonic,
+        health_interval: float = _HEALTH_INTERVAL,
+        retry_after: float = _RETRY_AFTER,
+    ) -> None:
+        self._backends = [BackendStatus(url=u) for u in dict.fromkeys(urls)]
+        if not self._backends:
+            raise ValueError("Ollama のバックエンドが指定されていません")
+        self._probe = probe
+        self._clock = clock
+        self._health_interval = health_interval
+        self._retry_after = retry_after
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> list[str]:
+        return [b.url for b in self._backends]
+
+    def refresh(self, force: bool = False) -> None:
+        """確認時期が来たバックエンド（force なら全台）を /api/tags で確認する"""
+        now = self._clock()
+        with self._lock:
+            due = [b for b in self._backends if force or self._is_due(b, now)]
+            for b in due:
+                # 同時に振り分けたスレッドが同じバックエンドを重ねて確認しないよう、先に確認時刻を進める
+                b.checked_at = now
+        for b in due:
+            try:
+                models, error = self._probe(b.url), None
+            except Exception as e:
+                models, error = None, e
+            with self._lock:
+                if error is None:
+                    b.healthy, b.models, b.last_error = True, models, None
+                else:
+                    b.healthy, b.last_error = False, str(error)
+            if error is not None:
+                logging.getLogger(__name__).warning("Ollama %s のヘルスチェックに失敗しました: %s", b.url, error)
+
+    def _is_due(self, b: BackendStatus, now: float) -> bool:
+        if b.checked_at is None:
+            return True
+        return now - b.checked_at >= (self._health_interval if b.healthy else self._retry_after)
+
+    def acquire(self, model: str, exclude: Iterable[str] = (), *, refresh: bool = True) -> Optional[BackendStatus]:
+        """振り分け先を選び、実行中の数を1つ増やして返す（候補が無ければ None）。refresh=False ならヘルスチェックしない"""
+        if refresh:
+            self.refresh()
+        excluded = set(exclude)
+        with self._lock:
+            candidates = [b for b in self._backends if b.url not in excluded and b.serves(model)]
+            healthy = [b for b in candidates if b.healthy]
+            pool = healthy or candidates
+            if not pool:
+                return None
+            chosen = min(pool, key=lambda b: (b.in_flight, b.requests))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, backend: BackendStatus, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            backend.in_flight -= 1
+            if error is not None and is_backend_failure(error):
+                backend.failures += 1
+                backend.healthy = False
+                backend.checked_at = self._clock()
+                backend.last_error = str(error)
+        if error is not None and is_backend_failure(error):
+            logging.getLogger(__name__).warning("Ollama %s への呼び出しに失敗したため他へ切り替えます: %s", backend.url, error)
+
+    def snapshot(self) -> list[dict]:
+        """バックエンドごとの状態（url / healthy / in_flight / requests / failures / models / last_error）"""
+        with self._lock:
+            return [
+                {
+                    "url": b.url,
+                    "healthy": b.healthy,
+                    "in_flight": b.in_flight,
+                    "requests": b.requests,
+                    "failures": b.failures,
+                    "models": sorted(b.models) if b.models is not None else None,
+                    "last_error": b.last_error,
+                }
+                for b in self._backends
+            ]
+
+
+_pools: dict[tuple[str, ...], OllamaBackendPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_backend_pool(urls: Iterable[str]) -> OllamaBackendPool:
+    """同じバックエンドの組に対してプロセス内で共有する OllamaBackendPool（実行中の数をプロファイル間でも合算する）"""
+    key = tuple(dict.fromkeys(urls))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = OllamaBackendPool(key)
+        return pool
+
+
+def get_llm_router_stats() -> dict:
+    """{バックエンドの組（カンマ区切り）: OllamaBackendPool.snapshot()}"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {",".join(key): pool.snapshot() for key, pool in pools.items()}
+
+
+def clear_backend_pools() -> None:
+    with _pools_lock:
+        _pools.clear()
+
+
+class RoutingChatModel(ChatOllama):
+    """
+    複数の Ollama（base_urls）に振り分ける ChatOllama。
+
+    呼び出しごとに OllamaBackendPool で振り分け先を選び、そのバックエンド用の ChatOllama に処理を任せる。
+    接続できない/5xx などの失敗（is_backend_failure）は、まだ試していない別のバックエンドで再試行する
+    （ストリーミングは最初の chunk を返す前の失敗だけ）。ChatOllama のサブクラスなので、format による構造化出力や
+    計測（src.utils.llm_metrics）はそのまま使える。
+    """
+
+    base_urls: list[str] = Field(default_factory=list)
+    _pool: OllamaBackendPool = PrivateAttr()
+    _backends: dict[str, ChatOllama] = PrivateAttr()
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        urls = self.base_urls or [self.base_url]
+        self._pool = get_backend_pool(urls)
+        params = {k: getattr(self, k) for k in self.model_fields_set if k not in _ROUTER_ONLY_FIELDS}
+        # LLM_MAX_CONCURRENCY が有効なら、各バックエンドへの呼び出しごとに共有の同時実行数の枠を取る
+        backend_cls = chat_ollama_class()
+        self._backends = {url: backend_cls(**params, base_url=url, cache=False) for url in self._pool.urls}
+
+    @property
+    def pool(self) -> OllamaBackendPool:
+        return self._pool
+
+    @property
+    def _llm_type(self) -> str:
+        return "chat-ollama-router"
+
+    def _acquire(self, tried: list[str], refresh: bool = True) -> BackendStatus:
+        backend = self._pool.acquire(self.model, exclude=tried, refresh=refresh)
+        if backend is None:
+            raise NoHealthyBackendError(
+                f"モデル '{self.model}' を実行できる Ollama がありません（試行済み: {', '.join(tried) or 'なし'}）"
+            )
+        return backend
+
+    async def _aacquire(self, tried: list[str]) -> BackendStatus:
+        # ヘルスチェック（HTTP）でイベントループを止めない
+        await asyncio.to_thread(self._pool.refresh)
+        return self._acquire(tried, refresh=False)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried: list[str] = []
+        while True:
+            backend = self._acquire(tried)
+            error: Optional[BaseException] = None
+            try:
+                return self._backends[backend.url]._generate(messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                error = e
+                if not is_backend_failure(e):
+                    raise
+            finally:
+                self._pool.release(backend, error)
+            tried.append(backend.url)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried: list[str] = []
+        while True:
+            backend = await self._aacquire(tried)
+            error: Optional[BaseException] = None
+            try:
+                return await self._backends[backend.url]._agenerate(messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                error = e
+                if not is_backend_failure(e):
+                    raise
+            finally:
+                self._pool.release(backend, error)
+            tried.append(backend.url)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tried: list[str] = []
+        while True:
+            backend = self._acquire(tried)
+            error: Optional[BaseException] = None
+            started = False
+            try:
+                for chunk in self._backends[backend.url]._stream(messages, stop, run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                if started or not is_backend_failure(e):
+                    raise
+            finally:
+                self._pool.release(backend, error)
+            tried.append(backend.url)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tried: list[str] = []
+        while True:
+            backend = await self._aacquire(tried)
+            error: Optional[BaseException] = None
+            started = False
+            try:
+                async for chunk in self._backends[backend.url]._astream(messages, stop, run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                if started or not is_backend_failure(e):
+                    raise
+            finally:
+                self._pool.release(backend, error)
+            tried.append(backend.url)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# 構造化出力の戦略（src.utils.structured_output が実装する。並びは既定の優先順）
+# - json_schema: format に JSON スキーマを渡して制約 / json_mode: format="json" / tool_calling: tool 呼び出し
+STRATEGIES = ("json_schema", "json_mode", "tool_calling")
+
+# 観測が無いときの成功率の見込み（_PRIOR_WEIGHT 回分の観測として扱う）
+_PRIORS = {"json_schema": 0.9, "json_mode": 0.7, "tool_calling": 0.5}
+_PRIOR_WEIGHT = 4.0
+# 推定成功率がこれ未満の戦略は使わない（全戦略がそうなら LLM を呼ばずに呼び出し側のフォールバックへ進める）
+_DOOMED_RATE = 0.1
+# 全戦略が見込み無しでも、この回数に1回は最善のものを試す（モデル更新等で直っていれば戻れるように）
+_RETRY_EVERY = 20
+
+
+@dataclass
+class StrategyStats:
+    successes: int = 0
+    failures: int = 0
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures
+
+    def estimate(self, prior: float) -> float:
+        return (self.successes + _PRIOR_WEIGHT * prior) / (self.attempts + _PRIOR_WEIGHT)
+
+
+class ModelCapabilities:
+    """
+    モデル名ごとに、構造化出力の戦略ごとの成功/失敗を記録し、次に使う戦略を選ぶ。
+
+    - record(): 実際の呼び出し（と probe）の結果を記録する。失敗は「そのモデルがその形式を扱えなかった」ものだけ
+      （出力の検証失敗・tool 非対応など。接続エラーは数えない）
+    - choose(): 推定成功率（観測 + _PRIORS）が最も高い戦略を返す。何度も失敗している戦略は最初から試さない
+    - probe=True なら、モデルごとに最初の choose() の前に各戦略を1回ずつ試す（MODEL_CAPABILITY_PROBE=1）
+    """
+
+    def __init__(self, probe: bool = False) -> None:
+        self.probe_enabled = probe
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, StrategyStats]] = {}
+        self._probed: set[str] = set()
+        self._skips: dict[str, int] = {}
+
+    def record(self, model: str, strategy: str, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(model, {}).setdefault(strategy, StrategyStats())
+            if ok:
+                stats.successes += 1
+            else:
+                stats.failures += 1
+
+    def estimate(self, model: str, strategy: str) -> float:
+        with self._lock:
+            stats = self._stats.get(model, {}).get(strategy) or StrategyStats()
+            return stats.estimate(_PRIORS.get(strategy, 0.5))
+
+    def choose(self, model: str) -> Optional[str]:
+        """次に使う戦略。全戦略が見込み無しなら None（_RETRY_EVERY 回に1回は最善のものを返す）"""
+        ranked = sorted(STRATEGIES, key=lambda s: -self.estimate(model, s))
+        best = ranked[0]
+        if self.estimate(model, best) >= _DOOMED_RATE:
+            return best
+        with self._lock:
+            self._skips[model] = self._skips.get(model, 0) + 1
+            retry = self._skips[model] % _RETRY_EVERY == 0
+        if retry:
+            return best
+        logging.getLogger(__name__).info("%s: 構造化出力の戦略がいずれも見込み無しのため省略", model)
+        return None
+
+    def needs_probe(self, model: str) -> bool:
+        """probe が有効で、このモデルをまだ probe していなければ True（以後は False）"""
+        if not self.probe_enabled:
+            return False
+        with self._lock:
+            if model in self._probed:
+                return False
+            self._probed.add(model)
+            return True
+
+    def snapshot(self) -> dict:
+        """{モデル名: {戦略: {successes, failures, success_rate, estimate}}}"""
+        with self._lock:
+            models = {m: dict(s) for m, s in self._stats.items()}
+        out: dict[str, dict[str, dict[str, Any]]] = {}
+        for model, by_strategy in models.items():
+            out[model] = {
+                strategy: {
+                    "successes": stats.successes,
+                    "failures": stats.failures,
+                    "success_rate": round(stats.successes / stats.attempts, 4) if stats.attempts else None,
+                    "estimate": round(stats.estimate(_PRIORS.get(strategy, 0.5)), 4),
+                }
+                for strategy, stats in by_strategy.items()
+            }
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._probed.clear()
+            self._skips.clear()
+
+
+def model_key(model: Any) -> str:
+    """モデル名（ChatOllama.model 等）。名前が無ければクラス名"""
+    return str(getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__)
+
+
+_capabilities: ModelCapabilities | None = None
+_capabilities_lock = threading.Lock()
+
+
+def get_model_capabilities() -> ModelCapabilities:
+    """プロセス内で共有する ModelCapabilities（MODEL_CAPABILITY_PROBE=1 で初回利用時に probe する）"""
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is None:
+            _capabilities = ModelCapabilities(probe=os.getenv("MODEL_CAPABILITY_PROBE", "0") == "1")
+        return _capabilities
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Awaitable, Callable, Iterable
+from urllib.parse import urlparse
+import asyncio
+import heapq
+import logging
+import math
 import os
 import re
+import threading
+import time
 import xml.etree.ElementTree as ET
 
 import requests
-from src.utils.security import fetch_url_bytes, validate_outbound_url, UrlValidationError
+from src.utils.feed_cache import get_feed_cache
+from src.utils.security import afetch_url_bytes, fetch_url_bytes, validate_outbound_url, UrlValidationError
 
 
 @dataclass(frozen=True)
@@ -57,11 +66,231 @@ def fetch_feed_xml(url: str, timeout: int = 10) -> str:
     # security_spec.md: RSS取得もURL検証・サイズ上限・リダイレクト制御を適用する
     _ = validate_outbound_url(url, purpose="rss")
     result = fetch_url_bytes(url, purpose="rss")
+    return _decode_feed_bytes(result.content)
+
+
+async def afetch_feed_xml(url: str, timeout: int = 10) -> str:
+    """fetch_feed_xml の asyncio 版（DNS解決を含むURL検証もイベントループ外で行う）。"""
+    _ = await asyncio.to_thread(validate_outbound_url, url, purpose="rss")
+    result = await afetch_url_bytes(url, purpose="rss")
+    return _decode_feed_bytes(result.content)
+
+
+def fetch_feed_items(url: str, timeout: int = 10) -> list[FeedItem]:
+    """
+    フィードを取得して記事候補を返す。
+    RSS_CACHE_ENABLED=1（既定: 無効）なら条件付きGETキャッシュを使い、304 のときは前回のパース結果を返す。
+    """
+    cache = get_feed_cache()
+    if cache is None:
+        return parse_feed(fetch_feed_xml(url, timeout=timeout), feed_url=url)
+    return cache.fetch_items(url, _parse_feed_bytes)
+
+
+def _parse_feed_bytes(content: bytes, feed_url: str) -> list[FeedItem]:
+    return parse_feed(_decode_feed_bytes(content), feed_url=feed_url)
+
+
+def _fetch_and_parse(feed_url: str, fetch_xml: Callable[..., str]) -> list[FeedItem]:
+    # 既定の取得関数なら条件付きGETキャッシュ経由にする（差し替えた取得関数はそのまま呼ぶ）
+    if fetch_xml is fetch_feed_xml:
+        return fetch_feed_items(feed_url, timeout=10)
+    return parse_feed(fetch_xml(feed_url, timeout=10), feed_url=feed_url)
+
+
+def _decode_feed_bytes(content: bytes) -> str:
     try:
-        return result.content.decode("utf-8")
+        return content.decode("utf-8")
     except Exception:
         # 最低限のフォールバック（XMLはUTF-8以外もあり得る）
-        return result.content.decode("utf-8", errors="ignore")
+        return content.decode("utf-8", errors="ignore")
+
+
+@dataclass(frozen=True)
+class FeedFetchLimits:
+    """
+    複数フィード同時取得の上限設定。
+    - concurrency: 全体の同時取得数
+    - per_host: 同一ホストへの同時取得数（配信元への負荷を抑える）
+    - deadline_sec: 全体の締め切り（超過分は待たずに、取得済みのフィードだけで続行する）
+    """
+
+    concurrency: int = 8
+    per_host: int = 2
+    deadline_sec: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> "FeedFetchLimits":
+        return cls(
+            concurrency=max(1, int(_env_float("RSS_FETCH_CONCURRENCY", cls.concurrency))),
+            per_host=max(1, int(_env_float("RSS_FETCH_PER_HOST", cls.per_host))),
+            deadline_sec=max(0.1, _env_float("RSS_FETCH_DEADLINE_SEC", cls.deadline_sec)),
+        )
+
+
+def fetch_feeds_concurrently(
+    feed_urls: list[str],
+    *,
+    fetch_xml: Callable[..., str] = fetch_feed_xml,
+    limits: FeedFetchLimits | None = None,
+) -> list[FeedItem]:
+    """
+    複数フィードを並行取得してパースし、フィード順（feed_urls の順）に連結した記事候補を返す。
+
+    - 取得失敗したフィードはログに残してスキップする
+    - deadline_sec を過ぎても終わらないフィードは待たない（ワーカーは各リクエストのタイムアウトで自然に終わる）
+    """
+    by_feed = fetch_feeds_by_url(feed_urls, fetch_xml=fetch_xml, limits=limits)
+    items: list[FeedItem] = []
+    for feed_url in _dedupe_preserve_order(list(feed_urls)):
+        items.extend(by_feed.get(feed_url, []))
+    return items
+
+
+def fetch_feeds_by_url(
+    feed_urls: list[str],
+    *,
+    fetch_xml: Callable[..., str] = fetch_feed_xml,
+    limits: FeedFetchLimits | None = None,
+) -> dict[str, list[FeedItem]]:
+    """
+    fetch_feeds_concurrently と同じ条件で取得し、取得できたフィードだけを {feed_url: items} で返す。
+    （「取得失敗」と「記事0件」を区別したい呼び出し側向け）
+    """
+    limits = limits or FeedFetchLimits.from_env()
+    urls = _dedupe_preserve_order(list(feed_urls))
+    if not urls:
+        return {}
+
+    host_sems: dict[str, threading.BoundedSemaphore] = {}
+    for u in urls:
+        host_sems.setdefault(_feed_host(u), threading.BoundedSemaphore(limits.per_host))
+
+    deadline = time.monotonic() + limits.deadline_sec
+
+    def task(feed_url: str) -> list[FeedItem]:
+        sem = host_sems[_feed_host(feed_url)]
+        if not sem.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError("同一ホストの取得待ちで締め切りを超過しました")
+        try:
+            return _fetch_and_parse(feed_url, fetch_xml)
+        finally:
+            sem.release()
+
+    results: dict[str, list[FeedItem]] = {}
+    # 同一ホストが連続するとワーカーがセマフォ待ちで埋まるため、ホスト間で交互に投入する
+    order = _interleave_by_host(urls)
+    executor = ThreadPoolExecutor(max_workers=min(limits.concurrency, len(urls)), thread_name_prefix="rss-fetch")
+    try:
+        futures = {executor.submit(task, urls[i]): urls[i] for i in order}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                feed_url = futures[fut]
+                try:
+                    results[feed_url] = fut.result()
+                except Exception as e:
+                    logging.getLogger(__name__).warning("RSS取得失敗: %s (%s)", feed_url, e)
+        if pending:
+            logging.getLogger(__name__).warning(
+                "RSS取得が締め切り（%.1fs）を超過: %s件を待たずに続行します", limits.deadline_sec, len(pending)
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+async def afetch_feeds_concurrently(
+    feed_urls: list[str],
+    *,
+    fetch_xml: Callable[..., Awaitable[str]] = afetch_feed_xml,
+    limits: FeedFetchLimits | None = None,
+) -> list[FeedItem]:
+    """fetch_feeds_concurrently の asyncio 版（上限/締め切りの意味は同じ）。"""
+    by_feed = await afetch_feeds_by_url(feed_urls, fetch_xml=fetch_xml, limits=limits)
+    items: list[FeedItem] = []
+    for feed_url in _dedupe_preserve_order(list(feed_urls)):
+        items.extend(by_feed.get(feed_url, []))
+    return items
+
+
+async def afetch_feeds_by_url(
+    feed_urls: list[str],
+    *,
+    fetch_xml: Callable[..., Awaitable[str]] = afetch_feed_xml,
+    limits: FeedFetchLimits | None = None,
+) -> dict[str, list[FeedItem]]:
+    """fetch_feeds_by_url の asyncio 版（取得できたフィードだけを {feed_url: items} で返す）。"""
+    limits = limits or FeedFetchLimits.from_env()
+    urls = _dedupe_preserve_order(list(feed_urls))
+    if not urls:
+        return {}
+
+    global_sem = asyncio.Semaphore(limits.concurrency)
+    host_sems: dict[str, asyncio.Semaphore] = {}
+    for u in urls:
+        host_sems.setdefault(_feed_host(u), asyncio.Semaphore(limits.per_host))
+
+    async def task(feed_url: str) -> list[FeedItem]:
+        async with host_sems[_feed_host(feed_url)], global_sem:
+            if fetch_xml is afetch_feed_xml:
+                return await asyncio.to_thread(fetch_feed_items, feed_url, 10)
+            xml = await fetch_xml(feed_url, timeout=10)
+        return parse_feed(xml, feed_url=feed_url)
+
+    tasks = {asyncio.ensure_future(task(urls[i])): i for i in _interleave_by_host(urls)}
+    done, pending = await asyncio.wait(tasks, timeout=limits.deadline_sec)
+    for t in pending:
+        t.cancel()
+    if pending:
+        logging.getLogger(__name__).warning(
+            "RSS取得が締め切り（%.1fs）を超過: %s件を待たずに続行します", limits.deadline_sec, len(pending)
+        )
+
+    results: dict[str, list[FeedItem]] = {}
+    for t in done:
+        feed_url = urls[tasks[t]]
+        try:
+            results[feed_url] = t.result()
+        except Exception as e:
+            logging.getLogger(__name__).warning("RSS取得失敗: %s (%s)", feed_url, e)
+    return results
+
+
+def _feed_host(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except Exception:
+        return ""
+
+
+def _interleave_by_host(urls: list[str]) -> list[int]:
+    """urls のインデックスを、ホストごとのラウンドロビン順に並べ替える。"""
+    by_host: dict[str, list[int]] = {}
+    for i, u in enumerate(urls):
+        by_host.setdefault(_feed_host(u), []).append(i)
+    queues = list(by_host.values())
+    out: list[int] = []
+    depth = 0
+    while len(out) < len(urls):
+        for q in queues:
+            if depth < len(q):
+                out.append(q[depth])
+        depth += 1
+    return out
+
+
+def _env_float(name: str, default: float) -> float:
+    v = (os.getenv(name) or "").strip()
+    try:
+        return float(v) if v else default
+    except Exception:
+        return default
 
 
 def parse_feed(xml_text: str, feed_url: str = "") -> list[FeedItem]:
@@ -119,32 +348,153 @@ def parse_feed(xml_text: str, feed_url: str = "") -> list[FeedItem]:
 
 def rank_items_by_query(items: Iterable[FeedItem], query: str, limit: int = 5) -> list[FeedItem]:
     """
-    タイトル+概要に対して簡易キーワードマッチし、スコア順に上位を返す。
-    - 日本語は空白区切りが効きにくいので、クエリが単語1つの場合は簡易N-gramを併用
-    - スコアは「一致トークンの重み（長いほど重い）」の合計
+    タイトル+概要に対して BM25 で順位付けし、上位を返す（詳細は BM25Index）。
+    呼び出しごとにインデックスを作るので1回きりの検索用。同じ記事集合を繰り返し検索するなら FeedIndex を使う。
+    - 日本語は空白区切りが効きにくいので、CJK部分は2-gramで照合する（_tokenize_query と同じ単位）
+    - クエリのいずれかのトークンを含む記事だけが対象（スコア0の記事は返さない）
+    """
+    return BM25Index(items).search(query, limit=limit)
+
+
+class BM25Index:
+    """
+    FeedItem の BM25 ランキング用インデックス（事前構築した転置インデックスで検索する）。
+
+    - 語: 英数字の単語 + CJKの1文字/2-gram（`_term_list`）
+    - タイトル中の語は title_boost 倍の頻度として数える（フィールド重み付き BM25）
+    - 対象記事: クエリトークン（_tokenize_query）のいずれかについて、その語をすべて含む記事
+    - 上位k件はヒープで選ぶ。同点は追加順（order_key 指定時はその順）
+
+    追加/削除はできるが、スレッドセーフではない（FeedIndex がロックして使う）。
     """
-    q = (query or "").strip()
-    if not q:
-        return []
-    tokens = _tokenize_query(q)
-    if not tokens:
-        return []
 
-    scored: list[tuple[int, FeedItem]] = []
-    for it in items:
-        hay = f"{it.title}\n{it.summary}".lower()
-        hit = 0
-        for t in set(tokens):
-            tl = t.lower()
-            if tl and tl in hay:
-                # 短いトークンはノイズになりやすいので重みを抑える
-                hit += max(1, min(len(tl), 6))
-        if hit > 0:
-            scored.append((hit, it))
+    def __init__(
+        self,
+        items: Iterable[FeedItem] = (),
+        *,
+        k1: float = 1.2,
+        b: float = 0.75,
+        title_boost: float = 2.0,
+    ) -> None:
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.title_boost = float(title_boost)
+        # term -> {doc_id: 重み付き頻度}
+        self._postings: dict[str, dict[int, float]] = {}
+        # doc_id -> (order_key, item, 文書長, 語の一覧)
+        self._docs: dict[int, tuple[Any, FeedItem, float, tuple[str, ...]]] = {}
+        self._total_len = 0.0
+        self._next_id = 0
+        self._norms: dict[int, float] | None = None
+        for it in items:
+            self.add(it)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, item: FeedItem, order_key: Any = None) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        tf: dict[str, float] = {}
+        for t in _term_list(item.title):
+            tf[t] = tf.get(t, 0.0) + self.title_boost
+        for t in _term_list(item.summary):
+            tf[t] = tf.get(t, 0.0) + 1.0
+        doc_len = sum(tf.values())
+        for t, f in tf.items():
+            self._postings.setdefault(t, {})[doc_id] = f
+        self._docs[doc_id] = (doc_id if order_key is None else order_key, item, doc_len, tuple(tf))
+        self._total_len += doc_len
+        self._norms = None
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        _, _, doc_len, terms = doc
+        self._total_len -= doc_len
+        self._norms = None
+        for t in terms:
+            posting = self._postings.get(t)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[t]
+
+    def set_order(self, doc_id: int, order_key: Any) -> None:
+        doc = self._docs.get(doc_id)
+        if doc is not None:
+            self._docs[doc_id] = (order_key,) + doc[1:]
+
+    def search(self, query: str, limit: int = 5) -> list[FeedItem]:
+        q = (query or "").strip()
+        if not q or limit <= 0 or not self._docs:
+            return []
+        tokens = _tokenize_query(q)
+        if not tokens:
+            return []
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = [it for _, it in scored[: max(0, limit)]]
-    return top
+        # 対象記事: いずれかのトークンについて、その語をすべて含む
+        eligible: set[int] = set()
+        query_terms: set[str] = set()
+        for token in set(tokens):
+            terms = _query_terms(token)
+            if not terms:
+                continue
+            query_terms |= terms
+            postings = [self._postings.get(t) for t in terms]
+            if any(p is None for p in postings):
+                continue
+            postings.sort(key=len)
+            ids = set(postings[0])
+            for p in postings[1:]:
+                ids.intersection_update(p)
+                if not ids:
+                    break
+            eligible |= ids
+        if not eligible:
+            return []
+
+        n = len(self._docs)
+        norms = self._length_norms()
+        k1 = self.k1
+        scores: dict[int, float] = dict.fromkeys(eligible, 0.0)
+        for t in query_terms:
+            posting = self._postings.get(t)
+            if not posting:
+                continue
+            df = len(posting)
+            w = math.log(1.0 + (n - df + 0.5) / (df + 0.5)) * (k1 + 1.0)
+            # 対象記事が少なければ記事側から、多ければ posting 側から回す
+            if len(scores) < df:
+                for d in scores:
+                    f = posting.get(d)
+                    if f:
+                        scores[d] += w * f / (f + norms[d])
+            else:
+                for d, f in posting.items():
+                    if d in scores:
+                        scores[d] += w * f / (f + norms[d])
+
+        # 上位k件: まずスコアの閾値をヒープで求め、閾値以上だけを (スコア降順, 追加順) で並べる
+        top_scores = heapq.nlargest(limit, scores.values())
+        threshold = top_scores[-1]
+        docs = self._docs
+        top = sorted(
+            ((sc, d) for d, sc in scores.items() if sc >= threshold),
+            key=lambda x: (-x[0], docs[x[1]][0]),
+        )[:limit]
+        return [docs[d][1] for _, d in top]
+
+    def _length_norms(self) -> dict[int, float]:
+        """文書長による正規化項 k1*(1-b+b*dl/avgdl) を文書ごとに返す（追加/削除までキャッシュ）。"""
+        if self._norms is None:
+            avgdl = (self._total_len / len(self._docs)) or 1.0
+            k1, b = self.k1, self.b
+            self._norms = {d: k1 * (1.0 - b + b * doc[2] / avgdl) for d, doc in self._docs.items()}
+        return self._norms
 
 
 def _tokenize_query(q: str) -> list[str]:
@@ -169,6 +519,35 @@ def _tokenize_query(q: str) -> list[str]:
     return parts
 
 
+_CJK_RUN_RE = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u4e00-\u9fff]+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _term_list(text: str) -> list[str]:
+    """
+    索引用の語を（重複込みで）取り出す。小文字化済み。
+    - CJKの連続部分: 1文字ずつ + 2-gram（_tokenize_query の2-gramと同じ単位）
+    - それ以外: 英数字等の単語（空白/記号で区切る）
+    """
+    t = (text or "").lower()
+    terms: list[str] = []
+    for run in _CJK_RUN_RE.findall(t):
+        terms.extend(run)
+        terms.extend(_bigrams(run, max_ngrams=len(run)))
+    terms.extend(_WORD_RE.findall(_CJK_RUN_RE.sub(" ", t)))
+    return terms
+
+
+def _query_terms(token: str) -> set[str]:
+    """クエリトークンを、インデックス照合に使う語（すべて含む文書が候補）に変換する。"""
+    t = (token or "").lower()
+    terms: set[str] = set()
+    for run in _CJK_RUN_RE.findall(t):
+        terms.update(_bigrams(run, max_ngrams=len(run)) if len(run) >= 2 else [run])
+    terms.update(_WORD_RE.findall(_CJK_RUN_RE.sub(" ", t)))
+    return terms
+
+
 def _has_cjk(text: str) -> bool:
     for ch in text:
         o = ord(ch)
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import ipaddress
 import os
 import re
 import socket
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from http.cookiejar import DefaultCookiePolicy
 from typing import Iterable, Literal
 from urllib.parse import urljoin, urlparse, urlunparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection as urllib3_connection
 
 
 class UrlValidationError(ValueError):
@@ -31,6 +41,10 @@ class FetchResult:
     url: str
     content: bytes
     content_type: str
+    status_code: int = 200
+    # 条件付きGET用のバリデータ（無ければ空文字）
+    etag: str = ""
+    last_modified: str = ""
 
 
 _BLOCKED_V4 = [
@@ -128,9 +142,14 @@ def is_blocked_ip(ip: str) -> bool:
 def resolve_host_ips(hostname: str) -> list[str]:
     """
     ホスト名を解決してIP一覧を返す（DNSリバインディング対策の材料）。
+    結果は TTL 付きでキャッシュし、URL検証と実際の接続で同じIPを使う（解決失敗も短時間キャッシュする）。
     """
     if not hostname:
         return []
+    return _dns_cache.resolve(hostname)
+
+
+def _resolve_host_ips_uncached(hostname: str) -> list[str]:
     out: list[str] = []
     try:
         infos = socket.getaddrinfo(hostname, None)
@@ -152,6 +171,65 @@ def resolve_host_ips(hostname: str) -> list[str]:
     return uniq
 
 
+class _DnsCache:
+    """
+    resolve_host_ips 用の TTL 付きキャッシュ（スレッドセーフ）。
+    - DNS_CACHE_TTL_SEC: 解決結果の保持秒数（既定60、0で無効）
+    - DNS_NEGATIVE_CACHE_TTL_SEC: 解決失敗の保持秒数（既定5）
+    - DNS_CACHE_MAX_ENTRIES: 保持するホスト数（既定1024、古いものから捨てる）
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, tuple[str, ...]]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "negative_hits": 0}
+
+    def resolve(self, hostname: str) -> list[str]:
+        key = hostname.strip().lower().rstrip(".")
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits" if hit[1] else "negative_hits"] += 1
+                return list(hit[1])
+            self._stats["misses"] += 1
+
+        ips = _resolve_host_ips_uncached(hostname)
+
+        ttl = _env_int("DNS_CACHE_TTL_SEC", 60) if ips else _env_int("DNS_NEGATIVE_CACHE_TTL_SEC", 5)
+        if ttl > 0:
+            max_entries = max(1, _env_int("DNS_CACHE_MAX_ENTRIES", 1024))
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, tuple(ips))
+                self._entries.move_to_end(key)
+                while len(self._entries) > max_entries:
+                    self._entries.popitem(last=False)
+        return ips
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._entries)
+            return out
+
+
+_dns_cache = _DnsCache()
+
+
+def clear_dns_cache() -> None:
+    """DNSキャッシュを空にする（テスト/設定変更用）。"""
+    _dns_cache.clear()
+
+
+def get_dns_cache_stats() -> dict:
+    return _dns_cache.stats()
+
+
 def _domain_allowed(host: str, allowlist: Iterable[str]) -> bool:
     """
     ドメイン許可:
@@ -243,9 +321,179 @@ def validate_outbound_url(url: str, *, purpose: Purpose) -> str:
     return urlunparse(p)
 
 
+class _PinnedConnectionMixin:
+    """
+    接続先を resolve_host_ips（URL検証と同じDNSキャッシュ）のIPに固定する。
+    - 検証と接続の間にDNS応答が変わっても（リバインディング）、検証したIPにしか接続しない
+    - 接続直前にも内部/予約IPでないことを確認する（URL_BLOCK_PRIVATE_IPS=1 のとき）
+    - TLS の SNI/証明書検証はホスト名のまま
+    """
+
+    def _new_conn(self):
+        if self.proxy is not None:
+            # HTTP_TRUST_ENV=1 でプロキシ経由にした場合はプロキシへ接続する（宛先の解決はプロキシ側）
+            return super()._new_conn()
+
+        host = self._dns_host
+        ips = resolve_host_ips(host)
+        if not ips:
+            raise NewConnectionError(self, f"Failed to resolve host: {host}")
+        if _env_bool("URL_BLOCK_PRIVATE_IPS", True):
+            for ip in ips:
+                if is_blocked_ip(ip):
+                    raise UrlValidationError(f"危険な宛先（内部/予約IP）へのアクセスは拒否されました: {ip}")
+
+        last_err: OSError | None = None
+        for ip in ips:
+            try:
+                return urllib3_connection.create_connection(
+                    (ip, self.port),
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+            except OSError as e:
+                last_err = e
+        if isinstance(last_err, socket.timeout):
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from last_err
+        raise NewConnectionError(self, f"Failed to establish a new connection: {last_err}") from last_err
+
+
+class _PinnedHTTPConnection(_PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _PinnedHTTPSConnection(_PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _PinnedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PinnedHTTPConnection
+
+
+class _PinnedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PinnedHTTPSConnection
+
+
+class _PinnedHTTPAdapter(HTTPAdapter):
+    """接続をDNSキャッシュの検証済みIPに固定する HTTPAdapter。"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PinnedHTTPConnectionPool,
+            "https": _PinnedHTTPSConnectionPool,
+        }
+
+
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+def _build_http_session() -> requests.Session:
+    """
+    外部HTTPアクセス用の共有セッションを作る（接続プール + keep-alive、接続先IPはURL検証時のものに固定）。
+    - HTTP_POOL_HOSTS: プールを保持するホスト数（既定32）
+    - HTTP_POOL_PER_HOST: ホストごとの同時接続数の上限（既定4）。使い切ったら他の取得が接続を返すまで待つ
+    """
+    sess = requests.Session()
+    # security: 環境変数（HTTP_PROXY/HTTPS_PROXY等）による経路変更を既定で無効化（必要なら運用で有効化）
+    sess.trust_env = _env_bool("HTTP_TRUST_ENV", False)
+    # security: 共有セッションに Cookie を溜めない（取得ごとのジャーで持ち回る）
+    sess.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = _PinnedHTTPAdapter(
+        pool_connections=max(1, _env_int("HTTP_POOL_HOSTS", 32)),
+        pool_maxsize=max(1, _env_int("HTTP_POOL_PER_HOST", 4)),
+        # 既定（pool_block=False）では使い切ったときに上限を超えて接続を開き、返却時に捨てるだけなので上限にならない
+        pool_block=True,
+        max_retries=0,
+    )
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+def _get_http_session() -> requests.Session:
+    """プロセス共通の requests.Session を返す（初回呼び出し時に作成）。"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = _build_http_session()
+        return _http_session
+
+
+def reset_http_session() -> None:
+    """共有セッションを閉じて破棄する（設定変更の反映・テスト用）。次回の取得時に作り直す。"""
+    global _http_session
+    with _http_session_lock:
+        sess, _http_session = _http_session, None
+    if sess is not None:
+        sess.close()
+
+
+def get_http_pool_stats() -> dict:
+    """
+    共有セッションの接続プール統計を返す。
+    - hosts: ホストごとの作成済み接続数 / リクエスト数 / 待機中（再利用可能）の接続数
+    - connections_opened / requests / reused: 上記の合計（reused = requests - connections_opened）
+    """
+    with _http_session_lock:
+        sess = _http_session
+    hosts: dict[str, dict] = {}
+    if sess is not None:
+        seen: set[int] = set()
+        for adapter in sess.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            manager = adapter.poolmanager
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                name = f"{pool.scheme}://{pool.host}:{pool.port}"
+                hosts[name] = {
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    # キューは未使用枠を None で埋めているので、実際の接続だけ数える
+                    "idle": sum(1 for c in list(pool.pool.queue) if c is not None) if pool.pool is not None else 0,
+                }
+    opened = sum(h["connections_opened"] for h in hosts.values())
+    reqs = sum(h["requests"] for h in hosts.values())
+    return {
+        "active": sess is not None,
+        "hosts": hosts,
+        "connections_opened": opened,
+        "requests": reqs,
+        "reused": max(0, reqs - opened),
+    }
+
+
+def _discard_body(res, limit: int = 64 * 1024) -> None:
+    """
+    小さな本文（リダイレクト/304/エラー応答）を読み捨ててから閉じる。
+    読み切った接続はプールに戻り再利用される（上限を超える場合は接続ごと閉じる）。
+    """
+    try:
+        read = 0
+        for chunk in res.iter_content(chunk_size=16 * 1024):
+            read += len(chunk or b"")
+            if read > limit:
+                break
+    except Exception:
+        pass
+    finally:
+        res.close()
+
+
 def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None) -> FetchResult:
     """
     検証済みURLに対して外部HTTPアクセスを行い、サイズ上限・リダイレクト制御を適用して bytes を返す。
+
+    headers に If-None-Match / If-Modified-Since を渡した場合、304 は例外にせず
+    status_code=304・content=b"" の FetchResult を返す（本文は呼び出し側のキャッシュを使う）。
     """
     # 検証
     current = validate_outbound_url(url, purpose=purpose)
@@ -267,9 +515,9 @@ def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None)
     else:
         allowed_ct_prefixes = ("application/rss", "application/atom", "application/xml", "text/xml", "text/plain")
 
-    sess = requests.Session()
-    # security: 環境変数（HTTP_PROXY/HTTPS_PROXY等）による経路変更を既定で無効化（必要なら運用で有効化）
-    sess.trust_env = _env_bool("HTTP_TRUST_ENV", False)
+    # 接続はプロセス共通のプール（keep-alive）を使う。Cookie はこの取得（リダイレクト追跡中）だけで持ち回る
+    sess = _get_http_session()
+    cookies = requests.cookies.RequestsCookieJar()
     hdrs = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
     if headers:
         hdrs.update(headers)
@@ -277,12 +525,15 @@ def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None)
     redirects = 0
     while True:
         try:
-            res = sess.get(current, headers=hdrs, timeout=timeout, stream=True, allow_redirects=False)
+            res = sess.get(
+                current, headers=hdrs, cookies=cookies, timeout=timeout, stream=True, allow_redirects=False
+            )
         except requests.exceptions.RequestException as e:
             raise OutboundHttpError(f"外部HTTPアクセスに失敗しました: {e}")
 
         # リダイレクト
         if res.status_code in (301, 302, 303, 307, 308):
+            _discard_body(res)
             if not allow_redirects:
                 raise OutboundHttpError(f"リダイレクトは禁止されています（{res.status_code}）。")
             if redirects >= max_redirects:
@@ -292,16 +543,30 @@ def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None)
                 raise OutboundHttpError("リダイレクト先が不明です。")
             nxt = urljoin(current, loc)
             current = validate_outbound_url(nxt, purpose=purpose)
+            cookies.update(getattr(res, "cookies", None) or {})
             redirects += 1
             continue
 
+        if res.status_code == 304:
+            _discard_body(res)
+            return FetchResult(
+                url=current,
+                content=b"",
+                content_type="",
+                status_code=304,
+                etag=res.headers.get("ETag") or "",
+                last_modified=res.headers.get("Last-Modified") or "",
+            )
+
         try:
             res.raise_for_status()
         except requests.exceptions.RequestException as e:
+            _discard_body(res)
             raise OutboundHttpError(f"HTTPエラー: {e}")
 
         ct = (res.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
         if ct and not ct.startswith(allowed_ct_prefixes):
+            res.close()
             raise OutboundHttpError(f"想定外のContent-Typeです: {ct}")
 
         cl = res.headers.get("Content-Length")
@@ -310,6 +575,7 @@ def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None)
                 if int(cl) > max_bytes:
                     raise ResponseTooLargeError("レスポンスがサイズ上限を超えています。")
             except ResponseTooLargeError:
+                res.close()
                 raise
             except Exception:
                 # Content-Length が数値でない場合はストリーム上限で制御する
@@ -326,6 +592,21 @@ def fetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None)
         finally:
             res.close()
 
-        return FetchResult(url=current, content=bytes(buf), content_type=ct)
+        return FetchResult(
+            url=current,
+            content=bytes(buf),
+            content_type=ct,
+            status_code=res.status_code,
+            etag=res.headers.get("ETag") or "",
+            last_modified=res.headers.get("Last-Modified") or "",
+        )
+
 
+async def afetch_url_bytes(url: str, *, purpose: Purpose, headers: dict | None = None) -> FetchResult:
+    """
+    fetch_url_bytes の asyncio 版。
 
+    SSRF対策（URL検証・リダイレクト検証・サイズ上限）を二重実装しないため、
+    同期版をワーカースレッドで実行し、イベントループはブロックしない。
+    """
+    return await asyncio.to_thread(fetch_url_bytes, url, purpose=purpose, headers=headers)
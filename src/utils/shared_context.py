@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+
+from langchain_core.prompts import ChatPromptTemplate
+
+# SHARED_CONTEXT_PROMPTS=1 のとき、全フェーズのプロンプトを
+#   [system: 共通の前置き + 記事本文] [human: 役割ごとの指示 + 役割ごとの入力]
+# の並びにする（既定はオフ。各エージェント従来のプロンプトを使う）。
+# 先頭の system メッセージが全フェーズでバイト単位まで同じになるため、Ollama は前回の呼び出しの
+# KV キャッシュを再利用でき、記事本文の prefill をフェーズごとにやり直さずに済む。
+
+# 共通の先頭部分に入れる記事本文の上限（超えた分は先頭+末尾を残して中略。全フェーズで同じ結果になる）
+SHARED_CONTEXT_MAX_CHARS = 8000
+
+SHARED_CONTEXT_PREAMBLE = """あなたはニュース記事を多角的に検討するチーム（楽観的アナリスト・悲観的アナリスト・ファクトチェッカー・レポーター）の一員です。
+全員が下の同じ記事を読み、最後のメッセージで与えられる役割と指示に従って出力します。
+記事に書かれていない事実を作らないでください。
+
+記事:
+{shared_article}"""
+
+
+def shared_context_enabled() -> bool:
+    return os.getenv("SHARED_CONTEXT_PROMPTS", "0") == "1"
+
+
+def shared_article_text(article_text: str | None) -> str:
+    """
+    共通の先頭部分に入れる記事本文。
+
+    どのエージェントが呼んでも同じ文字列になるよう、前後の空白を除いて SHARED_CONTEXT_MAX_CHARS で切り詰めるだけにする
+    （エージェントごとのヘッダ除去や引用候補の抽出は、後ろの役割ごとの入力で行う）。
+    """
+    text = (article_text or "").strip()
+    if len(text) <= SHARED_CONTEXT_MAX_CHARS:
+        return text
+    head = text[: SHARED_CONTEXT_MAX_CHARS // 2]
+    tail = text[-(SHARED_CONTEXT_MAX_CHARS // 2) :]
+    return head + "\n\n...(中略)...\n\n" + tail
+
+
+def shared_context_prompt(prompt: ChatPromptTemplate, human: str | None = None) -> ChatPromptTemplate:
+    """
+    [system, human] の2メッセージのプロンプト prompt を共通の先頭部分から始まる並びにしたもの。
+
+    prompt の system（役割の指示）と human を、共通の先頭部分（SHARED_CONTEXT_PREAMBLE）の後ろの1つの human にまとめる。
+    human を渡すと prompt の human の代わりに使う（記事本文を含む human は、本文を除いたものに差し替える）。
+    記事本文は入力 shared_article（shared_article_text の値）で渡す。
+    """
+    system, original = (m.prompt.template for m in prompt.messages)
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", SHARED_CONTEXT_PREAMBLE),
+            ("human", f"{system}\n\n{original if human is None else human}"),
+        ]
+    )
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.utils.json import parse_json_markdown
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+from pydantic import BaseModel, ValidationError
+
+from src.utils.llm_router import is_backend_failure
+from src.utils.model_capabilities import STRATEGIES, get_model_capabilities, model_key
+
+# Ollama が format（JSON スキーマ）や tools を受け付けなかったときの ResponseError の本文に含まれる語
+_REJECTION_HINTS = ("format", "schema", "json", "tool")
+
+# STRUCTURED_OUTPUT_MODE
+# - json_schema（既定）: Ollama の format に Pydantic の JSON スキーマを渡して出力を制約し、手元で検証/修復する。
+#   モデルごとの成功率（src.utils.model_capabilities）を見て、json_mode / tool_calling の方が通るモデルではそちらを使う
+# - langchain: 従来どおり model.with_structured_output(schema) に任せる
+#   （langchain-ollama の版によっては format ではなく tool 呼び出しになり、tool 非対応のモデルでは毎回フォールバックする）
+STRUCTURED_OUTPUT_MODES = ("json_schema", "langchain")
+
+
+class StructuredOutputError(ValueError):
+    """LLM の出力を schema として復元できなかった（呼び出し側は JSON フォールバック等へ進む）"""
+
+
+class _Stats:
+    """schema ごとの検証結果の件数（fallback_rate = 検証に失敗してフォールバックへ回った割合）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_schema: dict[str, dict[str, int]] = {}
+
+    def add(self, schema: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._by_schema.setdefault(schema, {"calls": 0, "repaired": 0, "failed": 0})
+            counts["calls"] += 1
+            if outcome != "ok":
+                counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by_schema = {name: dict(c, fallback_rate=_rate(c)) for name, c in self._by_schema.items()}
+        total = {k: sum(c[k] for c in by_schema.values()) for k in ("calls", "repaired", "failed")}
+        return {**total, "fallback_rate": _rate(total), "by_schema": by_schema}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_schema.clear()
+
+
+def _rate(counts: dict) -> float:
+    return round(counts["failed"] / counts["calls"], 4) if counts["calls"] else 0.0
+
+
+_stats = _Stats()
+
+
+def get_structured_output_stats() -> dict:
+    """プロセス内の構造化出力の検証結果（calls / repaired / failed / fallback_rate と schema 別の内訳）"""
+    return _stats.snapshot()
+
+
+def clear_structured_output_stats() -> None:
+    _stats.reset()
+
+
+def structured_output_mode() -> str:
+    mode = (os.getenv("STRUCTURED_OUTPUT_MODE") or "json_schema").strip().lower()
+    return mode if mode in STRUCTURED_OUTPUT_MODES else "json_schema"
+
+
+def constrained_strategy(model: BaseChatModel) -> str | None:
+    """
+    constrained_model が使う戦略（Ollama 以外は None）。
+    そのモデルで JSON スキーマの制約より format="json" の方が通っている場合は "json_mode"、それ以外は "json_schema"。
+    """
+    if not isinstance(model, ChatOllama):
+        return None
+    capabilities, key = get_model_capabilities(), model_key(model)
+    if capabilities.estimate(key, "json_mode") > capabilities.estimate(key, "json_schema"):
+        return "json_mode"
+    return "json_schema"
+
+
+def constrained_model(model: BaseChatModel, schema: type[BaseModel], strategy: str | None = None):
+    """
+    Ollama なら schema の JSON スキーマを format に渡して出力を制約する（それ以外のモデルはそのまま）。
+    strategy を省略すると constrained_strategy で選ぶ（"json_mode" なら format="json"）。
+    """
+    strategy = strategy or constrained_strategy(model)
+    if strategy == "json_mode":
+        return model.bind(format="json")
+    if strategy == "json_schema":
+        return model.bind(format=schema.model_json_schema())
+    return model
+
+
+def parse_structured(text: str, schema: type[BaseModel]) -> BaseModel:
+    """
+    LLM の出力テキストを schema として検証する。
+
+    - まずそのまま JSON として読む（format で制約した出力は通常ここで通る）
+    - 読めなければコードフェンスを外し、途中で切れた JSON（num_predict 到達など）を閉じて読み直す
+    Raises:
+        StructuredOutputError: どちらでも schema に合う値にならなかった
+    """
+    name = schema.__name__
+    try:
+        value = schema.model_validate(json.loads(text))
+        _stats.add(name, "ok")
+        return value
+    except (json.JSONDecodeError, ValidationError):
+        pass
+    try:
+        value = schema.model_validate(parse_json_markdown(text))
+    except (json.JSONDecodeError, ValidationError, TypeError, ValueError) as e:
+        _stats.add(name, "failed")
+        raise StructuredOutputError(f"{name} として復元できません: {e}") from e
+    _stats.add(name, "repaired")
+    logging.getLogger(__name__).info("%s: 不完全なJSONを修復して検証しました", name)
+    return value
+
+
+def parse_and_record(text: str, schema: type[BaseModel], model: BaseChatModel, strategy: str | None) -> BaseModel:
+    """
+    parse_structured の結果を、strategy（constrained_strategy の値）の成否として ModelCapabilities に記録する。
+    strategy が None（Ollama 以外）なら記録しない。
+    """
+    try:
+        value = parse_structured(text, schema)
+    except StructuredOutputError:
+        if strategy is not None:
+            get_model_capabilities().record(model_key(model), strategy, False)
+        raise
+    if strategy is not None:
+        get_model_capabilities().record(model_key(model), strategy, True)
+    return value
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", message)
+    return content if isinstance(content, str) else str(content)
+
+
+def _is_capability_failure(e: BaseException) -> bool:
+    """
+    モデルがその形式を扱えなかった失敗か。
+    接続エラー/タイムアウト/5xx/モデル未取得(404)（is_backend_failure）はモデルの能力と無関係なので数えない。
+    ResponseError は、format/スキーマ/tools を受け付けなかった 4xx だけを数える。
+    """
+    if isinstance(e, ResponseError):
+        if is_backend_failure(e) or not 400 <= e.status_code < 500 or e.status_code == 429:
+            return False
+        return any(hint in str(e.error).lower() for hint in _REJECTION_HINTS)
+    return isinstance(e, (StructuredOutputError, OutputParserException, ValidationError, NotImplementedError))
+
+
+def _strategy_runnable(model: ChatOllama, schema: type[BaseModel], strategy: str) -> Runnable:
+    parse = RunnableLambda(lambda message: parse_structured(_message_text(message), schema), name=f"parse_{schema.__name__}")
+    if strategy == "json_schema":
+        return constrained_model(model, schema, strategy) | parse
+    if strategy == "json_mode":
+        return model.bind(format="json") | parse
+    return model.with_structured_output(schema, method="function_calling") | RunnableLambda(
+        lambda value: _require_instance(value, schema), name=f"require_{schema.__name__}"
+    )
+
+
+def _require_instance(value: Any, schema: type[BaseModel]) -> BaseModel:
+    # tool を呼ばずに本文で答えたモデルでは PydanticToolsParser が None を返す
+    if not isinstance(value, schema):
+        raise StructuredOutputError(f"{schema.__name__} の tool 呼び出しがありませんでした")
+    return value
+
+
+def _adaptive_runnable(model: ChatOllama, schema: type[BaseModel]) -> Runnable:
+    """呼び出しのたびにモデルの戦略を選び、結果を ModelCapabilities に記録する"""
+    capabilities = get_model_capabilities()
+    key = model_key(model)
+
+    def choose() -> str:
+        strategy = capabilities.choose(key)
+        if strategy is None:
+            raise StructuredOutputError(f"{key}: 構造化出力が見込めないため LLM を呼ばずに省略しました")
+        return strategy
+
+    def run(value, config):
+        if capabilities.needs_probe(key):
+            probe_model_capabilities(model)
+        strategy = choose()
+        try:
+            result = _strategy_runnable(model, schema, strategy).invoke(value, config=config)
+        except Exception as e:
+            if _is_capability_failure(e):
+                capabilities.record(key, strategy, False)
+            raise
+        capabilities.record(key, strategy, True)
+        return result
+
+    async def arun(value, config):
+        if capabilities.needs_probe(key):
+            await asyncio.to_thread(probe_model_capabilities, model)
+        strategy = choose()
+        try:
+            result = await _strategy_runnable(model, schema, strategy).ainvoke(value, config=config)
+        except Exception as e:
+            if _is_capability_failure(e):
+                capabilities.record(key, strategy, False)
+            raise
+        capabilities.record(key, strategy, True)
+        return result
+
+    return RunnableLambda(run, afunc=arun, name=f"structured_{schema.__name__}")
+
+
+class _ProbeResult(BaseModel):
+    ok: bool
+    label: str
+
+
+_PROBE_PROMPT = ChatPromptTemplate.from_messages(
+    [("human", '次のJSONだけを出力してください: {{"ok": true, "label": "テスト"}}')]
+)
+
+
+def probe_model_capabilities(model: BaseChatModel) -> dict[str, bool]:
+    """各戦略で短いプロンプトを1回ずつ試し、結果を ModelCapabilities に記録する（{戦略: 成功したか}）"""
+    capabilities = get_model_capabilities()
+    key = model_key(model)
+    results: dict[str, bool] = {}
+    for strategy in STRATEGIES:
+        try:
+            (_PROBE_PROMPT | _strategy_runnable(model, _ProbeResult, strategy)).invoke({})
+            ok = True
+        except Exception as e:
+            if not _is_capability_failure(e):
+                logging.getLogger(__name__).warning("%s: probe を中断しました（%s）", key, e)
+                break
+            ok = False
+        capabilities.record(key, strategy, ok)
+        results[strategy] = ok
+    logging.getLogger(__name__).info("%s: 構造化出力の probe 結果 %s", key, results)
+    return results
+
+
+def structured_chain(prompt, model: BaseChatModel, schema: type[BaseModel]) -> Runnable:
+    """
+    prompt | model の出力を schema として返すチェーン（with_structured_output の代わりに使う）。
+
+    json_schema モードかつ Ollama のときは、モデルごとに成功率の高い戦略（既定は format で制約し parse_structured で
+    手元で検証する json_schema）を1つ選んで1回だけ呼ぶ。どの戦略も失敗続きのモデルでは LLM を呼ばずに
+    StructuredOutputError を送出する（呼び出し側の JSON フォールバックへ直行する）。それ以外は with_structured_output。
+    """
+    if structured_output_mode() == "json_schema" and isinstance(model, ChatOllama):
+        return prompt | _adaptive_runnable(model, schema)
+    return prompt | model.with_structured_output(schema)
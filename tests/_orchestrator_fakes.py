@@ -0,0 +1,136 @@
+"""オーケストレーターのテストで使う、LLM を呼ばないエージェントのスタブ"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from langchain_core.language_models import FakeListChatModel
+
+from src.core.orchestrator import OrchestrationAgent
+from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+from src.utils.llm_metrics import llm_config
+from src.utils.testing_models import AlwaysFailChatModel
+
+ARTICLE_TEXT = "[source] https://example.com/news\n[title] テスト\n\n政府は2025年12月に新制度を発表した。"
+
+
+class StaticResearcher:
+    """article を返す（gate を渡すと、それが set されるまで待ってから返す）"""
+
+    def __init__(self, article: str = ARTICLE_TEXT, gate: Optional[threading.Event] = None):
+        self.article = article
+        self.gate = gate
+        self.calls = 0
+
+    def run(self, topic: str) -> str:
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.article
+
+
+class StubAnalyst:
+    """label を結論/反論にして返す（delay 秒待つ。async 版は asyncio.sleep で待つ）"""
+
+    def __init__(self, label: str, delay: float = 0.0):
+        self.label = label
+        self.delay = delay
+        self.calls = 0
+        self.debates = 0
+
+    def analyze(self, article_text: str, **kwargs) -> Argument:
+        self.calls += 1
+        time.sleep(self.delay)
+        return Argument(conclusion=self.label, evidence=[])
+
+    def debate(self, critique, opponent_argument, original_argument, article_text=None, **kwargs) -> Rebuttal:
+        self.calls += 1
+        self.debates += 1
+        time.sleep(self.delay)
+        return Rebuttal(counter_points=[self.label], strengthened_evidence=[])
+
+    async def aanalyze(self, article_text: str, **kwargs) -> Argument:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Argument(conclusion=self.label, evidence=[])
+
+    async def adebate(self, critique, opponent_argument, original_argument, article_text=None, **kwargs) -> Rebuttal:
+        self.calls += 1
+        self.debates += 1
+        await asyncio.sleep(self.delay)
+        return Rebuttal(counter_points=[self.label], strengthened_evidence=[])
+
+
+class RescuedAnalyst(StubAnalyst):
+    """最初の LLM 呼び出しが失敗し、JSON フォールバックの呼び出しで値を作れたアナリスト"""
+
+    def analyze(self, article_text: str, **kwargs) -> Argument:
+        try:
+            AlwaysFailChatModel().invoke("分析", config=llm_config("analyze"))
+        except RuntimeError:
+            pass
+        FakeListChatModel(responses=[self.label]).invoke("分析", config=llm_config("analyze", "json_fallback"))
+        return super().analyze(article_text, **kwargs)
+
+    # 同期版と同じ経路を通す
+    aanalyze = None
+
+
+class StubChecker:
+    def __init__(self, bias_points: tuple[str, ...] = ("偏り",)):
+        self.bias_points = bias_points
+        self.calls = 0
+
+    def validate(self, optimistic_argument, pessimistic_argument, article_text) -> Critique:
+        self.calls += 1
+        return Critique(bias_points=list(self.bias_points), factual_errors=[])
+
+
+class StubReporter:
+    """
+    レポートを返し、呼び出し回数と最後の kwargs を記録する。
+    最初の fail_times 回と、article_url に fail_for を含む呼び出しは RuntimeError("reporter crashed")。
+    """
+
+    def __init__(self, fail_times: int = 0, fail_for: Optional[str] = None):
+        self.fail_times = fail_times
+        self.fail_for = fail_for
+        self.calls = 0
+        self.kwargs = None
+
+    def create_report(self, optimistic_argument, pessimistic_argument, critique, **kwargs) -> FinalReport:
+        self.calls += 1
+        self.kwargs = kwargs
+        if self.calls <= self.fail_times or (self.fail_for and self.fail_for in (kwargs.get("article_url") or "")):
+            raise RuntimeError("reporter crashed")
+        return FinalReport(
+            article_info="テスト",
+            optimistic_view=optimistic_argument,
+            pessimistic_view=pessimistic_argument,
+            critique_points=list(critique.bias_points),
+            final_conclusion="結論",
+        )
+
+
+def build_orchestrator(
+    researcher=None, *, optimist=None, pessimist=None, checker=None, reporter=None, **kwargs
+) -> OrchestrationAgent:
+    """
+    LLM を AlwaysFailChatModel にし、各エージェントをスタブ（未指定なら既定のスタブ）に差し替えたオーケストレーター。
+    kwargs は OrchestrationAgent にそのまま渡す（checkpoint_store / result_cache の既定は False）。
+    """
+    failing = AlwaysFailChatModel()
+    kwargs.setdefault("checkpoint_store", False)
+    kwargs.setdefault("result_cache", False)
+    orch = OrchestrationAgent(
+        llm=failing,
+        llm_fact_checker=failing,
+        researcher_agent=researcher or StaticResearcher(),
+        **kwargs,
+    )
+    orch.optimist = optimist or StubAnalyst("opt")
+    orch.pessimist = pessimist or StubAnalyst("pes")
+    orch.checker = checker or StubChecker()
+    orch.reporter = reporter or StubReporter()
+    return orch
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import unittest
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agents.fact_checker import FactCheckerAgent
+from src.agents.reporter import ReporterAgent
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.models.schemas import Argument, Critique, Rebuttal
+from src.utils.testing_models import AlwaysFailChatModel
+from tests._orchestrator_fakes import StaticResearcher
+
+
+class FixedResponseChatModel(BaseChatModel):
+    """決め打ちの文字列を返すテスト用ChatModel（同期/非同期どちらからも呼べる）"""
+
+    def __init__(self, content: str):
+        super().__init__()
+        self._content = content
+
+    @property
+    def _llm_type(self) -> str:
+        return "fixed_response_chat_model"
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._content))])
+
+
+class AsyncSleepAnalyst:
+    """await asyncio.sleep で待つだけの非同期スタブ（スレッドを使わないことの確認用）"""
+
+    def __init__(self, label: str, delay: float):
+        self.label = label
+        self.delay = delay
+
+    async def aanalyze(self, article_text: str) -> Argument:
+        await asyncio.sleep(self.delay)
+        return Argument(conclusion=self.label, evidence=[])
+
+    async def adebate(self, critique, opponent_argument, original_argument, article_text=None) -> Rebuttal:
+        await asyncio.sleep(self.delay)
+        return Rebuttal(counter_points=[self.label], strengthened_evidence=[])
+
+
+class TestAsyncApi(unittest.TestCase):
+    def test_avalidate_matches_validate(self):
+        content = '{"bias_points": ["楽観的アナリスト: 偏り", "楽観的アナリスト: 偏り"], "factual_errors": ["悲観的アナリスト: 誤り"]}'
+        agent = FactCheckerAgent(FixedResponseChatModel(content))
+        args = (
+            Argument(conclusion="A", evidence=["x"]),
+            Argument(conclusion="B", evidence=["y"]),
+            "元記事テキスト",
+        )
+
+        sync_result = agent.validate(*args)
+        async_result = asyncio.run(agent.avalidate(*args))
+
+        self.assertEqual(async_result, sync_result)
+        self.assertEqual(async_result.bias_points, ["楽観的アナリスト: 偏り"])
+
+    def test_acreate_report_falls_back_like_sync(self):
+        agent = ReporterAgent(AlwaysFailChatModel())
+        kwargs = dict(
+            article_text="[title] テスト記事\n\n政府は2025年12月に新制度を発表した。施行日は2026年4月1日で、移行期間は6カ月とされる。",
+            optimistic_argument=Argument(conclusion="機会", evidence=[]),
+            pessimistic_argument=Argument(conclusion="リスク", evidence=[]),
+            critique=Critique(bias_points=["偏り"], factual_errors=[]),
+            optimistic_rebuttal=Rebuttal(counter_points=[], strengthened_evidence=[]),
+            pessimistic_rebuttal=Rebuttal(counter_points=[], strengthened_evidence=[]),
+        )
+
+        self.assertEqual(asyncio.run(agent.acreate_report(**kwargs)), agent.create_report(**kwargs))
+
+    def test_ainvoke_completes_with_failing_model(self):
+        failing = AlwaysFailChatModel()
+        orch = OrchestrationAgent(llm=failing, llm_fact_checker=failing, researcher_agent=StaticResearcher())
+
+        result = asyncio.run(orch.ainvoke({"topic": "https://example.com/news", "messages": [], "request_id": "t-async"}))
+
+        for key in [
+            "optimistic_argument",
+            "pessimistic_argument",
+            "critique",
+            "optimistic_rebuttal",
+            "pessimistic_rebuttal",
+            "final_report",
+        ]:
+            self.assertIn(key, result)
+        self.assertTrue(result["final_report"].final_conclusion)
+
+    def test_many_debates_share_one_event_loop(self):
+        failing = AlwaysFailChatModel()
+        orch = OrchestrationAgent(
+            llm=failing,
+            llm_fact_checker=failing,
+            researcher_agent=StaticResearcher(),
+            options=OrchestrationOptions(parallel_phases=True),
+        )
+        orch.optimist = AsyncSleepAnalyst("opt", 0.1)
+        orch.pessimist = AsyncSleepAnalyst("pes", 0.1)
+
+        async def run_all():
+            return await asyncio.gather(
+                *[orch.ainvoke({"topic": "https://example.com/news", "request_id": f"t-{i}"}) for i in range(10)]
+            )
+
+        started = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - started
+
+        # 10討論 x (分析0.1s + 反論0.1s) を逐次に積み上げると2秒。並行に待機できていれば大幅に短い。
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual([r["optimistic_rebuttal"].counter_points for r in results], [["opt"]] * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import json
+import threading
+import time
+import unittest
+
+import main
+from src.core.orchestrator import OrchestrationAgent
+from tests._orchestrator_fakes import StubReporter, build_orchestrator
+
+
+class DelayResearcher:
+    """トピック "sleep:<秒>" はその秒数待ち、"crash" は例外を送出する。同時実行数の最大値を記録する"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def run(self, topic: str) -> str:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if topic.startswith("sleep:"):
+                time.sleep(float(topic.split(":", 1)[1]))
+            return f"[source] https://example.com/{topic}\n[title] テスト\n\n{topic} の記事本文。"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _build() -> OrchestrationAgent:
+    return build_orchestrator(DelayResearcher(), reporter=StubReporter(fail_for="crash"))
+
+
+class TestInvokeMany(unittest.TestCase):
+    def test_results_arrive_in_completion_order_with_bounded_concurrency(self):
+        orch = _build()
+        topics = ["sleep:0.3", "sleep:0.01", "sleep:0.1", "sleep:0.02", "sleep:0.05"]
+        results = list(orch.invoke_many(topics, max_concurrency=2))
+
+        self.assertEqual(sorted(r.index for r in results), [0, 1, 2, 3, 4])
+        self.assertEqual(results[0].index, 1)
+        self.assertEqual(results[-1].index, 0)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLessEqual(orch.researcher.max_active, 2)
+        self.assertEqual(len({r.state["request_id"] for r in results}), 5)
+
+    def test_errors_are_isolated_per_item(self):
+        orch = _build()
+
+        def crash_stream(initial_state, on_token=None, *, bypass_cache=False):
+            if initial_state["topic"] == "boom":
+                raise ValueError("broken input")
+            return original(initial_state, on_token, bypass_cache=bypass_cache)
+
+        original = orch.stream
+        orch.stream = crash_stream
+        results = {r.topic: r for r in orch.invoke_many(["a", "boom", "crash"], max_concurrency=3)}
+
+        self.assertTrue(results["a"].ok)
+        self.assertEqual(results["boom"].error, "ValueError: broken input")
+        self.assertIsNone(results["boom"].state)
+        # フェーズ単位のフォールバックは実行を止めず phase_errors に記録する
+        self.assertTrue(results["crash"].ok)
+        self.assertEqual(results["crash"].phase_errors, {"final_report": "reporter crashed"})
+
+    def test_topics_are_consumed_lazily(self):
+        orch = _build()
+        consumed = []
+
+        def topics():
+            for i in range(100):
+                consumed.append(i)
+                yield f"t{i}"
+
+        results = orch.invoke_many(topics(), max_concurrency=2)
+        next(results)
+        results.close()
+        self.assertLess(len(consumed), 10)
+
+
+class TestBatchCli(unittest.TestCase):
+    def test_read_topics_skips_blank_and_comment_lines(self):
+        src = io.StringIO("# morning feed\nhttps://example.com/a\n\n  経済  \n")
+        self.assertEqual(list(main.read_topics(src)), ["https://example.com/a", "経済"])
+
+    def test_result_record_is_json_serializable(self):
+        orch = _build()
+        result = next(orch.invoke_many(["a"]))
+        record = json.loads(json.dumps(main.result_record(result), ensure_ascii=False))
+        self.assertEqual(record["topic"], "a")
+        self.assertTrue(record["ok"])
+        self.assertEqual(record["final_report"]["final_conclusion"], "結論")
+        self.assertNotIn("article_text", record)
+
+    def test_parse_args(self):
+        args = main.parse_args(["--batch", "-", "-j", "8", "--no-cache"])
+        self.assertEqual((args.batch, args.concurrency, args.no_cache, args.output), ("-", 8, True, "-"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from src.agents.reporter import ReporterAgent
+from src.core.orchestrator import OrchestrationAgent
+from src.core.result_cache import DebateResultCache
+from src.models.schemas import Argument, Critique, FinalReport, Rebuttal
+from src.utils.deadline import Deadline
+from src.utils.testing_models import AlwaysFailChatModel
+from tests._orchestrator_fakes import StaticResearcher, build_orchestrator
+
+ARTICLE = "\n".join(
+    [
+        "[source] https://example.com/news",
+        "[title] テスト記事タイトル",
+        "",
+        "政府は2025年12月に新制度を発表した。対象は全国の事業者。",
+        "施行日は2026年4月1日で、移行期間は6カ月とされる。",
+    ]
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _build(reporter=None, result_cache=False) -> OrchestrationAgent:
+    return build_orchestrator(StaticResearcher(ARTICLE), reporter=reporter, result_cache=result_cache)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_budget_and_remaining_follow_the_clock(self):
+        clock = FakeClock()
+        deadline = Deadline(100, clock=clock)
+        self.assertAlmostEqual(deadline.budget_for("rebuttal", "report"), 45.0)
+        self.assertTrue(deadline.allows(45.0))
+
+        clock.now += 60
+        self.assertAlmostEqual(deadline.remaining(), 40.0)
+        self.assertFalse(deadline.allows(45.0))
+        clock.now += 50
+        self.assertTrue(deadline.expired)
+        self.assertFalse(deadline.allows(0.0))
+
+    def test_coerce_and_skip(self):
+        self.assertIsNone(Deadline.coerce(None))
+        deadline = Deadline.coerce(5)
+        self.assertIs(Deadline.coerce(deadline), deadline)
+        deadline.skip("a")
+        deadline.skip("a")
+        self.assertEqual(deadline.skipped, ["a"])
+
+
+class TestReporterDeadline(unittest.TestCase):
+    def test_expired_deadline_uses_deterministic_report_without_llm(self):
+        agent = ReporterAgent(AlwaysFailChatModel())
+        deadline = Deadline(0)
+        with patch.object(AlwaysFailChatModel, "_generate", side_effect=RuntimeError("called")) as generate:
+            report = agent.create_report(
+                article_text=ARTICLE,
+                optimistic_argument=Argument(conclusion="機会がある", evidence=["2026年4月1日に施行"]),
+                pessimistic_argument=Argument(conclusion="リスクがある", evidence=["移行期間が6カ月"]),
+                critique=Critique(bias_points=["楽観的アナリスト: 良い面に寄りすぎ"], factual_errors=[]),
+                optimistic_rebuttal=Rebuttal(counter_points=[], strengthened_evidence=[]),
+                pessimistic_rebuttal=Rebuttal(counter_points=[], strengthened_evidence=[]),
+                deadline=deadline,
+            )
+        self.assertEqual(generate.call_count, 0)
+        self.assertIn("report:llm", deadline.skipped)
+        self.assertIn("要約:", report.article_info)
+        self.assertIn("確実度が高い点", report.final_conclusion)
+
+
+class TestOrchestratorDeadline(unittest.TestCase):
+    def test_rebuttals_are_skipped_when_time_is_short(self):
+        orch = _build()
+        events = list(orch.stream({"topic": "x", "request_id": "r1"}, deadline=Deadline(0)))
+
+        skipped = {ev.key: ev for ev in events if ev.phase == "rebuttal"}
+        self.assertEqual(set(skipped), {"optimistic_rebuttal", "pessimistic_rebuttal"})
+        self.assertTrue(all(ev.error for ev in skipped.values()))
+        self.assertEqual(orch.optimist.debates + orch.pessimist.debates, 0)
+
+        state = events[-1].state
+        self.assertEqual(state["optimistic_rebuttal"], Rebuttal(counter_points=[], strengthened_evidence=[]))
+        self.assertEqual(state["degraded"], ["optimistic_rebuttal", "pessimistic_rebuttal"])
+        self.assertIsInstance(orch.reporter.kwargs["deadline"], Deadline)
+
+    def test_generous_deadline_changes_nothing(self):
+        orch = _build()
+        state = orch.invoke({"topic": "x"}, deadline=600)
+        self.assertNotIn("degraded", state)
+        self.assertEqual(orch.optimist.debates, 1)
+
+    def test_degraded_report_is_flagged_and_not_cached(self):
+        cache = DebateResultCache(None)
+        orch = _build(ReporterAgent(AlwaysFailChatModel()), cache)
+        events = list(orch.stream({"topic": "x"}, deadline=0))
+        report = next(ev for ev in events if ev.phase == "report")
+        self.assertIn("report:llm", report.error)
+        self.assertIsInstance(report.value, FinalReport)
+        self.assertIn("report:llm", events[-1].state["degraded"])
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+
+    def test_async_stream_honours_deadline(self):
+        orch = _build()
+        state = asyncio.run(orch.ainvoke({"topic": "x"}, deadline=0))
+        self.assertEqual(state["degraded"], ["optimistic_rebuttal", "pessimistic_rebuttal"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.utils.feed_cache import FeedCache, get_feed_cache
+from src.utils.rss import _parse_feed_bytes
+from src.utils.security import FetchResult, fetch_url_bytes
+
+FEED_URL = "https://feed.example.com/rss"
+RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>t</title>
+<item><title>テスト記事</title><link>https://feed.example.com/a</link><description>概要</description></item>
+</channel></rss>
+""".encode("utf-8")
+
+
+class FakeOrigin:
+    """ETag が一致すれば 304 を返すフェッチスタブ"""
+
+    def __init__(self, etag: str = '"v1"'):
+        self.etag = etag
+        self.requests: list[dict] = []
+
+    def __call__(self, url, *, purpose, headers=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return FetchResult(url=url, content=b"", content_type="", status_code=304, etag=self.etag)
+        return FetchResult(url=url, content=RSS, content_type="application/rss+xml", etag=self.etag)
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, content, feed_url):
+        self.calls += 1
+        return _parse_feed_bytes(content, feed_url)
+
+
+class TestFeedCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "feed_cache.sqlite3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_not_modified_returns_cached_items_without_parsing(self):
+        origin, parse = FakeOrigin(), CountingParser()
+        cache = FeedCache(self.path, fetch=origin)
+        first = cache.fetch_items(FEED_URL, parse)
+        second = cache.fetch_items(FEED_URL, parse)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0].title, "テスト記事")
+        self.assertEqual(parse.calls, 1)
+        self.assertEqual(origin.requests[1], {"If-None-Match": '"v1"'})
+        self.assertEqual(cache.stats()["not_modified"], 1)
+
+    def test_changed_feed_is_downloaded_again(self):
+        origin, parse = FakeOrigin(), CountingParser()
+        cache = FeedCache(self.path, fetch=origin)
+        cache.fetch_items(FEED_URL, parse)
+        origin.etag = '"v2"'
+        cache.fetch_items(FEED_URL, parse)
+        self.assertEqual(parse.calls, 2)
+        self.assertEqual(cache.stats()["downloads"], 2)
+
+    def test_validators_persist_on_disk(self):
+        FeedCache(self.path, fetch=FakeOrigin()).fetch_items(FEED_URL, CountingParser())
+        origin, parse = FakeOrigin(), CountingParser()
+        items = FeedCache(self.path, fetch=origin).fetch_items(FEED_URL, parse)
+        self.assertEqual(origin.requests[0], {"If-None-Match": '"v1"'})
+        self.assertEqual(items[0].link, "https://feed.example.com/a")
+        # ディスクから読んだ本文は304時に1回だけパースする
+        self.assertEqual(parse.calls, 1)
+
+    def test_feed_without_validators_is_not_cached(self):
+        def origin(url, *, purpose, headers=None):
+            self.assertIsNone(headers)
+            return FetchResult(url=url, content=RSS, content_type="application/rss+xml")
+
+        cache = FeedCache(None, fetch=origin)
+        cache.fetch_items(FEED_URL, CountingParser())
+        cache.fetch_items(FEED_URL, CountingParser())
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+
+    def test_shared_cache_is_opt_in(self):
+        with patch.dict(os.environ, {"RSS_CACHE_ENABLED": ""}):
+            self.assertIsNone(get_feed_cache())
+        with patch.dict(os.environ, {"RSS_CACHE_ENABLED": "1", "RSS_CACHE_PATH": ""}):
+            self.assertIsInstance(get_feed_cache(), FeedCache)
+
+
+class TestFetchUrlBytesNotModified(unittest.TestCase):
+    def test_304_is_returned_with_validators(self):
+        class FakeResponse:
+            status_code = 304
+            headers = {"ETag": '"v1"', "Last-Modified": "Wed, 01 Oct 2025 00:00:00 GMT"}
+
+            def close(self):
+                return None
+
+        class FakeSession:
+            trust_env = True
+
+            def get(self, url, headers=None, cookies=None, timeout=None, stream=None, allow_redirects=None):
+                self.sent = headers
+                return FakeResponse()
+
+        sess = FakeSession()
+        with patch("src.utils.security._get_http_session", return_value=sess):
+            with patch("src.utils.security.validate_outbound_url", side_effect=lambda url, purpose: url):
+                res = fetch_url_bytes(FEED_URL, purpose="rss", headers={"If-None-Match": '"v1"'})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res.etag, '"v1"')
+        self.assertEqual(sess.sent["If-None-Match"], '"v1"')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+from unittest.mock import patch
+
+from src.agents.researcher import ResearcherAgent, RssKeywordNotFoundError
+from src.utils import feed_index
+from src.utils.feed_index import FeedIndex, FeedPoller
+from src.utils.rss import BM25Index, FeedItem, rank_items_by_query
+from src.utils.testing_models import AlwaysFailChatModel
+
+
+def _items(feed_url: str) -> list[FeedItem]:
+    return [
+        FeedItem(title="政府が半導体の新制度を発表", link=f"{feed_url}/1", summary="補助金を拡充", feed_url=feed_url),
+        FeedItem(title="OpenAI releases a new AI model", link=f"{feed_url}/2", summary="AI safety", feed_url=feed_url),
+        FeedItem(title="日銀、金融政策を据え置き", link=f"{feed_url}/3", summary="物価見通し", feed_url=feed_url),
+        FeedItem(title="半導体 工場の建設が進む", link=f"{feed_url}/4", summary="地域経済", feed_url=feed_url),
+    ]
+
+
+def _rss(items: list[FeedItem]) -> str:
+    body = "".join(
+        f"<item><title>{it.title}</title><link>{it.link}</link><description>{it.summary}</description></item>"
+        for it in items
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>t</title>{body}</channel></rss>'
+
+
+class TestFeedIndex(unittest.TestCase):
+    def setUp(self):
+        self.feeds = ["https://a.example.com/rss", "https://b.example.com/rss"]
+        self.index = FeedIndex()
+        self.index.set_feed_order(self.feeds)
+        self.all_items = []
+        for f in self.feeds:
+            self.index.replace_feed(f, _items(f))
+            self.all_items.extend(_items(f))
+
+    def test_search_matches_full_scan_ranking(self):
+        for q in ["半導体", "政府 制度", "金融政策", "AI model", "日銀", "存在しない語"]:
+            with self.subTest(q=q):
+                self.assertEqual(self.index.search(q), rank_items_by_query(self.all_items, q, limit=5))
+
+    def test_replace_and_remove_feed(self):
+        self.index.replace_feed(self.feeds[0], [FeedItem(title="新しい記事", link="https://a.example.com/new")])
+        self.assertEqual(self.index.size, 5)
+        self.assertEqual([it.link for it in self.index.search("日銀")], ["https://b.example.com/rss/3"])
+        self.index.remove_feed(self.feeds[1])
+        self.assertEqual(self.index.search("日銀"), [])
+        self.assertEqual([it.link for it in self.index.search("新しい記事")], ["https://a.example.com/new"])
+
+    def test_unchanged_feed_is_not_reindexed(self):
+        with patch.object(BM25Index, "add", side_effect=AssertionError("reindexed")):
+            self.index.replace_feed(self.feeds[0], _items(self.feeds[0]))
+        self.assertEqual(self.index.size, 8)
+
+
+class TestFeedPoller(unittest.TestCase):
+    def test_failed_feed_keeps_previous_items(self):
+        feeds = ["https://a.example.com/rss", "https://b.example.com/rss"]
+        state = {"fail": False}
+
+        def fake_fetch(url: str, timeout: int = 10) -> str:
+            if state["fail"] and "b.example.com" in url:
+                raise ConnectionError("down")
+            return _rss(_items(url))
+
+        poller = FeedPoller(feeds, fetch_xml=fake_fetch)
+        self.assertFalse(poller.ready)
+        self.assertEqual(poller.poll_once(), 2)
+        self.assertTrue(poller.ready)
+        state["fail"] = True
+        self.assertEqual(poller.poll_once(), 1)
+        self.assertEqual(poller.index.size, 8)
+
+
+class TestResearcherUsesIndex(unittest.TestCase):
+    def setUp(self):
+        self.feeds = ["https://a.example.com/rss"]
+        poller = FeedPoller(self.feeds, fetch_xml=lambda url, timeout=10: _rss(_items(url)))
+        poller.poll_once()
+        feed_index._pollers[tuple(self.feeds)] = poller
+        self.env = patch.dict("os.environ", {"RSS_BACKGROUND_POLL": "1", "RSS_ITEM_LINK_POLICY": "A", "URL_ALLOWLIST_DOMAINS": ""})
+        self.env.start()
+        # __init__ の事前起動で実フィード用のポーラーが立たないよう、許可リストを差し替える
+        self.feed_list = patch("src.agents.researcher.load_rss_feed_urls", return_value=self.feeds)
+        self.feed_list.start()
+
+    def tearDown(self):
+        self.feed_list.stop()
+        self.env.stop()
+        feed_index.stop_feed_pollers()
+
+    def test_keyword_lookup_has_no_feed_io(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=AssertionError("network")):
+            with patch.object(agent, "_fetch_from_url", return_value="本文") as m:
+                out = agent.run("半導体")
+        expected = rank_items_by_query(_items(self.feeds[0]), "半導体", limit=1)[0]
+        self.assertIn(f"[source] {expected.link}", out)
+        self.assertEqual(m.call_count, 1)
+
+    def test_no_match_raises_keyword_not_found(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=AssertionError("network")):
+            with self.assertRaises(RssKeywordNotFoundError):
+                agent._search_with_rss("存在しない語")
+
+
+class TestResearcherNetworkPath(unittest.TestCase):
+    def setUp(self):
+        self.feeds = ["https://a.example.com/rss", "https://b.example.com/rss"]
+        self.fetched = []
+        self.env = patch.dict("os.environ", {"RSS_BACKGROUND_POLL": "", "RSS_ITEM_LINK_POLICY": "A", "URL_ALLOWLIST_DOMAINS": ""})
+        self.env.start()
+        self.feed_list = patch("src.agents.researcher.load_rss_feed_urls", return_value=self.feeds)
+        self.feed_list.start()
+        feed_index.clear_feed_indexes()
+
+    def tearDown(self):
+        feed_index.clear_feed_indexes()
+        self.feed_list.stop()
+        self.env.stop()
+
+    def _fetch(self, url: str, timeout: int = 10) -> str:
+        self.fetched.append(url)
+        return _rss(_items(url))
+
+    def test_fetched_feeds_are_indexed_once_and_queried(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+        adds = []
+        real_add = BM25Index.add
+
+        def counting_add(index, item, order_key=None):
+            adds.append(item.link)
+            return real_add(index, item, order_key)
+
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=self._fetch), patch.object(BM25Index, "add", counting_add):
+            with patch.object(agent, "_fetch_from_url", return_value="本文"):
+                outputs = [agent.run(q) for q in ("半導体", "日銀")]
+
+        # 毎回フィードは取得し直すが、内容が変わらなければ索引は1回だけ作る
+        self.assertEqual(len(self.fetched), 4)
+        self.assertEqual(len(adds), 8)
+        all_items = _items(self.feeds[0]) + _items(self.feeds[1])
+        for q, out in zip(("半導体", "日銀"), outputs):
+            self.assertIn(f"[source] {rank_items_by_query(all_items, q, limit=1)[0].link}", out)
+
+    def test_no_match_raises_keyword_not_found(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=self._fetch):
+            with self.assertRaises(RssKeywordNotFoundError):
+                agent._search_with_rss("存在しない語")
+
+    def test_only_feeds_fetched_in_this_call_are_ranked(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+
+        def a_is_down(url: str, timeout: int = 10) -> str:
+            if "a.example.com" in url:
+                raise ConnectionError("down")
+            return self._fetch(url, timeout)
+
+        with patch.object(agent, "_fetch_from_url", return_value="本文"):
+            with patch("src.agents.researcher.fetch_feed_xml", side_effect=self._fetch):
+                agent.run("半導体")
+            with patch("src.agents.researcher.fetch_feed_xml", side_effect=a_is_down):
+                out = agent.run("半導体")
+        expected = rank_items_by_query(_items(self.feeds[1]), "半導体", limit=1)[0]
+        self.assertIn(f"[source] {expected.link}", out)
+
+    def test_no_fetched_feed_raises_original_error(self):
+        agent = ResearcherAgent(AlwaysFailChatModel())
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=self._fetch):
+            with patch.object(agent, "_fetch_from_url", return_value="本文"):
+                agent.run("半導体")
+        with patch("src.agents.researcher.fetch_feed_xml", side_effect=ConnectionError("down")):
+            with self.assertRaisesRegex(ValueError, "記事候補を取得できませんでした"):
+                agent._search_with_rss("半導体")
+
+    def test_shared_indexes_are_bounded(self):
+        lists = [[f"https://{i}.example.com/rss"] for i in range(feed_index._MAX_FEED_INDEXES + 1)]
+        first = feed_index.get_feed_index(lists[0])
+        for urls in lists[1:]:
+            feed_index.get_feed_index(urls)
+        self.assertEqual(len(feed_index._indexes), feed_index._MAX_FEED_INDEXES)
+        self.assertIsNot(feed_index.get_feed_index(lists[0]), first)
+        # 直近に使った許可リストは残る
+        self.assertIs(feed_index.get_feed_index(lists[-1]), feed_index.get_feed_index(lists[-1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
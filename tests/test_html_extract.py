@@ -0,0 +1,65 @@
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.agents.researcher import ResearcherAgent
+from src.utils import html_extract
+from src.utils.html_extract import extract_article_text, get_text, parse_html
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+
+
+def _source_url(name: str) -> str:
+    return f"https://example.com/news/{name}"
+
+
+class TestHtmlExtractFixtures(unittest.TestCase):
+    """
+    fixtures/html/*.html の抽出結果が、BeautifulSoup で複数回パースしていた旧実装の出力
+    （*.expected.txt）と一致することを確認する。
+    """
+
+    def test_fixtures_match_expected_output(self):
+        agent = ResearcherAgent.__new__(ResearcherAgent)
+        pages = sorted(FIXTURES.glob("*.html"))
+        self.assertGreaterEqual(len(pages), 10)
+        for path in pages:
+            name = path.stem
+            raw = path.read_text(encoding="utf-8")
+            expected_path = FIXTURES / f"{name}.expected.txt"
+            with self.subTest(name=name):
+                if not expected_path.exists():
+                    with self.assertRaises(ValueError):
+                        agent._extract_article_text(raw, _source_url(name))
+                    continue
+                expected = expected_path.read_text(encoding="utf-8")
+                self.assertEqual(agent._extract_article_text(raw, _source_url(name)), expected)
+                self.assertEqual(
+                    agent._extract_article_text(raw, _source_url(name), include_header=False),
+                    expected.split("\n\n", 1)[1],
+                )
+
+    def test_raw_html_is_parsed_once(self):
+        raw = (FIXTURES / "readability_list_reextract.html").read_text(encoding="utf-8")
+        with patch("src.utils.html_extract.parse_html", wraps=html_extract.parse_html) as parse:
+            extract_article_text(raw, _source_url("readability_list_reextract"))
+        parsed = [c.args[0] for c in parse.call_args_list]
+        # 生HTML1回 + readability の抽出結果1回（生HTMLでの再抽出でも再パースしない）
+        self.assertEqual(parsed.count(raw), 1)
+        self.assertLessEqual(len(parsed), 2)
+
+
+class TestGetText(unittest.TestCase):
+    def test_removed_element_keeps_text_segments_separate(self):
+        root = parse_html("<p>前半<script>x()</script>後半</p>")
+        p = next(root.iter("p"))
+        html_extract._remove_noise_elements(root)
+        self.assertEqual(get_text(p, " "), "前半 後半")
+
+    def test_ruby_text_and_comments_are_not_content(self):
+        root = parse_html("<p>漢<ruby>字<rt>じ</rt></ruby>です<!-- c -->。</p>")
+        self.assertEqual(get_text(next(root.iter("p")), "|"), "漢|字|です|。")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src.utils.security import (
+    UrlValidationError,
+    clear_dns_cache,
+    fetch_url_bytes,
+    get_http_pool_stats,
+    reset_http_session,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        srv.client_ports.add(self.client_address[1])
+        srv.cookies_seen.append(self.headers.get("Cookie"))
+        if self.path == "/redirect":
+            self._send(302, b"", {"Location": "/article", "Set-Cookie": "consent=1; Path=/"})
+        elif self.path == "/slow":
+            time.sleep(0.1)
+            self._send(200, b"<html><body>ok</body></html>", {})
+        elif self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+            self._send(304, None, {"ETag": '"v1"'})
+        else:
+            self._send(200, b"<html><body>ok</body></html>", {"Set-Cookie": "sid=abc; Path=/", "ETag": '"v1"'})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        if body is not None:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return None
+
+
+class TestSharedHttpSession(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.client_ports = set()
+        self.server.cookies_seen = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        port = self.server.server_address[1]
+        self.base = f"http://127.0.0.1:{port}"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "URL_ALLOWED_SCHEMES": "http",
+                "URL_ALLOWED_PORTS": str(port),
+                "URL_BLOCK_PRIVATE_IPS": "0",
+                "URL_ALLOW_REDIRECTS": "1",
+            },
+        )
+        self._env.start()
+        reset_http_session()
+        clear_dns_cache()
+
+    def tearDown(self):
+        reset_http_session()
+        clear_dns_cache()
+        self._env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused_across_fetches(self):
+        for _ in range(3):
+            res = fetch_url_bytes(f"{self.base}/article", purpose="article")
+            self.assertEqual(res.content, b"<html><body>ok</body></html>")
+        stats = get_http_pool_stats()
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["reused"], 2)
+        self.assertEqual(stats["hosts"][self.base]["idle"], 1)
+
+    def test_connections_per_host_are_capped(self):
+        with patch.dict(os.environ, {"HTTP_POOL_PER_HOST": "1"}):
+            reset_http_session()
+            threads = [
+                threading.Thread(target=fetch_url_bytes, args=(f"{self.base}/slow",), kwargs={"purpose": "article"})
+                for _ in range(3)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+        # 上限を超えた取得は接続が返るのを待つ（余分な接続を開かない）
+        stats = get_http_pool_stats()
+        self.assertEqual((stats["requests"], stats["connections_opened"]), (3, 1))
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_not_modified_response_returns_connection_to_pool(self):
+        fetch_url_bytes(f"{self.base}/etag", purpose="article")
+        res = fetch_url_bytes(f"{self.base}/etag", purpose="article", headers={"If-None-Match": '"v1"'})
+        self.assertEqual(res.status_code, 304)
+        fetch_url_bytes(f"{self.base}/article", purpose="article")
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_cookies_do_not_leak_between_fetches(self):
+        fetch_url_bytes(f"{self.base}/article", purpose="article")
+        fetch_url_bytes(f"{self.base}/article", purpose="article")
+        self.assertEqual(self.server.cookies_seen, [None, None])
+
+    def test_cookies_follow_redirects_within_one_fetch(self):
+        res = fetch_url_bytes(f"{self.base}/redirect", purpose="article")
+        self.assertEqual(res.url, f"{self.base}/article")
+        self.assertEqual(self.server.cookies_seen, [None, "consent=1"])
+
+
+    def _rebinding_getaddrinfo(self, calls):
+        """feeds.test は1回目だけ 127.0.0.1、以降は別のIPを返す（DNSリバインディングの再現）"""
+        real = socket.getaddrinfo
+
+        def fake(host, *args, **kwargs):
+            if host != "feeds.test":
+                return real(host, *args, **kwargs)
+            calls.append(host)
+            ip = "127.0.0.1" if len(calls) == 1 else "192.0.2.10"
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, 0))]
+
+        return fake
+
+    def test_connection_uses_the_validated_ip(self):
+        calls = []
+        port = self.server.server_address[1]
+        # 検証ではローカルテストサーバを許可し、リバインド先（192.0.2.10）だけ拒否する
+        with patch.dict(os.environ, {"URL_BLOCK_PRIVATE_IPS": "1"}):
+            with patch("src.utils.security.is_blocked_ip", side_effect=lambda ip: ip != "127.0.0.1"):
+                with patch("socket.getaddrinfo", side_effect=self._rebinding_getaddrinfo(calls)):
+                    res = fetch_url_bytes(f"http://feeds.test:{port}/article", purpose="article")
+        self.assertEqual(res.content, b"<html><body>ok</body></html>")
+        # URL検証と接続で1回しか解決しない（2回目以降の応答には接続しない）
+        self.assertEqual(calls, ["feeds.test"])
+
+    def test_blocked_ip_is_rejected_at_connect_time(self):
+        port = self.server.server_address[1]
+        with patch.dict(os.environ, {"URL_BLOCK_PRIVATE_IPS": "1"}):
+            with patch("src.utils.security.validate_outbound_url", side_effect=lambda url, purpose: url):
+                with self.assertRaises(UrlValidationError):
+                    fetch_url_bytes(f"http://127.0.0.1:{port}/article", purpose="article")
+        self.assertEqual(self.server.client_ports, set())
+
+if __name__ == "__main__":
+    unittest.main()
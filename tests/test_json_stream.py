@@ -0,0 +1,169 @@
+import asyncio
+import json
+import random
+import unittest
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_ollama import ChatOllama
+
+from src.agents.analyst_optimistic import OptimisticAnalystAgent
+from src.agents.analyst_pessimistic import PessimisticAnalystAgent
+from src.core.orchestrator import OrchestrationAgent
+from src.models.schemas import Argument, Rebuttal
+from src.utils.json_stream import IncrementalJsonParser, JsonStreamError, stream_structured
+from src.utils.model_capabilities import get_model_capabilities
+from src.utils.structured_output import StructuredOutputError
+from src.utils.testing_models import AlwaysFailChatModel
+
+ARTICLE = "[source] https://example.com/news\n[title] テスト\n\n政府は2025年12月に新制度を発表した。"
+
+
+def _fake_model(*contents: str) -> GenericFakeChatModel:
+    # GenericFakeChatModel は空白ごとに区切ってチャンクを返す
+    return GenericFakeChatModel(messages=iter([AIMessage(content=c) for c in contents]))
+
+
+def _feed_in_pieces(parser: IncrementalJsonParser, text: str, rng: random.Random) -> dict:
+    got: dict = {}
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 6)
+        for path, delta in parser.feed(text[i : i + n]):
+            got[path] = got.get(path, "") + delta
+        i += n
+    return got
+
+
+class TestIncrementalJsonParser(unittest.TestCase):
+    def test_matches_json_loads_for_any_chunking(self):
+        doc = {
+            "conclusion": '成長の"機会"がある\n改行\tタブ 😀',
+            "evidence": ["a", "b\\c", ""],
+            "n": -1.5e3,
+            "flags": [True, False, None],
+            "nested": {"x": [[], {}]},
+        }
+        rng = random.Random(0)
+        for ensure_ascii in (True, False):
+            text = "```json\n" + json.dumps(doc, ensure_ascii=ensure_ascii, indent=1) + "\n```"
+            for _ in range(50):
+                parser = IncrementalJsonParser()
+                got = _feed_in_pieces(parser, text, rng)
+                self.assertEqual(parser.close(), doc)
+                self.assertEqual(got[("conclusion",)], doc["conclusion"])
+                self.assertEqual(got[("evidence", 1)], "b\\c")
+                self.assertNotIn(("evidence", 2), got)
+
+    def test_partial_value_is_visible_before_close(self):
+        parser = IncrementalJsonParser()
+        self.assertEqual(parser.feed('{"conclusion": "前向'), [(("conclusion",), "前向")])
+        parser.feed('き", "evidence": ["引用')
+        self.assertEqual(parser.value, {"conclusion": "前向き", "evidence": ["引用"]})
+        self.assertFalse(parser.done)
+        with self.assertRaises(JsonStreamError):
+            parser.close()
+
+    def test_rejects_malformed_json(self):
+        for text in ('{"a" 1}', '{"a": [1,]}', '{"a": tru}', '{"a": "\\x"}', '{"a": 1]'):
+            with self.subTest(text=text):
+                with self.assertRaises(JsonStreamError):
+                    IncrementalJsonParser().feed(text)
+
+
+class TestStreamStructured(unittest.TestCase):
+    def test_stream_structured_emits_deltas_and_validates(self):
+        payload = json.dumps({"conclusion": "市場 は 拡大 する", "evidence": ["新制度 を 発表"]}, ensure_ascii=False)
+        agent = OptimisticAnalystAgent(_fake_model(payload))
+        deltas = []
+
+        result = agent.analyze(ARTICLE, on_delta=lambda path, d: deltas.append((path, d)))
+
+        self.assertEqual(result, Argument(conclusion="市場 は 拡大 する", evidence=["新制度 を 発表"]))
+        conclusion = [d for path, d in deltas if path == ("conclusion",)]
+        self.assertGreater(len(conclusion), 1)
+        self.assertEqual("".join(conclusion), "市場 は 拡大 する")
+
+    def test_invalid_stream_falls_back_like_invoke(self):
+        agent = PessimisticAnalystAgent(_fake_model("JSON ではない 応答"))
+        result = agent.analyze(ARTICLE, on_delta=lambda path, d: None)
+        self.assertIn("エラー", result.conclusion)
+
+    def test_truncated_stream_is_repaired_like_invoke(self):
+        agent = PessimisticAnalystAgent(_fake_model('{"conclusion": "途中 で'))
+        deltas = []
+        result = agent.analyze(ARTICLE, on_delta=lambda path, d: deltas.append(d))
+        self.assertEqual(result, Argument(conclusion="途中 で", evidence=[]))
+        self.assertEqual("".join(deltas), "途中 で")
+
+    def test_ollama_stream_outcome_is_recorded_in_model_capabilities(self):
+        get_model_capabilities().clear()
+        outputs = iter(['{"conclusion": "拡大', "JSON ではない"])
+
+        def stream(self, messages, stop=None, run_manager=None, **kwargs):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=next(outputs)))
+
+        prompt = ChatPromptTemplate.from_messages([("human", "test")])
+        with patch.object(ChatOllama, "_stream", stream):
+            result = stream_structured(ChatOllama(model="stream:1b"), prompt, {}, Argument, lambda p, d: None)
+            with self.assertRaises(StructuredOutputError):
+                stream_structured(ChatOllama(model="stream:1b"), prompt, {}, Argument, lambda p, d: None)
+
+        self.assertEqual(result.conclusion, "拡大")
+        stats = get_model_capabilities().snapshot()["stream:1b"]["json_schema"]
+        self.assertEqual((stats["successes"], stats["failures"]), (1, 1))
+
+    def test_schema_mismatch_raises(self):
+        with self.assertRaises(ValueError):
+            prompt = ChatPromptTemplate.from_messages([("human", "test")])
+            stream_structured(_fake_model('{"evidence": []}'), prompt, {}, Argument, lambda p, d: None)
+
+    def test_async_debate_streams_counter_points(self):
+        payload = json.dumps({"counter_points": ["根拠 が 弱い", "期間 が 短い"], "strengthened_evidence": []}, ensure_ascii=False)
+        agent = PessimisticAnalystAgent(_fake_model(payload))
+        deltas = []
+
+        result = asyncio.run(
+            agent.adebate(
+                critique=None,
+                opponent_argument=Argument(conclusion="x"),
+                original_argument=Argument(conclusion="y"),
+                on_delta=lambda path, d: deltas.append((path, d)),
+            )
+        )
+
+        self.assertEqual(result, Rebuttal(counter_points=["根拠 が 弱い", "期間 が 短い"], strengthened_evidence=[]))
+        self.assertEqual({path for path, _ in deltas}, {("counter_points", 0), ("counter_points", 1)})
+
+
+class TestOrchestratorTokenStream(unittest.TestCase):
+    def test_on_token_receives_state_key_before_phase_event(self):
+        payload = json.dumps({"conclusion": "伸びる 見込み", "evidence": []}, ensure_ascii=False)
+
+        class Researcher:
+            def run(self, topic):
+                return ARTICLE
+
+        orch = OrchestrationAgent(
+            llm=AlwaysFailChatModel(),
+            llm_fact_checker=AlwaysFailChatModel(),
+            researcher_agent=Researcher(),
+        )
+        orch.optimist = OptimisticAnalystAgent(_fake_model(payload))
+        log = []
+
+        for event in orch.stream({"topic": "https://example.com/news"}, on_token=lambda k, p, d: log.append(("token", k, p))):
+            log.append(("event", event.key))
+
+        first_event = log.index(("event", "optimistic_argument"))
+        self.assertIn(("token", "optimistic_argument", ("conclusion",)), log[:first_event])
+        self.assertEqual(log[first_event - 1][0], "token")
+        # 失敗するモデルは従来どおりフォールバックで完走する
+        self.assertIn(("event", "final_report"), log)
+
+
+if __name__ == "__main__":
+    unittest.main()
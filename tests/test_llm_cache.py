@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.utils.llm_cache import LLMResponseCache
+
+
+class CountingChatModel(BaseChatModel):
+    """呼び出し回数を数えるテスト用ChatModel"""
+
+    temperature: float = 0.2
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting_chat_model"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"temperature": self.temperature}
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"応答{self.calls}"))])
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "llm_cache.sqlite3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_same_prompt_hits_memory(self):
+        cache = LLMResponseCache(self.path)
+        llm = CountingChatModel(cache=cache)
+        a = llm.invoke("こんにちは")
+        b = llm.invoke("こんにちは")
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(a.content, b.content)
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+
+    def test_different_params_do_not_share_entries(self):
+        cache = LLMResponseCache(self.path)
+        CountingChatModel(cache=cache, temperature=0.2).invoke("同じ質問")
+        other = CountingChatModel(cache=cache, temperature=0.9)
+        other.invoke("同じ質問")
+        self.assertEqual(other.calls, 1)
+
+    def test_persists_across_instances(self):
+        CountingChatModel(cache=LLMResponseCache(self.path)).invoke("永続化")
+        cache2 = LLMResponseCache(self.path)
+        llm2 = CountingChatModel(cache=cache2)
+        out = llm2.invoke("永続化")
+        self.assertEqual(llm2.calls, 0)
+        self.assertEqual(out.content, "応答1")
+        self.assertEqual(cache2.stats()["disk_hits"], 1)
+
+    def test_ttl_expiry(self):
+        cache = LLMResponseCache(self.path, ttl_sec=10)
+        llm = CountingChatModel(cache=cache)
+        with patch("src.utils.llm_cache.time.time", return_value=1000.0):
+            llm.invoke("期限")
+        with patch("src.utils.llm_cache.time.time", return_value=1005.0):
+            llm.invoke("期限")
+        self.assertEqual(llm.calls, 1)
+        with patch("src.utils.llm_cache.time.time", return_value=1011.0):
+            llm.invoke("期限")
+        self.assertEqual(llm.calls, 2)
+
+    def test_memory_lru_and_disk_bounds(self):
+        cache = LLMResponseCache(self.path, max_memory_entries=2, max_disk_entries=3)
+        llm = CountingChatModel(cache=cache)
+        for i in range(5):
+            llm.invoke(f"質問{i}")
+        stats = cache.stats()
+        self.assertEqual(stats["memory_entries"], 2)
+        self.assertEqual(stats["disk_entries"], 3)
+        # 最古のエントリはディスクからも追い出されている
+        llm.invoke("質問0")
+        self.assertEqual(llm.calls, 6)
+
+    def test_memory_only_mode(self):
+        cache = LLMResponseCache(None)
+        llm = CountingChatModel(cache=cache)
+        llm.invoke("メモリのみ")
+        llm.invoke("メモリのみ")
+        self.assertEqual(llm.calls, 1)
+        self.assertNotIn("disk_entries", cache.stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+
+from src.utils.llm import get_llm
+from src.utils.llm_limiter import AIMDLimiter, LimitedChatOllama, get_llm_limiter_stats, reset_llm_limiter
+from src.utils.llm_metrics import llm_config
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Concurrency:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.active -= 1
+
+
+def _saturate(limiter: AIMDLimiter, clock: _Clock, latency: float, rounds: int = 1) -> None:
+    """枠を使い切る数だけ同時に取り、同じ所要時間で返す"""
+    for _ in range(rounds):
+        started = [limiter.acquire() for _ in range(limiter.limit)]
+        clock.now += latency
+        for s in started:
+            limiter.release(s, latency, "analyze")
+
+
+class TestAIMDLimiter(unittest.TestCase):
+    def test_additive_increase_and_multiplicative_decrease(self):
+        clock = _Clock()
+        limiter = AIMDLimiter(8, initial=2, clock=clock)
+        _saturate(limiter, clock, 1.0, rounds=6)
+        self.assertGreaterEqual(limiter.limit, 4)
+        grown = limiter.limit
+
+        # 基準（1秒）の2倍を超えたら半分に減らす。減らす前に始まった呼び出しでは重ねて減らさない
+        started = [limiter.acquire() for _ in range(grown)]
+        clock.now += 3.0
+        for s in started:
+            limiter.release(s, 3.0, "analyze")
+        self.assertEqual(limiter.limit, grown // 2)
+
+        # 別の処理（基準が別）の遅い呼び出しは、それだけでは減らさない
+        s = limiter.acquire()
+        limiter.release(s, 30.0, "report")
+        self.assertEqual(limiter.limit, grown // 2)
+
+        # タイムアウト/5xx は所要時間に関係なく減らす（min_limit より下げない）
+        for _ in range(5):
+            s = limiter.acquire()
+            clock.now += 0.1
+            limiter.release(s, None, "analyze", overloaded=True)
+        self.assertEqual(limiter.limit, 1)
+
+        stats = limiter.snapshot()
+        self.assertEqual((stats["max_limit"], stats["in_flight"], stats["queue_depth"]), (8, 0, 0))
+        self.assertGreater(stats["increases"], 0)
+        self.assertGreater(stats["decreases"], 1)
+        self.assertEqual(stats["baseline_sec"]["report"], 30.0)
+
+    def test_threads_queue_in_order_and_wait_time_is_reported(self):
+        limiter = AIMDLimiter(2, tolerance=1000)
+        seen = _Concurrency()
+
+        def work():
+            with limiter.slot("analyze"), seen:
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        stats = limiter.snapshot()
+        self.assertEqual(seen.peak, 2)
+        self.assertEqual((stats["acquired"], stats["in_flight"], stats["queue_depth"]), (6, 0, 0))
+        self.assertGreaterEqual(stats["max_queue_depth"], 3)
+        self.assertGreater(stats["wait_sec_max"], 0.04)
+
+    def test_async_slots_and_cancelled_waiters(self):
+        limiter = AIMDLimiter(2, tolerance=1000)
+        seen = _Concurrency()
+
+        async def work():
+            async with limiter.aslot():
+                with seen:
+                    await asyncio.sleep(0.02)
+
+        async def main():
+            await asyncio.gather(*(work() for _ in range(6)))
+            # 待っている間に取り消された呼び出しは、枠を持ったまま残らない
+            holders = [asyncio.create_task(work()) for _ in range(2)]
+            await asyncio.sleep(0)
+            waiting = asyncio.create_task(work())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.gather(*holders, waiting, return_exceptions=True)
+
+        asyncio.run(main())
+        stats = limiter.snapshot()
+        self.assertEqual(seen.peak, 2)
+        self.assertEqual((stats["in_flight"], stats["queue_depth"]), (0, 0))
+
+    def test_overload_errors_shrink_the_limit(self):
+        limiter = AIMDLimiter(4)
+        with self.assertRaises(ResponseError):
+            with limiter.slot():
+                raise ResponseError("server busy", 503)
+        with self.assertRaises(ValueError):
+            with limiter.slot():
+                raise ValueError("出力の検証失敗")  # 混雑とは無関係
+        self.assertEqual(limiter.limit, 2)
+
+
+class TestLimitedChatOllama(unittest.TestCase):
+    def setUp(self):
+        reset_llm_limiter()
+
+    def tearDown(self):
+        reset_llm_limiter()
+
+    def test_get_llm_applies_the_process_wide_limit(self):
+        seen = _Concurrency()
+
+        def generate(self, messages, stop=None, run_manager=None, **kwargs):
+            with seen:
+                time.sleep(0.03)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+        with patch.dict(os.environ, {"LLM_MAX_CONCURRENCY": "1"}), patch.object(ChatOllama, "_generate", generate):
+            analysis = get_llm("gemma3:4b", verify_model=False, cache=False)
+            fact_check = get_llm("gemma3:4b", verify_model=False, cache=False, temperature=0.1)
+            self.assertIsInstance(analysis, LimitedChatOllama)
+            threads = [
+                threading.Thread(target=lambda m=m: m.invoke("x", config=llm_config("analyze")))
+                for m in (analysis, fact_check, analysis)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+
+        stats = get_llm_limiter_stats()
+        self.assertEqual(seen.peak, 1)
+        self.assertEqual((stats["acquired"], stats["waited"]), (3, 2))
+        self.assertIn("analyze", stats["baseline_sec"])
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {"LLM_MAX_CONCURRENCY": ""}):
+            self.assertNotIsInstance(get_llm("gemma3:4b", verify_model=False, cache=False), LimitedChatOllama)
+            self.assertEqual(get_llm_limiter_stats(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from typing import Any, List, Optional
+from unittest.mock import patch
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agents.fact_checker import FactCheckerAgent
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.models.schemas import Argument
+from src.utils.llm_metrics import llm_call_scope, record_llm_path
+from src.utils.testing_models import AlwaysFailChatModel
+from tests._orchestrator_fakes import StaticResearcher
+
+ARTICLE = "[source] https://example.com/news\n[title] テスト\n\n政府は2025年12月に新制度を発表した。"
+
+
+class OllamaLikeChatModel(BaseChatModel):
+    """Ollama と同じ形の計測値（ナノ秒）を generation_info に付けて固定の JSON を返す"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama_like"
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        info = {"prompt_eval_count": 120, "eval_count": 30, "eval_duration": 1_500_000_000, "total_duration": 2_000_000_000}
+        message = AIMessage(content=json.dumps({"bias_points": ["偏り"], "factual_errors": []}, ensure_ascii=False))
+        return ChatResult(generations=[ChatGeneration(message=message, generation_info=info)])
+
+
+def _build(**kwargs) -> OrchestrationAgent:
+    failing = AlwaysFailChatModel()
+    return OrchestrationAgent(
+        llm=failing,
+        llm_fact_checker=failing,
+        researcher_agent=StaticResearcher(),
+        checkpoint_store=False,
+        result_cache=False,
+        **kwargs,
+    )
+
+
+class TestLLMInstrumentation(unittest.TestCase):
+    def test_records_ollama_counts_and_prompt_size(self):
+        checker = FactCheckerAgent(OllamaLikeChatModel())
+        calls: list = []
+        with llm_call_scope(calls, "r1", "fact_check", "critique"):
+            checker.validate(Argument(conclusion="a", evidence=[]), Argument(conclusion="b", evidence=[]), ARTICLE)
+
+        self.assertEqual(len(calls), 1)
+        record = calls[0]
+        self.assertEqual(
+            (record["request_id"], record["phase"], record["task"], record["step"], record["path"]),
+            ("r1", "fact_check", "critique", "validate", "json"),
+        )
+        self.assertEqual((record["prompt_eval_count"], record["eval_count"]), (120, 30))
+        self.assertEqual((record["eval_duration_sec"], record["total_duration_sec"]), (1.5, 2.0))
+        self.assertGreater(record["prompt_chars"], len("政府は2025年12月に新制度を発表した。"))
+        self.assertIsNone(record["error"])
+
+    def test_nothing_is_recorded_outside_a_scope(self):
+        FactCheckerAgent(OllamaLikeChatModel()).validate(
+            Argument(conclusion="a", evidence=[]), Argument(conclusion="b", evidence=[]), ARTICLE
+        )
+        record_llm_path("report")  # スコープ外では何もしない
+
+    def test_orchestrator_tags_calls_by_request_and_phase(self):
+        orch = _build(options=OrchestrationOptions(parallel_phases=True))
+        state = orch.invoke({"topic": "x", "request_id": "r1"})
+
+        calls = state["llm_calls"]
+        self.assertTrue(all(c["request_id"] == "r1" for c in calls))
+        # 並行実行したワーカースレッドの呼び出しも、それぞれのタスクとして記録される
+        self.assertEqual(
+            {c["task"] for c in calls if c["phase"] == "analysis"}, {"optimistic_argument", "pessimistic_argument"}
+        )
+        report_paths = [(c["step"], c["path"]) for c in calls if c["phase"] == "report"]
+        self.assertIn(("facts", "json_fallback"), report_paths)
+        self.assertIn(("report", "deterministic"), report_paths)
+        json.dumps(calls, ensure_ascii=False)
+
+    def test_async_stream_records_the_same_calls(self):
+        sync_calls = _build().invoke({"topic": "x"})["llm_calls"]
+        async_calls = asyncio.run(_build().ainvoke({"topic": "x"}))["llm_calls"]
+        key = lambda c: (c["phase"], c["task"], c["step"], c["path"])  # noqa: E731
+        self.assertEqual(sorted(map(key, sync_calls)), sorted(map(key, async_calls)))
+
+    def test_exported_as_jsonl(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "metrics", "llm_calls.jsonl")
+            with patch.dict(os.environ, {"LLM_METRICS_PATH": path}):
+                orch = _build()
+            first = orch.invoke({"topic": "x", "request_id": "r1"})
+            orch.invoke({"topic": "y", "request_id": "r2"})
+            with open(path, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f]
+
+        self.assertEqual(rows[: len(first["llm_calls"])], first["llm_calls"])
+        self.assertEqual({r["request_id"] for r in rows}, {"r1", "r2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src.utils.llm import DEFAULT_OLLAMA_BASE_URL, get_llm
+from src.utils.llm_router import NoHealthyBackendError, RoutingChatModel, clear_backend_pools, get_llm_router_stats
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    """/api/tags と /api/chat（NDJSON のストリーム）だけを持つ Ollama の代わり"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        if self.path != "/api/tags":
+            return self._send(404, {"error": "not found"})
+        self._send(200, {"models": [{"name": name} for name in srv.models]})
+
+    def do_POST(self):
+        srv = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with srv.lock:
+            srv.active += 1
+            srv.chats += 1
+        try:
+            srv.gate.wait(5)
+            if srv.status != 200:
+                return self._send(srv.status, {"error": "overloaded"})
+            done = {"model": request.get("model"), "created_at": "2025-01-01T00:00:00Z", "done": True, "done_reason": "stop"}
+            lines = [
+                {**done, "done": False, "message": {"role": "assistant", "content": srv.reply}},
+                {**done, "message": {"role": "assistant", "content": ""}, "prompt_eval_count": 10, "eval_count": 3},
+            ]
+            body = b"".join(json.dumps(line).encode("utf-8") + b"\n" for line in lines)
+            self._send_raw(200, body, "application/x-ndjson")
+        finally:
+            with srv.lock:
+                srv.active -= 1
+
+    def _send(self, status, payload):
+        self._send_raw(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_raw(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return None
+
+
+def _start(reply: str, models=("gemma3:4b",)) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+    server.models, server.reply, server.status = list(models), reply, 200
+    server.lock, server.active, server.chats = threading.Lock(), 0, 0
+    server.gate = threading.Event()
+    server.gate.set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class TestRoutingChatModel(unittest.TestCase):
+    def setUp(self):
+        clear_backend_pools()
+        self.a, self.b = _start("from-a"), _start("from-b")
+
+    def tearDown(self):
+        for server in (self.a, self.b):
+            server.gate.set()
+            server.shutdown()
+            server.server_close()
+        clear_backend_pools()
+
+    def _model(self, **kwargs) -> RoutingChatModel:
+        return get_llm("gemma3:4b", verify_model=False, cache=False, base_urls=[_url(self.a), _url(self.b)], **kwargs)
+
+    def test_dispatches_to_the_least_loaded_backend(self):
+        model = self._model()
+        self.a.gate.clear()  # a の応答を止めて、実行中のままにする
+        first = []
+        worker = threading.Thread(target=lambda: first.append(model.invoke("1").content))
+        worker.start()
+        deadline = time.monotonic() + 5
+        while self.a.active == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # a が実行中なので、次の呼び出しは b へ
+        self.assertEqual(model.invoke("2").content, "from-b")
+        self.a.gate.set()
+        worker.join(5)
+        self.assertEqual(first, ["from-a"])
+
+        stats = {s["url"]: s for s in model.pool.snapshot()}
+        self.assertEqual((stats[_url(self.a)]["requests"], stats[_url(self.b)]["requests"]), (1, 1))
+        self.assertEqual(sum(s["in_flight"] for s in stats.values()), 0)
+
+    def test_fails_over_and_marks_the_backend_unhealthy(self):
+        self.a.status = 503
+        model = self._model()
+        self.assertEqual(model.invoke("x").content, "from-b")
+        self.assertEqual(asyncio.run(model.ainvoke("y")).content, "from-b")
+
+        a = {s["url"]: s for s in model.pool.snapshot()}[_url(self.a)]
+        self.assertFalse(a["healthy"])
+        self.assertEqual((a["failures"], self.a.chats), (1, 1))  # 停止中と判定した後は振り分けない
+
+    def test_routes_only_to_backends_that_have_the_model(self):
+        self.a.models = ["llama3:8b"]
+        model = self._model()
+        self.assertEqual([model.invoke(str(i)).content for i in range(3)], ["from-b"] * 3)
+        self.assertEqual("".join(c.content for c in model.stream("s")), "from-b")
+        self.assertEqual(self.a.chats, 0)
+
+    def test_raises_when_no_backend_is_left(self):
+        self.a.status = self.b.status = 503
+        with self.assertRaises(NoHealthyBackendError):
+            self._model().invoke("x")
+        self.assertTrue(all(not s["healthy"] for pool in get_llm_router_stats().values() for s in pool))
+
+    def test_env_lists_backends_and_verification_uses_any_reachable_one(self):
+        self.a.shutdown()
+        self.a.server_close()  # 接続できない
+        urls = f"{_url(self.a)}, {_url(self.b)}"
+        with patch.dict(os.environ, {"OLLAMA_BASE_URLS": urls}):
+            model = get_llm("gemma3:4b", cache=False)
+            with self.assertRaises(ValueError):
+                get_llm("missing:1b", cache=False)
+        self.assertIsInstance(model, RoutingChatModel)
+        self.assertEqual(model.invoke("x").content, "from-b")
+        with patch.dict(os.environ, {"OLLAMA_BASE_URLS": _url(self.b)}):
+            single = get_llm("gemma3:4b", cache=False)
+        self.assertNotIsInstance(single, RoutingChatModel)
+        self.assertEqual(single.base_url, _url(self.b))
+
+    def test_explicit_base_url_beats_the_env(self):
+        for explicit in ("http://127.0.0.1:9", DEFAULT_OLLAMA_BASE_URL):
+            for env in (_url(self.b), f"{_url(self.a)},{_url(self.b)}"):
+                with patch.dict(os.environ, {"OLLAMA_BASE_URLS": env}):
+                    model = get_llm("gemma3:4b", base_url=explicit, verify_model=False, cache=False)
+                self.assertNotIsInstance(model, RoutingChatModel)
+                self.assertEqual(model.base_url, explicit)
+        # base_urls はさらに優先する
+        with patch.dict(os.environ, {"OLLAMA_BASE_URLS": _url(self.b)}):
+            routed = get_llm("gemma3:4b", base_url="http://127.0.0.1:9", base_urls=[_url(self.a)], verify_model=False, cache=False)
+        self.assertEqual(routed.base_url, _url(self.a))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+
+from src.models.schemas import Argument
+from src.utils.model_capabilities import ModelCapabilities, get_model_capabilities
+from src.utils.structured_output import StructuredOutputError, probe_model_capabilities, structured_chain
+
+PROMPT = ChatPromptTemplate.from_messages([("human", "{article_text}")])
+VALID = json.dumps({"conclusion": "機会がある", "evidence": []}, ensure_ascii=False)
+
+
+def _ollama_that_ignores_schema(seen: list, content: str = VALID):
+    """format にスキーマを渡すと壊れた出力を返し、format="json" なら content を返すモデル（tool 呼び出しはしない）"""
+
+    def generate(self, messages, stop=None, run_manager=None, **kwargs):
+        seen.append(kwargs.get("format"))
+        text = content if kwargs.get("format") == "json" else "{"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return generate(self, messages, stop, run_manager, **kwargs)
+
+    return patch.multiple(ChatOllama, _generate=generate, _agenerate=agenerate)
+
+
+class TestModelCapabilities(unittest.TestCase):
+    def test_choose_prefers_live_success_rates(self):
+        caps = ModelCapabilities()
+        self.assertEqual(caps.choose("m"), "json_schema")
+        caps.record("m", "json_schema", False)
+        self.assertEqual(caps.choose("m"), "json_schema")  # 1回の失敗では切り替えない
+        caps.record("m", "json_schema", False)
+        self.assertEqual(caps.choose("m"), "json_mode")
+        self.assertEqual(caps.choose("other"), "json_schema")
+
+        snapshot = caps.snapshot()["m"]["json_schema"]
+        self.assertEqual((snapshot["successes"], snapshot["failures"], snapshot["success_rate"]), (0, 2, 0.0))
+
+    def test_hopeless_models_are_skipped_with_periodic_retry(self):
+        caps = ModelCapabilities()
+        for strategy in ("json_schema", "json_mode", "tool_calling"):
+            for _ in range(40):
+                caps.record("m", strategy, False)
+        choices = [caps.choose("m") for _ in range(20)]
+        self.assertEqual(choices[:19], [None] * 19)
+        self.assertIsNotNone(choices[19])
+
+    def test_probe_runs_once_per_model(self):
+        caps = ModelCapabilities(probe=True)
+        self.assertTrue(caps.needs_probe("m"))
+        self.assertFalse(caps.needs_probe("m"))
+        self.assertFalse(ModelCapabilities().needs_probe("m"))
+
+
+class TestAdaptiveStructuredChain(unittest.TestCase):
+    def setUp(self):
+        get_model_capabilities().clear()
+
+    def test_switches_to_the_strategy_that_works(self):
+        seen: list = []
+        model = ChatOllama(model="schema-blind:1b")
+        with _ollama_that_ignores_schema(seen):
+            for _ in range(2):
+                with self.assertRaises(StructuredOutputError):
+                    structured_chain(PROMPT, model, Argument).invoke({"article_text": "本文"})
+            result = structured_chain(PROMPT, model, Argument).invoke({"article_text": "本文"})
+            again = asyncio.run(structured_chain(PROMPT, model, Argument).ainvoke({"article_text": "本文"}))
+
+        self.assertEqual(result.conclusion, "機会がある")
+        self.assertEqual(again, result)
+        self.assertEqual(seen[2:], ["json", "json"])
+        stats = get_model_capabilities().snapshot()["schema-blind:1b"]
+        self.assertEqual(stats["json_schema"]["failures"], 2)
+        self.assertEqual(stats["json_mode"]["successes"], 2)
+
+    def test_connection_errors_do_not_count_against_the_model(self):
+        def generate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise ConnectionError("ollama is down")
+
+        with patch.object(ChatOllama, "_generate", generate):
+            with self.assertRaises(ConnectionError):
+                structured_chain(PROMPT, ChatOllama(model="m:1b"), Argument).invoke({"article_text": "本文"})
+        self.assertEqual(get_model_capabilities().snapshot().get("m:1b", {}), {})
+
+    def test_only_format_rejections_count_among_response_errors(self):
+        errors = [
+            ResponseError("model 'm:1b' not found", 404),
+            ResponseError("server busy", 503),
+            ResponseError("too many requests", 429),
+            ResponseError("invalid format: schema is not supported", 400),
+        ]
+
+        def generate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise errors.pop(0)
+
+        with patch.object(ChatOllama, "_generate", generate):
+            for _ in range(4):
+                with self.assertRaises(ResponseError):
+                    structured_chain(PROMPT, ChatOllama(model="m:1b"), Argument).invoke({"article_text": "本文"})
+        stats = get_model_capabilities().snapshot()["m:1b"]["json_schema"]
+        self.assertEqual((stats["successes"], stats["failures"]), (0, 1))
+
+    def test_probe_records_every_strategy(self):
+        seen: list = []
+        with _ollama_that_ignores_schema(seen, '{"ok": true, "label": "テスト"}'):
+            results = probe_model_capabilities(ChatOllama(model="probe:1b"))
+        self.assertEqual(results, {"json_schema": False, "json_mode": True, "tool_calling": False})
+        self.assertEqual(get_model_capabilities().choose("probe:1b"), "json_mode")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.models.schemas import Argument, Rebuttal
+from src.utils.testing_models import AlwaysFailChatModel
+from tests._orchestrator_fakes import StaticResearcher
+
+
+class SlowAnalyst:
+    """analyze/debate が一定時間ブロックするスタブ（同時実行数も記録する）"""
+
+    def __init__(self, label: str, delay: float, counter: dict, fail: bool = False):
+        self.label = label
+        self.delay = delay
+        self.counter = counter
+        self.fail = fail
+        self.calls: list[str] = []
+
+    def _enter(self):
+        with self.counter["lock"]:
+            self.counter["active"] += 1
+            self.counter["max_active"] = max(self.counter["max_active"], self.counter["active"])
+
+    def _leave(self):
+        with self.counter["lock"]:
+            self.counter["active"] -= 1
+
+    def analyze(self, article_text: str) -> Argument:
+        self.calls.append("analyze")
+        self._enter()
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError(f"{self.label} failed")
+            return Argument(conclusion=self.label, evidence=[])
+        finally:
+            self._leave()
+
+    def debate(self, critique, opponent_argument, original_argument, article_text=None) -> Rebuttal:
+        self.calls.append("debate")
+        self._enter()
+        try:
+            time.sleep(self.delay)
+            return Rebuttal(counter_points=[self.label], strengthened_evidence=[])
+        finally:
+            self._leave()
+
+
+class TestOrchestratorParallelPhases(unittest.TestCase):
+    def _build(self, options: OrchestrationOptions, delay: float = 0.2, fail_pessimist: bool = False):
+        failing = AlwaysFailChatModel()
+        orch = OrchestrationAgent(
+            llm=failing,
+            llm_fact_checker=failing,
+            researcher_agent=StaticResearcher(),
+            options=options,
+        )
+        counter = {"lock": threading.Lock(), "active": 0, "max_active": 0}
+        orch.optimist = SlowAnalyst("opt", delay, counter)
+        orch.pessimist = SlowAnalyst("pes", delay, counter, fail=fail_pessimist)
+        return orch, counter
+
+    def test_parallel_mode_runs_pairs_concurrently_and_reports_savings(self):
+        orch, counter = self._build(OrchestrationOptions(parallel_phases=True, max_parallelism=2))
+        result = orch.invoke({"topic": "https://example.com/news", "messages": [], "request_id": "t-par"})
+
+        self.assertEqual(counter["max_active"], 2)
+        self.assertEqual(result["optimistic_argument"].conclusion, "opt")
+        self.assertEqual(result["pessimistic_rebuttal"].counter_points, ["pes"])
+
+        timings = result["phase_timings"]
+        for phase in ("analysis", "rebuttal"):
+            self.assertTrue(timings[phase]["parallel"])
+            self.assertGreater(timings[phase]["saved_sec"], 0.1)
+            self.assertEqual(set(timings[phase]["tasks"]), {"optimistic_argument", "pessimistic_argument"} if phase == "analysis" else {"optimistic_rebuttal", "pessimistic_rebuttal"})
+
+    def test_sequential_mode_is_default(self):
+        orch, counter = self._build(OrchestrationOptions(), delay=0.01)
+        result = orch.invoke({"topic": "https://example.com/news", "messages": [], "request_id": "t-seq"})
+
+        self.assertEqual(counter["max_active"], 1)
+        self.assertFalse(result["phase_timings"]["analysis"]["parallel"])
+
+    def test_parallel_mode_keeps_per_task_fallback_and_skip_semantics(self):
+        orch, _ = self._build(OrchestrationOptions(parallel_phases=True), delay=0.01, fail_pessimist=True)
+        preset = Rebuttal(counter_points=["既存"], strengthened_evidence=[])
+        result = orch.invoke(
+            {
+                "topic": "https://example.com/news",
+                "messages": [],
+                "request_id": "t-fallback",
+                "optimistic_rebuttal": preset,
+            }
+        )
+
+        # 悲観側の失敗は悲観側だけのフォールバックになる
+        self.assertEqual(result["optimistic_argument"].conclusion, "opt")
+        self.assertTrue(result["pessimistic_argument"].conclusion.startswith("エラー:"))
+        # state に既にあるフェーズは再実行しない
+        self.assertIs(result["optimistic_rebuttal"], preset)
+        self.assertEqual(orch.optimist.calls, ["analyze"])
+        self.assertEqual(set(result["phase_timings"]["rebuttal"]["tasks"]), {"pessimistic_rebuttal"})
+
+
+if __name__ == "__main__":
+    unittest.main()
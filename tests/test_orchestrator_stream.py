@@ -0,0 +1,111 @@
+import asyncio
+import time
+import unittest
+
+from src.agents.researcher import RssKeywordNotFoundError
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions, PhaseEvent
+from src.models.schemas import Rebuttal
+from tests._orchestrator_fakes import StubAnalyst, build_orchestrator
+
+TOPIC = "https://example.com/news"
+
+
+class NoMatchResearcher:
+    def run(self, topic: str) -> str:
+        raise RssKeywordNotFoundError("一致する記事がありません")
+
+
+def _build(options: OrchestrationOptions | None = None, researcher=None, delays=(0.01, 0.01)) -> OrchestrationAgent:
+    return build_orchestrator(
+        researcher, optimist=StubAnalyst("opt", delays[0]), pessimist=StubAnalyst("pes", delays[1]), options=options
+    )
+
+
+async def _collect(aiter) -> list[PhaseEvent]:
+    return [ev async for ev in aiter]
+
+
+class TestOrchestratorStream(unittest.TestCase):
+    def test_stream_yields_each_phase_then_done(self):
+        events = list(_build().stream({"topic": TOPIC, "request_id": "t-stream"}))
+
+        self.assertEqual(
+            [(ev.phase, ev.key) for ev in events],
+            [
+                ("research", "article_text"),
+                ("analysis", "optimistic_argument"),
+                ("analysis", "pessimistic_argument"),
+                ("fact_check", "critique"),
+                ("rebuttal", "optimistic_rebuttal"),
+                ("rebuttal", "pessimistic_rebuttal"),
+                ("report", "final_report"),
+                ("done", None),
+            ],
+        )
+        self.assertTrue(events[-1].done)
+        self.assertEqual(events[1].value.conclusion, "opt")
+        elapsed = [ev.elapsed_sec for ev in events]
+        self.assertEqual(elapsed, sorted(elapsed))
+
+        final = events[-1].state
+        expected = _build().invoke({"topic": TOPIC, "request_id": "t-stream"})
+        self.assertEqual(set(final), set(expected))
+        for key in ("optimistic_argument", "pessimistic_rebuttal", "final_report"):
+            self.assertEqual(final[key], expected[key])
+
+    def test_parallel_stream_emits_in_completion_order_without_waiting_for_the_pair(self):
+        orch = _build(OrchestrationOptions(parallel_phases=True), delays=(0.3, 0.01))
+        received: list[tuple[str, float]] = []
+        t0 = time.perf_counter()
+        for ev in orch.stream({"topic": TOPIC}):
+            if ev.phase == "analysis":
+                received.append((ev.key, time.perf_counter() - t0))
+
+        self.assertEqual([k for k, _ in received], ["pessimistic_argument", "optimistic_argument"])
+        # 速い方は遅い方（0.3秒）の完了を待たずに届く
+        self.assertLess(received[0][1], 0.25)
+
+    def test_halt_yields_reason_and_stops(self):
+        events = list(_build(researcher=NoMatchResearcher()).stream({"topic": "半導体"}))
+
+        self.assertEqual([(ev.phase, ev.key) for ev in events], [("research", "halt_reason"), ("done", None)])
+        self.assertEqual(events[0].value, "一致する記事がありません")
+        self.assertTrue(events[-1].state["halt"])
+
+    def test_slow_consumer_does_not_inflate_sequential_phase_timing(self):
+        events = []
+        for ev in _build().stream({"topic": TOPIC}):
+            if ev.phase == "analysis":
+                time.sleep(0.2)
+            events.append(ev)
+
+        timing = events[-1].state["phase_timings"]["analysis"]
+        self.assertLess(timing["wall_sec"], 0.15)
+
+    def test_preset_phases_are_not_emitted(self):
+        preset = Rebuttal(counter_points=["既存"], strengthened_evidence=[])
+        events = list(_build().stream({"topic": TOPIC, "optimistic_rebuttal": preset}))
+
+        keys = [ev.key for ev in events if ev.phase == "rebuttal"]
+        self.assertEqual(keys, ["pessimistic_rebuttal"])
+        self.assertIs(events[-1].state["optimistic_rebuttal"], preset)
+
+
+class TestOrchestratorAstream(unittest.TestCase):
+    def test_astream_matches_stream_order(self):
+        events = asyncio.run(_collect(_build().astream({"topic": TOPIC})))
+        self.assertEqual([ev.phase for ev in events], ["research", "analysis", "analysis", "fact_check", "rebuttal", "rebuttal", "report", "done"])
+        self.assertEqual(events[-1].state["optimistic_rebuttal"].counter_points, ["opt"])
+
+    def test_parallel_astream_emits_in_completion_order(self):
+        orch = _build(OrchestrationOptions(parallel_phases=True), delays=(0.2, 0.01))
+        events = asyncio.run(_collect(orch.astream({"topic": TOPIC})))
+
+        analysis = [ev for ev in events if ev.phase == "analysis"]
+        self.assertEqual([ev.key for ev in analysis], ["pessimistic_argument", "optimistic_argument"])
+        self.assertLess(analysis[0].elapsed_sec, analysis[1].elapsed_sec)
+        self.assertTrue(events[-1].state["phase_timings"]["analysis"]["parallel"])
+
+
+if __name__ == "__main__":
+    unittest.main()
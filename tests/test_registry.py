@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.core.orchestrator import OrchestrationOptions
+from src.core.registry import OrchestratorRegistry, config_fingerprint
+
+
+class _Agent:
+    def __init__(self, model_name, *, llm, llm_fact_checker, options):
+        self.model_name = model_name
+        self.llm = llm
+        self.llm_fact_checker = llm_fact_checker
+        self.options = options
+
+
+def _llm_factory(model_name, verify_model=True, **kwargs):
+    return ("llm", model_name, kwargs["temperature"])
+
+
+class TestOrchestratorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.config = ["v1"]
+        self.registry = OrchestratorRegistry(
+            llm_factory=_llm_factory,
+            agent_factory=_Agent,
+            fingerprint=lambda: self.config[0],
+        )
+
+    def test_reuses_agent_per_model_and_options(self):
+        a = self.registry.get("gemma3:4b")
+        self.assertIs(self.registry.get("gemma3:4b"), a)
+        self.assertIsNot(self.registry.get("llama3:8b"), a)
+
+        parallel = self.registry.get("gemma3:4b", options=OrchestrationOptions(parallel_phases=True))
+        self.assertIsNot(parallel, a)
+        # LLMクライアントは options が違っても (モデル, プロファイル) で共有する
+        self.assertIs(parallel.llm, a.llm)
+        self.assertNotEqual(a.llm, a.llm_fact_checker)
+
+        stats = self.registry.stats()
+        self.assertEqual(stats["builds"], 3)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["llm_builds"], 4)
+
+    def test_config_change_rebuilds(self):
+        a = self.registry.get("gemma3:4b")
+        self.config[0] = "v2"
+        b = self.registry.get("gemma3:4b")
+        self.assertIsNot(b, a)
+        self.assertIs(self.registry.get("gemma3:4b"), b)
+
+    def test_explicit_invalidation(self):
+        a = self.registry.get("gemma3:4b")
+        other = self.registry.get("llama3:8b")
+        self.assertEqual(self.registry.invalidate("gemma3:4b"), 1)
+        self.assertIsNot(self.registry.get("gemma3:4b"), a)
+        self.assertIs(self.registry.get("llama3:8b"), other)
+
+        self.assertEqual(self.registry.invalidate(), 2)
+        self.assertIsNot(self.registry.get("llama3:8b"), other)
+
+    def test_concurrent_get_builds_once(self):
+        built = []
+
+        def slow_agent(*args, **kwargs):
+            built.append(1)
+            time.sleep(0.05)
+            return _Agent(*args, **kwargs)
+
+        registry = OrchestratorRegistry(llm_factory=_llm_factory, agent_factory=slow_agent, fingerprint=lambda: 0)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("gemma3:4b"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+
+class TestConfigFingerprint(unittest.TestCase):
+    def test_changes_with_env_and_feeds_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "rss_feeds.txt"
+            path.write_text("https://example.com/rss\n", encoding="utf-8")
+            with patch.dict(os.environ, {"RSS_FEED_URLS": ""}):
+                base = config_fingerprint(str(path))
+                self.assertEqual(config_fingerprint(str(path)), base)
+                path.write_text("https://example.com/rss\nhttps://example.org/feed\n", encoding="utf-8")
+                changed_file = config_fingerprint(str(path))
+            self.assertNotEqual(changed_file, base)
+            with patch.dict(os.environ, {"RSS_FEED_URLS": "https://example.net/rss"}):
+                self.assertNotEqual(config_fingerprint(str(path)), changed_file)
+
+    def test_secret_values_are_not_kept(self):
+        with patch.dict(os.environ, {"TAVILY_API_KEY": "tvly-SECRET"}):
+            self.assertNotIn("tvly-SECRET", repr(config_fingerprint()))
+
+
+if __name__ == "__main__":
+    unittest.main()
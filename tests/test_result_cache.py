@@ -0,0 +1,135 @@
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.core.result_cache import DebateResultCache, normalize_article_text
+from src.models.schemas import Critique, FinalReport
+from src.utils.llm import get_llm
+from tests._orchestrator_fakes import RescuedAnalyst, StaticResearcher, StubReporter, build_orchestrator
+
+ARTICLE = "政府は2025年12月に新制度を発表した。\n  制度は来年度から始まる。"
+
+
+def _researcher(source: str = "https://example.com/a") -> StaticResearcher:
+    return StaticResearcher(f"[source] {source}\n[title] テスト\n\n{ARTICLE}")
+
+
+def _build(cache, source: str = "https://example.com/a", **kwargs) -> OrchestrationAgent:
+    return build_orchestrator(_researcher(source), result_cache=cache, **kwargs)
+
+
+class TestNormalizeArticleText(unittest.TestCase):
+    def test_headers_and_whitespace_are_ignored(self):
+        a = f"[source] https://example.com/a\n[title] A\n\n{ARTICLE}"
+        b = f"[source] https://news.example.org/rss/1\n[title] 別タイトル\n{ARTICLE.replace('  ', ' ')}\n"
+        self.assertEqual(normalize_article_text(a), normalize_article_text(b))
+        self.assertNotEqual(normalize_article_text(a), normalize_article_text(a + "追記"))
+
+
+class TestDebateResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = DebateResultCache(None, ttl_sec=60, max_entries=2)
+
+    def test_same_article_via_another_url_is_served_from_cache(self):
+        first = _build(self.cache, "https://example.com/a")
+        state = first.invoke({"topic": "https://example.com/a", "request_id": "r1"})
+        self.assertFalse(state.get("result_cache_hit"))
+
+        second = _build(self.cache, "https://news.example.org/rss/1")
+        events = list(second.stream({"topic": "経済", "request_id": "r2"}))
+        self.assertEqual([ev.phase for ev in events], ["research", "done"])
+        cached = events[-1].state
+        self.assertTrue(cached["result_cache_hit"])
+        self.assertEqual(cached["topic"], "経済")
+        self.assertEqual(cached["request_id"], "r2")
+        self.assertEqual(cached["final_report"], state["final_report"])
+        self.assertEqual(second.optimist.calls, 0)
+        self.assertEqual(second.reporter.calls, 0)
+
+    def test_bypass_and_config_change_rerun_the_pipeline(self):
+        _build(self.cache).invoke({"topic": "x"})
+
+        bypass = _build(self.cache)
+        state = bypass.invoke({"topic": "x"}, bypass_cache=True)
+        self.assertFalse(state.get("result_cache_hit"))
+        self.assertEqual(bypass.reporter.calls, 1)
+
+        other_prompt = _build(self.cache)
+        other_prompt.options = OrchestrationOptions(truncate_for_prompt_chars=1000)
+        other_prompt.invoke({"topic": "x"})
+        self.assertEqual(other_prompt.reporter.calls, 1)
+
+    def test_failed_runs_are_not_cached(self):
+        _build(self.cache, reporter=StubReporter(fail_times=1)).invoke({"topic": "x"})
+        orch = _build(self.cache)
+        orch.invoke({"topic": "x"})
+        self.assertEqual(orch.reporter.calls, 1)
+
+    def test_runs_that_fell_back_inside_agents_are_not_cached(self):
+        # Ollama に接続できない: 各エージェントは例外を捕まえて "分析中にエラーが発生しました: ..." 等を返す
+        unreachable = get_llm("gemma3:4b", base_url="http://127.0.0.1:9", verify_model=False, cache=False)
+        degraded = OrchestrationAgent(
+            llm=unreachable,
+            llm_fact_checker=unreachable,
+            researcher_agent=_researcher(),
+            checkpoint_store=False,
+            result_cache=self.cache,
+        )
+        state = degraded.invoke({"topic": "x"})
+        self.assertIn("エラー", state["optimistic_argument"].conclusion)
+
+        # 同じ記事・同じ設定でも保存されていないので、もう一度実行する（復旧後に正しい結果を作り直せる）
+        for again in (degraded.invoke({"topic": "x"}), asyncio.run(degraded.ainvoke({"topic": "x"}))):
+            self.assertFalse(again.get("result_cache_hit"))
+            self.assertIn("エラー", again["optimistic_argument"].conclusion)
+
+    def test_runs_rescued_by_a_later_attempt_are_cached(self):
+        first = _build(self.cache, optimist=RescuedAnalyst("opt"))
+        state = first.invoke({"topic": "x"})
+        self.assertTrue(any(r["error"] for r in state["llm_calls"]))
+
+        second = _build(self.cache)
+        cached = second.invoke({"topic": "x"})
+        self.assertTrue(cached["result_cache_hit"])
+        self.assertEqual(cached["optimistic_argument"].conclusion, "opt")
+        self.assertEqual(second.optimist.calls, 0)
+
+    def test_async_stream_uses_cache(self):
+        asyncio.run(_build(self.cache).ainvoke({"topic": "x"}))
+        orch = _build(self.cache)
+        state = asyncio.run(orch.ainvoke({"topic": "x"}))
+        self.assertTrue(state["result_cache_hit"])
+        self.assertEqual(orch.reporter.calls, 0)
+
+    def test_ttl_and_lru_eviction(self):
+        value = {"final_report": None, "critique": Critique(bias_points=["a"]), "topic": "x"}
+        with patch("src.core.result_cache.time.time", return_value=1000.0):
+            self.cache.put("k1", value)
+            self.cache.put("k2", value)
+            self.assertEqual(self.cache.get("k1"), {"critique": Critique(bias_points=["a"])})
+            self.cache.put("k3", value)
+            self.assertIsNone(self.cache.get("k2"))
+        with patch("src.core.result_cache.time.time", return_value=1061.0):
+            self.assertIsNone(self.cache.get("k1"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertEqual(self.cache.stats()["expired"], 1)
+
+    def test_sqlite_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = f"{d}/result_cache.sqlite3"
+            cache = DebateResultCache(path)
+            _build(cache).invoke({"topic": "x"})
+            cache.close()
+
+            reopened = DebateResultCache(path)
+            orch = _build(reopened)
+            state = orch.invoke({"topic": "y"})
+            reopened.close()
+            self.assertTrue(state["result_cache_hit"])
+            self.assertIsInstance(state["final_report"], FinalReport)
+
+
+if __name__ == "__main__":
+    unittest.main()
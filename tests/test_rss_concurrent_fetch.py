@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from src.utils.rss import FeedFetchLimits, afetch_feeds_concurrently, fetch_feeds_concurrently
+
+
+def _rss(title: str, link: str) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>t</title>
+<item><title>{title}</title><link>{link}</link><description>概要</description></item>
+</channel></rss>
+"""
+
+
+class ConcurrencyProbe:
+    """同時実行数（全体/ホスト別）の最大値を記録するフェッチスタブ"""
+
+    def __init__(self, delays: dict[str, float] | None = None, default_delay: float = 0.05):
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.active_by_host: dict[str, int] = {}
+        self.max_by_host: dict[str, int] = {}
+        self.calls: list[str] = []
+
+    def _enter(self, url: str) -> str:
+        host = url.split("/")[2]
+        with self._lock:
+            self.calls.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.active_by_host[host] = self.active_by_host.get(host, 0) + 1
+            self.max_by_host[host] = max(self.max_by_host.get(host, 0), self.active_by_host[host])
+        return host
+
+    def _leave(self, host: str) -> None:
+        with self._lock:
+            self.active -= 1
+            self.active_by_host[host] -= 1
+
+    def __call__(self, url: str, timeout: int = 10) -> str:
+        host = self._enter(url)
+        try:
+            time.sleep(self.delays.get(url, self.default_delay))
+            if "broken" in url:
+                raise ConnectionError("接続失敗")
+            return _rss(f"記事 {url}", url + "/a")
+        finally:
+            self._leave(host)
+
+    async def afetch(self, url: str, timeout: int = 10) -> str:
+        host = self._enter(url)
+        try:
+            await asyncio.sleep(self.delays.get(url, self.default_delay))
+            if "broken" in url:
+                raise ConnectionError("接続失敗")
+            return _rss(f"記事 {url}", url + "/a")
+        finally:
+            self._leave(host)
+
+
+class TestConcurrentFeedFetch(unittest.TestCase):
+    def test_runs_concurrently_and_keeps_feed_order(self):
+        urls = [f"https://feed{i}.example.com/rss" for i in range(8)]
+        probe = ConcurrencyProbe(default_delay=0.1)
+        t0 = time.perf_counter()
+        items = fetch_feeds_concurrently(urls, fetch_xml=probe, limits=FeedFetchLimits(concurrency=8))
+        elapsed = time.perf_counter() - t0
+        self.assertLess(elapsed, 0.5)  # 逐次なら 0.8s
+        self.assertEqual([it.feed_url for it in items], urls)
+
+    def test_global_and_per_host_limits(self):
+        urls = [f"https://a.example.com/rss{i}" for i in range(6)] + [f"https://b{i}.example.com/rss" for i in range(6)]
+        probe = ConcurrencyProbe()
+        items = fetch_feeds_concurrently(urls, fetch_xml=probe, limits=FeedFetchLimits(concurrency=4, per_host=2))
+        self.assertEqual(len(items), 12)
+        self.assertLessEqual(probe.max_active, 4)
+        self.assertLessEqual(probe.max_by_host["a.example.com"], 2)
+
+    def test_deadline_returns_partial_results(self):
+        slow = "https://slow.example.com/rss"
+        urls = ["https://fast1.example.com/rss", slow, "https://fast2.example.com/rss", "https://broken.example.com/rss"]
+        probe = ConcurrencyProbe(delays={slow: 2.0})
+        t0 = time.perf_counter()
+        items = fetch_feeds_concurrently(urls, fetch_xml=probe, limits=FeedFetchLimits(deadline_sec=0.3))
+        elapsed = time.perf_counter() - t0
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual([it.feed_url for it in items], [urls[0], urls[2]])
+
+    def test_async_version_respects_limits_and_deadline(self):
+        slow = "https://slow.example.com/rss"
+        urls = [f"https://a.example.com/rss{i}" for i in range(4)] + [slow]
+        probe = ConcurrencyProbe(delays={slow: 2.0})
+        limits = FeedFetchLimits(concurrency=3, per_host=1, deadline_sec=0.5)
+        items = asyncio.run(afetch_feeds_concurrently(urls, fetch_xml=probe.afetch, limits=limits))
+        self.assertEqual([it.feed_url for it in items], urls[:4])
+        self.assertLessEqual(probe.max_by_host["a.example.com"], 1)
+
+    def test_duplicate_urls_are_fetched_once(self):
+        urls = ["https://a.example.com/rss", "https://b.example.com/rss", "https://a.example.com/rss"]
+        for fetch in (
+            lambda probe: fetch_feeds_concurrently(urls, fetch_xml=probe),
+            lambda probe: asyncio.run(afetch_feeds_concurrently(urls, fetch_xml=probe.afetch)),
+        ):
+            probe = ConcurrencyProbe()
+            items = fetch(probe)
+            self.assertEqual(sorted(probe.calls), sorted(urls[:2]))
+            self.assertEqual([it.feed_url for it in items], urls[:2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from src.utils.rss import BM25Index, FeedItem, rank_items_by_query
+
+
+def _item(title: str, summary: str = "", link: str = "") -> FeedItem:
+    return FeedItem(title=title, link=link or f"https://example.com/{abs(hash(title + summary))}", summary=summary)
+
+
+class TestBM25Ranking(unittest.TestCase):
+    def test_title_match_beats_summary_match(self):
+        in_title = _item("半導体の輸出規制を強化", "政府は発表した")
+        in_summary = _item("政府が新方針を発表", "半導体の輸出規制を強化")
+        ranked = rank_items_by_query([in_summary, in_title], "半導体")
+        self.assertEqual(ranked, [in_title, in_summary])
+
+    def test_rare_term_weighs_more(self):
+        items = [_item(f"経済ニュース {i}", "市場") for i in range(10)]
+        rare = _item("経済と半導体", "市場")
+        ranked = rank_items_by_query(items + [rare], "経済 半導体", limit=3)
+        self.assertEqual(ranked[0], rare)
+        self.assertEqual(len(ranked), 3)
+
+    def test_cjk_query_requires_whole_token(self):
+        # 「テスト」は2-gram（テス/スト）がすべて含まれる記事だけが対象
+        hit = _item("テスト記事")
+        partial = _item("テスラの決算")
+        self.assertEqual(rank_items_by_query([partial, hit], "テスト"), [hit])
+
+    def test_long_cjk_query_matches_partial_bigrams(self):
+        # 4文字以上の単語クエリは2-gramも補助トークンになるため、部分一致も拾う
+        exact = _item("金融政策の見通し")
+        partial = _item("政策金利を据え置き")
+        ranked = rank_items_by_query([partial, exact], "金融政策")
+        self.assertEqual(ranked, [exact, partial])
+
+    def test_english_is_case_insensitive_and_word_based(self):
+        a = _item("New AI model released")
+        b = _item("OpenAI earnings")
+        self.assertEqual(rank_items_by_query([b, a], "ai"), [a])
+
+    def test_ties_keep_insertion_order_and_limit(self):
+        items = [_item("同じ見出し", link=f"https://example.com/{i}") for i in range(7)]
+        self.assertEqual(rank_items_by_query(items, "見出し", limit=5), items[:5])
+        self.assertEqual(rank_items_by_query(items, "見出し", limit=0), [])
+        self.assertEqual(rank_items_by_query(items, "   "), [])
+
+    def test_remove_updates_postings_and_stats(self):
+        index = BM25Index()
+        a = index.add(_item("日銀が利上げ"))
+        index.add(_item("日銀総裁の会見"))
+        index.remove(a)
+        self.assertEqual(len(index), 1)
+        self.assertEqual([it.title for it in index.search("日銀")], ["日銀総裁の会見"])
+        self.assertEqual(index.search("利上げ"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import threading
+import time
+import unittest
+
+from src.core.orchestrator import PhaseEvent
+from src.core.runs import RunCancelledError, RunManager
+
+
+def _event(phase, key, state, value=None):
+    return PhaseEvent(phase=phase, key=key, value=value, duration_sec=0.0, elapsed_sec=0.0, state=state)
+
+
+class ScriptedOrchestrator:
+    """stream() が指定のイベントを返すだけのスタブ。gate を渡すと各フェーズの前で止まる"""
+
+    def __init__(self, gate: threading.Event | None = None, tokens: int = 0):
+        self.gate = gate
+        self.tokens = tokens
+        self.started = threading.Event()
+        self.calls = 0
+        self.token_errors: list[Exception] = []
+
+    def stream(self, initial_state, on_token=None):
+        self.calls += 1
+        self.started.set()
+        state = dict(initial_state)
+        for key in ("optimistic_argument", "pessimistic_argument", "final_report"):
+            if self.gate is not None:
+                self.gate.wait(5)
+            for _ in range(self.tokens):
+                try:
+                    on_token(key, ("conclusion",), "あ")
+                except RunCancelledError as e:
+                    # エージェントと同じく、生成の打ち切りはフォールバック値で受ける
+                    self.token_errors.append(e)
+                    break
+            state[key] = f"{key}-value"
+            yield _event("analysis", key, state, state[key])
+        yield _event("done", None, state)
+
+
+class FailingOrchestrator:
+    def stream(self, initial_state, on_token=None):
+        yield _event("research", "article_text", dict(initial_state))
+        raise RuntimeError("boom")
+
+
+class TestRunManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = RunManager(max_workers=1, max_finished=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_run_completes_in_background_with_progress(self):
+        orch = ScriptedOrchestrator(tokens=3)
+        snap = self.manager.submit("r1", orch, {"topic": "x"})
+        self.assertIn(snap.status, ("queued", "running"))
+
+        done = self.manager.wait("r1", timeout=5)
+        self.assertEqual(done.status, "done")
+        self.assertEqual([ev.key for ev in done.events], ["optimistic_argument", "pessimistic_argument", "final_report", None])
+        self.assertEqual(done.state["final_report"], "final_report-value")
+        self.assertEqual(done.state["request_id"], "r1")
+        self.assertEqual(done.drafts["optimistic_argument"][("conclusion",)], "あああ")
+
+    def test_resubmitting_an_active_run_does_not_start_another(self):
+        gate = threading.Event()
+        orch = ScriptedOrchestrator(gate=gate)
+        self.manager.submit("r1", orch, {"topic": "x"})
+        orch.started.wait(5)
+        again = self.manager.submit("r1", orch, {"topic": "x"})
+        self.assertEqual(again.status, "running")
+        gate.set()
+        self.assertEqual(self.manager.wait("r1", timeout=5).status, "done")
+        self.assertEqual(orch.calls, 1)
+
+    def test_cancel_running_run_stops_after_current_step(self):
+        gate = threading.Event()
+        orch = ScriptedOrchestrator(gate=gate, tokens=2)
+        self.manager.submit("r1", orch, {"topic": "x"})
+        orch.started.wait(5)
+        self.assertTrue(self.manager.cancel("r1"))
+        gate.set()
+
+        snap = self.manager.wait("r1", timeout=5)
+        self.assertEqual(snap.status, "cancelled")
+        self.assertLess(len(snap.events), 4)
+        self.assertTrue(orch.token_errors)
+        self.assertFalse(self.manager.cancel("r1"))
+
+    def test_queued_run_can_be_cancelled_before_it_starts(self):
+        gate = threading.Event()
+        first = ScriptedOrchestrator(gate=gate)
+        second = ScriptedOrchestrator()
+        self.manager.submit("r1", first, {"topic": "x"})
+        first.started.wait(5)
+        self.assertEqual(self.manager.submit("r2", second, {"topic": "y"}).status, "queued")
+
+        self.assertTrue(self.manager.cancel("r2"))
+        self.assertEqual(self.manager.get("r2").status, "cancelled")
+        gate.set()
+        self.manager.wait("r1", timeout=5)
+        self.manager.shutdown(cancel=False)
+        self.assertEqual(second.calls, 0)
+
+    def test_failure_is_recorded(self):
+        self.manager.submit("r1", FailingOrchestrator(), {"topic": "x"})
+        snap = self.manager.wait("r1", timeout=5)
+        self.assertEqual(snap.status, "failed")
+        self.assertIsInstance(snap.error, RuntimeError)
+        self.assertEqual(len(snap.events), 1)
+
+    def test_wait_for_update_returns_on_progress(self):
+        gate = threading.Event()
+        orch = ScriptedOrchestrator(gate=gate)
+        snap = self.manager.submit("r1", orch, {"topic": "x"})
+        orch.started.wait(5)
+        current = self.manager.get("r1")
+
+        t0 = time.perf_counter()
+        timer = threading.Timer(0.05, gate.set)
+        timer.start()
+        updated = self.manager.wait_for_update("r1", current.version, timeout=5)
+        self.assertGreater(updated.version, current.version)
+        self.assertLess(time.perf_counter() - t0, 2)
+        self.assertGreater(current.version, snap.version)
+        self.manager.wait("r1", timeout=5)
+
+    def test_old_finished_runs_are_pruned(self):
+        for i in range(4):
+            self.manager.submit(f"r{i}", ScriptedOrchestrator(), {"topic": "x"})
+            self.manager.wait(f"r{i}", timeout=5)
+        self.assertIsNone(self.manager.get("r0"))
+        self.assertIsNone(self.manager.get("r1"))
+        self.assertEqual(self.manager.get("r3").status, "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,13 +6,23 @@ from src.utils.security import (
     OutboundHttpError,
     ResponseTooLargeError,
     UrlValidationError,
+    _build_http_session,
+    clear_dns_cache,
     fetch_url_bytes,
+    get_dns_cache_stats,
+    resolve_host_ips,
     sanitize_url_for_logging,
     validate_outbound_url,
 )
 
 
 class TestSecurityUtils(unittest.TestCase):
+    def setUp(self):
+        clear_dns_cache()
+
+    def tearDown(self):
+        clear_dns_cache()
+
     def test_sanitize_url_masks_query_and_removes_newlines(self):
         s = sanitize_url_for_logging("https://example.com/path?token=SECRET\nx=1#frag")
         self.assertNotIn("\n", s)
@@ -101,7 +111,7 @@ class TestSecurityUtils(unittest.TestCase):
             def __init__(self):
                 self.calls = 0
 
-            def get(self, url, headers=None, timeout=None, stream=None, allow_redirects=None):
+            def get(self, url, headers=None, cookies=None, timeout=None, stream=None, allow_redirects=None):
                 self.calls += 1
                 # 初回は302、以降は呼ばれない想定
                 return FakeResponse(302, {"Location": "http://127.0.0.1/"})
@@ -112,7 +122,7 @@ class TestSecurityUtils(unittest.TestCase):
             raise UrlValidationError("blocked")
 
         with patch.dict(os.environ, {"URL_ALLOW_REDIRECTS": "1", "URL_MAX_REDIRECTS": "2"}):
-            with patch("src.utils.security.requests.Session", return_value=FakeSession()):
+            with patch("src.utils.security._get_http_session", return_value=FakeSession()):
                 with patch("src.utils.security.validate_outbound_url", side_effect=validate_side_effect):
                     with self.assertRaises(UrlValidationError):
                         fetch_url_bytes("https://example.com/news", purpose="article")
@@ -133,14 +143,14 @@ class TestSecurityUtils(unittest.TestCase):
                 return None
 
         class FakeSession:
-            def get(self, url, headers=None, timeout=None, stream=None, allow_redirects=None):
+            def get(self, url, headers=None, cookies=None, timeout=None, stream=None, allow_redirects=None):
                 return FakeResponse()
 
         def ok_validate(url, *, purpose):
             return url
 
         with patch.dict(os.environ, {"HTTP_MAX_BYTES": "10"}):
-            with patch("src.utils.security.requests.Session", return_value=FakeSession()):
+            with patch("src.utils.security._get_http_session", return_value=FakeSession()):
                 with patch("src.utils.security.validate_outbound_url", side_effect=ok_validate):
                     with self.assertRaises(ResponseTooLargeError):
                         fetch_url_bytes("https://example.com/news", purpose="article")
@@ -162,50 +172,78 @@ class TestSecurityUtils(unittest.TestCase):
                 return None
 
         class FakeSession:
-            def get(self, url, headers=None, timeout=None, stream=None, allow_redirects=None):
+            def get(self, url, headers=None, cookies=None, timeout=None, stream=None, allow_redirects=None):
                 return FakeResponse()
 
         def ok_validate(url, *, purpose):
             return url
 
         with patch.dict(os.environ, {"HTTP_MAX_BYTES": "10"}):
-            with patch("src.utils.security.requests.Session", return_value=FakeSession()):
+            with patch("src.utils.security._get_http_session", return_value=FakeSession()):
                 with patch("src.utils.security.validate_outbound_url", side_effect=ok_validate):
                     with self.assertRaises(ResponseTooLargeError):
                         fetch_url_bytes("https://example.com/news", purpose="article")
 
     def test_fetch_disables_env_proxy_by_default(self):
-        # requests.Session().trust_env が False になること（環境プロキシを拾わない）
-        class FakeResponse:
-            def __init__(self):
-                self.status_code = 200
-                self.headers = {"Content-Type": "text/html; charset=utf-8"}
+        # 共有セッションの trust_env が False になること（環境プロキシを拾わない）
+        with patch.dict(os.environ, {"HTTP_TRUST_ENV": ""}):
+            sess = _build_http_session()
+        try:
+            self.assertFalse(sess.trust_env)
+        finally:
+            sess.close()
 
-            def raise_for_status(self):
-                return None
 
-            def iter_content(self, chunk_size=65536):
-                yield b"ok"
+class TestDnsCache(unittest.TestCase):
+    def setUp(self):
+        clear_dns_cache()
 
-            def close(self):
-                return None
+    def tearDown(self):
+        clear_dns_cache()
 
-        class FakeSession:
-            def __init__(self):
-                self.trust_env = True
+    def test_resolution_is_cached_until_ttl(self):
+        calls = []
 
-            def get(self, url, headers=None, timeout=None, stream=None, allow_redirects=None):
-                return FakeResponse()
+        def fake_getaddrinfo(host, *args, **kwargs):
+            calls.append(host)
+            return [(2, None, None, None, ("93.184.216.34", 0))]
 
-        sess = FakeSession()
+        with patch("socket.getaddrinfo", side_effect=fake_getaddrinfo):
+            validate_outbound_url("https://example.com/a", purpose="article")
+            validate_outbound_url("https://EXAMPLE.com/b", purpose="rss")
+            self.assertEqual(resolve_host_ips("example.com"), ["93.184.216.34"])
+            self.assertEqual(calls, ["example.com"])
 
-        def ok_validate(url, *, purpose):
-            return url
+            with patch("src.utils.security.time.monotonic", return_value=10**9):
+                resolve_host_ips("example.com")
+            self.assertEqual(len(calls), 2)
+
+    def test_failures_are_negatively_cached(self):
+        calls = []
+
+        def failing_getaddrinfo(host, *args, **kwargs):
+            calls.append(host)
+            raise OSError("nxdomain")
 
-        with patch("src.utils.security.requests.Session", return_value=sess):
-            with patch("src.utils.security.validate_outbound_url", side_effect=ok_validate):
-                fetch_url_bytes("https://example.com/news", purpose="article")
-                self.assertFalse(sess.trust_env)
+        with patch("socket.getaddrinfo", side_effect=failing_getaddrinfo):
+            for _ in range(3):
+                with self.assertRaises(UrlValidationError):
+                    validate_outbound_url("https://missing.example/", purpose="article")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_dns_cache_stats()["negative_hits"], 2)
+
+    def test_ttl_zero_disables_cache(self):
+        calls = []
+
+        def fake_getaddrinfo(host, *args, **kwargs):
+            calls.append(host)
+            return [(2, None, None, None, ("93.184.216.34", 0))]
+
+        with patch.dict(os.environ, {"DNS_CACHE_TTL_SEC": "0"}):
+            with patch("socket.getaddrinfo", side_effect=fake_getaddrinfo):
+                resolve_host_ips("example.com")
+                resolve_host_ips("example.com")
+        self.assertEqual(len(calls), 2)
 
 
 if __name__ == "__main__":
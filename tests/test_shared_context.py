@@ -0,0 +1,86 @@
+import os
+import unittest
+from typing import Any, List, Optional
+from unittest.mock import patch
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import Field
+
+from src.core.orchestrator import OrchestrationAgent
+from src.utils.shared_context import SHARED_CONTEXT_MAX_CHARS, shared_article_text
+from src.utils.testing_models import AlwaysFailChatModel
+from tests._orchestrator_fakes import StaticResearcher
+
+ARTICLE = "[source] https://example.com/news\n[title] テスト\n\n政府は2025年12月に新制度を発表した。" + "補助の対象は半導体工場。" * 800
+
+
+class PromptRecorder(AlwaysFailChatModel):
+    """受け取ったメッセージを記録してから失敗する（各エージェントはフォールバックで完走する）"""
+
+    calls: list = Field(default_factory=list)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "PromptRecorder":
+        return self
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        self.calls.append([m.content for m in messages])
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _run(shared: str) -> list:
+    model = PromptRecorder()
+    orch = OrchestrationAgent(
+        llm=model,
+        llm_fact_checker=model,
+        researcher_agent=StaticResearcher(ARTICLE),
+        checkpoint_store=False,
+        result_cache=False,
+    )
+    with patch.dict(os.environ, {"SHARED_CONTEXT_PROMPTS": shared}):
+        orch.invoke({"topic": "x"})
+    return model.calls
+
+
+class TestSharedContextPrompts(unittest.TestCase):
+    def test_every_phase_starts_with_the_same_prefix(self):
+        calls = _run("1")
+
+        # analyze x2 / validate / debate x2 / facts (+ JSON) / report (+ JSON)
+        self.assertGreaterEqual(len(calls), 7)
+        prefixes = {messages[0] for messages in calls}
+        self.assertEqual(len(prefixes), 1)
+        prefix = prefixes.pop()
+        self.assertIn(shared_article_text(ARTICLE), prefix)
+        for messages in calls:
+            # 記事本文は先頭部分にだけ入り、役割ごとの指示は後ろのメッセージに入る
+            self.assertEqual(len(messages), 2)
+            self.assertNotIn("補助の対象は半導体工場。" * 3, messages[1])
+        self.assertTrue(any("楽観的アナリストです" in m[1] for m in calls))
+        self.assertTrue(any("ファクトチェッカーです" in m[1] for m in calls))
+        self.assertTrue(any("レポートエージェントです" in m[1] for m in calls))
+
+    def test_default_layout_is_unchanged(self):
+        calls = _run("0")
+        self.assertGreater(len({messages[0] for messages in calls}), 1)
+        self.assertTrue(calls[0][0].startswith("あなたは楽観的アナリストです"))
+
+    def test_shared_article_is_truncated_the_same_way_everywhere(self):
+        text = shared_article_text(ARTICLE)
+        self.assertLessEqual(len(text), SHARED_CONTEXT_MAX_CHARS + len("\n\n...(中略)...\n\n"))
+        self.assertEqual(text, shared_article_text("\n" + ARTICLE + "  "))
+
+    def test_result_cache_key_depends_on_layout(self):
+        failing = AlwaysFailChatModel()
+        orch = OrchestrationAgent(llm=failing, llm_fact_checker=failing, checkpoint_store=False, result_cache=False)
+        keys = set()
+        for shared in ("0", "1"):
+            with patch.dict(os.environ, {"SHARED_CONTEXT_PROMPTS": shared}):
+                keys.add(orch._result_cache_key(ARTICLE))
+        self.assertEqual(len(keys), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import threading
+import unittest
+
+from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+from src.core.singleflight import FlightAbandonedError, SingleFlight
+from tests._orchestrator_fakes import StaticResearcher, build_orchestrator
+
+
+def _gated_source(gate: threading.Event, calls: list, n: int = 3, fail: bool = False):
+    def start(emit):
+        calls.append(1)
+        for i in range(n):
+            gate.wait(5)
+            emit(f"token-{i}")
+            yield i
+        if fail:
+            raise RuntimeError("boom")
+
+    return start
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flights = SingleFlight()
+        gate = threading.Event()
+        calls: list = []
+        first = flights.stream("k", _gated_source(gate, calls))
+        second = flights.stream("k", _gated_source(gate, calls))
+        gate.set()
+
+        a = list(first)
+        b = list(second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(a, b)
+        self.assertEqual([p for kind, p in a if kind == "event"], [0, 1, 2])
+        self.assertEqual([p for kind, p in a if kind == "token"], ["token-0", "token-1", "token-2"])
+        self.assertEqual(flights.stats()["coalesced"], 1)
+        self.assertEqual(flights.in_flight(), 0)
+
+        # 終わった実行には合流しない
+        list(flights.stream("k", _gated_source(gate, calls)))
+        self.assertEqual(len(calls), 2)
+
+    def test_late_joiner_gets_earlier_items(self):
+        flights = SingleFlight()
+        step = threading.Semaphore(0)
+        calls: list = []
+
+        def start(emit):
+            calls.append(1)
+            for i in range(2):
+                step.acquire(timeout=5)
+                yield i
+
+        first = flights.stream("k", start)
+        step.release()
+        self.assertEqual(next(first), ("event", 0))
+        late = flights.stream("k", start)
+        step.release()
+        self.assertEqual(list(late), [("event", 0), ("event", 1)])
+        self.assertEqual(list(first), [("event", 1)])
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_reach_every_subscriber(self):
+        flights = SingleFlight()
+        gate = threading.Event()
+        calls: list = []
+        subs = [flights.stream("k", _gated_source(gate, calls, n=1, fail=True)) for _ in range(2)]
+        gate.set()
+        for sub in subs:
+            with self.assertRaises(RuntimeError):
+                list(sub)
+
+    def test_execution_stops_when_everyone_leaves(self):
+        flights = SingleFlight()
+        step = threading.Semaphore(0)
+        finished = threading.Event()
+        seen: list = []
+
+        def start(emit):
+            try:
+                for i in range(100):
+                    step.acquire(timeout=5)
+                    try:
+                        emit(i)
+                    except FlightAbandonedError:
+                        seen.append("abandoned")
+                    yield i
+            finally:
+                finished.set()
+
+        first = flights.stream("k", start)
+        second = flights.stream("k", start)
+        step.release()
+        self.assertEqual(next(first), ("token", 0))
+        self.assertEqual(next(second), ("token", 0))
+        first.close()
+        step.release()
+        self.assertEqual(next(second), ("event", 0))
+        self.assertFalse(finished.is_set())
+        second.close()
+        step.release()
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(seen, ["abandoned"])
+        self.assertEqual(flights.stats()["abandoned"], 1)
+
+
+def _build(gate: threading.Event, options: OrchestrationOptions | None = None) -> OrchestrationAgent:
+    return build_orchestrator(StaticResearcher(gate=gate), options=options)
+
+
+def _invoke_concurrently(orch: OrchestrationAgent, topics: list[str]) -> tuple[list[threading.Thread], list]:
+    results: list = [None] * len(topics)
+
+    def run(i: int) -> None:
+        results[i] = orch.invoke({"topic": topics[i], "request_id": f"r{i}", "messages": []})
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(topics))]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+class TestOrchestratorCoalescing(unittest.TestCase):
+    def test_identical_topics_run_once(self):
+        gate = threading.Event()
+        orch = _build(gate, OrchestrationOptions(coalesce_identical_requests=True))
+        threads, results = _invoke_concurrently(orch, ["  Breaking  News ", "breaking news", "https://example.com/a#top"])
+        # 最初の実行が記事取得で止まっている間に全員が合流する
+        while orch._inflight.stats()["coalesced"] < 1 or orch._inflight.in_flight() < 2:
+            threading.Event().wait(0.01)
+        gate.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(orch.researcher.calls, 2)
+        self.assertEqual(orch.reporter.calls, 2)
+        self.assertEqual(results[0]["final_report"], results[1]["final_report"])
+        self.assertEqual([r["request_id"] for r in results], ["r0", "r1", "r2"])
+        self.assertEqual(results[1]["topic"], "breaking news")
+
+    def test_disabled_by_default(self):
+        gate = threading.Event()
+        gate.set()
+        orch = _build(gate)
+        threads, results = _invoke_concurrently(orch, ["x", "x"])
+        for t in threads:
+            t.join(5)
+        self.assertEqual(orch.researcher.calls, 2)
+        self.assertEqual(orch._inflight.stats()["executions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
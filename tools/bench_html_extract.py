@@ -0,0 +1,77 @@
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+PARAGRAPHS = [
+    "政府は15日、半導体の輸出管理を強化する新たな制度の概要を発表した。対象品目を拡大し、審査期間を短縮する。",
+    "経済産業省によると、新制度は2026年4月から段階的に施行される予定で、企業には事前の届け出が求められる。",
+    "業界団体は「サプライチェーンへの影響を最小限にしてほしい」とコメントし、詳細な運用指針の早期公表を求めた。",
+    "一方、専門家の間では、規制強化が国内企業の競争力に与える影響について慎重な見方も出ている。",
+]
+
+
+def make_large_page(target_bytes: int) -> str:
+    """ナビ/関連記事/コメント欄が大量にある、数MB級のニュース記事ページを生成する。"""
+    head = (
+        "<!DOCTYPE html><html lang=\"ja\"><head><meta charset=\"utf-8\">"
+        "<title>半導体の輸出管理を強化へ | ニュースサイト</title>"
+        "<meta property=\"og:title\" content=\"半導体の輸出管理を強化へ\">"
+        + "".join(f"<script>var tracking{i} = {{id: {i}, name: 'tag{i}'}};</script>" for i in range(50))
+        + "</head><body>"
+    )
+    nav = "<header><nav><ul>" + "".join(f"<li><a href=\"/c/{i}\">カテゴリ{i}</a></li>" for i in range(200)) + "</ul></nav></header>"
+    article = "<article><h1>半導体の輸出管理を強化へ 政府が新制度</h1>"
+    article += "".join(f"<p>{PARAGRAPHS[i % len(PARAGRAPHS)]}（{i}）</p>" for i in range(120))
+    article += "</article>"
+    parts = [head, nav, article, "<aside class=\"related\"><ul>"]
+    size = sum(len(p.encode("utf-8")) for p in parts)
+    i = 0
+    while size < target_bytes:
+        chunk = (
+            f"<li class=\"item\" style=\"display:{'none' if i % 7 == 0 else 'block'}\">"
+            f"<a href=\"/news/{i}\">関連記事の見出しテキスト{i}：地域経済と物価の動向</a>"
+            f"<span class=\"sr-only\">新着</span><p>コメント{i}: 記事に対する読者のコメントがここに入ります。</p></li>"
+        )
+        parts.append(chunk)
+        size += len(chunk.encode("utf-8"))
+        i += 1
+    parts.append("</ul></aside><footer><p>© 2026 ニュースサイト</p></footer></body></html>")
+    return "".join(parts)
+
+
+def main() -> int:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    from src.agents.researcher import ResearcherAgent
+
+    parser = argparse.ArgumentParser(description="記事本文抽出（_extract_article_text）のベンチマーク")
+    parser.add_argument("--size-mb", type=float, default=3.0, help="生成する大きなページのサイズ")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = ResearcherAgent.__new__(ResearcherAgent)
+    pages = {f"large_{args.size_mb:g}MB": make_large_page(int(args.size_mb * 1_000_000))}
+    for path in sorted((project_root / "tests" / "fixtures" / "html").glob("*.html")):
+        pages[path.stem] = path.read_text(encoding="utf-8")
+
+    print(f"{'page':<28}{'bytes':>10}{'median':>12}{'min':>12}")
+    for name, html in pages.items():
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            try:
+                agent._extract_article_text(html, "https://example.com/news", include_header=True)
+            except ValueError:
+                pass
+            times.append((time.perf_counter() - t0) * 1000)
+        print(f"{name:<28}{len(html.encode('utf-8')):>10}{statistics.median(times):>10.1f}ms{min(times):>10.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
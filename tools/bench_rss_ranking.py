@@ -0,0 +1,92 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+WORDS_JA = [
+    "政府", "半導体", "輸出規制", "金融政策", "日銀", "利上げ", "物価", "賃金", "選挙", "与党", "野党",
+    "円安", "株価", "決算", "生成AI", "規制", "補助金", "電力", "原発", "気候変動", "少子化", "年金",
+    "防衛費", "外交", "首脳会談", "関税", "貿易", "自動車", "EV", "電池", "通信", "災害", "地震",
+]
+WORDS_EN = [
+    "market", "policy", "bank", "rate", "election", "chip", "export", "model", "energy", "climate",
+    "trade", "tariff", "earnings", "battery", "network", "security", "launch", "report", "growth",
+]
+QUERIES = ["半導体", "金融政策", "日銀 利上げ", "生成AI 規制", "chip export", "気候変動", "防衛費", "EV 電池"]
+
+
+def _legacy_rank(items, query: str, limit: int = 5):
+    """置き換え前の rank_items_by_query（部分一致の総当たり）。比較用。"""
+    from src.utils.rss import _tokenize_query
+
+    tokens = _tokenize_query(query.strip())
+    scored = []
+    for it in items:
+        hay = f"{it.title}\n{it.summary}".lower()
+        hit = 0
+        for t in set(tokens):
+            tl = t.lower()
+            if tl and tl in hay:
+                hit += max(1, min(len(tl), 6))
+        if hit > 0:
+            scored.append((hit, it))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [it for _, it in scored[:limit]]
+
+
+def _make_items(n: int, seed: int):
+    from src.utils.rss import FeedItem
+
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        title = "".join(rng.sample(WORDS_JA, 3)) + " " + " ".join(rng.sample(WORDS_EN, 2))
+        summary = "、".join(rng.sample(WORDS_JA, 6)) + "について。" + " ".join(rng.sample(WORDS_EN, 4))
+        items.append(FeedItem(title=title, link=f"https://example.com/{i}", summary=summary, feed_url="bench"))
+    return items
+
+
+def _timeit(fn, repeat: int) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main() -> int:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    from src.utils.rss import BM25Index
+
+    parser = argparse.ArgumentParser(description="RSS記事ランキングのベンチマーク（BM25 vs 旧方式）")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    items = _make_items(args.items, args.seed)
+
+    t0 = time.perf_counter()
+    index = BM25Index(items)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"items={len(items)} build={build_ms:.0f}ms")
+    print(f"{'query':<16}{'bm25 p50':>12}{'bm25 p95':>12}{'legacy p50':>14}")
+
+    for q in QUERIES:
+        bm25 = sorted(_timeit(lambda: index.search(q, limit=5), args.repeat))
+        legacy = _timeit(lambda: _legacy_rank(items, q, limit=5), args.legacy_repeat)
+        p95 = bm25[min(len(bm25) - 1, int(len(bm25) * 0.95))]
+        print(f"{q:<16}{statistics.median(bm25):>10.2f}ms{p95:>10.2f}ms{statistics.median(legacy):>12.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+import argparse
+import logging
+import os
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import Field
+
+
+LAYOUTS = {"per_agent": "0", "shared": "1"}
+
+PARAGRAPHS = [
+    "政府は2025年12月、半導体の国内生産を支援する新制度を発表した。総額は3兆円規模で、{n}年間にわたり段階的に支出する。",
+    "経済産業省によると、対象は先端ロジック半導体と車載向けのパワー半導体で、工場の建設費の最大半分を補助する。",
+    "業界団体は歓迎する一方、電力と人材の確保が課題になると指摘した。地方の工場では技術者が2割不足しているという。",
+    "野党は財源の裏付けが不十分だと批判しており、来年の通常国会で補助の効果検証を求める方針だ。",
+    "海外では米国と欧州も同様の補助を拡大しており、各国の補助金競争が激しくなっている。",
+]
+
+
+def _article(run: int, chars: int) -> str:
+    # 先頭に run ごとに異なる行を入れ、前の run のキャッシュが効かないようにする（計るのは1リクエスト内の再利用）
+    body = []
+    i = 0
+    while sum(len(p) for p in body) < chars:
+        body.append(PARAGRAPHS[i % len(PARAGRAPHS)].format(n=i + 3))
+        i += 1
+    return f"[source] https://example.com/bench/{run}\n[title] 半導体支援の新制度（bench {run}）\n\n" + "\n".join(body)
+
+
+def _build(model: Any, article: str):
+    from src.core.orchestrator import OrchestrationAgent, OrchestrationOptions
+
+    class StaticResearcher:
+        def run(self, topic: str) -> str:
+            return article
+
+    kwargs = {"llm": model, "llm_fact_checker": model} if not isinstance(model, str) else {"model_name": model}
+    return OrchestrationAgent(
+        **kwargs,
+        researcher_agent=StaticResearcher(),
+        checkpoint_store=False,
+        result_cache=False,
+        # 呼び出し順を固定する（Ollama は直前の呼び出しと共通な先頭部分の KV キャッシュを再利用する）
+        options=OrchestrationOptions(parallel_phases=False),
+    )
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _offline(args) -> None:
+    """LLM を呼ばず、各フェーズのプロンプトが直前の呼び出しと先頭で何文字共通かを数える"""
+    from src.utils.testing_models import AlwaysFailChatModel
+
+    class PromptRecorder(AlwaysFailChatModel):
+        """受け取ったプロンプトを記録してから失敗する（各エージェントはフォールバックで完走する）"""
+
+        prompts: list = Field(default_factory=list)
+
+        def bind_tools(self, tools: Any, **kwargs: Any) -> "PromptRecorder":
+            # with_structured_output の経路でもモデル呼び出しまで進めてプロンプトを記録する
+            return self
+
+        def _generate(
+            self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+        ) -> ChatResult:
+            self.prompts.append("\n".join(f"{m.type}: {m.content}" for m in messages))
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    logging.disable(logging.ERROR)  # 各エージェントのフォールバックのログ（意図した失敗）を出さない
+    for layout, flag in LAYOUTS.items():
+        os.environ["SHARED_CONTEXT_PROMPTS"] = flag
+        model = PromptRecorder()
+        _build(model, _article(0, args.article_chars)).invoke({"topic": "bench", "request_id": f"bench-{layout}"})
+        total = sum(len(p) for p in model.prompts)
+        reused = sum(_common_prefix(prev, cur) for prev, cur in zip(model.prompts, model.prompts[1:]))
+        print(
+            f"{layout:>9}: calls={len(model.prompts)} prompt_chars={total} "
+            f"reusable_prefix_chars={reused} ({reused / total:.0%}) prefill_chars={total - reused}"
+        )
+
+
+def _live(args) -> None:
+    """Ollama で実行し、state["llm_calls"] の prompt_eval_count / prompt_eval_duration（実際に prefill した分）を比べる"""
+    from src.utils.llm import check_ollama_connection
+
+    if not check_ollama_connection():
+        raise SystemExit("Ollama に接続できません（--offline ならLLM無しで先頭部分の共通率だけを比べます）")
+
+    totals: dict[str, dict[str, list[float]]] = {layout: {"tokens": [], "sec": [], "wall": []} for layout in LAYOUTS}
+    for run in range(args.repeat):
+        # 直前の run の影響を偏らせないよう、run ごとに順番を入れ替える
+        order = list(LAYOUTS.items()) if run % 2 == 0 else list(reversed(LAYOUTS.items()))
+        for layout, flag in order:
+            os.environ["SHARED_CONTEXT_PROMPTS"] = flag
+            article = _article(run * len(LAYOUTS) + list(LAYOUTS).index(layout) + 1, args.article_chars)
+            state = _build(args.model, article).invoke({"topic": "bench", "request_id": f"bench-{layout}-{run}"})
+            calls = [c for c in state.get("llm_calls") or [] if c.get("prompt_eval_count") is not None]
+            totals[layout]["tokens"].append(sum(c["prompt_eval_count"] for c in calls))
+            totals[layout]["sec"].append(sum(c["prompt_eval_duration_sec"] or 0.0 for c in calls))
+            totals[layout]["wall"].append(sum(c["wall_sec"] for c in calls))
+            print(
+                f"run={run} {layout:>9}: calls={len(calls)} prefill_tokens={totals[layout]['tokens'][-1]} "
+                f"prefill={totals[layout]['sec'][-1]:.2f}s llm_wall={totals[layout]['wall'][-1]:.2f}s"
+            )
+
+    print(f"model={args.model} article_chars={args.article_chars} repeat={args.repeat}（中央値）")
+    for layout, t in totals.items():
+        print(
+            f"{layout:>9}: prefill_tokens={statistics.median(t['tokens']):.0f} "
+            f"prefill={statistics.median(t['sec']):.2f}s llm_wall={statistics.median(t['wall']):.2f}s"
+        )
+    before, after = statistics.median(totals["per_agent"]["sec"]), statistics.median(totals["shared"]["sec"])
+    if before > 0:
+        print(f"prefill time: {before:.2f}s -> {after:.2f}s ({(after - before) / before:+.0%})")
+
+
+def main() -> int:
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(description="共通の先頭部分を持つプロンプト（SHARED_CONTEXT_PROMPTS）の prefill 比較")
+    parser.add_argument("--model", default="gemma3:4b")
+    parser.add_argument("--article-chars", type=int, default=6000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--offline", action="store_true", help="Ollama を使わず、直前の呼び出しと共通な先頭部分の文字数だけを比べる")
+    args = parser.parse_args()
+
+    if args.offline:
+        _offline(args)
+    else:
+        _live(args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())